@@ -15,7 +15,7 @@ from typing import Annotated, Literal
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -25,6 +25,11 @@ from app.config import settings
 from app.models.lab import Lab, LabStatus
 from app.models.user import User
 from app.runtime import _resolve_compose_path
+from app.services.compose_network_pool import get_network_pool
+from app.services.compose_warm_pool import get_warm_pool
+from app.services.microvm_boot_admission import get_boot_admission
+from app.services.microvm_image_cache import get_target_image_cache
+from app.services.microvm_warm_pool import get_microvm_warm_pool
 from app.services.docker_net import (
     AdminCleanupResult,
     AttachedContainerInfo,
@@ -56,6 +61,7 @@ from app.services.docker_net import (
     cleanup_project_networks,
     is_lab_project,
 )
+from app.services.lab_network_reaper import get_network_reaper
 from app.services.scan_cache import get_scan_cache
 
 logger = logging.getLogger(__name__)
@@ -329,6 +335,11 @@ class NetworkStatusResponse(BaseModel):
     hint: str
     # Debug sample (admin-only, max 10)
     debug_sample: list[ContainerDebugInfo] = []
+    # Compose pools (None when disabled): sizes, occupancy, claim hit rate
+    network_pool: dict | None = None
+    warm_pool: dict | None = None
+    # Background reaper of empty lab networks (None outside compose runtime)
+    network_reaper: dict | None = None
 
 
 # =============================================================================
@@ -394,6 +405,7 @@ class ProjectStopResultInfo(BaseModel):
     networks_removed: int = 0
     verified_stopped: bool = False  # True only if remaining_final == 0
     error: str | None = None
+    timings_ms: dict[str, int] = {}  # Phase durations (pre_check, down, ..., total)
 
 
 class StopLabsResponse(BaseModel):
@@ -421,6 +433,8 @@ class StopLabsResponse(BaseModel):
     after_containers: int  # Running lab containers after execution (fresh query)
     errors: list[str] = []
     results: list[ProjectStopResultInfo] = []  # Per-project details (capped)
+    max_parallel: int = 1  # Concurrent compose down cap used
+    elapsed_ms: int = 0  # Wall time of the batch stop
     message: str
 
 
@@ -515,6 +529,9 @@ async def get_network_status(
     # Get running container status with lab/non-lab partitioning
     container_status = get_running_container_status(timeout=10.0)
 
+    network_pool = get_network_pool()
+    warm_pool = get_warm_pool()
+
     # Build debug sample (max 10 lab containers)
     debug_sample = [
         ContainerDebugInfo(name=entry.name, project=entry.project)
@@ -530,6 +547,11 @@ async def get_network_status(
         running_total_containers=container_status.running_total_containers,
         hint=net_counts.hint or "Network counts within normal range.",
         debug_sample=debug_sample,
+        network_pool=network_pool.stats() if network_pool is not None else None,
+        warm_pool=warm_pool.stats() if warm_pool is not None else None,
+        network_reaper=(
+            get_network_reaper().stats() if settings.octolab_runtime == "compose" else None
+        ),
     )
 
 
@@ -879,10 +901,19 @@ async def _classify_runtime_projects(
     for containers in runtime_projects.values():
         result.running_lab_containers_total += len(containers)
 
+    # Warm standby stacks have no Lab row yet; they belong to the pool
+    warm_pool = get_warm_pool()
+    standby_projects = warm_pool.standby_projects() if warm_pool is not None else set()
+
     # Classify each project
     projects_list: list[RuntimeLabProject] = []
 
     for project, containers in runtime_projects.items():
+        if project in standby_projects:
+            result.running_lab_projects_total -= 1
+            result.running_lab_containers_total -= len(containers)
+            continue
+
         lab_id = extract_lab_id_from_project(project)
         if not lab_id:
             continue  # Skip invalid projects (shouldn't happen)
@@ -1213,6 +1244,7 @@ async def stop_labs(
                 networks_removed=pr.networks_removed,
                 verified_stopped=pr.verified_stopped,
                 error=pr.error,
+                timings_ms=pr.timings_ms,
             ))
 
     # Cap results unless debug mode
@@ -1269,6 +1301,8 @@ async def stop_labs(
         after_containers=after_containers,
         errors=stop_result.errors,
         results=project_results,
+        max_parallel=stop_result.max_parallel,
+        elapsed_ms=stop_result.elapsed_ms,
         message=message,
     )
 
@@ -2248,6 +2282,9 @@ class FirecrackerStatusResponse(BaseModel):
     running_microvm_labs: list[LabRuntimeStatusInfo]
     drift: dict  # {"db_running_no_pid": [...], "orphan_pids": [...]}
     summary: str
+    warm_pool: dict | None = None
+    boot_admission: dict | None = None
+    image_cache: dict | None = None
 
 
 @router.get(
@@ -2276,6 +2313,8 @@ async def get_firecracker_status_endpoint(
     logger.info(f"Admin {admin.email} checking Firecracker status")
 
     result = await get_firecracker_status(db)
+    microvm_pool = get_microvm_warm_pool()
+    image_cache = get_target_image_cache()
 
     logger.info(
         f"Firecracker status: processes={result.firecracker_process_count}, "
@@ -2303,6 +2342,40 @@ async def get_firecracker_status_endpoint(
         running_microvm_labs=labs_response,
         drift=result.drift,
         summary=result.summary,
+        warm_pool=microvm_pool.stats() if microvm_pool is not None else None,
+        boot_admission=get_boot_admission().stats(),
+        image_cache=image_cache.stats() if image_cache is not None else None,
     )
 
 
+# =============================================================================
+# Host Operation Metrics Endpoint
+# =============================================================================
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Host operation metrics",
+    description=(
+        "Latency histograms (with p50/p95/p99 over recent operations), error "
+        "counters and in-flight gauges for docker, compose, guest agent, "
+        "microvm-netd and Guacamole operations, in Prometheus text format. "
+        "Admin only."
+    ),
+)
+async def get_host_metrics(
+    admin: User = Depends(require_admin),
+) -> PlainTextResponse:
+    """Render the in-process metrics registry.
+
+    SECURITY:
+    - Admin-only endpoint
+    - Labels are operation names only (no lab IDs, paths or secrets)
+    """
+    from app.utils.metrics import get_registry
+
+    return PlainTextResponse(
+        get_registry().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
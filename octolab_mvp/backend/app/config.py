@@ -42,6 +42,7 @@ VALID_RUNTIMES: Final[frozenset[str]] = frozenset({
 # These defaults match deploy paths in infra/firecracker/build-rootfs.sh
 MICROVM_DEFAULT_KERNEL_PATH: Final[str] = "/var/lib/octolab/firecracker/vmlinux"
 MICROVM_DEFAULT_ROOTFS_PATH: Final[str] = "/var/lib/octolab/firecracker/rootfs.ext4"
+MICROVM_DEFAULT_IMAGE_STORE_PATH: Final[str] = "/var/lib/octolab/firecracker/images.ext4"
 
 # Type alias for runtime (used for validation)
 RuntimeName = Literal["compose", "firecracker", "microvm", "k8s", "noop"]
@@ -230,6 +231,9 @@ class Settings(BaseSettings):
     evidence_export_timeout_seconds: int = 120
     evidence_seal_timeout_seconds: int = 60
     evidence_tlog_reader: str = "volume_tar"
+    # Copy volumes straight from their host Mountpoint when it is readable
+    # (backend on the docker host as root); otherwise stream a docker archive
+    evidence_volume_mountpoint_read: bool = True
 
     # =========================================================================
     # Cost Guardrails: Quotas and TTL
@@ -286,6 +290,63 @@ class Settings(BaseSettings):
     docker_network_timeout_seconds: int = 30
     net_rm_max_retries: int = 6
     net_rm_backoff_ms: int = 200
+    # Max lab projects torn down concurrently by admin batch stop (per host)
+    teardown_batch_max_parallel: int = 4
+
+    # Docker Engine API (unix socket). When enabled and the socket exists,
+    # docker_net/compose_runtime helpers use the API instead of forking the CLI.
+    # The CLI remains the fallback whenever the API is unreachable.
+    docker_engine_api_enabled: bool = True
+    docker_socket_path: str = "/var/run/docker.sock"
+    docker_engine_api_timeout_seconds: float = 10.0
+    # Keep an in-memory container/network/volume inventory current from the
+    # Docker event stream (requires the Engine API). Scans fall back to
+    # listing the daemon whenever the inventory is not in sync.
+    docker_inventory_enabled: bool = True
+    # Pre-created lab_net/egress_net pairs for the compose runtime. Labs claim
+    # a pair at create and release it at teardown; a background task keeps
+    # compose_network_pool_size pairs ready and reaps leaked ones. Each pair
+    # reserves two /compose_network_pool_prefixlen subnets from the CIDR below.
+    compose_network_pool_enabled: bool = False
+    compose_network_pool_size: int = 8
+    compose_network_pool_cidr: str = "10.248.0.0/16"
+    compose_network_pool_prefixlen: int = 24
+    compose_network_pool_interval_seconds: float = 30.0
+    # Private (0700) backend-owned directory for compose pool state shared by
+    # all workers: network pair leases and the compose overrides using them.
+    compose_state_dir: str = "/var/lib/octolab/compose"
+    # Empty per-lab networks are reaped in the background instead of before
+    # every create_lab. A network is removed once it has been empty for
+    # min_empty_seconds (compose creates networks before attaching containers);
+    # the reaper runs every interval, or early once pressure_threshold empty
+    # networks are waiting. create_lab reclaims synchronously only when compose
+    # reports address pool exhaustion.
+    compose_network_reaper_interval_seconds: float = 60.0
+    compose_network_reaper_min_empty_seconds: float = 120.0
+    compose_network_reaper_pressure_threshold: int = 16
+    # Warm standby pool: fully started, healthy, unassigned octobox+gateway
+    # stacks. Sizes are keyed by recipe name; "*" is shared by all recipes.
+    # A lab claims a stack at creation, gets its VNC password bound and only
+    # its target started. Idle stacks are recycled after the TTL.
+    compose_warm_pool_enabled: bool = False
+    compose_warm_pool_sizes: dict[str, int] = {}
+    compose_warm_pool_ttl_seconds: int = 1800
+    compose_warm_pool_interval_seconds: float = 15.0
+
+    # =========================================================================
+    # Subprocess Executor
+    # =========================================================================
+    # Max concurrent child processes per binary (arun_cmd). Binaries not
+    # listed share subprocess_default_concurrency each. iptables covers
+    # iptables-save/-restore and ip6tables (they contend on the xtables lock).
+    subprocess_concurrency_limits: dict[str, int] = {
+        "docker": 16,
+        "iptables": 4,
+        "kubectl": 8,
+    }
+    subprocess_default_concurrency: int = 32
+    # Captured stdout/stderr is truncated beyond this many bytes per stream
+    subprocess_max_output_bytes: int = 4 * 1024 * 1024
 
     # =========================================================================
     # Firecracker microVM Runtime Configuration
@@ -326,12 +387,18 @@ class Settings(BaseSettings):
     # The backend connects to this socket to request bridge/tap creation
     # This socket is served by microvm-netd running as root
     microvm_netd_sock: str = "/run/octolab/microvm-netd.sock"
+    # Persistent connections to netd; each carries several requests at once
+    # (0 = one connection per request)
+    microvm_netd_pool_size: int = 2
 
     # Timeouts
     microvm_boot_timeout_secs: int = 20
     microvm_cmd_timeout_secs: int = 120  # Default command timeout
     microvm_compose_timeout_secs: int = 600  # Longer timeout for compose_up (10 min)
     microvm_diag_timeout_secs: int = 30  # Short timeout for diag command
+    # Agent connections are parked for reuse this long after a response (0
+    # disables reuse). Keep below the agent's keep-alive idle timeout (5s).
+    microvm_agent_conn_idle_seconds: float = 2.0
 
     # Output limits (DoS prevention)
     microvm_max_output_bytes: int = 65536
@@ -340,6 +407,56 @@ class Settings(BaseSettings):
     microvm_vcpu_count: int = 1
     microvm_mem_size_mib: int = 512
 
+    # Concurrent VM boots, shared by all workers on the host through lease
+    # files in <state_dir>/boot-leases. The number of slots moves between min
+    # and max: it scales down as PSI "some avg10" for io/memory approaches its
+    # limit (percent), and is capped by how many more VMs fit in MemAvailable
+    # above boot_min_free_mib.
+    microvm_min_concurrent_boots: int = 1
+    microvm_max_concurrent_boots: int = 4
+    microvm_boot_io_pressure_limit: float = 40.0
+    microvm_boot_memory_pressure_limit: float = 20.0
+    microvm_boot_min_free_mib: int = 1024
+    microvm_boot_admission_poll_seconds: float = 0.25
+
+    # Overlay rootfs: share the base image read-only and give each VM a sparse
+    # writable overlay drive. Only when reflink is unavailable, and only for
+    # rootfs builds that include /sbin/overlay-init (build-rootfs.sh).
+    microvm_rootfs_overlay_enabled: bool = False
+    microvm_rootfs_overlay_size_mib: int = 4096
+
+    # Pre-baked image store drive (build-rootfs.sh): attached read-only to
+    # every VM when the file exists, and mounted by the guest as Docker's data
+    # root through a per-VM copy-on-write snapshot, so boots skip loading the
+    # image tarballs. Empty disables.
+    microvm_image_store_path: str = MICROVM_DEFAULT_IMAGE_STORE_PATH
+
+    # Snapshot/restore boot: a golden VM is booted once per rootfs build (docker
+    # running, images loaded) and snapshotted; labs restore from the snapshot
+    # and get their token/MAC/IP after restore. Falls back to cold boot while
+    # no current template exists or if a restore fails.
+    # Requires Firecracker >= 1.12 (network_overrides on snapshot load).
+    microvm_snapshot_enabled: bool = False
+    microvm_snapshot_check_interval_seconds: float = 300.0
+    microvm_snapshot_restore_timeout_secs: int = 10
+    microvm_snapshot_images_timeout_secs: int = 300
+
+    # Warm pool of booted, agent-ready VMs with TAP/IP allocated (0 disables).
+    # Labs claim one at creation and only get the port forward, project upload
+    # and compose up. Refill stops while MemAvailable minus one VM's memory
+    # would drop below min_free_mib; VMs are recycled after the TTL or when
+    # the base rootfs is replaced.
+    microvm_warm_pool_size: int = 0
+    microvm_warm_pool_ttl_seconds: int = 3600
+    microvm_warm_pool_interval_seconds: float = 15.0
+    microvm_warm_pool_min_free_mib: int = 2048
+
+    # Host-side cache of target images built inside labs, keyed by a hash of
+    # the Dockerfile and source files (0 disables). Later labs with the same
+    # key load the archive instead of rebuilding; least recently used
+    # archives are evicted above the limit.
+    microvm_image_cache_max_mib: int = 4096
+
     # =========================================================================
     # Validators
     # =========================================================================
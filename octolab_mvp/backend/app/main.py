@@ -39,7 +39,15 @@ from app.api.routes import admin, auth, cve_registry, dockerfile_review_queue, e
 from app.config import settings
 from app.db import engine
 from app.middleware.size_limit import SizeLimitMiddleware
+from app.services.compose_network_pool import network_pool_loop
+from app.services.compose_warm_pool import warm_pool_loop
+from app.services.microvm_warm_pool import microvm_warm_pool_loop
 from app.services.db_schema_guard import ensure_schema_in_sync
+from app.services.docker_inventory import docker_inventory_loop
+from app.services.firecracker_snapshot import snapshot_template_loop
+from app.services.lab_network_reaper import network_reaper_loop
+from app.services.microvm_net_client import close_netd_connections
+from app.services.lab_target_watch import register_target_watch, unregister_target_watch
 from app.services.runtime_selector import RuntimeState
 from app.services.teardown_worker import teardown_worker_loop
 from app.services.firecracker_cleanup import cleanup_orphaned_firecracker_resources
@@ -208,6 +216,37 @@ async def lifespan(app: FastAPI):
     if settings.octolab_runtime == "firecracker":
         watchdog_task = asyncio.create_task(_watchdog_loop())
 
+    # Keep Docker inventory current from the event stream (drift scans, cleanup)
+    inventory_task = None
+    if settings.docker_engine_api_enabled and settings.docker_inventory_enabled:
+        register_target_watch()
+        inventory_task = asyncio.create_task(docker_inventory_loop())
+
+    # Keep pre-created lab network pairs ready (compose runtime only)
+    network_pool_task = None
+    if settings.octolab_runtime == "compose" and settings.compose_network_pool_enabled:
+        network_pool_task = asyncio.create_task(network_pool_loop())
+
+    # Reap empty per-lab networks off the create path (compose runtime only)
+    network_reaper_task = None
+    if settings.octolab_runtime == "compose":
+        network_reaper_task = asyncio.create_task(network_reaper_loop())
+
+    # Keep warm standby lab stacks ready (compose runtime only)
+    warm_pool_task = None
+    if settings.octolab_runtime == "compose" and settings.compose_warm_pool_enabled:
+        warm_pool_task = asyncio.create_task(warm_pool_loop())
+
+    # Keep booted standby VMs ready (firecracker only)
+    microvm_pool_task = None
+    if settings.octolab_runtime == "firecracker" and settings.microvm_warm_pool_size > 0:
+        microvm_pool_task = asyncio.create_task(microvm_warm_pool_loop())
+
+    # Keep a snapshot template for the current rootfs build (firecracker only)
+    snapshot_task = None
+    if settings.octolab_runtime == "firecracker" and settings.microvm_snapshot_enabled:
+        snapshot_task = asyncio.create_task(snapshot_template_loop())
+
     yield
 
     # Shutdown
@@ -226,6 +265,51 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass  # Expected during shutdown
 
+    if inventory_task:
+        unregister_target_watch()
+        inventory_task.cancel()
+        try:
+            await inventory_task
+        except asyncio.CancelledError:
+            pass  # Expected during shutdown
+
+    if warm_pool_task:
+        warm_pool_task.cancel()
+        try:
+            await warm_pool_task
+        except asyncio.CancelledError:
+            pass  # Expected during shutdown
+
+    if microvm_pool_task:
+        microvm_pool_task.cancel()
+        try:
+            await microvm_pool_task
+        except asyncio.CancelledError:
+            pass  # Expected during shutdown
+
+    if network_pool_task:
+        network_pool_task.cancel()
+        try:
+            await network_pool_task
+        except asyncio.CancelledError:
+            pass  # Expected during shutdown
+
+    if network_reaper_task:
+        network_reaper_task.cancel()
+        try:
+            await network_reaper_task
+        except asyncio.CancelledError:
+            pass  # Expected during shutdown
+
+    if snapshot_task:
+        snapshot_task.cancel()
+        try:
+            await snapshot_task
+        except asyncio.CancelledError:
+            pass  # Expected during shutdown
+
+    close_netd_connections()
+
     await engine.dispose()
 
 
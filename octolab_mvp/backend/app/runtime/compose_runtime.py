@@ -42,9 +42,11 @@ import asyncio
 import json
 import logging
 import os
+import secrets
 import subprocess
 import time
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Sequence
 from subprocess import CalledProcessError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -55,8 +57,25 @@ from app.models.recipe import Recipe
 from app.runtime.base import LabRuntime
 from app.runtime.exceptions import NetworkPoolExhaustedError, NetworkCleanupBlockedError
 from app.services.port_allocator import allocate_novnc_port, release_novnc_port
+from app.services.compose_network_pool import (
+    ComposeNetworkPool,
+    NetworkPair,
+    get_network_pool,
+    override_path,
+    remove_override,
+)
+from app.services.compose_warm_pool import StandbyStack, get_warm_pool
+from app.services.docker_inventory import DockerInventory, get_ready_inventory
+from app.services.lab_network_reaper import reclaim_lab_networks
+from app.services.docker_engine import (
+    DockerEngineError,
+    atry_engine,
+    get_engine_client,
+    try_engine,
+)
 from app.services.docker_net import (
-    preflight_network_cleanup,
+    NetworkCleanupResult,
+    docker_operation_name,
     get_network_counts,
     list_networks_by_compose_project,
     get_network_container_count,
@@ -70,6 +89,8 @@ from app.utils.redact import (
     sanitize_subprocess_error,
     sanitize_output,
 )
+from app.utils.metrics import timed, track_operation
+from app.utils.subprocess_utils import arun_cmd
 
 logger = logging.getLogger(__name__)
 
@@ -118,6 +139,24 @@ _TIMEOUT_NETWORK_INSPECT = 30
 _TIMEOUT_NETWORK_DISCONNECT = 30
 _TIMEOUT_COMPOSE_RM = 120
 _TIMEOUT_COMPOSE_DOWN = 120
+_TIMEOUT_VNC_REBIND = 15
+
+# Warm standby stacks run everything except the recipe target
+_STANDBY_SERVICES = ("octobox", "lab-gateway")
+_TARGET_SERVICE = "target"
+
+# Binds the lab VNC password in a standby OctoBox. The password arrives on
+# stdin; passwd.bound is what start-vnc-session.sh uses after a restart.
+_VNC_REBIND_SCRIPT = (
+    "set -e; umask 077; "
+    "T=$(command -v vncpasswd || command -v tigervncpasswd); "
+    '"$T" -f > /home/pentester/.vnc/passwd.bound; '
+    "cp /home/pentester/.vnc/passwd.bound /home/pentester/.vnc/passwd"
+)
+
+# Health polling interval while the Docker event stream drives readiness
+# (safety net in case an event is missed)
+_HEALTH_EVENT_FALLBACK_POLL_SECONDS = 10.0
 
 # Error patterns indicating Docker subnet/network pool exhaustion
 POOL_EXHAUSTED_PATTERNS = [
@@ -248,6 +287,19 @@ def _list_project_containers(project: str, all_states: bool = True) -> list[dict
     Returns:
         List of dicts with keys: id, name, status (truncated for safety)
     """
+    ok, engine_containers = try_engine(
+        lambda c: c.list_containers(
+            all=all_states,
+            filters={"label": [f"com.docker.compose.project={project}"]},
+            timeout=10.0,
+        )
+    )
+    if ok:
+        return [
+            {"id": ctr.id[:12], "name": ctr.name[:80], "status": ctr.status[:50]}
+            for ctr in engine_containers
+        ]
+
     cmd = [
         "docker", "ps",
         "--filter", f"label=com.docker.compose.project={project}",
@@ -297,6 +349,27 @@ def _rm_containers_force(container_ids: list[str]) -> tuple[int, list[str]]:
     if not container_ids:
         return 0, []
 
+    engine = get_engine_client()
+    if engine is not None:
+        engine_removed = 0
+        engine_errors: list[str] = []
+        try:
+            for cid in container_ids:
+                try:
+                    engine.remove_container(cid, force=True, timeout=30.0)
+                    engine_removed += 1
+                except DockerEngineError as e:
+                    if e.status_code is None:
+                        raise
+                    if e.status_code == 404:
+                        engine_removed += 1
+                    else:
+                        engine_errors.append(f"container rm {cid[:12]} failed: {e.message[:100]}")
+            return engine_removed, engine_errors
+        except DockerEngineError:
+            # Daemon became unreachable; rm -f below is idempotent
+            pass
+
     # Process in batches to avoid command line length issues
     batch_size = 10
     removed = 0
@@ -340,6 +413,14 @@ def _list_project_networks(project: str) -> list[str]:
     Returns:
         List of network names
     """
+    ok, engine_networks = try_engine(
+        lambda c: c.list_networks(
+            filters={"label": [f"com.docker.compose.project={project}"]}, timeout=10.0
+        )
+    )
+    if ok:
+        return [n.name for n in engine_networks if n.name]
+
     cmd = [
         "docker", "network", "ls",
         "--filter", f"label=com.docker.compose.project={project}",
@@ -387,6 +468,24 @@ def _rm_networks(network_names: list[str]) -> tuple[int, int, list[str]]:
             logger.debug(f"Skipping non-octolab network: {net_name}")
             continue
 
+        engine = get_engine_client()
+        if engine is not None:
+            try:
+                engine.remove_network(net_name, timeout=_TIMEOUT_NETWORK_RM)
+                removed += 1
+                continue
+            except DockerEngineError as e:
+                if e.status_code == 404:
+                    removed += 1
+                    continue
+                if e.status_code is not None:
+                    if "active endpoints" in e.message.lower():
+                        errors.append(f"{net_name}: has active endpoints")
+                    else:
+                        errors.append(f"{net_name}: {e.message[:50]}")
+                    continue
+                # Transport failure: fall through to CLI
+
         cmd = ["docker", "network", "rm", net_name]
 
         try:
@@ -456,6 +555,7 @@ class ComposeLabRuntime(LabRuntime):
         suppress_errors: bool = False,
         timeout: float = 120.0,
         secrets_for_redaction: list[str] | None = None,
+        extra_compose_files: Sequence[Path] | None = None,
     ) -> tuple[str, str]:
         """Run docker compose command with deterministic paths and captured output.
 
@@ -469,6 +569,7 @@ class ComposeLabRuntime(LabRuntime):
             suppress_errors: If True, log and swallow CalledProcessError
             timeout: Command timeout in seconds (default 120s)
             secrets_for_redaction: List of secret values to redact from output
+            extra_compose_files: Override files layered after the main compose file
 
         Returns:
             Tuple of (sanitized_stdout, sanitized_stderr)
@@ -484,8 +585,10 @@ class ComposeLabRuntime(LabRuntime):
             "docker", "compose",
             "--project-directory", self.compose_dir,
             "-f", str(self.compose_path),
-            *args,
         ]
+        for extra in extra_compose_files or ():
+            cmd.extend(["-f", str(extra)])
+        cmd.extend(args)
 
         # SECURITY: Log command without env (may contain VNC_PASSWORD)
         # Only log whether VNC_PASSWORD is present, never its value
@@ -495,20 +598,15 @@ class ComposeLabRuntime(LabRuntime):
             f"cwd={self.compose_dir}, vnc_password_present={vnc_password_present}"
         )
 
-        def _run() -> subprocess.CompletedProcess:
-            return subprocess.run(
-                cmd,
-                env=env,
-                check=True,
-                shell=False,
-                timeout=timeout,
-                capture_output=True,
-                text=True,
-                cwd=self.compose_dir,  # DETERMINISTIC: Run from compose directory
-            )
-
         try:
-            result = await asyncio.to_thread(_run)
+            with track_operation("compose", docker_operation_name(cmd)):
+                result = await arun_cmd(
+                    cmd,
+                    env=env,
+                    check=True,
+                    timeout=timeout,
+                    cwd=self.compose_dir,  # DETERMINISTIC: Run from compose directory
+                )
             # Sanitize output even on success
             sanitized_stdout = sanitize_output(result.stdout, secrets)
             sanitized_stderr = sanitize_output(result.stderr, secrets)
@@ -579,19 +677,15 @@ class ComposeLabRuntime(LabRuntime):
             "--build-arg", f"CMDLOG_BUST={cache_bust_value}",
         ]
 
-        def _build() -> None:
-            subprocess.run(
-                cmd,
-                env=env,
-                check=True,
-                shell=False,
-                timeout=_TIMEOUT_COMPOSE_BUILD,
-                capture_output=True,  # Don't spam logs with build output
-                cwd=self.compose_dir,  # DETERMINISTIC: Run from compose directory
-            )
-
         logger.info(f"Building with CMDLOG_BUST={cache_bust_value} for project {project}")
-        await asyncio.to_thread(_build)
+        # Output is captured (and capped) so build logs don't spam ours
+        await arun_cmd(
+            cmd,
+            env=env,
+            check=True,
+            timeout=_TIMEOUT_COMPOSE_BUILD,
+            cwd=self.compose_dir,  # DETERMINISTIC: Run from compose directory
+        )
 
     def _is_localhost(self, host: str) -> bool:
         """Check if host is a localhost address."""
@@ -983,6 +1077,7 @@ class ComposeLabRuntime(LabRuntime):
         logger.warning(f"Network {net_name} removal gave up after {attempt} attempt(s)")
         return False
 
+    @timed("compose", "create_lab")
     async def create_lab(
         self,
         lab: Lab,
@@ -1020,14 +1115,56 @@ class ComposeLabRuntime(LabRuntime):
                 "Set VNC_AUTH_MODE=password or COMPOSE_BIND_HOST=127.0.0.1"
             )
 
-        # Preflight: Clean up stale empty lab networks to recover address pool space
-        # This is strictly scoped (only empty per-lab networks) and never raises
-        cleanup_result = await preflight_network_cleanup()
-        if cleanup_result.removed_count > 0:
-            logger.info(
-                f"Preflight cleanup freed {cleanup_result.removed_count} "
-                f"empty lab network(s) before creating lab {lab.id}"
+        project = self._project_name(lab)
+
+        # Warm standby claimed at lab creation: OctoBox and gateway are already
+        # up, so only bind the password and start the target
+        warm_pool = get_warm_pool()
+        standby = warm_pool.take(lab.id) if warm_pool is not None else None
+        if standby is not None:
+            activated = await self._activate_standby(lab, standby, db_session, vnc_password)
+            warm_pool.record_activation(activated)
+            if activated:
+                return
+            # Fall back to a cold start on a clean project
+            await self.discard_standby(lab.id)
+
+        # Pre-created network pair: networks already exist with reserved
+        # subnets, so there is nothing to clean up or create on this path
+        network_pool = get_network_pool()
+        pool_pair = await network_pool.claim(project) if network_pool is not None else None
+        compose_overrides: list[Path] = []
+        if pool_pair is not None:
+            override = await self._write_network_override(network_pool, pool_pair, project)
+            if override is not None:
+                compose_overrides.append(override)
+                logger.debug(f"Lab {lab.id} claimed network pair {pool_pair.slot}")
+            else:
+                pool_pair = None
+        # Otherwise compose creates the networks. Empty lab networks are reaped
+        # in the background (lab_network_reaper); _start_stack reclaims
+        # synchronously only if compose reports address pool exhaustion.
+
+        try:
+            await self._start_stack(
+                lab, project, compose_overrides, db_session, vnc_password
             )
+        except BaseException:
+            if pool_pair is not None:
+                await network_pool.release(project)
+                remove_override(project)
+            raise
+
+    async def _start_stack(
+        self,
+        lab: Lab,
+        project: str,
+        compose_overrides: list[Path],
+        db_session: AsyncSession,
+        vnc_password: str | None,
+    ) -> None:
+        """Allocate the noVNC port and bring the compose stack up (create_lab body)."""
+        vnc_auth_mode = settings.vnc_auth_mode
 
         # Allocate a unique port for noVNC access (with tenant isolation)
         novnc_port = await allocate_novnc_port(db_session, lab_id=lab.id, owner_id=lab.owner_id)
@@ -1064,8 +1201,6 @@ class ComposeLabRuntime(LabRuntime):
             f"GUAC mode: {guac_enabled}, vnc_password_present=True"
         )
 
-        project = self._project_name(lab)
-
         # Dev-only: Force cmdlog rebuild when enabled (server-side setting)
         # This ensures cmdlog script changes are picked up without manual cache busting
         if settings.dev_force_cmdlog_rebuild:
@@ -1083,6 +1218,9 @@ class ComposeLabRuntime(LabRuntime):
         # SECURITY: Build secrets list for redaction (never log these values)
         secrets_for_redaction = [vnc_password] if vnc_password else []
 
+        # Set once empty lab networks have been reclaimed after pool exhaustion
+        cleanup_result: NetworkCleanupResult | None = None
+
         # Attempt to start the compose stack with allocated port
         max_port_retries = 5
         for attempt in range(max_port_retries):
@@ -1091,6 +1229,7 @@ class ComposeLabRuntime(LabRuntime):
                     ["-p", project, "up", "-d"],
                     env=env,
                     secrets_for_redaction=secrets_for_redaction,
+                    extra_compose_files=compose_overrides,
                 )
                 logger.info(f"Lab {lab.id} started successfully with noVNC port {novnc_port}")
                 return  # Success
@@ -1101,11 +1240,21 @@ class ComposeLabRuntime(LabRuntime):
 
                 # Check for Docker network pool exhaustion
                 if self._is_pool_exhausted_error(error_msg):
+                    # Reclaim empty lab networks now (once), then retry
+                    if cleanup_result is None:
+                        cleanup_result = await reclaim_lab_networks()
+                        if cleanup_result.removed_count > 0:
+                            logger.info(
+                                f"Network pool exhausted for lab {lab.id}; reclaimed "
+                                f"{cleanup_result.removed_count} empty lab network(s), retrying"
+                            )
+                            continue
+
                     # Collect network counts for diagnostics
                     net_counts = get_network_counts(timeout=5.0)
                     logger.error(
                         f"Docker network pool exhausted while creating lab {lab.id}. "
-                        f"Preflight cleanup freed {cleanup_result.removed_count} network(s) "
+                        f"Reclaim freed {cleanup_result.removed_count} network(s) "
                         f"but pool is still exhausted. "
                         f"Network counts: total={net_counts.total_count}, octolab={net_counts.octolab_count}"
                     )
@@ -1220,6 +1369,7 @@ class ComposeLabRuntime(LabRuntime):
             f"Unable to start lab {lab.id} after {max_port_retries} attempts due to persistent port conflicts"
         )
 
+    @timed("compose", "destroy_lab")
     async def destroy_lab(self, lab: Lab) -> TeardownResult:
         """
         Destroy lab resources with VERIFIED cleanup and truthful reporting.
@@ -1257,6 +1407,12 @@ class ComposeLabRuntime(LabRuntime):
             logger.error(f"Refusing to teardown invalid project name for lab {lab.id}")
             return result
 
+        # Pooled networks are external in the override, so compose down
+        # detaches from them instead of trying to remove them
+        network_pool = get_network_pool()
+        compose_overrides = [override_path(project)] if network_pool is not None else []
+        compose_overrides = [p for p in compose_overrides if p.exists()]
+
         # Step 1: Run docker compose down
         try:
             stdout, stderr = await self._run_compose(
@@ -1264,6 +1420,7 @@ class ComposeLabRuntime(LabRuntime):
                 env=os.environ.copy(),
                 suppress_errors=True,
                 timeout=_TIMEOUT_COMPOSE_DOWN,
+                extra_compose_files=compose_overrides,
             )
             result.compose_down_ok = True
         except ComposeCommandError as e:
@@ -1325,6 +1482,11 @@ class ComposeLabRuntime(LabRuntime):
                 elif skipped.reason != "name_not_allowed":
                     result.errors.append(f"network {skipped.name}: {skipped.reason}")
 
+        # Step 6: Return the pooled network pair (verified empty before reuse)
+        if network_pool is not None:
+            await network_pool.release(project)
+            remove_override(project)
+
         # Log truthful summary
         logger.info(
             f"Teardown verified for lab {lab.id}: success={result.success}, "
@@ -1347,6 +1509,159 @@ class ComposeLabRuntime(LabRuntime):
 
         return result
 
+    # -------------------------------------------------------------------------
+    # Warm standby stacks (see app/services/compose_warm_pool.py)
+    # -------------------------------------------------------------------------
+
+    async def _write_network_override(
+        self, network_pool: ComposeNetworkPool, pair: NetworkPair, project: str
+    ) -> Path | None:
+        """Write a claimed pair's override, or release the pair on failure."""
+        try:
+            return pair.write_override(project)
+        except OSError as e:
+            logger.warning(
+                f"Cannot write network override for {project} ({type(e).__name__}); "
+                "not using the network pool"
+            )
+            await network_pool.release(project)
+            return None
+
+    def _compose_overrides(self, project: str) -> list[Path]:
+        """Override files a project was started with (pooled networks)."""
+        if get_network_pool() is None:
+            return []
+        return [p for p in (override_path(project),) if p.exists()]
+
+    def _standby_env(self, lab_id: PyUUID, novnc_port: int, vnc_password: str) -> dict[str, str]:
+        env = os.environ.copy()
+        env["LAB_ID"] = str(lab_id)
+        env["NOVNC_HOST_PORT"] = str(novnc_port)
+        env["COMPOSE_BIND_HOST"] = settings.compose_bind_host
+        env["OCTOBOX_VNC_AUTH"] = settings.vnc_auth_mode
+        env["GUAC_ENABLED"] = "true" if settings.guac_enabled else "false"
+        env["VNC_PASSWORD"] = vnc_password
+        return env
+
+    async def start_standby(self, lab_id: PyUUID, novnc_port: int) -> None:
+        """Start an unassigned octobox + gateway stack and wait until healthy.
+
+        The stack runs under the project the lab with this ID will use. Its
+        VNC password is random and replaced when a lab activates the stack.
+
+        Raises:
+            ComposeCommandError, subprocess.TimeoutExpired, TimeoutError,
+            RuntimeError: stack did not come up (it has been discarded)
+        """
+        project = project_name_for_lab(lab_id)
+        standby_password = secrets.token_urlsafe(24)
+
+        network_pool = get_network_pool()
+        compose_overrides: list[Path] = []
+        if network_pool is not None:
+            pair = await network_pool.claim(project)
+            if pair is not None:
+                override = await self._write_network_override(network_pool, pair, project)
+                if override is not None:
+                    compose_overrides.append(override)
+
+        try:
+            await self._run_compose(
+                ["-p", project, "up", "-d", *_STANDBY_SERVICES],
+                env=self._standby_env(lab_id, novnc_port, standby_password),
+                secrets_for_redaction=[standby_password],
+                extra_compose_files=compose_overrides,
+            )
+            # wait_for_healthy only needs the ID to derive the project
+            await self.wait_for_healthy(
+                SimpleNamespace(id=lab_id),
+                timeout_seconds=settings.container_health_timeout_seconds,
+            )
+        except BaseException:
+            await self.discard_standby(lab_id)
+            raise
+
+    async def _rebind_vnc_password(self, project: str, vnc_password: str) -> None:
+        """Replace the standby VNC password in a running OctoBox.
+
+        SECURITY: The password is passed on stdin, never in argv or env.
+        Xtigervnc re-reads the -rfbauth file on each authentication.
+        """
+        cmd = [
+            "docker", "exec", "-i", "-u", "pentester",
+            f"{project}-octobox-1",
+            "sh", "-c", _VNC_REBIND_SCRIPT,
+        ]
+
+        result = await arun_cmd(cmd, input=f"{vnc_password}\n", timeout=_TIMEOUT_VNC_REBIND)
+        if result.returncode != 0:
+            raise RuntimeError(f"VNC password rebind failed (exit_code={result.returncode})")
+
+    async def _activate_standby(
+        self,
+        lab: Lab,
+        standby: StandbyStack,
+        db_session: AsyncSession,
+        vnc_password: str | None,
+    ) -> bool:
+        """Turn a claimed standby into this lab's stack.
+
+        Returns:
+            True if the lab is running on the standby, False if the caller
+            should discard it and cold-start
+        """
+        if not vnc_password:
+            return False
+
+        # create_lab_for_user reserved the standby's published port for this lab
+        novnc_port = await allocate_novnc_port(db_session, lab_id=lab.id, owner_id=lab.owner_id)
+        if novnc_port != standby.novnc_port:
+            logger.info(f"Standby port for lab {lab.id} was not reserved; cold-starting")
+            return False
+
+        project = self._project_name(lab)
+        try:
+            await self._rebind_vnc_password(project, vnc_password)
+            await self._run_compose(
+                ["-p", project, "up", "-d", "--no-deps", _TARGET_SERVICE],
+                env=self._standby_env(lab.id, novnc_port, vnc_password),
+                secrets_for_redaction=[vnc_password],
+                extra_compose_files=self._compose_overrides(project),
+            )
+        except (ComposeCommandError, RuntimeError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Warm standby activation failed for lab {lab.id}: {type(e).__name__}")
+            return False
+
+        logger.info(
+            f"Lab {lab.id} started from warm standby (pool={standby.pool_key}, "
+            f"idle {standby.age_seconds():.0f}s) with noVNC port {novnc_port}"
+        )
+        return True
+
+    async def discard_standby(self, lab_id: PyUUID) -> None:
+        """Tear down a standby stack that no lab will use, volumes included.
+
+        Only called for stacks no user has been given access to, so removing
+        the project's volumes never destroys evidence.
+        """
+        project = project_name_for_lab(lab_id)
+        try:
+            await self._run_compose(
+                ["-p", project, "down", "-v", "--remove-orphans"],
+                env=os.environ.copy(),
+                suppress_errors=True,
+                timeout=_TIMEOUT_COMPOSE_DOWN,
+                extra_compose_files=self._compose_overrides(project),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to discard standby {project}: {type(e).__name__}")
+
+        network_pool = get_network_pool()
+        if network_pool is not None:
+            await network_pool.release(project)
+            remove_override(project)
+
+    @timed("compose", "wait_for_healthy")
     async def wait_for_healthy(
         self,
         lab: Lab,
@@ -1360,10 +1675,14 @@ class ComposeLabRuntime(LabRuntime):
         underlying healthcheck command plus recent log output when failures occur.
         Returns True when healthy, raises TimeoutError if not healthy within timeout.
 
+        When the Docker event stream is live, each check is triggered by the
+        container's health_status/start/die events instead of the poll timer,
+        and polling only continues at a slow fallback interval.
+
         Args:
             lab: Lab model instance
             timeout_seconds: Maximum time to wait for healthy status
-            poll_interval_seconds: Delay between health checks
+            poll_interval_seconds: Delay between health checks (no event stream)
 
         Returns:
             True if container is healthy
@@ -1379,11 +1698,57 @@ class ComposeLabRuntime(LabRuntime):
 
         start_time = time.monotonic()
         deadline = start_time + timeout_seconds
+
+        # Wake the loop on this container's events when the stream is live
+        inventory = get_ready_inventory()
+        wakeup = asyncio.Event()
+
+        def _on_event(event: dict) -> None:
+            actor = event.get("Actor") or {}
+            if event.get("Type") != "container":
+                return
+            if (actor.get("Attributes") or {}).get("name") != container_name:
+                return
+            action = event.get("Action") or ""
+            if action.startswith("health_status") or action in ("start", "die"):
+                wakeup.set()
+
+        if inventory is not None:
+            inventory.add_event_listener(_on_event)
+
+        try:
+            return await self._wait_for_health_status(
+                container_name,
+                start_time=start_time,
+                deadline=deadline,
+                timeout_seconds=timeout_seconds,
+                poll_interval_seconds=poll_interval_seconds,
+                inventory=inventory,
+                wakeup=wakeup,
+            )
+        finally:
+            if inventory is not None:
+                inventory.remove_event_listener(_on_event)
+
+    async def _wait_for_health_status(
+        self,
+        container_name: str,
+        *,
+        start_time: float,
+        deadline: float,
+        timeout_seconds: float,
+        poll_interval_seconds: float,
+        inventory: DockerInventory | None,
+        wakeup: asyncio.Event,
+    ) -> bool:
+        """Health check loop for wait_for_healthy (event-woken or polled)."""
         last_status: str | None = None
         last_inspect: dict | None = None
         initial_logged = False
 
         while time.monotonic() < deadline:
+            # Clear before inspecting so an event racing the inspect is not lost
+            wakeup.clear()
             inspect_data = await self._inspect_container_health(container_name)
             if inspect_data:
                 last_inspect = inspect_data
@@ -1417,7 +1782,23 @@ class ComposeLabRuntime(LabRuntime):
                     f"Container {container_name} is unhealthy after {elapsed:.1f}s ({details})"
                 )
 
-            await asyncio.sleep(poll_interval_seconds)
+            if inventory is None:
+                await asyncio.sleep(poll_interval_seconds)
+                continue
+
+            # Event-driven: sleep until the next event for this container, or
+            # poll at the slow fallback rate (fast rate if the stream dropped)
+            if inventory.ready:
+                interval = max(poll_interval_seconds, _HEALTH_EVENT_FALLBACK_POLL_SECONDS)
+            else:
+                interval = poll_interval_seconds
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=min(interval, remaining))
+            except asyncio.TimeoutError:
+                pass
 
         elapsed = time.monotonic() - start_time
         latest = await self._inspect_container_health(container_name)
@@ -1428,16 +1809,14 @@ class ComposeLabRuntime(LabRuntime):
 
     async def _inspect_container_health(self, container_name: str) -> dict | None:
         """Return docker inspect data for the container (limited to health info)."""
+        ok, data = await atry_engine(lambda c: c.ainspect_container(container_name, timeout=5.0))
+        if ok:
+            return data if isinstance(data, dict) else None
+
         cmd = ["docker", "inspect", container_name]
 
-        def _inspect() -> dict | None:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                shell=False,
-                timeout=5.0,
-            )
+        try:
+            result = await arun_cmd(cmd, timeout=5.0)
             if result.returncode != 0 or not result.stdout.strip():
                 return None
             try:
@@ -1448,9 +1827,6 @@ class ComposeLabRuntime(LabRuntime):
                 return None
             first = payload[0]
             return first if isinstance(first, dict) else None
-
-        try:
-            return await asyncio.to_thread(_inspect)
         except subprocess.TimeoutExpired:
             return None
         except Exception as exc:
@@ -1524,18 +1900,9 @@ class ComposeLabRuntime(LabRuntime):
             "{{.ID}}",
         ]
 
-        def _check_containers() -> str:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                shell=False,
-                timeout=3.0,
-            )
-            return result.stdout.strip()
-
         try:
-            container_ids = await asyncio.to_thread(_check_containers)
+            result = await arun_cmd(cmd, timeout=3.0)
+            container_ids = result.stdout.strip()
             exists = bool(container_ids)
 
             if exists:
@@ -19,10 +19,10 @@ SECURITY:
 from __future__ import annotations
 
 import asyncio
-import base64
 import io
 import logging
 import tarfile
+from dataclasses import replace
 from pathlib import Path
 from typing import Any
 from uuid import UUID
@@ -43,20 +43,23 @@ from app.services.firecracker_manager import (
     StaleRootfsError,
     VMMetadata,
     cleanup_network_for_lab,
-    cleanup_port_forward_for_lab,
     create_vm,
     destroy_vm,
     preflight,
     send_agent_command,
+    send_agent_stream,
     setup_network_for_lab,
     setup_port_forward_for_lab,
 )
+from app.services.microvm_image_cache import get_target_image_cache, target_image_key
+from app.services.microvm_warm_pool import get_microvm_warm_pool
 from app.services.firecracker_paths import (
     PathContainmentError,
     lab_state_dir,
     validate_lab_id,
 )
 from app.services.port_allocator import allocate_novnc_port, release_novnc_port
+from app.runtime.pipeline import ProvisioningPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -273,6 +276,11 @@ class FirecrackerLabRuntime:
     ) -> str | None:
         """Build the target image inside the VM using docker_build agent command.
 
+        Images are content-addressed (see microvm_image_cache): a cached
+        archive for the same Dockerfile and source files is loaded instead
+        of building, and a fresh build is exported to the cache before this
+        returns, while the lab's project and port forward are not set up.
+
         Args:
             lab_id: Lab UUID string
             dockerfile: Dockerfile content
@@ -281,19 +289,45 @@ class FirecrackerLabRuntime:
         Returns:
             Image tag if successful, None on failure
         """
-        # Use a consistent project name for the target
+        # Same name for the same build inputs in every lab, so a cached
+        # archive loads under the tag the compose project expects.
         # The agent will create: octolab/{project_name}:latest
-        project_name = f"target-{lab_id[-12:]}"
+        key = target_image_key(dockerfile, source_files)
+        project_name = f"target-{key[:12]}"
+        image_cache = get_target_image_cache()
+
+        if image_cache is not None:
+            archive = image_cache.lookup(key)
+            if archive is not None:
+                load_response = await send_agent_stream(
+                    lab_id,
+                    "image_load",
+                    {"image.tar": archive},
+                    project=project_name,
+                )
+                if load_response.ok:
+                    logger.info(
+                        f"Target image for lab ...{lab_id[-6:]} loaded from cache "
+                        f"(project={project_name})"
+                    )
+                    return f"octolab/{project_name}:latest"
+                logger.warning(
+                    f"Cached target image load failed for lab ...{lab_id[-6:]}: "
+                    f"{load_response.error or load_response.stderr[:200]}; building"
+                )
+                if load_response.exit_code > 0:
+                    # docker load rejected the archive
+                    image_cache.discard(key)
 
         logger.info(f"Building target image for lab ...{lab_id[-6:]} (project={project_name})")
 
         try:
-            build_response = await send_agent_command(
+            build_response = await send_agent_stream(
                 lab_id,
                 "docker_build",
+                {sf["filename"]: sf.get("content", "").encode() for sf in source_files},
                 project=project_name,
                 dockerfile=dockerfile,
-                source_files=source_files,
             )
 
             if build_response.ok:
@@ -306,6 +340,12 @@ class FirecrackerLabRuntime:
                     image_tag = f"octolab/{project_name}:latest"
 
                 logger.info(f"Target image built successfully: {image_tag}")
+                if image_cache is not None:
+                    # The archive is shared with other labs: export it while
+                    # the VM holds nothing a student has touched
+                    await image_cache.store_once(
+                        key, lambda write: self._export_image(lab_id, image_tag, write)
+                    )
                 return image_tag
             else:
                 error = build_response.error or build_response.stderr[:200] if build_response.stderr else "unknown"
@@ -316,6 +356,16 @@ class FirecrackerLabRuntime:
             logger.error(f"Exception building target image: {type(e).__name__}: {e}")
             return None
 
+    async def _export_image(self, lab_id: str, image_tag: str, write) -> bool:
+        """Stream an image out of the VM (image_save) into write()."""
+        response = await send_agent_stream(lab_id, "image_save", {}, image=image_tag, on_data=write)
+        if not response.ok:
+            logger.warning(
+                f"Exporting {image_tag} from lab ...{lab_id[-6:]} failed: "
+                f"{response.error or response.stderr[:200]}"
+            )
+        return response.ok
+
     def _package_compose_project(
         self, lab_id: str, vnc_password: str, target_image: str | None = None
     ) -> bytes:
@@ -403,6 +453,145 @@ VNC_PASSWORD={vnc_password}
 
         return tar_buffer.getvalue()
 
+    async def _target_dockerfile(
+        self,
+        lab: Lab,
+        recipe: Recipe,
+        db_session: AsyncSession | None,
+    ) -> tuple[str, list[dict]] | None:
+        """Dockerfile and source files for the lab's target image.
+
+        From runtime_meta (deploy-from-dockerfile), else the CVE Dockerfile
+        named by the recipe. None means the fallback httpd:2.4 image.
+        """
+        # Check if lab has Dockerfile in runtime_meta (from deploy-from-dockerfile)
+        if lab.runtime_meta and lab.runtime_meta.get("dockerfile"):
+            return lab.runtime_meta["dockerfile"], lab.runtime_meta.get("source_files", [])
+
+        # Otherwise, try to look up CVE Dockerfile from recipe name
+        if not (db_session and recipe.name):
+            return None
+
+        # Extract CVE ID from recipe name (e.g., "Apache Path Traversal (CVE-2021-41773)")
+        cve_match = re.search(r"(CVE-\d{4}-\d+)", recipe.name, re.IGNORECASE)
+        if not cve_match:
+            return None
+        cve_id = cve_match.group(1).upper()
+        logger.info(f"Looking up CVE Dockerfile for {cve_id}")
+
+        from sqlalchemy import select
+        result = await db_session.execute(
+            select(CVEDockerfile).where(CVEDockerfile.cve_id == cve_id)
+        )
+        cve_dockerfile = result.scalar_one_or_none()
+
+        if cve_dockerfile and cve_dockerfile.dockerfile:
+            logger.info(f"Found CVE Dockerfile for {cve_id}, building target image")
+            # CVE Dockerfiles don't have source_files
+            return cve_dockerfile.dockerfile, []
+
+        logger.warning(f"No CVE Dockerfile found for {cve_id}, using fallback httpd:2.4")
+        return None
+
+    async def _wait_for_images(self, lab_id: str) -> None:
+        """Wait for the pre-baked Docker images in the guest.
+
+        Immediate when the guest mounted the image store; otherwise
+        octolab-load-images.service is loading the tarballs (e.g.
+        octobox.tar.gz -> octolab/octobox:latest). Never raises: compose_up
+        fails with a clearer error if images are missing.
+        """
+        images_response = await send_agent_command(
+            lab_id,
+            "wait_for_images",
+            timeout=120,  # 2 minutes max wait
+        )
+        if images_response.ok:
+            logger.info(f"Pre-baked images ready for lab ...{lab_id[-6:]}: waited={getattr(images_response, 'waited_seconds', 0):.1f}s")
+        else:
+            logger.warning(
+                f"wait_for_images failed for lab ...{lab_id[-6:]}: "
+                f"{images_response.error or images_response.stderr[:200] if images_response.stderr else 'unknown'}"
+            )
+
+    async def _boot_ready_vm(
+        self,
+        lab_id: str,
+        network_config: NetworkConfig,
+        wait_for_images: bool = True,
+    ) -> tuple[VMMetadata, AgentResponse]:
+        """Boot a VM and bring it to the point where compose can run.
+
+        Boots (or restores) the VM, verifies the agent identity, configures
+        the guest network and waits for the pre-baked images. Nothing here
+        is lab-specific, which is what lets the warm pool do it ahead of time.
+
+        Args:
+            wait_for_images: False when the caller waits for the images
+                itself (create_lab overlaps that with the target build)
+
+        Returns:
+            (VM metadata, agent ping response)
+
+        Raises:
+            VMBootError, AgentError, StaleRootfsError, NetworkError: The VM
+            did not become ready (it has been destroyed)
+        """
+        # Boot VM with network config
+        metadata = await create_vm(lab_id, network_config=network_config)
+
+        try:
+            logger.info(
+                f"VM booted: pid={metadata.pid}, cid={metadata.cid}, "
+                f"mode={metadata.boot_mode}, lab=...{lab_id[-6:]}"
+            )
+
+            # Wait for agent
+            ping_response = await send_agent_command(lab_id, "ping")
+            if not ping_response.ok:
+                raise AgentError(f"Agent ping failed: {ping_response.error}")
+
+            # Verify agent identity (catches stale rootfs)
+            if not ping_response.agent_version or not ping_response.rootfs_build_id:
+                raise StaleRootfsError(
+                    "Agent missing version/build_id fields. "
+                    "Rootfs likely stale - rebuild with: "
+                    "sudo infra/firecracker/build-rootfs.sh --with-kernel --deploy"
+                )
+
+            logger.info(
+                f"Agent ready for lab ...{lab_id[-6:]}: "
+                f"version={ping_response.agent_version}, "
+                f"build={ping_response.rootfs_build_id}"
+            )
+
+            # Configure VM network (required for outbound connectivity)
+            network_response = await send_agent_command(
+                lab_id,
+                "configure_network",
+                guest_ip=network_config.guest_ip,
+                netmask=network_config.netmask,
+                gateway=network_config.gateway,
+                dns=network_config.dns,
+            )
+            if not network_response.ok:
+                raise NetworkError(
+                    f"configure_network failed: {network_response.error or network_response.stderr[:200] if network_response.stderr else 'unknown'}"
+                )
+            logger.info(f"Network configured for lab ...{lab_id[-6:]}: ip={network_config.guest_ip}")
+
+            # Pre-baked images must be in place before compose_up
+            if wait_for_images:
+                await self._wait_for_images(lab_id)
+        except BaseException:
+            try:
+                await destroy_vm(lab_id)
+            except Exception as e:
+                logger.warning(f"VM destroy failed: {type(e).__name__}")
+            raise
+
+        return metadata, ping_response
+
     async def create_lab(
         self,
         lab: Lab,
@@ -412,15 +601,23 @@ VNC_PASSWORD={vnc_password}
     ) -> None:
         """Provision a lab as a Firecracker microVM.
 
-        Steps:
-        1. Run preflight checks
-        2. Allocate host port
-        3. Set up networking (tap, bridge, iptables)
-        4. Boot VM
-        5. Wait for agent ready
-        6. Upload compose project
-        7. Run docker compose up
-        8. Verify OctoBox is accessible
+        Runs preflight checks, then these phases as a ProvisioningPipeline;
+        each starts once the phases it needs have finished, so independent
+        ones overlap (timings are logged and in octolab_host_operation_*):
+
+            port, network         first, concurrently
+            vm                    after network
+            target_source         after port (same db_session)
+            images                after vm
+            target                after vm and target_source
+            port_forward          after port, vm and target
+            package, upload       after target
+            compose_up            after upload and images
+            status                after compose_up
+
+        When the lab claimed a warm standby VM, network reuses its TAP and
+        vm/images are no-ops. On failure, nothing new starts, the port/network/VM
+        phases are allowed to finish and everything acquired is released.
 
         Args:
             lab: Lab model instance
@@ -456,10 +653,22 @@ VNC_PASSWORD={vnc_password}
 
         host_port: int | None = None
         network_config: NetworkConfig | None = None
-        vm_booted = False
 
-        try:
-            # Allocate host port
+        # Warm standby claimed at lab creation (see microvm_warm_pool.py)
+        warm_pool = get_microvm_warm_pool()
+        standby = warm_pool.take(lab.id) if warm_pool is not None else None
+        if standby is not None and standby.discard:
+            await self.discard_standby(lab.id)
+            standby = None
+
+        # A standby is already booted with agent ready, network configured
+        # and images loaded under this lab's ID
+        vm_booted = standby is not None
+        project_name = f"octolab_{lab_id}"
+        pipeline = ProvisioningPipeline("firecracker")
+
+        async def allocate_port() -> int:
+            nonlocal host_port
             if db_session:
                 host_port = await allocate_novnc_port(
                     db_session,
@@ -469,150 +678,86 @@ VNC_PASSWORD={vnc_password}
             else:
                 # Use a default port for testing
                 host_port = 6080
-
             logger.info(f"Allocated host port {host_port} for lab ...{lab_id[-6:]}")
+            return host_port
 
-            # Set up networking
-            network_config = await setup_network_for_lab(lab_id, host_port)
-            if not network_config:
-                raise NetworkError("Failed to set up networking")
+        async def set_up_network() -> NetworkConfig:
+            nonlocal network_config
+            if standby is not None:
+                network_config = standby.network_config
+                logger.info(
+                    f"Lab ...{lab_id[-6:]} using warm standby VM "
+                    f"(idle {standby.age_seconds():.0f}s, guest_ip={network_config.guest_ip})"
+                )
+                return network_config
 
+            # The host port only matters to the port forward, so the TAP is
+            # allocated while the port is
+            config = await setup_network_for_lab(lab_id, host_port=0)
+            if not config:
+                raise NetworkError("Failed to set up networking")
+            network_config = config
             logger.info(
                 f"Network ready: tap={network_config.tap_name}, "
                 f"guest_ip={network_config.guest_ip}"
             )
+            return config
 
-            # Boot VM with network config
-            metadata = await create_vm(lab_id, network_config=network_config)
-            vm_booted = True
-
-            logger.info(
-                f"VM booted: pid={metadata.pid}, cid={metadata.cid}, "
-                f"lab=...{lab_id[-6:]}"
-            )
-
-            # Wait for agent
-            ping_response = await send_agent_command(lab_id, "ping")
-            if not ping_response.ok:
-                raise AgentError(f"Agent ping failed: {ping_response.error}")
-
-            # Verify agent identity (catches stale rootfs)
-            if not ping_response.agent_version or not ping_response.rootfs_build_id:
-                raise StaleRootfsError(
-                    "Agent missing version/build_id fields. "
-                    "Rootfs likely stale - rebuild with: "
-                    "sudo infra/firecracker/build-rootfs.sh --with-kernel --deploy"
-                )
-
-            logger.info(
-                f"Agent ready for lab ...{lab_id[-6:]}: "
-                f"version={ping_response.agent_version}, "
-                f"build={ping_response.rootfs_build_id}"
-            )
-
-            # Configure VM network (required for outbound connectivity)
-            network_response = await send_agent_command(
-                lab_id,
-                "configure_network",
-                guest_ip=network_config.guest_ip,
-                netmask=network_config.netmask,
-                gateway=network_config.gateway,
-                dns=network_config.dns,
-            )
-            if not network_response.ok:
-                raise NetworkError(
-                    f"configure_network failed: {network_response.error or network_response.stderr[:200] if network_response.stderr else 'unknown'}"
-                )
-            logger.info(f"Network configured for lab ...{lab_id[-6:]}: ip={network_config.guest_ip}")
+        async def boot() -> None:
+            nonlocal vm_booted
+            if standby is None:
+                await self._boot_ready_vm(lab_id, network_config, wait_for_images=False)
+                vm_booted = True
 
-            # Wait for pre-baked Docker images to be loaded
-            # The octolab-load-images.service runs on boot and loads images from tarballs
-            # (e.g., octobox.tar.gz -> octolab/octobox:latest)
-            # We must wait for this to complete before running compose_up
-            images_response = await send_agent_command(
-                lab_id,
-                "wait_for_images",
-                timeout=120,  # 2 minutes max wait
-            )
-            if images_response.ok:
-                logger.info(f"Pre-baked images ready for lab ...{lab_id[-6:]}: waited={getattr(images_response, 'waited_seconds', 0):.1f}s")
-            else:
-                logger.warning(
-                    f"wait_for_images failed for lab ...{lab_id[-6:]}: "
-                    f"{images_response.error or images_response.stderr[:200] if images_response.stderr else 'unknown'}"
-                )
-                # Continue anyway - compose_up will fail with clearer error if images are missing
+        async def wait_for_images() -> None:
+            if standby is None:
+                await self._wait_for_images(lab_id)
 
-            # Set up port forwarding from host to VM (for VNC access via Guacamole)
+        async def forward_port() -> None:
             # Port 5900 is the VNC server port that Guacamole's guacd connects to
             await setup_port_forward_for_lab(lab_id, host_port, guest_port=5900)
             logger.info(f"Port forward set up for lab ...{lab_id[-6:]}: host:{host_port} -> guest:5900")
 
-            # Verify VNC password
-            if not vnc_password:
-                raise ComposeError("VNC password required for Firecracker labs")
-
-            # Build target image from CVE Dockerfile if available
-            target_image: str | None = None
-
-            # Check if lab has Dockerfile in runtime_meta (from deploy-from-dockerfile)
-            if lab.runtime_meta and lab.runtime_meta.get("dockerfile"):
-                dockerfile_content = lab.runtime_meta["dockerfile"]
-                source_files = lab.runtime_meta.get("source_files", [])
-                target_image = await self._build_target_image(
-                    lab_id, dockerfile_content, source_files
-                )
-            # Otherwise, try to look up CVE Dockerfile from recipe name
-            elif db_session and recipe.name:
-                # Extract CVE ID from recipe name (e.g., "Apache Path Traversal (CVE-2021-41773)")
-                cve_match = re.search(r"(CVE-\d{4}-\d+)", recipe.name, re.IGNORECASE)
-                if cve_match:
-                    cve_id = cve_match.group(1).upper()
-                    logger.info(f"Looking up CVE Dockerfile for {cve_id}")
-
-                    from sqlalchemy import select
-                    result = await db_session.execute(
-                        select(CVEDockerfile).where(CVEDockerfile.cve_id == cve_id)
-                    )
-                    cve_dockerfile = result.scalar_one_or_none()
-
-                    if cve_dockerfile and cve_dockerfile.dockerfile:
-                        logger.info(f"Found CVE Dockerfile for {cve_id}, building target image")
-                        # CVE Dockerfiles don't have source_files
-                        target_image = await self._build_target_image(
-                            lab_id, cve_dockerfile.dockerfile, []
-                        )
-                    else:
-                        logger.warning(f"No CVE Dockerfile found for {cve_id}, using fallback httpd:2.4")
+        async def resolve_target() -> tuple[str, list[dict]] | None:
+            return await self._target_dockerfile(lab, recipe, db_session)
 
+        async def build_target() -> str | None:
+            source = pipeline.results["target_source"]
+            target_image = None
+            if source is not None:
+                target_image = await self._build_target_image(lab_id, *source)
             if target_image:
                 logger.info(f"Target image built for lab ...{lab_id[-6:]}: {target_image}")
             else:
                 logger.info(f"Using fallback target image for lab ...{lab_id[-6:]}: httpd:2.4")
+            return target_image
 
-            # Package and upload compose project
-            project_name = f"octolab_{lab_id}"
-            project_data = self._package_compose_project(lab_id, vnc_password, target_image)
-            project_b64 = base64.b64encode(project_data).decode()
+        async def package_project() -> bytes:
+            return await asyncio.to_thread(
+                self._package_compose_project,
+                lab_id,
+                vnc_password,
+                pipeline.results["target"],
+            )
 
-            upload_response = await send_agent_command(
+        async def upload_project() -> None:
+            upload_response = await send_agent_stream(
                 lab_id,
                 "upload_project",
+                {"project.tgz": pipeline.results["package"]},
                 project=project_name,
-                data=project_b64,
             )
             if not upload_response.ok:
                 raise ComposeError(
                     f"Failed to upload project: {upload_response.error or upload_response.stderr[:200]}"
                 )
-
             logger.info(f"Project uploaded for lab ...{lab_id[-6:]}")
 
-            # Run compose up via the clean abstraction
-            # This handles timeouts, diag on failure, and proper error messages
+        async def compose_up() -> None:
+            # Handles timeouts, diag on failure, and proper error messages
             await self.compose_up_inside_vm(lab, project_name)
 
-            # Verify status
+        async def check_status() -> None:
             status_response = await send_agent_command(lab_id, "status")
             if status_response.ok:
                 logger.info(
@@ -620,6 +765,30 @@ VNC_PASSWORD={vnc_password}
                     f"{status_response.stdout[:200]}"
                 )
 
+        # Resource phases are shielded: on a failure elsewhere they finish,
+        # so the cleanup below sees the port, TAP and VM they acquired
+        pipeline.add("port", allocate_port, shielded=True)
+        pipeline.add("network", set_up_network, shielded=True)
+        pipeline.add("vm", boot, after=("network",), shielded=True)
+        # Shares db_session with the port allocation, so it follows it
+        pipeline.add("target_source", resolve_target, after=("port",))
+        pipeline.add("images", wait_for_images, after=("vm",))
+        # After the target build, which may export the image to the shared cache
+        pipeline.add("port_forward", forward_port, after=("port", "vm", "target"))
+        pipeline.add("target", build_target, after=("vm", "target_source"))
+        pipeline.add("package", package_project, after=("target",))
+        pipeline.add("upload", upload_project, after=("package", "vm"))
+        pipeline.add("compose_up", compose_up, after=("upload", "images"))
+        pipeline.add("status", check_status, after=("compose_up",))
+
+        try:
+            # Verify VNC password
+            if not vnc_password:
+                raise ComposeError("VNC password required for Firecracker labs")
+
+            await pipeline.run()
+            network_config = replace(network_config, host_port=host_port)
+
             # TODO: Verify host port responds (TCP connect test)
             # For now, we trust compose up success
 
@@ -643,8 +812,10 @@ VNC_PASSWORD={vnc_password}
 
             logger.info(
                 f"Firecracker lab ...{lab_id[-6:]} ready at port {host_port}, "
-                f"guest_ip={network_config.guest_ip}"
+                f"guest_ip={network_config.guest_ip} ({pipeline.summary()})"
             )
+            if standby is not None:
+                warm_pool.record_activation(True)
 
         except StaleRootfsError as e:
             # Stale rootfs detected - cleanup and raise with clear error
@@ -675,8 +846,11 @@ VNC_PASSWORD={vnc_password}
         except Exception as e:
             # Cleanup on failure - NO FALLBACK TO COMPOSE
             logger.error(
-                f"Failed to create Firecracker lab ...{lab_id[-6:]}: {type(e).__name__}"
+                f"Failed to create Firecracker lab ...{lab_id[-6:]}: {type(e).__name__} "
+                f"({pipeline.summary()})"
             )
+            if standby is not None:
+                warm_pool.record_activation(False)
 
             # Best-effort cleanup
             if vm_booted:
@@ -705,9 +879,8 @@ VNC_PASSWORD={vnc_password}
         Steps:
         1. Send compose down to guest agent (best-effort)
         2. Stop VM process
-        3. Clean up port forwarding (iptables DNAT rules)
-        4. Clean up networking (TAP device)
-        5. Remove state directory
+        3. Clean up port forwarding and networking (TAP device)
+        4. Remove state directory
 
         Args:
             lab: Lab model instance
@@ -753,22 +926,17 @@ VNC_PASSWORD={vnc_password}
         except Exception as e:
             logger.warning(f"VM destroy failed: {type(e).__name__}")
 
-        # 3. Clean up port forwarding (best-effort)
-        try:
-            await cleanup_port_forward_for_lab(lab_id)
-        except Exception as e:
-            logger.warning(f"Port forward cleanup failed: {type(e).__name__}")
-
-        # 4. Clean up networking (TAP device)
+        # 3. Clean up port forwarding and networking (TAP device) in one
+        # netd round-trip (best-effort)
         try:
             tap_name = f"tap-{lab_id[-8:]}"
-            await cleanup_network_for_lab(lab_id, tap_name)
+            await cleanup_network_for_lab(lab_id, tap_name, port_forwards=True)
             results["network_cleaned"] = True
             logger.info(f"Network cleaned for lab ...{lab_id[-6:]}")
         except Exception as e:
             logger.warning(f"Network cleanup failed: {type(e).__name__}")
 
-        # 5. State directory is cleaned by destroy_vm
+        # 4. State directory is cleaned by destroy_vm
         results["state_cleaned"] = results["vm_stopped"]
 
         return {
@@ -778,6 +946,46 @@ VNC_PASSWORD={vnc_password}
             **results,
         }
 
+    # -------------------------------------------------------------------------
+    # Warm standby VMs (see app/services/microvm_warm_pool.py)
+    # -------------------------------------------------------------------------
+
+    async def start_standby(self, lab_id: UUID) -> tuple[NetworkConfig, AgentResponse]:
+        """Boot an unassigned VM under the ID the lab that claims it will use.
+
+        The TAP/IP is allocated now; the port forward is only set up when a
+        lab activates the VM, so a standby is unreachable from the host.
+
+        Returns:
+            (network config without a host port, agent ping response)
+
+        Raises:
+            PreflightError, NetworkError, VMBootError, AgentError,
+            StaleRootfsError: VM did not become ready (it has been discarded)
+        """
+        self._ensure_preflight()
+        safe_lab_id = str(lab_id)
+
+        network_config = await setup_network_for_lab(safe_lab_id, host_port=0)
+        if not network_config:
+            raise NetworkError("Failed to set up networking")
+
+        try:
+            _, ping_response = await self._boot_ready_vm(safe_lab_id, network_config)
+        except BaseException:
+            await cleanup_network_for_lab(safe_lab_id, network_config.tap_name)
+            raise
+        return network_config, ping_response
+
+    async def discard_standby(self, lab_id: UUID) -> None:
+        """Destroy a standby VM no lab will use and release its TAP/IP."""
+        safe_lab_id = str(lab_id)
+        try:
+            await destroy_vm(safe_lab_id)
+        except Exception as e:
+            logger.warning(f"Failed to discard standby VM: {type(e).__name__}")
+        await cleanup_network_for_lab(safe_lab_id)
+
     async def resources_exist_for_lab(self, lab: Lab) -> bool:
         """Check if Firecracker VM resources exist for a lab.
 
@@ -16,6 +16,7 @@ from app.models.lab import Lab
 from app.models.recipe import Recipe
 from app.runtime.base import LabRuntime
 from app.utils.redact import redact_argv, truncate_text, sanitize_subprocess_error
+from app.utils.subprocess_utils import CmdResult, arun_cmd
 from app.helpers.cluster_detector import detect_cluster_type, check_apiserver_readiness
 
 logger = logging.getLogger(__name__)
@@ -129,7 +130,7 @@ class K8sLabRuntime(LabRuntime):
             redacted.append(redacted_arg)
         return redacted
 
-    async def _run_kubectl(self, args: list[str], *, namespace: str | None = None, timeout_s: int | None = None) -> subprocess.CompletedProcess[str]:
+    async def _run_kubectl(self, args: list[str], *, namespace: str | None = None, timeout_s: int | None = None) -> CmdResult:
         """
         Execute kubectl command with centralized security enforcement and timeout from settings.
 
@@ -158,18 +159,9 @@ class K8sLabRuntime(LabRuntime):
         # Use requested timeout or fallback to configured default from settings
         effective_timeout = timeout_s or settings.kubectl_request_timeout_seconds
 
-        def _run() -> subprocess.CompletedProcess[str]:
-            return subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,  # Raise CalledProcessError on non-zero exit
-                timeout=effective_timeout,
-                shell=False,  # Critical security: never use shell=True
-            )
-
         try:
-            return await asyncio.to_thread(_run)
+            # Raises CalledProcessError on non-zero exit; exec, never a shell
+            return await arun_cmd(cmd, check=True, timeout=effective_timeout)
         except (CalledProcessError, TimeoutExpired) as e:
             # Sanitize error information before raising
             if isinstance(e, CalledProcessError):
@@ -217,7 +209,7 @@ class K8sLabRuntime(LabRuntime):
         timeout_s: int | None = None,
         request_timeout_s: int | None = 30,
         capture_output: bool = True,
-    ) -> subprocess.CompletedProcess[str]:
+    ) -> CmdResult:
         """
         Execute kubectl command with secure plumbing and proper error handling.
 
@@ -226,7 +218,7 @@ class K8sLabRuntime(LabRuntime):
             namespace: optional namespace
             timeout_s: overall subprocess timeout
             request_timeout_s: kubectl request timeout
-            capture_output: whether to capture stdout/stderr
+            capture_output: kept for compatibility; output is always captured (bounded)
 
         Returns:
             CompletedProcess with redacted error details on failure.
@@ -243,17 +235,9 @@ class K8sLabRuntime(LabRuntime):
 
         timeout_s = timeout_s or self.kubectl_timeout
 
-        def _run() -> subprocess.CompletedProcess[str]:
-            return subprocess.run(
-                cmd,
-                capture_output=capture_output,
-                text=True,
-                check=True,  # We want CalledProcessError to be caught and redacted
-                timeout=timeout_s,
-            )
-
         try:
-            return await asyncio.to_thread(_run)
+            # We want CalledProcessError to be caught and redacted
+            return await arun_cmd(cmd, check=True, timeout=timeout_s)
         except (CalledProcessError, TimeoutExpired) as e:
             if isinstance(e, CalledProcessError):
                 # Use redact utilities to sanitize error message
@@ -283,7 +267,7 @@ class K8sLabRuntime(LabRuntime):
         check: bool = True,
         sensitive_strings: set[str] | None = None,
         stdin: str | None = None,
-    ) -> subprocess.CompletedProcess[str]:
+    ) -> CmdResult:
         """
         Execute kubectl command safely with redaction support.
 
@@ -293,46 +277,24 @@ class K8sLabRuntime(LabRuntime):
         timeout_sec = timeout or self.kubectl_timeout
         sensitive = sensitive_strings or set()
 
-        def _run() -> subprocess.CompletedProcess[str]:
-            if stdin is not None:
-                # Use Popen for stdin support
-                proc = subprocess.Popen(
-                    cmd,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                )
-                stdout, stderr = proc.communicate(input=stdin, timeout=timeout_sec)
-                result = subprocess.CompletedProcess(
-                    cmd, proc.returncode, stdout, stderr
-                )
-            else:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=False,  # We handle errors ourselves
-                    timeout=timeout_sec,
-                )
-
-            if result.returncode != 0 and check:
-                # Redact sensitive strings before raising
-                redacted_cmd = self._redact_cmd(cmd, sensitive)
-                redacted_stdout = self._redact_strings(result.stdout, sensitive)
-                redacted_stderr = self._redact_strings(result.stderr, sensitive)
+        # We handle errors ourselves (check=False); stdin only when given
+        result = await arun_cmd(cmd, input=stdin, timeout=timeout_sec)
 
-                cmd_str = " ".join(redacted_cmd)
-                raise RuntimeError(
-                    f"kubectl command failed (exit code {result.returncode}):\n"
-                    f"Command: {cmd_str}\n"
-                    f"STDOUT:\n{redacted_stdout}\n"
-                    f"STDERR:\n{redacted_stderr}"
-                )
+        if result.returncode != 0 and check:
+            # Redact sensitive strings before raising
+            redacted_cmd = self._redact_cmd(cmd, sensitive)
+            redacted_stdout = self._redact_strings(result.stdout, sensitive)
+            redacted_stderr = self._redact_strings(result.stderr, sensitive)
 
-            return result
+            cmd_str = " ".join(redacted_cmd)
+            raise RuntimeError(
+                f"kubectl command failed (exit code {result.returncode}):\n"
+                f"Command: {cmd_str}\n"
+                f"STDOUT:\n{redacted_stdout}\n"
+                f"STDERR:\n{redacted_stderr}"
+            )
 
-        return await asyncio.to_thread(_run)
+        return result
 
     async def _kubectl(
         self,
@@ -0,0 +1,156 @@
+"""Dependency-ordered provisioning phases.
+
+A runtime's create_lab is a series of steps, but not a chain: allocating a
+host port does not wait for the network, and building the target image does
+not wait for the pre-baked images to load. ProvisioningPipeline runs each
+phase as soon as the phases it depends on have finished, so independent
+ones overlap, and records how long each took.
+
+Failure semantics (what the caller's cleanup relies on):
+- No phase starts after another has failed
+- Phases still running are cancelled, except "shielded" ones: those acquire
+  resources (port, TAP, VM) and are allowed to finish, so the caller's
+  cleanup sees everything that was acquired
+- run() returns only when nothing is running, then raises the first error
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from app.utils.metrics import track_operation
+
+
+class PipelineError(Exception):
+    """Raised for an invalid phase graph (unknown dependency or cycle)."""
+
+    pass
+
+
+@dataclass
+class _Phase:
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    after: tuple[str, ...]
+    shielded: bool
+
+
+@dataclass
+class ProvisioningPipeline:
+    """Phases with dependencies, run concurrently where the graph allows.
+
+    Usage:
+        pipeline = ProvisioningPipeline("firecracker")
+        pipeline.add("port", allocate_port, shielded=True)
+        pipeline.add("boot", boot, after=("port",), shielded=True)
+        await pipeline.run()
+        pipeline.results["port"], pipeline.timings
+
+    Phase functions take no arguments and read earlier results from
+    pipeline.results. Each phase is timed with track_operation(component,
+    "provision_<phase>").
+    """
+
+    component: str
+    results: dict[str, Any] = field(default_factory=dict, init=False)
+    timings: dict[str, float] = field(default_factory=dict, init=False)
+    started: set[str] = field(default_factory=set, init=False)
+    _phases: dict[str, _Phase] = field(default_factory=dict, init=False, repr=False)
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        *,
+        after: tuple[str, ...] = (),
+        shielded: bool = False,
+    ) -> None:
+        """Register a phase to run once every phase in `after` has finished."""
+        if name in self._phases:
+            raise PipelineError(f"Duplicate phase: {name}")
+        self._phases[name] = _Phase(name, func, tuple(after), shielded)
+
+    def _validate(self) -> None:
+        for phase in self._phases.values():
+            for dep in phase.after:
+                if dep not in self._phases:
+                    raise PipelineError(f"Phase {phase.name} depends on unknown phase {dep}")
+        # Kahn's algorithm: every phase must become runnable
+        pending = {name: set(p.after) for name, p in self._phases.items()}
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise PipelineError(f"Dependency cycle among: {', '.join(sorted(pending))}")
+            for name in ready:
+                del pending[name]
+            for deps in pending.values():
+                deps.difference_update(ready)
+
+    async def _run_phase(self, phase: _Phase) -> Any:
+        started = time.monotonic()
+        try:
+            with track_operation(self.component, f"provision_{phase.name}"):
+                return await phase.func()
+        finally:
+            self.timings[phase.name] = round(time.monotonic() - started, 3)
+
+    async def run(self) -> dict[str, Any]:
+        """Run all phases; returns results by phase name.
+
+        Raises:
+            PipelineError: The phase graph is invalid (nothing was run)
+            Exception: The first phase failure, after running phases settled
+        """
+        self._validate()
+        waiting = dict(self._phases)
+        running: dict[asyncio.Task, _Phase] = {}
+        error: BaseException | None = None
+
+        try:
+            while waiting or running:
+                if error is None:
+                    for name, phase in list(waiting.items()):
+                        if all(dep in self.results for dep in phase.after):
+                            del waiting[name]
+                            self.started.add(name)
+                            task = asyncio.create_task(self._run_phase(phase))
+                            running[task] = phase
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    phase = running.pop(task)
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        if error is None:
+                            error = task.exception()
+                            for other, other_phase in running.items():
+                                if not other_phase.shielded:
+                                    other.cancel()
+                        continue
+                    self.results[phase.name] = task.result()
+        except asyncio.CancelledError:
+            # Cancelled from outside: same rules as a failed phase
+            for task, phase in running.items():
+                if not phase.shielded:
+                    task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            for task, phase in running.items():
+                if not task.cancelled() and task.exception() is None:
+                    self.results[phase.name] = task.result()
+            raise
+
+        if error is not None:
+            raise error
+        return self.results
+
+    def summary(self) -> str:
+        """Phase timings in start order, e.g. "port=0.05s vm=8.1s"."""
+        return " ".join(
+            f"{name}={self.timings[name]}s" for name in self._phases if name in self.timings
+        )
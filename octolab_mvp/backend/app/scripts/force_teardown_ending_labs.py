@@ -33,6 +33,7 @@ from app.db import AsyncSessionLocal
 from app.models.lab import Lab, LabStatus
 from app.runtime import get_runtime
 from app.services.port_allocator import release_novnc_port
+from app.utils.subprocess_utils import arun_cmd
 
 logging.basicConfig(
     level=logging.INFO,
@@ -102,14 +103,7 @@ async def force_teardown_lab(lab: Lab, session: AsyncSessionLocal) -> bool:
             cmd = ["docker", "compose", "-p", project_name, "down", "--remove-orphans"]
 
         logger.info(f"Running direct docker compose down: {' '.join(cmd)}")
-        result = await asyncio.to_thread(
-            subprocess.run,
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30.0,
-            check=False,
-        )
+        result = await arun_cmd(cmd, timeout=30.0)
         if result.returncode == 0:
             logger.info(f"Docker compose down succeeded for {project_name}")
             teardown_succeeded = True
@@ -120,7 +114,7 @@ async def force_teardown_lab(lab: Lab, session: AsyncSessionLocal) -> bool:
                 teardown_succeeded = True
             else:
                 logger.warning(f"Docker compose down returned {result.returncode} for {project_name}: {result.stderr}")
-    except asyncio.TimeoutError:
+    except subprocess.TimeoutExpired:
         logger.warning(f"Docker compose down timed out for {project_name}")
     except Exception as e:
         logger.warning(f"Direct docker compose down failed for {project_name}: {type(e).__name__}")
@@ -0,0 +1,595 @@
+"""Pool of pre-created lab_net/egress_net pairs for the compose runtime.
+
+Without the pool every ComposeLabRuntime.create_lab runs preflight network
+cleanup and then lets compose create two fresh bridge networks. Near address
+pool exhaustion that is where NetworkPoolExhaustedError and most of the
+cleanup retry latency come from.
+
+With the pool enabled:
+
+1. A background task keeps N labelled network pairs created, each with two
+   subnets reserved up front from compose_network_pool_cidr
+2. create_lab claims a free pair (a host-wide lease file, so workers never
+   hand out the same pair) and starts the stack with a compose override
+   that declares lab_net/egress_net as external networks
+3. destroy_lab releases the pair once no container is attached to it
+4. Pairs released while still attached are marked leaked and reaped by the
+   background task once they are empty again
+
+Pool networks are named octolab_pool_<slot>_(lab_net|egress_net). They do not
+match LAB_NETWORK_PATTERN, so preflight/admin cleanup never removes them, and
+they carry no compose project label, so project teardown leaves them alone.
+
+SECURITY:
+- A pair is handed to a new lab only under its lease lock, to a claimant
+  that finds no holder and zero attachments, so two labs never share a
+  network even across workers
+- Overrides live in a private backend-owned directory and are never
+  written through an existing path or symlink
+- Only control-plane containers (settings.control_plane_containers) are ever
+  disconnected by the reaper; lab containers keep their pair claimed
+- All docker calls go through docker_net helpers (shell=False)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.services.docker_engine import try_engine
+from app.services.docker_net import (
+    create_labeled_network,
+    disconnect_container,
+    get_network_container_count,
+    get_network_containers,
+    is_lab_project,
+    remove_network,
+)
+from app.utils.host_state import ensure_private_dir, locked_record, read_record
+
+logger = logging.getLogger(__name__)
+
+# Labels on pool networks
+POOL_LABEL = "octolab.netpool"
+POOL_SLOT_LABEL = "octolab.netpool.slot"
+POOL_ROLE_LABEL = "octolab.netpool.role"
+
+POOL_NETWORK_PATTERN = re.compile(r"^octolab_pool_(\d{3})_(lab_net|egress_net)$")
+
+# Container names are <project>-<service>-<n>
+_CONTAINER_PROJECT_PATTERN = re.compile(
+    r"^(octolab_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})-"
+)
+
+# Lease holder of a pair released with containers still attached
+LEAKED_HOLDER = "leaked"
+
+# A claim with no containers at all for this long is treated as orphaned
+# (create_lab crashed between claim and release). Covers image pulls/builds.
+CLAIM_ORPHAN_GRACE_SECONDS = 900.0
+
+
+def pool_network_name(slot: int, role: str) -> str:
+    return f"octolab_pool_{slot:03d}_{role}"
+
+
+def override_path(project: str) -> Path:
+    """Path of the compose override used by a pooled project."""
+    return Path(settings.compose_state_dir) / "overrides" / f"{project}.yml"
+
+
+def _lease_name(slot: int) -> str:
+    return f"slot-{slot:03d}.lease"
+
+
+@dataclass(frozen=True)
+class NetworkPair:
+    """One pre-created lab_net/egress_net pair."""
+
+    slot: int
+    lab_net: str
+    egress_net: str
+    lab_subnet: str
+    egress_subnet: str
+
+    @property
+    def names(self) -> tuple[str, str]:
+        return (self.lab_net, self.egress_net)
+
+    def override_yaml(self) -> str:
+        """Compose override mapping the stack's networks onto this pair."""
+        return (
+            "networks:\n"
+            "  lab_net:\n"
+            "    external: true\n"
+            f"    name: {self.lab_net}\n"
+            "  egress_net:\n"
+            "    external: true\n"
+            f"    name: {self.egress_net}\n"
+        )
+
+    def write_override(self, project: str) -> Path:
+        """Write the override for a project (0600, private directory).
+
+        Raises:
+            FileExistsError: The path already exists (file or symlink)
+            OSError: The override directory is not private, or the write failed
+        """
+        path = override_path(project)
+        ensure_private_dir(path.parent)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.override_yaml())
+        return path
+
+
+def remove_override(project: str) -> None:
+    try:
+        override_path(project).unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.debug(f"Failed to remove network override for {project}: {type(e).__name__}")
+
+
+def carve_pairs(cidr: str, prefixlen: int, size: int) -> list[NetworkPair]:
+    """Reserve two subnets per slot from cidr (slot n uses subnets 2n, 2n+1).
+
+    Raises:
+        ValueError: If the CIDR cannot hold size pairs
+    """
+    network = ipaddress.ip_network(cidr)
+    if prefixlen < network.prefixlen:
+        raise ValueError(f"prefixlen /{prefixlen} is larger than {cidr}")
+    available = 2 ** (prefixlen - network.prefixlen)
+    if size * 2 > available:
+        raise ValueError(f"{cidr} holds {available // 2} /{prefixlen} pairs, need {size}")
+
+    subnets = network.subnets(new_prefix=prefixlen)
+    pairs = []
+    for slot in range(size):
+        lab_subnet = next(subnets)
+        egress_subnet = next(subnets)
+        pairs.append(NetworkPair(
+            slot=slot,
+            lab_net=pool_network_name(slot, "lab_net"),
+            egress_net=pool_network_name(slot, "egress_net"),
+            lab_subnet=str(lab_subnet),
+            egress_subnet=str(egress_subnet),
+        ))
+    return pairs
+
+
+def _project_container_count(project: str, timeout: float = 10.0) -> int:
+    """Count containers (any state) of a compose project, or -1 on error."""
+    ok, containers = try_engine(
+        lambda c: c.list_containers(
+            all=True,
+            filters={"label": [f"com.docker.compose.project={project}"]},
+            timeout=timeout,
+        )
+    )
+    if ok:
+        return len(containers)
+
+    cmd = ["docker", "ps", "-aq", "--filter", f"label=com.docker.compose.project={project}"]
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            shell=False,
+        )
+        if result.returncode != 0:
+            return -1
+        return len([line for line in result.stdout.split("\n") if line.strip()])
+    except subprocess.TimeoutExpired:
+        logger.debug(f"Timeout listing containers for {project}")
+        return -1
+    except Exception as e:
+        logger.debug(f"Error listing containers for {project}: {type(e).__name__}")
+        return -1
+
+
+def _list_pool_network_names(timeout: float = 10.0) -> list[str]:
+    ok, networks = try_engine(
+        lambda c: c.list_networks(filters={"label": [POOL_LABEL]}, timeout=timeout)
+    )
+    if ok:
+        return [n.name for n in networks]
+
+    cmd = ["docker", "network", "ls", "--filter", f"label={POOL_LABEL}", "--format", "{{.Name}}"]
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            shell=False,
+        )
+        if result.returncode != 0:
+            return []
+        return [line.strip() for line in result.stdout.split("\n") if line.strip()]
+    except subprocess.TimeoutExpired:
+        logger.debug("Timeout listing pool networks")
+        return []
+    except Exception as e:
+        logger.debug(f"Error listing pool networks: {type(e).__name__}")
+        return []
+
+
+class ComposeNetworkPool:
+    """Claim/release of pre-created network pairs, shared by all workers.
+
+    Who holds a slot is recorded host-wide in slot-<n>.lease under
+    compose_state_dir/netpool: empty when free, the compose project while
+    claimed, or "leaked" once released with containers still attached.
+    Records are only changed under their flock (see app.utils.host_state),
+    so two workers can never claim the same slot. Which free slots have
+    their networks created is a per-process hint, re-checked at claim.
+    Docker calls happen outside self._lock.
+    """
+
+    def __init__(self, pairs: list[NetworkPair]) -> None:
+        self._lock = threading.Lock()
+        self._pairs = {pair.slot: pair for pair in pairs}
+        self._ready: set[int] = set()
+        self._lease_dir_logged = False
+        self._hits = 0
+        self._misses = 0
+        self._released = 0
+        self._reaped = 0
+
+    # -------------------------------------------------------------------------
+    # Leases
+    # -------------------------------------------------------------------------
+
+    def _lease_dir(self) -> Path | None:
+        try:
+            return ensure_private_dir(Path(settings.compose_state_dir) / "netpool")
+        except OSError as e:
+            if not self._lease_dir_logged:
+                self._lease_dir_logged = True
+                logger.error(f"Network pool lease dir unusable ({type(e).__name__}); pool disabled")
+            return None
+
+    def _leases(self, lease_dir: Path) -> dict[int, tuple[str, float]]:
+        """Slot -> (holder, mtime) for every slot with a holder."""
+        leases = {}
+        for slot in self._pairs:
+            holder, mtime = read_record(lease_dir / _lease_name(slot))
+            if holder:
+                leases[slot] = (holder, mtime)
+        return leases
+
+    def _slot_of(self, lease_dir: Path, project: str) -> int | None:
+        for slot, (holder, _) in self._leases(lease_dir).items():
+            if holder == project:
+                return slot
+        return None
+
+    # -------------------------------------------------------------------------
+    # Claim / release
+    # -------------------------------------------------------------------------
+
+    def claim_sync(self, project: str) -> NetworkPair | None:
+        """Claim a free pair for a project (idempotent per project, host-wide).
+
+        Returns:
+            The pair, or None if no pair is free (caller uses the compose path)
+        """
+        lease_dir = self._lease_dir()
+        if lease_dir is None:
+            return None
+        slot = self._slot_of(lease_dir, project)
+        if slot is not None:
+            return self._pairs[slot]
+
+        with self._lock:
+            candidates = sorted(self._ready)
+        for slot in candidates:
+            pair = self._pairs[slot]
+            with locked_record(lease_dir / _lease_name(slot)) as lease:
+                holder = lease.read()
+                if holder and holder != project:
+                    # Claimed by another worker since we saw it free
+                    with self._lock:
+                        self._ready.discard(slot)
+                    continue
+                if not holder and not self._pair_is_empty(pair):
+                    # Attached without a claim (holder crashed): keep it out
+                    lease.write(LEAKED_HOLDER)
+                    with self._lock:
+                        self._ready.discard(slot)
+                    continue
+                lease.write(project)
+            with self._lock:
+                self._ready.discard(slot)
+                self._hits += 1
+            return pair
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    async def claim(self, project: str) -> NetworkPair | None:
+        return await asyncio.to_thread(self.claim_sync, project)
+
+    def claimed_pair(self, project: str) -> NetworkPair | None:
+        lease_dir = self._lease_dir()
+        if lease_dir is None:
+            return None
+        slot = self._slot_of(lease_dir, project)
+        return self._pairs[slot] if slot is not None else None
+
+    def release_sync(self, project: str) -> bool:
+        """Return a project's pair to the pool.
+
+        Returns:
+            True if the pair is ready for reuse, False if the project had no
+            claim or containers are still attached (pair marked leaked)
+        """
+        lease_dir = self._lease_dir()
+        if lease_dir is None:
+            return False
+        slot = self._slot_of(lease_dir, project)
+        if slot is None:
+            return False
+
+        pair = self._pairs[slot]
+        with locked_record(lease_dir / _lease_name(slot)) as lease:
+            if lease.read() != project:
+                return False
+            if not self._pair_is_empty(pair):
+                lease.write(LEAKED_HOLDER)
+                logger.warning(
+                    f"Network pair {slot} still in use after {project} released it; marked leaked"
+                )
+                return False
+            lease.write("")
+        with self._lock:
+            self._ready.add(slot)
+            self._released += 1
+        logger.debug(f"Released network pair {slot} from {project}")
+        return True
+
+    async def release(self, project: str) -> bool:
+        return await asyncio.to_thread(self.release_sync, project)
+
+    # -------------------------------------------------------------------------
+    # Maintenance (background task)
+    # -------------------------------------------------------------------------
+
+    def _pair_is_empty(self, pair: NetworkPair) -> bool:
+        return all(get_network_container_count(name) == 0 for name in pair.names)
+
+    def refill_sync(self) -> int:
+        """Create missing pairs and mark empty ones ready.
+
+        Returns:
+            Number of slots that became ready
+        """
+        lease_dir = self._lease_dir()
+        if lease_dir is None:
+            return 0
+        held = self._leases(lease_dir)
+        with self._lock:
+            candidates = sorted(
+                slot for slot in self._pairs if slot not in self._ready and slot not in held
+            )
+
+        added = 0
+        for slot in candidates:
+            pair = self._pairs[slot]
+            created = True
+            for name, subnet, role in (
+                (pair.lab_net, pair.lab_subnet, "lab_net"),
+                (pair.egress_net, pair.egress_subnet, "egress_net"),
+            ):
+                labels = {POOL_LABEL: "1", POOL_SLOT_LABEL: str(slot), POOL_ROLE_LABEL: role}
+                if not create_labeled_network(name, subnet=subnet, labels=labels):
+                    created = False
+                    break
+            if not created:
+                continue
+
+            with locked_record(lease_dir / _lease_name(slot)) as lease:
+                if lease.read():
+                    continue  # Claimed meanwhile
+                if not self._pair_is_empty(pair):
+                    lease.write(LEAKED_HOLDER)
+                    continue
+            with self._lock:
+                self._ready.add(slot)
+            added += 1
+        return added
+
+    def reap_sync(self) -> int:
+        """Return leaked and orphaned pairs to the pool once they are empty.
+
+        Leaked pairs get control-plane containers (guacd) disconnected; any
+        lab container still attached keeps the pair out of the pool. Claims
+        whose project has had no containers for CLAIM_ORPHAN_GRACE_SECONDS
+        are dropped the same way.
+
+        Returns:
+            Number of pairs returned to the pool
+        """
+        lease_dir = self._lease_dir()
+        if lease_dir is None:
+            return 0
+        now = time.time()
+        leaked = []
+        for slot, (holder, claimed_at) in sorted(self._leases(lease_dir).items()):
+            if holder == LEAKED_HOLDER:
+                leaked.append(slot)
+                continue
+            if now - claimed_at < CLAIM_ORPHAN_GRACE_SECONDS:
+                continue
+            if _project_container_count(holder) != 0:
+                continue
+            with locked_record(lease_dir / _lease_name(slot)) as lease:
+                if lease.read() != holder:
+                    continue
+                lease.write(LEAKED_HOLDER)
+            leaked.append(slot)
+            logger.info(f"Dropped orphaned network pair claim for {holder}")
+
+        reaped = 0
+        control_plane = set(settings.control_plane_containers)
+        for slot in leaked:
+            pair = self._pairs[slot]
+            for name in pair.names:
+                for container in get_network_containers(name):
+                    if container in control_plane:
+                        disconnect_container(name, container)
+            if not self._pair_is_empty(pair):
+                continue
+            with locked_record(lease_dir / _lease_name(slot)) as lease:
+                if lease.read() != LEAKED_HOLDER:
+                    continue
+                lease.write("")
+            with self._lock:
+                self._ready.add(slot)
+                self._reaped += 1
+            reaped += 1
+        if reaped:
+            logger.info(f"Reaped {reaped} leaked network pair(s)")
+        return reaped
+
+    def reconcile_sync(self) -> None:
+        """Record holders for attached pairs that have none (call at startup).
+
+        Leases survive restarts, but a pair can be attached without one (e.g.
+        leases lost with the state dir). Pairs with one lab's containers
+        attached are claimed for that project, pairs with anything else
+        attached are marked leaked, and empty pool networks from slots
+        beyond the configured size are removed.
+        """
+        lease_dir = self._lease_dir()
+        if lease_dir is None:
+            return
+        for slot, pair in self._pairs.items():
+            attached = [c for name in pair.names for c in get_network_containers(name)]
+            if not attached:
+                continue
+            projects = {
+                m.group(1) for m in map(_CONTAINER_PROJECT_PATTERN.match, attached) if m
+            }
+            with locked_record(lease_dir / _lease_name(slot)) as lease:
+                if lease.read():
+                    continue
+                if len(projects) == 1 and is_lab_project(next(iter(projects))):
+                    lease.write(projects.pop())
+                else:
+                    lease.write(LEAKED_HOLDER)
+
+        for name in _list_pool_network_names():
+            match = POOL_NETWORK_PATTERN.match(name)
+            if match and int(match.group(1)) not in self._pairs:
+                if get_network_container_count(name) == 0:
+                    remove_network(name)
+
+        stats = self.stats()
+        logger.info(
+            f"Network pool reconciled: {stats['claimed']} claimed, {stats['leaked']} leaked"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        lease_dir = self._lease_dir()
+        holders = [holder for holder, _ in self._leases(lease_dir).values()] if lease_dir else []
+        leaked = holders.count(LEAKED_HOLDER)
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._pairs),
+                "ready": len(self._ready),
+                "claimed": len(holders) - leaked,
+                "leaked": leaked,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "released": self._released,
+                "reaped": self._reaped,
+            }
+
+
+async def network_pool_loop(pool: ComposeNetworkPool | None = None) -> None:
+    """Reconcile once, then keep the pool filled and reaped until cancelled."""
+    pool = pool or get_network_pool()
+    if pool is None:
+        return
+    interval = settings.compose_network_pool_interval_seconds
+    logger.info(f"Compose network pool loop started (interval={interval}s)")
+
+    try:
+        await asyncio.to_thread(pool.reconcile_sync)
+    except asyncio.CancelledError:
+        logger.info("Compose network pool loop cancelled")
+        return
+    except Exception as e:
+        logger.error(f"Network pool reconcile failed: {type(e).__name__}")
+
+    while True:
+        try:
+            await asyncio.to_thread(pool.reap_sync)
+            added = await asyncio.to_thread(pool.refill_sync)
+            if added:
+                logger.info(f"Network pool refilled {added} pair(s): {pool.stats()}")
+            await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            logger.info("Compose network pool loop cancelled")
+            break
+        except Exception as e:
+            logger.error(f"Network pool loop error: {type(e).__name__}")
+            try:
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                logger.info("Compose network pool loop cancelled")
+                break
+
+
+# =============================================================================
+# Process-wide pool
+# =============================================================================
+
+_pool: ComposeNetworkPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_network_pool() -> ComposeNetworkPool | None:
+    """Get the process-wide pool, or None when disabled or misconfigured."""
+    global _pool
+    if not settings.compose_network_pool_enabled:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            try:
+                pairs = carve_pairs(
+                    settings.compose_network_pool_cidr,
+                    settings.compose_network_pool_prefixlen,
+                    settings.compose_network_pool_size,
+                )
+            except ValueError as e:
+                logger.error(f"Compose network pool disabled: {e}")
+                return None
+            _pool = ComposeNetworkPool(pairs)
+        return _pool
+
+
+def reset_network_pool() -> None:
+    """Reset the process-wide pool. Useful for testing."""
+    global _pool
+    with _pool_lock:
+        _pool = None
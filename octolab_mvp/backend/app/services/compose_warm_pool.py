@@ -0,0 +1,453 @@
+"""Warm standby pool of pre-started compose lab stacks.
+
+Compose lab start time is dominated by `docker compose up` plus the OctoBox
+XFCE/VNC boot and healthcheck. OctoBox and the lab gateway are identical for
+every recipe, so the pool keeps some of them running ahead of demand:
+
+1. The background loop starts octobox + lab-gateway under a fresh lab UUID
+   (project octolab_<uuid>), waits until OctoBox is healthy and parks it
+2. create_lab_for_user claims a stack for the recipe and creates the Lab row
+   with that UUID, so project, network and evidence volume names all line up
+3. ComposeLabRuntime.create_lab takes the stack, binds the lab's VNC password
+   and starts only the target service
+4. Stacks idle longer than the TTL are discarded (with their volumes) and
+   replaced; abandoned claims are discarded the same way
+
+The pool is shared by every backend worker on the host: each stack has a
+record (<lab_id>.standby under compose_state_dir/warm) whose state is only
+changed under its flock, so a stack is claimed and taken at most once
+host-wide, and any worker's admin scan sees every standby.
+
+Evidence isolation:
+- A stack is used by exactly one lab. It is never returned to the pool; a
+  stack that is not activated is torn down with `down -v`
+- Evidence volumes are project-scoped to the stack's UUID, which becomes the
+  lab ID, so no two labs can ever mount the same volume
+- The standby VNC password is random and never recorded; the lab password
+  is bound at claim via stdin (never argv)
+
+A claim create_lab does not take in time is only dropped from the pool, not
+torn down: create_lab may be cold-starting that project, which the lab now
+owns like any other.
+
+Standby projects have no Lab row; admin runtime drift skips the projects
+listed by standby_projects() so they are not reported or stopped as orphans.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from uuid import UUID, uuid4
+
+from app.config import settings
+from app.utils.host_state import ensure_private_dir, locked_record, read_record
+
+if TYPE_CHECKING:
+    from app.runtime.compose_runtime import ComposeLabRuntime
+
+logger = logging.getLogger(__name__)
+
+# Size key shared by all recipes
+SHARED_POOL_KEY = "*"
+
+# A claim create_lab has not taken within this window is dropped from the
+# pool (lab row creation failed, or provisioning was never scheduled)
+CLAIM_TAKE_TIMEOUT_SECONDS = 300.0
+
+# A stack starting or being discarded this long belongs to a worker that
+# died; it is discarded again (well past the compose and health timeouts)
+STALE_TRANSITION_SECONDS = 1800.0
+
+# Record states
+STARTING = "starting"
+READY = "ready"
+CLAIMED = "claimed"
+DISCARD = "discard"  # claim abandoned: tear down
+DISCARDING = "discarding"
+
+_RECORD_SUFFIX = ".standby"
+
+
+@dataclass
+class StandbyStack:
+    """A standby octobox + gateway stack and its pool state.
+
+    Times are wall-clock so that every worker reads them the same way.
+    """
+
+    lab_id: UUID
+    novnc_port: int
+    pool_key: str
+    created_at: float = field(default_factory=time.time)
+    state: str = READY
+    since: float = field(default_factory=time.time)
+
+    @property
+    def project(self) -> str:
+        return f"octolab_{self.lab_id}"
+
+    def age_seconds(self, now: float | None = None) -> float:
+        return (now or time.time()) - self.created_at
+
+    def to_record(self) -> str:
+        return json.dumps({**asdict(self), "lab_id": str(self.lab_id)}, separators=(",", ":"))
+
+    @classmethod
+    def from_record(cls, value: str) -> "StandbyStack | None":
+        try:
+            data = json.loads(value)
+            return cls(
+                lab_id=UUID(data["lab_id"]),
+                novnc_port=int(data["novnc_port"]),
+                pool_key=str(data["pool_key"]),
+                created_at=float(data["created_at"]),
+                state=str(data["state"]),
+                since=float(data["since"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class ComposeWarmPool:
+    """Host-wide standby records; docker work is done by the runtime.
+
+    Claim, take and abandon are short file operations and run on the event
+    loop; admin scans read standby_projects() from worker threads. Counters
+    are per process.
+    """
+
+    def __init__(self, sizes: dict[str, int], ttl_seconds: float) -> None:
+        self._lock = threading.Lock()
+        self._sizes = {key: n for key, n in sizes.items() if n > 0}
+        self._ttl = ttl_seconds
+        # Stacks this process started (drained at shutdown if still unclaimed)
+        self._started_here: set[UUID] = set()
+        self._records_dir_logged = False
+        self._hits: dict[str, int] = {}
+        self._misses: dict[str, int] = {}
+        self._started = 0
+        self._start_failures = 0
+        self._recycled = 0
+        self._claims_dropped = 0
+        self._activated = 0
+        self._activation_failures = 0
+
+    # -------------------------------------------------------------------------
+    # Records
+    # -------------------------------------------------------------------------
+
+    def _records_dir(self) -> Path | None:
+        try:
+            return ensure_private_dir(Path(settings.compose_state_dir) / "warm")
+        except OSError as e:
+            if not self._records_dir_logged:
+                self._records_dir_logged = True
+                logger.error(f"Warm pool record dir unusable ({type(e).__name__}); pool disabled")
+            return None
+
+    def _scan(self) -> list[StandbyStack]:
+        records_dir = self._records_dir()
+        if records_dir is None:
+            return []
+        stacks = []
+        for path in records_dir.glob(f"*{_RECORD_SUFFIX}"):
+            value, _ = read_record(path)
+            stack = StandbyStack.from_record(value) if value else None
+            if stack is not None:
+                stacks.append(stack)
+        return stacks
+
+    def _create(self, stack: StandbyStack) -> bool:
+        records_dir = self._records_dir()
+        if records_dir is None:
+            return False
+        with locked_record(records_dir / f"{stack.lab_id}{_RECORD_SUFFIX}") as record:
+            record.write(stack.to_record())
+        return True
+
+    def _transition(
+        self, lab_id: UUID, from_states: set[str], to_state: str | None, **changes: Any
+    ) -> StandbyStack | None:
+        """Move a record from one of from_states to to_state (None removes it).
+
+        Returns:
+            The stack as it was before the change, or None if the record is
+            missing or in another state
+        """
+        records_dir = self._records_dir()
+        if records_dir is None:
+            return None
+        path = records_dir / f"{lab_id}{_RECORD_SUFFIX}"
+        try:
+            with locked_record(path, create=False) as record:
+                stack = StandbyStack.from_record(record.read())
+                if stack is None or stack.state not in from_states:
+                    return None
+                if to_state is None:
+                    # Emptied first: a worker that opened the file before the
+                    # unlink finds no record once it gets the lock
+                    record.write("")
+                    path.unlink(missing_ok=True)
+                else:
+                    updated = StandbyStack(**{**asdict(stack), **changes})
+                    updated.state = to_state
+                    updated.since = time.time()
+                    record.write(updated.to_record())
+                return stack
+        except FileNotFoundError:
+            return None
+
+    # -------------------------------------------------------------------------
+    # Claim / take
+    # -------------------------------------------------------------------------
+
+    def claim(self, recipe_name: str) -> StandbyStack | None:
+        """Claim a standby stack for a recipe (own pool first, then shared).
+
+        Returns:
+            The stack (its lab_id must become the Lab ID), or None on a miss
+        """
+        now = time.time()
+        stacks = self._scan()
+        for key in (recipe_name, SHARED_POOL_KEY):
+            # Oldest first: it is closest to its TTL
+            candidates = sorted(
+                (
+                    s for s in stacks
+                    if s.pool_key == key and s.state == READY and s.age_seconds(now) < self._ttl
+                ),
+                key=lambda s: s.created_at,
+            )
+            for stack in candidates:
+                if self._transition(stack.lab_id, {READY}, CLAIMED) is not None:
+                    with self._lock:
+                        self._hits[recipe_name] = self._hits.get(recipe_name, 0) + 1
+                    stack.state = CLAIMED
+                    return stack
+        with self._lock:
+            self._misses[recipe_name] = self._misses.get(recipe_name, 0) + 1
+        return None
+
+    def take(self, lab_id: UUID) -> StandbyStack | None:
+        """Hand a claimed stack to create_lab (once, host-wide)."""
+        return self._transition(lab_id, {CLAIMED}, None)
+
+    def abandon(self, lab_id: UUID) -> None:
+        """Mark a claim as not going to be taken (discarded on the next tick)."""
+        self._transition(lab_id, {CLAIMED}, DISCARD)
+
+    def standby_projects(self) -> set[str]:
+        """Projects owned by the pool on this host, in any state."""
+        return {stack.project for stack in self._scan()}
+
+    def record_activation(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._activated += 1
+            else:
+                self._activation_failures += 1
+
+    # -------------------------------------------------------------------------
+    # Maintenance (background task)
+    # -------------------------------------------------------------------------
+
+    def _plan_starts(self) -> list[StandbyStack]:
+        """Record a starting stack for every missing one, host-wide."""
+        records_dir = self._records_dir()
+        if records_dir is None:
+            return []
+        planned = []
+        # Serializes planning between workers so pools are not overfilled
+        with locked_record(records_dir / "fill.lock"):
+            stacks = self._scan()
+            for key, size in self._sizes.items():
+                present = sum(1 for s in stacks if s.pool_key == key and s.state in (STARTING, READY))
+                for _ in range(size - present):
+                    stack = StandbyStack(lab_id=uuid4(), novnc_port=0, pool_key=key, state=STARTING)
+                    self._create(stack)
+                    planned.append(stack)
+        return planned
+
+    async def recycle(self, runtime: "ComposeLabRuntime") -> int:
+        """Discard expired and abandoned standbys; drop claims never taken.
+
+        Returns:
+            Number of stacks discarded
+        """
+        now = time.time()
+        to_discard = []
+        dropped = 0
+        stacks = self._scan()
+        for stack in stacks:
+            in_state = now - stack.since
+            if stack.state == CLAIMED:
+                if in_state >= CLAIM_TAKE_TIMEOUT_SECONDS and self._transition(
+                    stack.lab_id, {CLAIMED}, None
+                ):
+                    # create_lab may be cold-starting this project: release
+                    # the reservation only, never tear the project down
+                    dropped += 1
+                    logger.info(f"Dropped warm standby claim for {stack.project} (not taken)")
+                continue
+            expired = (
+                (stack.state == READY and stack.age_seconds(now) >= self._ttl)
+                or stack.state == DISCARD
+                or (stack.state in (STARTING, DISCARDING) and in_state >= STALE_TRANSITION_SECONDS)
+            )
+            if expired and self._transition(stack.lab_id, {stack.state}, DISCARDING):
+                to_discard.append(stack.lab_id)
+
+        for lab_id in to_discard:
+            await runtime.discard_standby(lab_id)
+            self._transition(lab_id, {DISCARDING}, None)
+        with self._lock:
+            self._recycled += len(to_discard)
+            self._claims_dropped += dropped
+            self._started_here &= {s.lab_id for s in stacks}
+        if to_discard:
+            logger.info(f"Recycled {len(to_discard)} warm standby stack(s)")
+        return len(to_discard)
+
+    async def _start_one(self, runtime: "ComposeLabRuntime", stack: StandbyStack, exclude: set[int]) -> None:
+        # Local import to avoid circular imports (app.db imports models)
+        from app.db import AsyncSessionLocal
+        from app.services.port_allocator import pick_unreserved_port
+
+        try:
+            async with AsyncSessionLocal() as session:
+                novnc_port = await pick_unreserved_port(session, exclude=exclude)
+            exclude.add(novnc_port)
+            await runtime.start_standby(stack.lab_id, novnc_port)
+        except Exception as e:
+            self._transition(stack.lab_id, {STARTING}, None)
+            with self._lock:
+                self._start_failures += 1
+            logger.warning(f"Warm standby start failed ({stack.pool_key}): {type(e).__name__}")
+            return
+
+        self._transition(
+            stack.lab_id, {STARTING}, READY, novnc_port=novnc_port, created_at=time.time()
+        )
+        with self._lock:
+            self._started += 1
+            self._started_here.add(stack.lab_id)
+        logger.info(f"Warm standby ready: pool={stack.pool_key} lab_id={stack.lab_id}")
+
+    async def fill(self, runtime: "ComposeLabRuntime") -> None:
+        """Start stacks until every pool is at its configured size."""
+        planned = self._plan_starts()
+        exclude = {s.novnc_port for s in self._scan() if s.novnc_port}
+        for stack in planned:
+            await self._start_one(runtime, stack, exclude)
+
+    async def drain(self, runtime: "ComposeLabRuntime") -> None:
+        """Discard unclaimed standbys this process started (shutdown)."""
+        with self._lock:
+            started_here, self._started_here = self._started_here, set()
+        for lab_id in started_here:
+            if self._transition(lab_id, {READY}, DISCARDING) is not None:
+                await runtime.discard_standby(lab_id)
+                self._transition(lab_id, {DISCARDING}, None)
+
+    def stats(self) -> dict[str, Any]:
+        stacks = self._scan()
+        with self._lock:
+            hits = sum(self._hits.values())
+            lookups = hits + sum(self._misses.values())
+            recipes = sorted(set(self._hits) | set(self._misses))
+            return {
+                "sizes": dict(self._sizes),
+                "ready": {
+                    key: sum(1 for s in stacks if s.pool_key == key and s.state == READY)
+                    for key in self._sizes
+                },
+                "starting": {
+                    key: sum(1 for s in stacks if s.pool_key == key and s.state == STARTING)
+                    for key in self._sizes
+                },
+                "claimed": sum(1 for s in stacks if s.state == CLAIMED),
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "by_recipe": {
+                    name: {"hits": self._hits.get(name, 0), "misses": self._misses.get(name, 0)}
+                    for name in recipes
+                },
+                "started": self._started,
+                "start_failures": self._start_failures,
+                "recycled": self._recycled,
+                "claims_dropped": self._claims_dropped,
+                "activated": self._activated,
+                "activation_failures": self._activation_failures,
+            }
+
+
+async def warm_pool_loop(pool: ComposeWarmPool | None = None) -> None:
+    """Keep the warm pool filled and recycled until cancelled."""
+    pool = pool or get_warm_pool()
+    if pool is None:
+        return
+    # Local import to avoid circular imports (compose_runtime uses this module)
+    from app.runtime import get_runtime_for_type
+
+    runtime = get_runtime_for_type("compose")
+    interval = settings.compose_warm_pool_interval_seconds
+    logger.info(f"Compose warm pool loop started (sizes={settings.compose_warm_pool_sizes})")
+
+    while True:
+        try:
+            await pool.recycle(runtime)
+            await pool.fill(runtime)
+            await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            logger.info("Compose warm pool loop cancelled")
+            break
+        except Exception as e:
+            logger.error(f"Warm pool loop error: {type(e).__name__}")
+            try:
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                logger.info("Compose warm pool loop cancelled")
+                break
+
+    # Unclaimed stacks have no Lab row; do not leave ours running
+    try:
+        await asyncio.shield(pool.drain(runtime))
+    except (asyncio.CancelledError, Exception) as e:
+        logger.warning(f"Warm pool drain incomplete: {type(e).__name__}")
+
+
+# =============================================================================
+# Process-wide pool
+# =============================================================================
+
+_pool: ComposeWarmPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_warm_pool() -> ComposeWarmPool | None:
+    """Get the process-wide warm pool, or None when disabled."""
+    global _pool
+    if not settings.compose_warm_pool_enabled or not settings.compose_warm_pool_sizes:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ComposeWarmPool(
+                settings.compose_warm_pool_sizes,
+                settings.compose_warm_pool_ttl_seconds,
+            )
+        return _pool
+
+
+def reset_warm_pool() -> None:
+    """Reset the process-wide pool. Useful for testing."""
+    global _pool
+    with _pool_lock:
+        _pool = None
@@ -0,0 +1,739 @@
+"""Native Docker Engine API client over the local unix socket.
+
+The docker_net and compose_runtime helpers historically forked a `docker` CLI
+process for every list/inspect/rm call and parsed its text output. This module
+talks HTTP to the daemon over /var/run/docker.sock instead, reusing a pooled
+keep-alive connection, and returns typed results.
+
+Callers use try_engine() and fall back to the CLI when it reports that the API
+is not usable (disabled in settings, socket missing, daemon unreachable). The
+CLI path therefore stays the behaviour of record in environments without a
+local socket (tests, remote DOCKER_HOST setups).
+
+SECURITY:
+- Only talks to the local daemon socket (never TCP)
+- Filters and path segments are built from server-derived names only
+- Error messages are truncated before they reach logs or callers
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import stat
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+from urllib.parse import quote
+
+import httpx
+
+from app.config import settings
+from app.utils.metrics import track_operation
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Host part is ignored for unix socket transports but required by httpx
+_BASE_URL = "http://docker"
+
+# After a transport failure, skip the API for this long before retrying
+ENGINE_RETRY_COOLDOWN_SECONDS = 30.0
+
+# Keep-alive pool sizing (one host, so small pools are enough)
+_MAX_CONNECTIONS = 10
+_MAX_KEEPALIVE_CONNECTIONS = 5
+
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+
+# Second path segments that name an endpoint rather than an object
+_COLLECTION_ENDPOINTS = frozenset({"json", "create", "prune"})
+
+
+class DockerEngineError(Exception):
+    """Docker Engine API returned an error response."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class DockerEngineUnavailableError(DockerEngineError):
+    """Engine API could not be reached (socket missing, refused, timed out)."""
+
+    pass
+
+
+@dataclass
+class EngineContainer:
+    """Container summary from GET /containers/json."""
+
+    id: str
+    name: str
+    state: str  # "running", "exited", "created", ...
+    status: str  # Human-readable status ("Up 2 minutes")
+    labels: dict[str, str] = field(default_factory=dict)
+    networks: list[str] = field(default_factory=list)
+
+    @property
+    def project(self) -> str:
+        """Compose project label value ("" if unlabeled)."""
+        return self.labels.get(COMPOSE_PROJECT_LABEL, "")
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+
+@dataclass
+class EngineNetwork:
+    """Network from GET /networks or GET /networks/{id}.
+
+    containers is only populated by inspect; the list endpoint leaves it empty.
+    """
+
+    id: str
+    name: str
+    driver: str = ""
+    scope: str = ""
+    labels: dict[str, str] = field(default_factory=dict)
+    containers: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def container_names(self) -> list[str]:
+        return [
+            meta["Name"]
+            for meta in self.containers.values()
+            if isinstance(meta, dict) and meta.get("Name")
+        ]
+
+
+@dataclass
+class EngineVolume:
+    """Volume from GET /volumes."""
+
+    name: str
+    driver: str = ""
+    labels: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def project(self) -> str:
+        return self.labels.get(COMPOSE_PROJECT_LABEL, "")
+
+
+def encode_filters(filters: dict[str, list[str]] | None) -> dict[str, str]:
+    """Encode a filters mapping as the Engine API `filters` query parameter."""
+    if not filters:
+        return {}
+    return {"filters": json.dumps(filters, separators=(",", ":"))}
+
+
+def _parse_container(obj: dict[str, Any]) -> EngineContainer:
+    names = obj.get("Names") or []
+    name = names[0].lstrip("/") if names else ""
+    networks = ((obj.get("NetworkSettings") or {}).get("Networks") or {}).keys()
+    return EngineContainer(
+        id=obj.get("Id", ""),
+        name=name,
+        state=(obj.get("State") or "").lower(),
+        status=obj.get("Status") or "",
+        labels=obj.get("Labels") or {},
+        networks=list(networks),
+    )
+
+
+def _parse_network(obj: dict[str, Any]) -> EngineNetwork:
+    return EngineNetwork(
+        id=obj.get("Id", ""),
+        name=obj.get("Name", ""),
+        driver=obj.get("Driver", ""),
+        scope=obj.get("Scope", ""),
+        labels=obj.get("Labels") or {},
+        containers=obj.get("Containers") or {},
+    )
+
+
+def _parse_volume(obj: dict[str, Any]) -> EngineVolume:
+    return EngineVolume(
+        name=obj.get("Name", ""),
+        driver=obj.get("Driver", ""),
+        labels=obj.get("Labels") or {},
+    )
+
+
+def _operation_name(method: str, path: str) -> str:
+    """Metrics label for a request ("DELETE /networks/{id}")."""
+    parts = path.strip("/").split("/")
+    if len(parts) >= 2 and parts[1] not in _COLLECTION_ENDPOINTS:
+        parts[1] = "{id}"
+    return f"{method} /" + "/".join(parts)
+
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        body = response.json()
+        message = body.get("message", "") if isinstance(body, dict) else ""
+    except ValueError:
+        message = response.text
+    return (message or f"HTTP {response.status_code}").strip()[:400]
+
+
+class DockerEngineClient:
+    """Engine API client with pooled keep-alive connections.
+
+    Both a sync and an async surface are exposed: the sync methods serve the
+    existing helpers that run in worker threads, the async ones (prefixed
+    with `a`) serve code running on the event loop. Each side holds its own
+    connection pool; the async pool is rebuilt if used from a different loop.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        *,
+        timeout: float = 10.0,
+        transport: httpx.BaseTransport | None = None,
+        async_transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._transport = transport
+        self._async_transport = async_transport
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+        self._unavailable_until = 0.0
+
+    # -------------------------------------------------------------------------
+    # Connection management
+    # -------------------------------------------------------------------------
+
+    @property
+    def available(self) -> bool:
+        """False while cooling down after a transport failure."""
+        return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self, exc: Exception) -> DockerEngineUnavailableError:
+        self._unavailable_until = time.monotonic() + ENGINE_RETRY_COOLDOWN_SECONDS
+        logger.debug(f"Docker Engine API unavailable: {type(exc).__name__}")
+        return DockerEngineUnavailableError(f"engine api unavailable: {type(exc).__name__}")
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=_MAX_CONNECTIONS,
+            max_keepalive_connections=_MAX_KEEPALIVE_CONNECTIONS,
+        )
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                transport = self._transport or httpx.HTTPTransport(uds=self.socket_path)
+                self._client = httpx.Client(
+                    base_url=_BASE_URL,
+                    transport=transport,
+                    timeout=self.timeout,
+                    limits=self._limits(),
+                )
+            return self._client
+
+    async def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            # Connections are bound to the loop that opened them
+            if self._async_client is not None:
+                await self._close_stale_async_client(self._async_client, self._async_loop)
+            transport = self._async_transport or httpx.AsyncHTTPTransport(uds=self.socket_path)
+            self._async_client = httpx.AsyncClient(
+                base_url=_BASE_URL,
+                transport=transport,
+                timeout=self.timeout,
+                limits=self._limits(),
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    @staticmethod
+    async def _close_stale_async_client(
+        client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop | None
+    ) -> None:
+        """Close a client left behind by another event loop."""
+        if loop is not None and loop.is_running():
+            # Its connections must be closed on the loop that owns them
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Transports of a closed loop can fail to shut down; drop them
+            logger.debug(f"Closing stale Docker Engine client failed: {type(e).__name__}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+    # -------------------------------------------------------------------------
+    # Request plumbing
+    # -------------------------------------------------------------------------
+
+    def _check(self, response: httpx.Response, ok_statuses: tuple[int, ...]) -> Any:
+        if response.status_code not in ok_statuses:
+            raise DockerEngineError(_error_message(response), status_code=response.status_code)
+        if not response.content:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return response.text
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json_body: Any = None,
+        timeout: float | None = None,
+        ok_statuses: tuple[int, ...] = (200, 201, 204),
+    ) -> Any:
+        with track_operation("docker_api", _operation_name(method, path)) as op:
+            try:
+                response = self._sync_client().request(
+                    method,
+                    path,
+                    params=params,
+                    json=json_body,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+            except httpx.TransportError as e:
+                raise self._mark_unavailable(e) from e
+            # 4xx (missing object, in use) is an answer, not a host failure
+            op.ok = response.status_code < 500
+        return self._check(response, ok_statuses)
+
+    async def _arequest(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json_body: Any = None,
+        timeout: float | None = None,
+        ok_statuses: tuple[int, ...] = (200, 201, 204),
+    ) -> Any:
+        with track_operation("docker_api", _operation_name(method, path)) as op:
+            try:
+                client = await self._get_async_client()
+                response = await client.request(
+                    method,
+                    path,
+                    params=params,
+                    json=json_body,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+            except httpx.TransportError as e:
+                raise self._mark_unavailable(e) from e
+            # 4xx (missing object, in use) is an answer, not a host failure
+            op.ok = response.status_code < 500
+        return self._check(response, ok_statuses)
+
+    # -------------------------------------------------------------------------
+    # System
+    # -------------------------------------------------------------------------
+
+    def ping(self, timeout: float | None = None) -> bool:
+        try:
+            return self._request("GET", "/_ping", timeout=timeout) == "OK"
+        except DockerEngineError:
+            return False
+
+    # -------------------------------------------------------------------------
+    # Containers
+    # -------------------------------------------------------------------------
+
+    def list_containers(
+        self,
+        *,
+        all: bool = False,
+        filters: dict[str, list[str]] | None = None,
+        timeout: float | None = None,
+    ) -> list[EngineContainer]:
+        params = {"all": "1" if all else "0", **encode_filters(filters)}
+        payload = self._request("GET", "/containers/json", params=params, timeout=timeout)
+        return [_parse_container(c) for c in payload or []]
+
+    async def alist_containers(
+        self,
+        *,
+        all: bool = False,
+        filters: dict[str, list[str]] | None = None,
+        timeout: float | None = None,
+    ) -> list[EngineContainer]:
+        params = {"all": "1" if all else "0", **encode_filters(filters)}
+        payload = await self._arequest("GET", "/containers/json", params=params, timeout=timeout)
+        return [_parse_container(c) for c in payload or []]
+
+    def inspect_container(self, container: str, timeout: float | None = None) -> dict | None:
+        """Return raw inspect data (same shape as `docker inspect`), None if missing."""
+        try:
+            return self._request("GET", f"/containers/{quote(container, safe='')}/json", timeout=timeout)
+        except DockerEngineUnavailableError:
+            raise
+        except DockerEngineError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    async def ainspect_container(self, container: str, timeout: float | None = None) -> dict | None:
+        try:
+            return await self._arequest(
+                "GET", f"/containers/{quote(container, safe='')}/json", timeout=timeout
+            )
+        except DockerEngineUnavailableError:
+            raise
+        except DockerEngineError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    def create_container(
+        self,
+        config: dict[str, Any],
+        *,
+        name: str | None = None,
+        timeout: float | None = None,
+    ) -> str:
+        """Create (but do not start) a container. Returns its ID."""
+        params = {"name": name} if name else None
+        payload = self._request(
+            "POST", "/containers/create", params=params, json_body=config, timeout=timeout
+        )
+        return (payload or {}).get("Id", "")
+
+    def iter_archive(
+        self,
+        container: str,
+        path: str,
+        *,
+        chunk_size: int = 1024 * 1024,
+        timeout: float | None = None,
+    ) -> Iterator[bytes]:
+        """Stream GET /containers/{id}/archive as raw tar chunks.
+
+        The container does not need to be running. Entries are rooted at the
+        basename of path. Nothing is buffered beyond one chunk.
+
+        Raises:
+            DockerEngineUnavailableError: Stream could not be opened or was cut
+            DockerEngineError: Daemon rejected the request (404 = no such path)
+        """
+        try:
+            with self._sync_client().stream(
+                "GET",
+                f"/containers/{quote(container, safe='')}/archive",
+                params={"path": path},
+                timeout=timeout if timeout is not None else self.timeout,
+            ) as response:
+                if response.status_code != 200:
+                    response.read()
+                    raise DockerEngineError(
+                        _error_message(response), status_code=response.status_code
+                    )
+                yield from response.iter_bytes(chunk_size)
+        except httpx.TransportError as e:
+            raise self._mark_unavailable(e) from e
+
+    def remove_container(
+        self,
+        container: str,
+        *,
+        force: bool = False,
+        volumes: bool = False,
+        timeout: float | None = None,
+    ) -> None:
+        """Remove a container. Raises DockerEngineError (404 = already gone)."""
+        params = {"force": "1" if force else "0", "v": "1" if volumes else "0"}
+        self._request(
+            "DELETE", f"/containers/{quote(container, safe='')}", params=params, timeout=timeout
+        )
+
+    # -------------------------------------------------------------------------
+    # Networks
+    # -------------------------------------------------------------------------
+
+    def list_networks(
+        self,
+        *,
+        filters: dict[str, list[str]] | None = None,
+        timeout: float | None = None,
+    ) -> list[EngineNetwork]:
+        payload = self._request("GET", "/networks", params=encode_filters(filters), timeout=timeout)
+        return [_parse_network(n) for n in payload or []]
+
+    async def alist_networks(
+        self,
+        *,
+        filters: dict[str, list[str]] | None = None,
+        timeout: float | None = None,
+    ) -> list[EngineNetwork]:
+        payload = await self._arequest(
+            "GET", "/networks", params=encode_filters(filters), timeout=timeout
+        )
+        return [_parse_network(n) for n in payload or []]
+
+    def inspect_network(self, network: str, timeout: float | None = None) -> EngineNetwork | None:
+        """Inspect a network including attached containers, None if missing."""
+        try:
+            payload = self._request("GET", f"/networks/{quote(network, safe='')}", timeout=timeout)
+        except DockerEngineUnavailableError:
+            raise
+        except DockerEngineError as e:
+            if e.status_code == 404:
+                return None
+            raise
+        return _parse_network(payload or {})
+
+    async def ainspect_network(
+        self, network: str, timeout: float | None = None
+    ) -> EngineNetwork | None:
+        try:
+            payload = await self._arequest(
+                "GET", f"/networks/{quote(network, safe='')}", timeout=timeout
+            )
+        except DockerEngineUnavailableError:
+            raise
+        except DockerEngineError as e:
+            if e.status_code == 404:
+                return None
+            raise
+        return _parse_network(payload or {})
+
+    def create_network(
+        self,
+        name: str,
+        *,
+        driver: str = "bridge",
+        subnet: str | None = None,
+        labels: dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> str:
+        """Create a network and return its ID. Raises DockerEngineError (409 = exists)."""
+        body: dict[str, Any] = {
+            "Name": name,
+            "Driver": driver,
+            "CheckDuplicate": True,
+            "Labels": labels or {},
+        }
+        if subnet:
+            body["IPAM"] = {"Driver": "default", "Config": [{"Subnet": subnet}]}
+        payload = self._request("POST", "/networks/create", json_body=body, timeout=timeout)
+        return (payload or {}).get("Id", "")
+
+    def remove_network(self, network: str, timeout: float | None = None) -> None:
+        """Remove a network. Raises DockerEngineError (404 missing, 403 in use)."""
+        self._request("DELETE", f"/networks/{quote(network, safe='')}", timeout=timeout)
+
+    def disconnect_network(
+        self,
+        network: str,
+        container: str,
+        *,
+        force: bool = True,
+        timeout: float | None = None,
+    ) -> None:
+        self._request(
+            "POST",
+            f"/networks/{quote(network, safe='')}/disconnect",
+            json_body={"Container": container, "Force": force},
+            timeout=timeout,
+        )
+
+    async def aconnect_network(
+        self,
+        network: str,
+        container: str,
+        *,
+        aliases: list[str] | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        body: dict[str, Any] = {"Container": container}
+        if aliases:
+            body["EndpointConfig"] = {"Aliases": aliases}
+        await self._arequest(
+            "POST", f"/networks/{quote(network, safe='')}/connect", json_body=body, timeout=timeout
+        )
+
+    async def adisconnect_network(
+        self,
+        network: str,
+        container: str,
+        *,
+        force: bool = True,
+        timeout: float | None = None,
+    ) -> None:
+        await self._arequest(
+            "POST",
+            f"/networks/{quote(network, safe='')}/disconnect",
+            json_body={"Container": container, "Force": force},
+            timeout=timeout,
+        )
+
+    # -------------------------------------------------------------------------
+    # Volumes
+    # -------------------------------------------------------------------------
+
+    def inspect_volume(self, volume: str, timeout: float | None = None) -> dict | None:
+        """Return raw volume inspect data, None if missing."""
+        try:
+            return self._request("GET", f"/volumes/{quote(volume, safe='')}", timeout=timeout)
+        except DockerEngineUnavailableError:
+            raise
+        except DockerEngineError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
+    async def alist_volumes(
+        self,
+        *,
+        filters: dict[str, list[str]] | None = None,
+        timeout: float | None = None,
+    ) -> list[EngineVolume]:
+        payload = await self._arequest(
+            "GET", "/volumes", params=encode_filters(filters), timeout=timeout
+        )
+        return [_parse_volume(v) for v in (payload or {}).get("Volumes") or []]
+
+    # -------------------------------------------------------------------------
+    # Events
+    # -------------------------------------------------------------------------
+
+    async def astream_events(
+        self,
+        *,
+        since: int | None = None,
+        filters: dict[str, list[str]] | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield decoded events from GET /events until the daemon closes the stream.
+
+        Args:
+            since: Unix timestamp to replay events from (avoids gaps after a resync)
+            filters: Event filters, e.g. {"type": ["container", "network"]}
+
+        Raises:
+            DockerEngineUnavailableError: Stream could not be opened or was cut
+            DockerEngineError: Daemon rejected the request
+        """
+        params = encode_filters(filters)
+        if since is not None:
+            params["since"] = str(since)
+        # No read timeout: the stream is idle whenever the daemon is quiet
+        stream_timeout = httpx.Timeout(self.timeout, read=None)
+        try:
+            client = await self._get_async_client()
+            async with client.stream(
+                "GET", "/events", params=params, timeout=stream_timeout
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise DockerEngineError(
+                        _error_message(response), status_code=response.status_code
+                    )
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(event, dict):
+                        yield event
+        except httpx.TransportError as e:
+            raise self._mark_unavailable(e) from e
+
+
+# =============================================================================
+# Process-wide client
+# =============================================================================
+
+_engine_client: DockerEngineClient | None = None
+_engine_lock = threading.Lock()
+
+
+def _socket_present(path: str) -> bool:
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def get_engine_client() -> DockerEngineClient | None:
+    """Return the shared Engine API client, or None to use the docker CLI.
+
+    None is returned when the API is disabled in settings, the socket does not
+    exist, or the client is cooling down after a transport failure.
+    """
+    global _engine_client
+    if not settings.docker_engine_api_enabled:
+        return None
+    socket_path = settings.docker_socket_path
+    if not _socket_present(socket_path):
+        return None
+    with _engine_lock:
+        if _engine_client is None or _engine_client.socket_path != socket_path:
+            _engine_client = DockerEngineClient(
+                socket_path,
+                timeout=float(settings.docker_engine_api_timeout_seconds),
+            )
+        client = _engine_client
+    return client if client.available else None
+
+
+def reset_engine_client() -> None:
+    """Drop the shared client. Useful for testing."""
+    global _engine_client
+    with _engine_lock:
+        if _engine_client is not None:
+            _engine_client.close()
+        _engine_client = None
+
+
+def try_engine(op: Callable[[DockerEngineClient], T]) -> tuple[bool, T | None]:
+    """Run op against the Engine API.
+
+    Returns (True, result) when the API answered, or (False, None) when the
+    caller should fall back to the docker CLI.
+    """
+    client = get_engine_client()
+    if client is None:
+        return False, None
+    try:
+        return True, op(client)
+    except DockerEngineError as e:
+        logger.debug(f"Engine API call failed (status={e.status_code}), using CLI: {e.message[:100]}")
+        return False, None
+
+
+async def atry_engine(op: Callable[[DockerEngineClient], Any]) -> tuple[bool, Any]:
+    """Async variant of try_engine(); op must return an awaitable."""
+    client = get_engine_client()
+    if client is None:
+        return False, None
+    try:
+        return True, await op(client)
+    except DockerEngineError as e:
+        logger.debug(f"Engine API call failed (status={e.status_code}), using CLI: {e.message[:100]}")
+        return False, None
@@ -0,0 +1,383 @@
+"""Event-driven inventory of Docker containers, networks and volumes.
+
+Drift scans, admin cleanup and preflight all need "what exists on the daemon
+right now". Listing the whole daemon for each of those calls is O(daemon size)
+per call and the admin endpoints make several back to back. This module keeps
+a process-wide copy instead:
+
+1. Full resync: list containers (all states), networks and volumes
+2. Subscribe to GET /events from the resync timestamp and apply each event
+3. On stream loss: mark the inventory stale, back off, reconnect, resync
+
+Readers call get_ready_inventory(), which returns None whenever the inventory
+is not known to be current (never synced, stream down, API disabled). Callers
+then use their existing list/inspect path, so correctness never depends on
+the event stream.
+
+SECURITY:
+- Read-only: the inventory never mutates daemon state
+- Callers still verify with a fresh inspect before removing anything
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from app.config import settings
+from app.services.docker_engine import (
+    DockerEngineError,
+    EngineContainer,
+    EngineNetwork,
+    EngineVolume,
+    get_engine_client,
+)
+
+logger = logging.getLogger(__name__)
+
+# Event types the inventory tracks
+_EVENT_TYPES = ["container", "network", "volume"]
+
+# Reconnect backoff after the stream drops or the API is unavailable
+_RECONNECT_BACKOFF_INITIAL = 1.0
+_RECONNECT_BACKOFF_MAX = 30.0
+
+# Listener signature: called on the event loop with the raw event dict
+EventListener = Callable[[dict[str, Any]], None]
+
+# Container actions that do not change inventory state
+_IGNORED_CONTAINER_ACTIONS = frozenset({
+    "attach", "commit", "copy", "export", "resize", "top", "archive-path", "extract-to-dir",
+})
+
+
+@dataclass
+class ProjectResources:
+    """Resources owned by one compose project."""
+
+    project: str
+    containers: list[EngineContainer] = field(default_factory=list)
+    networks: list[EngineNetwork] = field(default_factory=list)
+    volumes: list[EngineVolume] = field(default_factory=list)
+
+    @property
+    def running_containers(self) -> list[EngineContainer]:
+        return [c for c in self.containers if c.running]
+
+
+class DockerInventory:
+    """In-memory daemon inventory maintained from the Docker event stream.
+
+    Mutations happen on the event loop; reads may come from worker threads
+    (docker_net helpers run under asyncio.to_thread), so all state is guarded
+    by a threading.Lock and readers receive copies.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._containers: dict[str, EngineContainer] = {}
+        self._networks: dict[str, EngineNetwork] = {}
+        self._volumes: dict[str, EngineVolume] = {}
+        self._ready = False
+        self._last_sync: float | None = None
+        self._events_applied = 0
+        self._resyncs = 0
+        self._listeners: list[EventListener] = []
+
+    # -------------------------------------------------------------------------
+    # State
+    # -------------------------------------------------------------------------
+
+    @property
+    def ready(self) -> bool:
+        """True once synced and while the event stream is connected."""
+        return self._ready
+
+    def mark_stale(self) -> None:
+        with self._lock:
+            self._ready = False
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "containers": len(self._containers),
+                "networks": len(self._networks),
+                "volumes": len(self._volumes),
+                "events_applied": self._events_applied,
+                "resyncs": self._resyncs,
+                "last_sync_age_seconds": (
+                    round(time.monotonic() - self._last_sync, 1) if self._last_sync else None
+                ),
+            }
+
+    def replace_all(
+        self,
+        containers: list[EngineContainer],
+        networks: list[EngineNetwork],
+        volumes: list[EngineVolume],
+    ) -> None:
+        """Install a full resync snapshot and mark the inventory ready."""
+        with self._lock:
+            self._containers = {c.id: c for c in containers if c.id}
+            self._networks = {n.id: n for n in networks if n.id}
+            self._volumes = {v.name: v for v in volumes if v.name}
+            self._ready = True
+            self._last_sync = time.monotonic()
+            self._resyncs += 1
+
+    def upsert_container(self, container: EngineContainer) -> None:
+        with self._lock:
+            self._containers[container.id] = container
+
+    def remove_container(self, container_id: str) -> None:
+        with self._lock:
+            self._containers.pop(container_id, None)
+
+    def upsert_network(self, network: EngineNetwork) -> None:
+        with self._lock:
+            self._networks[network.id] = network
+
+    def remove_network(self, network_id: str) -> None:
+        with self._lock:
+            self._networks.pop(network_id, None)
+
+    def upsert_volume(self, volume: EngineVolume) -> None:
+        with self._lock:
+            self._volumes[volume.name] = volume
+
+    def remove_volume(self, name: str) -> None:
+        with self._lock:
+            self._volumes.pop(name, None)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def containers(self, *, running_only: bool = True) -> list[EngineContainer]:
+        with self._lock:
+            return [c for c in self._containers.values() if c.running or not running_only]
+
+    def networks(self) -> list[EngineNetwork]:
+        with self._lock:
+            return list(self._networks.values())
+
+    def volumes(self) -> list[EngineVolume]:
+        with self._lock:
+            return list(self._volumes.values())
+
+    def network_attachments(self, network_name: str) -> list[EngineContainer]:
+        """Containers (any state) attached to the named network."""
+        with self._lock:
+            return [c for c in self._containers.values() if network_name in c.networks]
+
+    def running_by_project(self) -> dict[str, list[EngineContainer]]:
+        projects: dict[str, list[EngineContainer]] = {}
+        for container in self.containers(running_only=True):
+            if container.project:
+                projects.setdefault(container.project, []).append(container)
+        return projects
+
+    def project_resources(self, project: str) -> ProjectResources:
+        with self._lock:
+            return ProjectResources(
+                project=project,
+                containers=[c for c in self._containers.values() if c.project == project],
+                networks=[
+                    n for n in self._networks.values()
+                    if n.labels.get("com.docker.compose.project") == project
+                ],
+                volumes=[v for v in self._volumes.values() if v.project == project],
+            )
+
+    def note_event(self) -> None:
+        with self._lock:
+            self._events_applied += 1
+
+    # -------------------------------------------------------------------------
+    # Event listeners
+    # -------------------------------------------------------------------------
+
+    def add_event_listener(self, listener: EventListener) -> None:
+        """Register a callback for every event after it is applied.
+
+        Listeners run on the event loop and must not block; anything slow
+        should be scheduled as a task. Events replayed after a reconnect are
+        delivered again, so listeners must be idempotent.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_event_listener(self, listener: EventListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def dispatch(self, event: dict[str, Any]) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"Docker event listener failed: {type(e).__name__}")
+
+
+# =============================================================================
+# Sync loop
+# =============================================================================
+
+
+async def _resync(client, inventory: DockerInventory) -> None:
+    containers, networks, volumes = await asyncio.gather(
+        client.alist_containers(all=True),
+        client.alist_networks(),
+        client.alist_volumes(),
+    )
+    inventory.replace_all(containers, networks, volumes)
+    logger.info(
+        f"Docker inventory synced: {len(containers)} containers, "
+        f"{len(networks)} networks, {len(volumes)} volumes"
+    )
+
+
+async def _refresh_container(client, inventory: DockerInventory, container_id: str) -> None:
+    found = await client.alist_containers(all=True, filters={"id": [container_id]})
+    match = next((c for c in found if c.id == container_id), None)
+    if match is None:
+        inventory.remove_container(container_id)
+    else:
+        inventory.upsert_container(match)
+
+
+async def apply_event(client, inventory: DockerInventory, event: dict[str, Any]) -> None:
+    """Apply one Docker event to the inventory.
+
+    Events only say what changed, so the affected object is re-read from the
+    API (by ID, which is cheap) rather than reconstructed from event fields.
+    """
+    event_type = event.get("Type")
+    action = (event.get("Action") or "").split(":", 1)[0].strip()
+    actor = event.get("Actor") or {}
+    actor_id = actor.get("ID") or ""
+    attributes = actor.get("Attributes") or {}
+
+    if event_type == "container" and actor_id:
+        if action in _IGNORED_CONTAINER_ACTIONS or action.startswith("exec_"):
+            return
+        if action == "destroy":
+            inventory.remove_container(actor_id)
+        else:
+            await _refresh_container(client, inventory, actor_id)
+
+    elif event_type == "network" and actor_id:
+        if action == "destroy":
+            inventory.remove_network(actor_id)
+        elif action in ("connect", "disconnect"):
+            # Attachments live on the container summary
+            container_id = attributes.get("container")
+            if container_id:
+                await _refresh_container(client, inventory, container_id)
+        else:
+            network = await client.ainspect_network(actor_id)
+            if network is None:
+                inventory.remove_network(actor_id)
+            else:
+                network.containers = {}
+                inventory.upsert_network(network)
+
+    elif event_type == "volume" and actor_id:
+        if action == "destroy":
+            inventory.remove_volume(actor_id)
+        elif action == "create":
+            found = await client.alist_volumes(filters={"name": [actor_id]})
+            for volume in found:
+                if volume.name == actor_id:
+                    inventory.upsert_volume(volume)
+    else:
+        return
+
+    inventory.note_event()
+
+
+async def docker_inventory_loop(inventory: DockerInventory | None = None) -> None:
+    """Keep the inventory current until cancelled.
+
+    Each connection cycle resyncs first and then replays events since the
+    resync started, so nothing that happened during the listing is lost.
+    """
+    inventory = inventory or get_docker_inventory()
+    backoff = _RECONNECT_BACKOFF_INITIAL
+    logger.info("Docker inventory loop started")
+
+    while True:
+        try:
+            client = get_engine_client()
+            if client is not None:
+                since = int(time.time())
+                await _resync(client, inventory)
+                backoff = _RECONNECT_BACKOFF_INITIAL
+
+                async for event in client.astream_events(
+                    since=since, filters={"type": _EVENT_TYPES}
+                ):
+                    await apply_event(client, inventory, event)
+                    inventory.dispatch(event)
+
+                # Daemon closed the stream (e.g. restart)
+                logger.info("Docker event stream closed, resyncing")
+            inventory.mark_stale()
+
+        except asyncio.CancelledError:
+            inventory.mark_stale()
+            logger.info("Docker inventory loop cancelled")
+            break
+        except DockerEngineError as e:
+            inventory.mark_stale()
+            logger.warning(f"Docker inventory stream lost: {e.message[:100]}")
+        except Exception as e:
+            inventory.mark_stale()
+            logger.error(f"Docker inventory loop error: {type(e).__name__}")
+
+        try:
+            await asyncio.sleep(backoff)
+        except asyncio.CancelledError:
+            logger.info("Docker inventory loop cancelled")
+            break
+        backoff = min(backoff * 2, _RECONNECT_BACKOFF_MAX)
+
+
+# =============================================================================
+# Process-wide inventory
+# =============================================================================
+
+_inventory: DockerInventory | None = None
+_inventory_lock = threading.Lock()
+
+
+def get_docker_inventory() -> DockerInventory:
+    """Get the process-wide inventory (may not be ready yet)."""
+    global _inventory
+    with _inventory_lock:
+        if _inventory is None:
+            _inventory = DockerInventory()
+        return _inventory
+
+
+def get_ready_inventory() -> DockerInventory | None:
+    """Get the inventory if it is current, else None (caller lists the daemon)."""
+    if not settings.docker_inventory_enabled:
+        return None
+    inventory = get_docker_inventory()
+    return inventory if inventory.ready else None
+
+
+def reset_docker_inventory() -> None:
+    """Reset the process-wide inventory. Useful for testing."""
+    global _inventory
+    with _inventory_lock:
+        _inventory = None
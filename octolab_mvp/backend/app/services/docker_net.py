@@ -14,11 +14,20 @@ import json
 import logging
 import re
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from uuid import UUID
 
 from app.config import settings
+from app.services.docker_engine import (
+    DockerEngineError,
+    get_engine_client,
+    try_engine,
+)
+from app.services.docker_inventory import DockerInventory, get_ready_inventory
+from app.utils.metrics import track_operation
 
 logger = logging.getLogger(__name__)
 
@@ -168,6 +177,23 @@ def get_lab_network_name(lab_id: UUID) -> str:
     return f"octolab_{lab_id}_lab_net"
 
 
+def resolve_lab_network_name(lab_id: UUID) -> str:
+    """Return the lab_net actually attached to a lab.
+
+    Labs started from the compose network pool use a pooled network instead
+    of the compose-scoped octolab_<lab_id>_lab_net.
+    """
+    # Import here to avoid circular imports (the pool builds on this module)
+    from app.services.compose_network_pool import get_network_pool
+
+    pool = get_network_pool()
+    if pool is not None:
+        pair = pool.claimed_pair(f"octolab_{lab_id}")
+        if pair is not None:
+            return pair.lab_net
+    return get_lab_network_name(lab_id)
+
+
 async def connect_container_to_network(
     container_name: str,
     network_name: str,
@@ -189,6 +215,25 @@ async def connect_container_to_network(
         - Uses shell=False
         - All args are validated/derived server-side
     """
+    engine = get_engine_client()
+    if engine is not None:
+        try:
+            await engine.aconnect_network(
+                network_name, container_name, aliases=[alias] if alias else None
+            )
+            logger.info(f"Connected {container_name} to network {network_name}")
+            return True
+        except DockerEngineError as e:
+            if e.status_code is not None and (
+                "already" in e.message.lower() or "endpoint with name" in e.message.lower()
+            ):
+                logger.debug(f"Container {container_name} already connected to {network_name}")
+                return True
+            if e.status_code is not None:
+                logger.warning(f"Failed to connect {container_name} to {network_name}: {e.message}")
+                return False
+            # Transport failure: fall through to CLI
+
     cmd = ["docker", "network", "connect"]
     if alias:
         cmd.extend(["--alias", alias])
@@ -244,6 +289,26 @@ async def disconnect_container_from_network(
     Returns:
         True if disconnected (or already was), False on error
     """
+    engine = get_engine_client()
+    if engine is not None:
+        try:
+            await engine.adisconnect_network(network_name, container_name, force=force)
+            logger.info(f"Disconnected {container_name} from network {network_name}")
+            return True
+        except DockerEngineError as e:
+            message_lower = e.message.lower()
+            if e.status_code == 404 or "is not connected" in message_lower:
+                logger.debug(
+                    f"Container {container_name} not connected to {network_name} (idempotent)"
+                )
+                return True
+            if e.status_code is not None:
+                logger.warning(
+                    f"Failed to disconnect {container_name} from {network_name}: {e.message}"
+                )
+                return False
+            # Transport failure: fall through to CLI
+
     cmd = ["docker", "network", "disconnect"]
     if force:
         cmd.append("--force")
@@ -296,7 +361,7 @@ async def connect_guacd_to_lab(lab_id: UUID) -> bool:
     Returns:
         True if connected successfully
     """
-    network_name = get_lab_network_name(lab_id)
+    network_name = resolve_lab_network_name(lab_id)
     container_name = settings.guacd_container_name
 
     return await connect_container_to_network(
@@ -317,7 +382,7 @@ async def disconnect_guacd_from_lab(lab_id: UUID) -> bool:
     Returns:
         True if disconnected successfully
     """
-    network_name = get_lab_network_name(lab_id)
+    network_name = resolve_lab_network_name(lab_id)
     container_name = settings.guacd_container_name
 
     return await disconnect_container_from_network(
@@ -326,6 +391,58 @@ async def disconnect_guacd_from_lab(lab_id: UUID) -> bool:
     )
 
 
+# docker subcommands that take a further subcommand ("docker network rm")
+_DOCKER_COMMAND_GROUPS = frozenset({
+    "builder", "container", "image", "network", "system", "volume",
+})
+
+# Compose options that consume the next argument
+_COMPOSE_VALUE_OPTIONS = frozenset({
+    "-f", "--file", "-p", "--project-name", "--project-directory", "--env-file", "--profile",
+})
+
+
+def docker_operation_name(cmd: list[str]) -> str:
+    """Metrics label for a docker CLI command, without object names.
+
+    ["docker", "network", "rm", "octolab_x_lab_net"] -> "docker network rm"
+    ["docker", "compose", "-p", "octolab_x", "down", "-v"] -> "docker compose down"
+    """
+    if not cmd:
+        return "unknown"
+    words = [cmd[0].rsplit("/", 1)[-1]]
+    args = iter(cmd[1:])
+    for arg in args:
+        if arg.startswith("-"):
+            continue
+        words.append(arg)
+        if arg == "compose":
+            for sub in args:
+                if sub in _COMPOSE_VALUE_OPTIONS:
+                    next(args, None)
+                elif not sub.startswith("-"):
+                    words.append(sub)
+                    break
+        elif arg in _DOCKER_COMMAND_GROUPS:
+            sub = next((a for a in args if not a.startswith("-")), None)
+            if sub:
+                words.append(sub)
+        break
+    return " ".join(words)
+
+
+def _run_docker(cmd: list[str], **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run() for docker CLI calls, recording per-operation latency.
+
+    Non-zero exits count as failures in the metrics; the result is returned
+    unchanged so callers keep their own classification.
+    """
+    with track_operation("docker", docker_operation_name(cmd)) as op:
+        result = subprocess.run(cmd, **kwargs)
+        op.ok = result.returncode == 0
+    return result
+
+
 def _run_docker_cmd(cmd: list[str]) -> subprocess.CompletedProcess:
     """Run a docker command synchronously.
 
@@ -337,7 +454,7 @@ def _run_docker_cmd(cmd: list[str]) -> subprocess.CompletedProcess:
     Returns:
         CompletedProcess result
     """
-    return subprocess.run(
+    return _run_docker(
         cmd,
         capture_output=True,
         text=True,
@@ -371,7 +488,7 @@ def _get_container_ip_on_network(
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -412,7 +529,7 @@ async def preflight_netcheck(
         NetCheckResult with status and diagnostic message
     """
     guacd_container = settings.guacd_container_name
-    network_name = get_lab_network_name(lab_id)
+    network_name = resolve_lab_network_name(lab_id)
     target_container = f"octolab_{lab_id}-octobox-1"
 
     # Step 1: Check if guacd is connected to the lab network
@@ -460,7 +577,7 @@ async def preflight_netcheck(
 
     def _test_connectivity() -> tuple[bool, str]:
         try:
-            result = subprocess.run(
+            result = _run_docker(
                 cmd,
                 capture_output=True,
                 text=True,
@@ -528,6 +645,51 @@ def _get_network_timeout() -> float:
     return float(settings.docker_network_timeout_seconds)
 
 
+def _engine_remove_network(network_name: str, timeout: float) -> NetworkRemoveResult | None:
+    """Remove a network via the Engine API.
+
+    Returns:
+        NetworkRemoveResult, or None if the API is unavailable (use the CLI)
+    """
+    client = get_engine_client()
+    if client is None:
+        return None
+    try:
+        client.remove_network(network_name, timeout=timeout)
+        return NetworkRemoveResult.OK
+    except DockerEngineError as e:
+        if e.status_code is None:
+            return None
+        if e.status_code == 404:
+            return NetworkRemoveResult.NOT_FOUND
+        classification = classify_network_error(e.message)
+        return classification if classification != NetworkRemoveResult.OK else NetworkRemoveResult.ERROR
+
+
+def _engine_disconnect(
+    network_name: str, container_name: str, *, force: bool, timeout: float
+) -> bool | None:
+    """Disconnect a container via the Engine API.
+
+    Returns:
+        True if disconnected or already disconnected, False on error,
+        None if the API is unavailable (use the CLI)
+    """
+    client = get_engine_client()
+    if client is None:
+        return None
+    try:
+        client.disconnect_network(network_name, container_name, force=force, timeout=timeout)
+        return True
+    except DockerEngineError as e:
+        if e.status_code is None:
+            return None
+        if e.status_code == 404 or "is not connected" in e.message.lower():
+            return True
+        logger.debug(f"Failed to disconnect {container_name} from {network_name}: {e.message[:100]}")
+        return False
+
+
 def parse_containers_json(stdout: str) -> dict:
     """Parse docker network inspect Containers field output robustly.
 
@@ -574,6 +736,11 @@ def inspect_network_containers(network_name: str, timeout: int | None = None) ->
         dict: {container_id: {Name: ..., ...}} or {} if empty/error
     """
     effective_timeout = timeout if timeout is not None else _get_network_timeout()
+
+    ok, net = try_engine(lambda c: c.inspect_network(network_name, timeout=effective_timeout))
+    if ok:
+        return net.containers if net is not None else {}
+
     cmd = [
         "docker", "network", "inspect",
         "--format", "{{json .Containers}}",
@@ -581,7 +748,7 @@ def inspect_network_containers(network_name: str, timeout: int | None = None) ->
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -611,6 +778,25 @@ def list_octolab_networks() -> list[NetworkInfo]:
     Returns:
         List of NetworkInfo objects for each octolab_* network
     """
+    inventory = get_ready_inventory()
+    if inventory is not None:
+        return [
+            NetworkInfo(name=n.name, driver=n.driver, scope=n.scope)
+            for n in inventory.networks()
+            if OCTOLAB_NETWORK_PREFIX in n.name
+        ]
+
+    ok, engine_networks = try_engine(
+        lambda c: c.list_networks(
+            filters={"name": [OCTOLAB_NETWORK_PREFIX]}, timeout=_get_network_timeout()
+        )
+    )
+    if ok:
+        return [
+            NetworkInfo(name=n.name, driver=n.driver, scope=n.scope)
+            for n in engine_networks
+        ]
+
     cmd = [
         "docker", "network", "ls",
         "--filter", f"name={OCTOLAB_NETWORK_PREFIX}",
@@ -618,7 +804,7 @@ def list_octolab_networks() -> list[NetworkInfo]:
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -673,6 +859,15 @@ def list_networks_by_compose_project(project_name: str, timeout: float = 10.0) -
     Returns:
         List of network names belonging to the project
     """
+    ok, engine_networks = try_engine(
+        lambda c: c.list_networks(
+            filters={"label": [f"com.docker.compose.project={project_name}"]},
+            timeout=timeout,
+        )
+    )
+    if ok:
+        return [n.name for n in engine_networks if n.name.startswith(OCTOLAB_NETWORK_PREFIX)]
+
     cmd = [
         "docker", "network", "ls",
         "--filter", f"label=com.docker.compose.project={project_name}",
@@ -680,7 +875,7 @@ def list_networks_by_compose_project(project_name: str, timeout: float = 10.0) -
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -725,6 +920,10 @@ def get_network_container_count(network_name: str, timeout: float = 10.0) -> int
     Returns:
         Number of attached containers, or -1 on error
     """
+    ok, net = try_engine(lambda c: c.inspect_network(network_name, timeout=timeout))
+    if ok:
+        return len(net.containers) if net is not None else -1
+
     cmd = [
         "docker", "network", "inspect",
         "-f", "{{len .Containers}}",
@@ -732,7 +931,7 @@ def get_network_container_count(network_name: str, timeout: float = 10.0) -> int
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -768,6 +967,10 @@ def get_network_containers(network_name: str) -> list[str]:
     Returns:
         List of container names (not IDs)
     """
+    ok, net = try_engine(lambda c: c.inspect_network(network_name, timeout=_get_network_timeout()))
+    if ok:
+        return net.container_names if net is not None else []
+
     cmd = [
         "docker", "network", "inspect",
         "--format", "{{range .Containers}}{{.Name}} {{end}}",
@@ -775,7 +978,7 @@ def get_network_containers(network_name: str) -> list[str]:
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -815,7 +1018,7 @@ def _prune_unused_networks() -> int:
     cmd = ["docker", "network", "prune", "--force"]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -857,10 +1060,18 @@ def _force_disconnect_container(
     Returns:
         True if successful or already disconnected
     """
+    engine_result = _engine_disconnect(
+        network_name, container_name, force=True, timeout=_get_network_timeout()
+    )
+    if engine_result is not None:
+        if engine_result:
+            logger.info(f"Force-disconnected {container_name} from {network_name}")
+        return engine_result
+
     cmd = ["docker", "network", "disconnect", "--force", network_name, container_name]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -904,10 +1115,20 @@ def _remove_network(network_name: str) -> bool:
     Returns:
         True if removed or didn't exist
     """
+    engine_result = _engine_remove_network(network_name, _get_network_timeout())
+    if engine_result is not None:
+        if engine_result == NetworkRemoveResult.OK:
+            logger.info(f"Removed network {network_name}")
+        elif engine_result == NetworkRemoveResult.IN_USE:
+            logger.warning(f"Cannot remove network {network_name}: has active endpoints")
+        elif engine_result == NetworkRemoveResult.ERROR:
+            logger.warning(f"Failed to remove network {network_name}")
+        return engine_result in (NetworkRemoveResult.OK, NetworkRemoveResult.NOT_FOUND)
+
     cmd = ["docker", "network", "rm", network_name]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -954,10 +1175,14 @@ def remove_network(network_name: str, timeout: int = 30) -> NetworkRemoveResult:
     Returns:
         NetworkRemoveResult indicating outcome
     """
+    engine_result = _engine_remove_network(network_name, timeout)
+    if engine_result is not None:
+        return engine_result
+
     cmd = ["docker", "network", "rm", network_name]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -994,6 +1219,84 @@ def remove_network(network_name: str, timeout: int = 30) -> NetworkRemoveResult:
         return NetworkRemoveResult.ERROR
 
 
+def create_labeled_network(
+    network_name: str,
+    *,
+    subnet: str | None = None,
+    labels: dict[str, str] | None = None,
+    driver: str = "bridge",
+    timeout: float = 30.0,
+) -> bool:
+    """Create a bridge network with labels and an optional fixed subnet.
+
+    Idempotent: an existing network with the same name counts as success.
+
+    SECURITY: shell=False is always used; name/subnet/labels are server-derived.
+
+    Args:
+        network_name: Network name (must start with octolab_)
+        subnet: CIDR to reserve for the network (None = daemon address pool)
+        labels: Labels to attach
+        driver: Network driver
+        timeout: Timeout in seconds
+
+    Returns:
+        True if the network exists after the call
+    """
+    if not network_name.startswith(OCTOLAB_NETWORK_PREFIX):
+        logger.warning(f"Refusing to create non-octolab network: {network_name}")
+        return False
+
+    engine = get_engine_client()
+    if engine is not None:
+        try:
+            engine.create_network(
+                network_name, driver=driver, subnet=subnet, labels=labels, timeout=timeout
+            )
+            logger.debug(f"Created network {network_name}")
+            return True
+        except DockerEngineError as e:
+            if e.status_code == 409 or "already exists" in e.message.lower():
+                return True
+            if e.status_code is not None:
+                logger.warning(f"Failed to create network {network_name}: {e.message[:100]}")
+                return False
+            # Transport failure: fall through to CLI
+
+    cmd = ["docker", "network", "create", "--driver", driver]
+    if subnet:
+        cmd.extend(["--subnet", subnet])
+    for key, value in (labels or {}).items():
+        cmd.extend(["--label", f"{key}={value}"])
+    cmd.append(network_name)
+
+    try:
+        result = _run_docker(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            shell=False,
+        )
+
+        if result.returncode == 0:
+            logger.debug(f"Created network {network_name}")
+            return True
+
+        if "already exists" in result.stderr.lower():
+            return True
+
+        logger.warning(f"Failed to create network {network_name}: {result.stderr.strip()[:100]}")
+        return False
+
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Timeout creating network {network_name}")
+        return False
+    except Exception as e:
+        logger.warning(f"Error creating network {network_name}: {type(e).__name__}")
+        return False
+
+
 def disconnect_container(
     network_name: str,
     container_name: str,
@@ -1014,13 +1317,19 @@ def disconnect_container(
     Returns:
         True if disconnected or already disconnected
     """
+    engine_result = _engine_disconnect(
+        network_name, container_name, force=force, timeout=timeout
+    )
+    if engine_result is not None:
+        return engine_result
+
     cmd = ["docker", "network", "disconnect"]
     if force:
         cmd.append("--force")
     cmd.extend([network_name, container_name])
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -1061,10 +1370,14 @@ def _try_remove_network_silent(network_name: str) -> bool:
     Returns:
         True if removed, False if in-use/race/error (silent)
     """
+    engine_result = _engine_remove_network(network_name, _get_network_timeout())
+    if engine_result is not None:
+        return engine_result in (NetworkRemoveResult.OK, NetworkRemoveResult.NOT_FOUND)
+
     cmd = ["docker", "network", "rm", network_name]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -1188,12 +1501,24 @@ def _resolve_container_names(container_ids: list[str], timeout: float = 5.0) ->
     if not container_ids:
         return {}
 
+    # Engine API: one request for all IDs instead of one process per ID
+    ok, containers = try_engine(
+        lambda c: c.list_containers(all=True, filters={"id": list(container_ids)}, timeout=timeout)
+    )
+    if ok:
+        names_by_id = {ctr.id: ctr.name for ctr in containers}
+        resolved = {}
+        for cid in container_ids:
+            match = next((name for full_id, name in names_by_id.items() if full_id.startswith(cid)), None)
+            resolved[cid] = match or cid[:12]
+        return resolved
+
     result = {}
     for cid in container_ids[:10]:  # Limit to 10 to avoid slowdown
         short_id = cid[:12]
         cmd = ["docker", "ps", "-a", "--filter", f"id={cid}", "--format", "{{.Names}}"]
         try:
-            proc = subprocess.run(
+            proc = _run_docker(
                 cmd,
                 capture_output=True,
                 text=True,
@@ -1424,9 +1749,16 @@ def preflight_cleanup_stale_lab_networks(*, dry_run: bool = False) -> NetworkCle
         logger.debug("No stale per-lab networks found")
         return result
 
+    # Attachment check is in-memory when the inventory is current; removal
+    # itself is still safe against races (the daemon refuses in-use networks)
+    inventory = get_ready_inventory()
+
     # For each lab network, check if empty and remove
     for net in lab_networks:
-        containers = inspect_network_containers(net.name)
+        if inventory is not None:
+            containers = inventory.network_attachments(net.name)
+        else:
+            containers = inspect_network_containers(net.name)
 
         if containers:
             # Has containers - skip silently (this is expected for active labs)
@@ -1506,22 +1838,32 @@ def get_network_counts(timeout: float = 10.0) -> NetworkCountInfo:
     """
     result = NetworkCountInfo()
 
+    inventory = get_ready_inventory()
+    if inventory is not None:
+        ok, engine_networks = True, inventory.networks()
+    else:
+        ok, engine_networks = try_engine(lambda c: c.list_networks(timeout=timeout))
+
     try:
-        # Get all network names
-        cmd = ["docker", "network", "ls", "--format", "{{.Name}}"]
-        proc_result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            shell=False,
-        )
+        if ok:
+            lines = [n.name for n in engine_networks if n.name]
+        else:
+            # Get all network names
+            cmd = ["docker", "network", "ls", "--format", "{{.Name}}"]
+            proc_result = _run_docker(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                shell=False,
+            )
 
-        if proc_result.returncode != 0:
-            return result
+            if proc_result.returncode != 0:
+                return result
+
+            lines = [l.strip() for l in proc_result.stdout.strip().split("\n") if l.strip()]
 
         # Count networks
-        lines = [l.strip() for l in proc_result.stdout.strip().split("\n") if l.strip()]
         result.total_count = len(lines)
 
         # Count octolab_ prefixed networks
@@ -1642,7 +1984,7 @@ def targeted_network_cleanup(
             "rm", "-sfv",
         ]
         try:
-            subprocess.run(
+            _run_docker(
                 cmd,
                 capture_output=True,
                 text=True,
@@ -1759,7 +2101,7 @@ def list_running_octolab_containers(timeout: float = 10.0) -> list[str]:
     cmd = ["docker", "ps", "--format", "{{.Names}}"]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -1808,6 +2150,12 @@ def get_running_container_status(timeout: float = 10.0) -> ContainerStatusInfo:
     """
     result = ContainerStatusInfo()
 
+    inventory = get_ready_inventory()
+    if inventory is not None:
+        ok, engine_containers = True, inventory.containers(running_only=True)
+    else:
+        ok, engine_containers = try_engine(lambda c: c.list_containers(timeout=timeout))
+
     # Get all running containers with name and compose project label
     cmd = [
         "docker", "ps",
@@ -1815,30 +2163,36 @@ def get_running_container_status(timeout: float = 10.0) -> ContainerStatusInfo:
     ]
 
     try:
-        proc_result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            shell=False,
-        )
-
-        if proc_result.returncode != 0:
-            logger.debug(f"Failed to list containers: {proc_result.stderr.strip()[:100]}")
-            return result
+        if ok:
+            rows = [(ctr.name, ctr.project) for ctr in engine_containers]
+        else:
+            proc_result = _run_docker(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                shell=False,
+            )
 
-        # Parse output and partition by lab project pattern
-        lab_projects = set()
+            if proc_result.returncode != 0:
+                logger.debug(f"Failed to list containers: {proc_result.stderr.strip()[:100]}")
+                return result
 
-        for line in proc_result.stdout.strip().split("\n"):
-            if not line.strip():
-                continue
+            rows = []
+            for line in proc_result.stdout.strip().split("\n"):
+                if not line.strip():
+                    continue
+                # Split by tab (format: name\tproject)
+                parts = line.split("\t")
+                rows.append((
+                    parts[0].strip() if parts else "",
+                    parts[1].strip() if len(parts) > 1 else "",
+                ))
 
-            # Split by tab (format: name\tproject)
-            parts = line.split("\t")
-            name = parts[0].strip() if parts else ""
-            project = parts[1].strip() if len(parts) > 1 else ""
+        # Partition by lab project pattern
+        lab_projects = set()
 
+        for name, project in rows:
             if not name:
                 continue
 
@@ -1900,13 +2254,20 @@ def list_stopped_octolab_containers(timeout: float = 10.0) -> list[str]:
     Returns:
         List of stopped container names starting with octolab_
     """
+    ok, engine_containers = try_engine(lambda c: c.list_containers(all=True, timeout=timeout))
+    if ok:
+        return sorted(
+            ctr.name for ctr in engine_containers
+            if not ctr.running and ctr.name.startswith(OCTOLAB_NETWORK_PREFIX)
+        )
+
     # List all containers (including stopped)
     cmd_all = ["docker", "ps", "-a", "--format", "{{.Names}}"]
     # List running containers
     cmd_running = ["docker", "ps", "--format", "{{.Names}}"]
 
     try:
-        result_all = subprocess.run(
+        result_all = _run_docker(
             cmd_all,
             capture_output=True,
             text=True,
@@ -1914,7 +2275,7 @@ def list_stopped_octolab_containers(timeout: float = 10.0) -> list[str]:
             shell=False,
         )
 
-        result_running = subprocess.run(
+        result_running = _run_docker(
             cmd_running,
             capture_output=True,
             text=True,
@@ -1970,10 +2331,24 @@ def remove_container(container_name: str, timeout: float = 30.0) -> bool:
         logger.warning(f"Refusing to remove non-octolab container: {container_name}")
         return False
 
+    engine = get_engine_client()
+    if engine is not None:
+        try:
+            engine.remove_container(container_name, force=True, timeout=timeout)
+            logger.debug(f"Removed container {container_name}")
+            return True
+        except DockerEngineError as e:
+            if e.status_code == 404:
+                return True
+            if e.status_code is not None:
+                logger.debug(f"Failed to remove container {container_name}: {e.message[:100]}")
+                return False
+            # Transport failure: fall through to CLI
+
     cmd = ["docker", "rm", "-f", container_name]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2014,10 +2389,20 @@ def list_all_octolab_networks(timeout: float = 10.0) -> list[str]:
     Returns:
         List of network names matching octolab_<uuid>_(lab_net|egress_net) pattern
     """
+    inventory = get_ready_inventory()
+    if inventory is not None:
+        return [n.name for n in inventory.networks() if is_octolab_lab_network(n.name)]
+
+    ok, engine_networks = try_engine(
+        lambda c: c.list_networks(filters={"name": [OCTOLAB_NETWORK_PREFIX]}, timeout=timeout)
+    )
+    if ok:
+        return [n.name for n in engine_networks if is_octolab_lab_network(n.name)]
+
     cmd = ["docker", "network", "ls", "--format", "{{.Name}}"]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2194,13 +2579,33 @@ def scan_running_lab_projects(timeout: float = 10.0) -> dict[str, list[str]]:
     Returns:
         Dict mapping project name to list of container names
     """
+    inventory = get_ready_inventory()
+    if inventory is not None:
+        return {
+            project: [c.name for c in containers if c.name]
+            for project, containers in inventory.running_by_project().items()
+            if is_lab_project(project)
+        }
+
+    ok, engine_containers = try_engine(
+        lambda c: c.list_containers(
+            filters={"label": ["com.docker.compose.project"]}, timeout=timeout
+        )
+    )
+    if ok:
+        engine_projects: dict[str, list[str]] = {}
+        for ctr in engine_containers:
+            if ctr.name and is_lab_project(ctr.project):
+                engine_projects.setdefault(ctr.project, []).append(ctr.name)
+        return engine_projects
+
     cmd = [
         "docker", "ps",
         "--format", "{{.Names}}\t{{.Label \"com.docker.compose.project\"}}"
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2281,7 +2686,7 @@ def stop_lab_project(
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2366,8 +2771,9 @@ def stop_lab_projects_batch(
     compose_dir: str,
     compose_file: str,
     timeout_per_project: float = 120.0,
+    max_parallel: int | None = None,
 ) -> StopLabsResult:
-    """Stop multiple lab projects in batch.
+    """Stop multiple lab projects in batch, up to max_parallel at a time.
 
     SECURITY:
     - All projects must be server-derived (from runtime scan)
@@ -2380,35 +2786,44 @@ def stop_lab_projects_batch(
         compose_dir: Directory containing compose file
         compose_file: Path to compose file
         timeout_per_project: Timeout per project for compose down
+        max_parallel: Concurrent project cap (default: settings)
 
     Returns:
         StopLabsResult with counts
     """
     result = StopLabsResult(targets=len(projects))
 
+    valid: list[str] = []
     for project in projects:
         # Verify each project matches lab pattern (defense-in-depth)
         if not is_lab_project(project):
             result.projects_failed += 1
             result.errors.append(f"Invalid project: {project}")
             continue
+        valid.append(project)
 
-        # Stop the project
+    def _stop_and_clean(project: str) -> tuple[bool, list[str], int, int]:
         success, errors = stop_lab_project(
             project,
             compose_dir,
             compose_file,
             timeout_per_project,
         )
+        # Clean up networks for this project
+        net_removed, net_failed = cleanup_project_networks(project)
+        return success, errors, net_removed, net_failed
+
+    parallel = _batch_parallelism(max_parallel, len(valid))
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="stop-labs") as pool:
+        outcomes = list(pool.map(_stop_and_clean, valid))
 
+    for success, errors, net_removed, net_failed in outcomes:
         if success:
             result.projects_stopped += 1
         else:
             result.projects_failed += 1
             result.errors.extend(errors)
 
-        # Clean up networks for this project
-        net_removed, net_failed = cleanup_project_networks(project)
         result.networks_removed += net_removed
         result.networks_failed += net_failed
 
@@ -2464,13 +2879,21 @@ def list_running_container_ids_for_project(
         logger.debug(f"Refusing to list containers for non-lab project: {project}")
         return []
 
+    ok, engine_containers = try_engine(
+        lambda c: c.list_containers(
+            filters={"label": [f"com.docker.compose.project={project}"]}, timeout=timeout
+        )
+    )
+    if ok:
+        return [ctr.id[:12] for ctr in engine_containers]
+
     cmd = [
         "docker", "ps", "-q",
         "--filter", f"label=com.docker.compose.project={project}",
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2514,6 +2937,14 @@ def list_running_container_names_for_project(
         logger.debug(f"Refusing to list containers for non-lab project: {project}")
         return []
 
+    ok, engine_containers = try_engine(
+        lambda c: c.list_containers(
+            filters={"label": [f"com.docker.compose.project={project}"]}, timeout=timeout
+        )
+    )
+    if ok:
+        return [ctr.name for ctr in engine_containers if ctr.name]
+
     cmd = [
         "docker", "ps",
         "--format", "{{.Names}}",
@@ -2521,7 +2952,7 @@ def list_running_container_names_for_project(
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2565,10 +2996,27 @@ def force_remove_containers(
     if not container_ids:
         return 0, None
 
+    engine = get_engine_client()
+    if engine is not None:
+        errors: list[str] = []
+        try:
+            for cid in container_ids:
+                try:
+                    engine.remove_container(cid, force=True, timeout=timeout)
+                except DockerEngineError as e:
+                    if e.status_code is None:
+                        raise
+                    if e.status_code != 404:
+                        errors.append(e.message)
+            return (1, _sanitize_stderr("\n".join(errors))) if errors else (0, None)
+        except DockerEngineError:
+            # Transport failure mid-way: the CLI retry is idempotent (rm -f)
+            pass
+
     cmd = ["docker", "rm", "-f", *container_ids]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2624,11 +3072,20 @@ def list_project_networks_robust(
     if not lab_id:
         return []
 
+    ok, engine_networks = try_engine(
+        lambda c: c.list_networks(filters={"name": [lab_id]}, timeout=timeout)
+    )
+    if ok:
+        return [
+            n.name for n in engine_networks
+            if n.name.startswith(OCTOLAB_NETWORK_PREFIX) and is_octolab_lab_network(n.name)
+        ][:50]
+
     # List all networks and filter by pattern
     cmd = ["docker", "network", "ls", "--format", "{{.Name}}"]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -2698,6 +3155,238 @@ def remove_detached_network(
     return rm_result in (NetworkRemoveResult.OK, NetworkRemoveResult.NOT_FOUND)
 
 
+# =============================================================================
+# Batch Helpers (one docker round-trip for many projects)
+# =============================================================================
+
+
+def _batch_parallelism(max_parallel: int | None, count: int) -> int:
+    """Resolve the concurrency cap for a batch of `count` projects."""
+    cap = max_parallel if max_parallel is not None else settings.teardown_batch_max_parallel
+    return max(1, min(cap, count or 1))
+
+
+def _elapsed_ms(start: float) -> int:
+    return int((time.monotonic() - start) * 1000)
+
+
+def _record_phase(
+    results: dict[str, "ProjectStopResult"],
+    projects: list[str],
+    phase: str,
+    start: float,
+) -> None:
+    """Record a shared batch phase duration on each participating project."""
+    elapsed = _elapsed_ms(start)
+    for project in projects:
+        results[project].timings_ms[phase] = elapsed
+
+
+def _running_container_ids_by_project(
+    projects: list[str],
+    timeout: float = 10.0,
+) -> dict[str, list[str]]:
+    """List running container IDs for several compose projects in one call.
+
+    SECURITY:
+    - projects must be server-derived
+    - shell=False is always used
+
+    Returns:
+        Dict mapping project -> short container IDs (projects with none omitted;
+        {} on error, matching list_running_container_ids_for_project)
+    """
+    wanted = {p for p in projects if is_lab_project(p)}
+    if not wanted:
+        return {}
+
+    grouped: dict[str, list[str]] = {}
+
+    ok, engine_containers = try_engine(
+        lambda c: c.list_containers(
+            filters={"label": ["com.docker.compose.project"]}, timeout=timeout
+        )
+    )
+    if ok:
+        for ctr in engine_containers:
+            if ctr.project in wanted:
+                grouped.setdefault(ctr.project, []).append(ctr.id[:12])
+        return grouped
+
+    cmd = [
+        "docker", "ps",
+        "--filter", "label=com.docker.compose.project",
+        "--format", "{{.ID}}\t{{.Label \"com.docker.compose.project\"}}",
+    ]
+
+    try:
+        result = _run_docker(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            shell=False,
+        )
+
+        if result.returncode != 0:
+            logger.debug(f"Failed to list running containers: {result.stderr.strip()[:100]}")
+            return {}
+
+        for line in result.stdout.strip().split("\n"):
+            parts = line.split("\t")
+            if len(parts) < 2:
+                continue
+            cid, project = parts[0].strip(), parts[1].strip()
+            if cid and project in wanted:
+                grouped.setdefault(project, []).append(cid)
+        return grouped
+
+    except subprocess.TimeoutExpired:
+        logger.debug("Timeout listing running containers for batch")
+        return {}
+    except Exception as e:
+        logger.debug(f"Error listing running containers for batch: {type(e).__name__}")
+        return {}
+
+
+def _project_networks_by_project(
+    projects: list[str],
+    timeout: float = 10.0,
+) -> dict[str, list[str]]:
+    """Discover networks for several compose projects in one listing.
+
+    Same rules as list_project_networks_robust: label-based first, then a
+    name-based fallback (octolab_<uuid>_* containing the lab UUID) for
+    projects with no labelled networks. Capped to 50 per project.
+    """
+    rows: list[tuple[str, str]] = []
+
+    ok, engine_networks = try_engine(
+        lambda c: c.list_networks(filters={"name": [OCTOLAB_NETWORK_PREFIX]}, timeout=timeout)
+    )
+    if ok:
+        rows = [(n.name, n.labels.get("com.docker.compose.project", "")) for n in engine_networks]
+    else:
+        cmd = [
+            "docker", "network", "ls",
+            "--format", "{{.Name}}\t{{.Label \"com.docker.compose.project\"}}",
+        ]
+        try:
+            result = _run_docker(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                shell=False,
+            )
+            if result.returncode != 0:
+                return {}
+            for line in result.stdout.strip().split("\n"):
+                parts = line.split("\t")
+                name = parts[0].strip() if parts else ""
+                if name:
+                    rows.append((name, parts[1].strip() if len(parts) > 1 else ""))
+        except subprocess.TimeoutExpired:
+            logger.debug("Timeout listing networks for batch")
+            return {}
+        except Exception as e:
+            logger.debug(f"Error listing networks for batch: {type(e).__name__}")
+            return {}
+
+    grouped: dict[str, list[str]] = {}
+    for project in projects:
+        if not is_lab_project(project):
+            continue
+        labelled = [
+            name for name, label in rows
+            if label == project and name.startswith(OCTOLAB_NETWORK_PREFIX)
+        ]
+        if not labelled:
+            lab_id = extract_lab_id_from_project(project)
+            labelled = [
+                name for name, _ in rows
+                if lab_id and lab_id in name
+                and name.startswith(OCTOLAB_NETWORK_PREFIX)
+                and is_octolab_lab_network(name)
+            ]
+        if labelled:
+            grouped[project] = labelled[:50]
+    return grouped
+
+
+def _remove_networks_bulk(network_names: list[str], timeout: float = 30.0) -> set[str]:
+    """Remove many networks with as few docker calls as possible.
+
+    The daemon refuses to remove networks that still have endpoints, so this
+    never detaches anything; in-use networks are simply reported as not removed.
+
+    SECURITY:
+    - Only octolab_ prefixed names are touched
+    - shell=False is always used
+
+    Returns:
+        Set of names that were removed or were already gone
+    """
+    pending = [n for n in network_names if n.startswith(OCTOLAB_NETWORK_PREFIX)]
+    removed: set[str] = set()
+    if not pending:
+        return removed
+
+    # Engine API: one pooled request per network, no process spawn
+    if get_engine_client() is not None:
+        unreachable: list[str] = []
+        for name in pending:
+            outcome = _engine_remove_network(name, timeout)
+            if outcome is None:
+                unreachable.append(name)
+            elif outcome in (NetworkRemoveResult.OK, NetworkRemoveResult.NOT_FOUND):
+                removed.add(name)
+        pending = unreachable
+        if not pending:
+            return removed
+
+    # CLI: docker network rm accepts many names; verify by listing afterwards
+    for i in range(0, len(pending), 50):
+        chunk = pending[i:i + 50]
+        try:
+            result = _run_docker(
+                ["docker", "network", "rm", *chunk],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                shell=False,
+            )
+        except subprocess.TimeoutExpired:
+            logger.debug(f"Timeout removing {len(chunk)} networks")
+            continue
+        except Exception as e:
+            logger.debug(f"Error removing networks: {type(e).__name__}")
+            continue
+
+        if result.returncode == 0:
+            removed.update(chunk)
+            continue
+
+        # Partial failure: whatever no longer exists was removed (or already gone)
+        try:
+            listing = _run_docker(
+                ["docker", "network", "ls", "--format", "{{.Name}}"],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                shell=False,
+            )
+        except Exception as e:
+            logger.debug(f"Error verifying network removal: {type(e).__name__}")
+            continue
+        if listing.returncode != 0:
+            continue
+        existing = {line.strip() for line in listing.stdout.split("\n") if line.strip()}
+        removed.update(name for name in chunk if name not in existing)
+
+    return removed
+
+
 # =============================================================================
 # State-Driven Stop with Verification
 # =============================================================================
@@ -2722,6 +3411,8 @@ class ProjectStopResult:
     networks_failed: int = 0
     verified_stopped: bool = False  # True only if remaining_final == 0
     error: str | None = None
+    # Phase -> milliseconds (batch phases shared across projects report the phase time)
+    timings_ms: dict[str, int] = field(default_factory=dict)
 
 
 @dataclass
@@ -2739,6 +3430,48 @@ class VerifiedStopLabsResult:
     networks_failed: int = 0
     errors: list[str] = field(default_factory=list)
     results: list[ProjectStopResult] = field(default_factory=list)
+    max_parallel: int = 1  # compose down concurrency used
+    elapsed_ms: int = 0
+
+
+def _compose_down_project(
+    project: str,
+    compose_dir: str,
+    compose_file: str,
+    timeout: float,
+) -> tuple[int, str | None]:
+    """Run compose down --remove-orphans for one project (best effort).
+
+    Returns:
+        Tuple of (return_code, sanitized_stderr_excerpt_or_none); -1 on timeout/error
+    """
+    cmd = [
+        "docker", "compose",
+        "--project-directory", compose_dir,
+        "-f", compose_file,
+        "-p", project,
+        "down", "--remove-orphans",
+    ]
+
+    try:
+        proc_result = _run_docker(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=compose_dir,
+            shell=False,
+        )
+        if proc_result.returncode != 0:
+            logger.debug(f"compose down for {project} rc={proc_result.returncode}")
+            return proc_result.returncode, _sanitize_stderr(proc_result.stderr)
+        return 0, None
+    except subprocess.TimeoutExpired:
+        logger.debug(f"compose down for {project} timed out")
+        return -1, "timeout"
+    except Exception as e:
+        logger.debug(f"compose down for {project} failed: {type(e).__name__}")
+        return -1, f"error: {type(e).__name__}"
 
 
 def stop_project_verified(
@@ -2794,35 +3527,9 @@ def stop_project_verified(
         return result
 
     # Step 1: Attempt compose down (best effort)
-    cmd = [
-        "docker", "compose",
-        "--project-directory", compose_dir,
-        "-f", compose_file,
-        "-p", project,
-        "down", "--remove-orphans",
-    ]
-
-    try:
-        proc_result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=compose_dir,
-            shell=False,
-        )
-        result.down_rc = proc_result.returncode
-        if proc_result.returncode != 0:
-            result.down_stderr = _sanitize_stderr(proc_result.stderr)
-            logger.debug(f"compose down for {project} rc={proc_result.returncode}")
-    except subprocess.TimeoutExpired:
-        result.down_rc = -1
-        result.down_stderr = "timeout"
-        logger.debug(f"compose down for {project} timed out")
-    except Exception as e:
-        result.down_rc = -1
-        result.down_stderr = f"error: {type(e).__name__}"
-        logger.debug(f"compose down for {project} failed: {type(e).__name__}")
+    result.down_rc, result.down_stderr = _compose_down_project(
+        project, compose_dir, compose_file, timeout
+    )
 
     # Step 2: Verify - count remaining containers after compose down
     ids_after_down = list_running_container_ids_for_project(project, timeout=10.0)
@@ -2923,6 +3630,29 @@ def inspect_container_state(
     Returns:
         AttachedContainerInfo or None on error
     """
+    ok, data = try_engine(lambda c: c.inspect_container(container_id, timeout=timeout))
+    if ok:
+        if not data:
+            return None
+        state_obj = data.get("State") or {}
+        status = (state_obj.get("Status") or "").lower()
+        project = ((data.get("Config") or {}).get("Labels") or {}).get(
+            "com.docker.compose.project"
+        ) or None
+        if state_obj.get("Running"):
+            state = "running"
+        elif status == "exited":
+            state = "exited"
+        else:
+            state = "unknown"
+        return AttachedContainerInfo(
+            container_id=container_id,
+            name=(data.get("Name") or "").lstrip("/"),
+            state=state,
+            project=project,
+            is_lab=is_lab_project(project) if project else False,
+        )
+
     # Use docker inspect with multiple format fields
     cmd = [
         "docker", "inspect",
@@ -2932,7 +3662,7 @@ def inspect_container_state(
     ]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -3041,6 +3771,57 @@ def inspect_network_leak(
     return result
 
 
+def _network_leak_from_inventory(
+    inventory: DockerInventory,
+    network_name: str,
+    max_sample: int = 5,
+) -> NetworkLeakInfo:
+    """Build NetworkLeakInfo from the event-driven inventory (no docker calls).
+
+    Unlike inspect_network_leak, counts cover every attached container rather
+    than just the sampled ones, since the data is already in memory.
+    """
+    attached = inventory.network_attachments(network_name)
+    result = NetworkLeakInfo(
+        network=network_name,
+        attached_containers=len(attached),
+        attached_running=0,
+        attached_exited=0,
+        lab_attached=0,
+        nonlab_attached=0,
+        blocked_by_nonlab=False,
+        sample=[],
+    )
+
+    for container in attached:
+        if container.running:
+            state = "running"
+            result.attached_running += 1
+        elif container.state == "exited":
+            state = "exited"
+            result.attached_exited += 1
+        else:
+            state = "unknown"
+
+        is_lab = is_lab_project(container.project) if container.project else False
+        if is_lab:
+            result.lab_attached += 1
+        else:
+            result.nonlab_attached += 1
+
+        if len(result.sample) < max_sample:
+            result.sample.append(AttachedContainerInfo(
+                container_id=container.id[:12],
+                name=container.name,
+                state=state,
+                project=container.project or None,
+                is_lab=is_lab,
+            ))
+
+    result.blocked_by_nonlab = result.nonlab_attached > 0
+    return result
+
+
 def scan_network_leaks(
     limit: int = 50,
     timeout: float = 30.0,
@@ -3080,11 +3861,16 @@ def scan_network_leaks(
     # Cap to 200 for safety
     networks = networks[:200]
 
-    # Inspect each network
+    # Inventory answers attachments in memory; otherwise inspect each network
+    inventory = get_ready_inventory()
+
     in_use_networks: list[NetworkLeakInfo] = []
 
     for net_name in networks:
-        info = inspect_network_leak(net_name, max_sample=5, timeout=10.0)
+        if inventory is not None:
+            info = _network_leak_from_inventory(inventory, net_name, max_sample=5)
+        else:
+            info = inspect_network_leak(net_name, max_sample=5, timeout=10.0)
 
         if info is None:
             continue
@@ -3172,7 +3958,7 @@ def remove_lab_containers_by_id(
     cmd = ["docker", "rm", *container_ids]
 
     try:
-        result = subprocess.run(
+        result = _run_docker(
             cmd,
             capture_output=True,
             text=True,
@@ -3391,10 +4177,20 @@ def stop_projects_verified_batch(
     compose_dir: str,
     compose_file: str,
     timeout_per_project: float = 120.0,
+    max_parallel: int | None = None,
 ) -> VerifiedStopLabsResult:
     """Stop multiple lab projects with full state verification.
 
-    Each project goes through verify->act->verify pattern.
+    Runs the same verify->act->verify pattern as stop_project_verified, but
+    as batch phases so the per-project docker round-trips do not add up:
+
+    1. Pre-check: one container listing for all projects
+    2. Act: compose down, up to max_parallel projects at a time
+    3. Verify: one container listing for all projects
+    4. Fallback: one bulk rm -f for every container still running
+    5. Final verify: one container listing for all projects
+    6. Cleanup: one network listing and bulk removal, only for projects
+       verified stopped
 
     SECURITY:
     - All projects must be server-derived (from runtime scan)
@@ -3405,21 +4201,106 @@ def stop_projects_verified_batch(
         projects: List of project names to stop
         compose_dir: Directory containing compose file
         compose_file: Path to compose file
-        timeout_per_project: Timeout per project
+        timeout_per_project: Timeout for each compose down
+        max_parallel: Concurrent compose down cap (default: settings)
 
     Returns:
         VerifiedStopLabsResult with verified counts and per-project results
     """
-    result = VerifiedStopLabsResult(targets=len(projects))
+    batch_start = time.monotonic()
+    parallel = _batch_parallelism(max_parallel, len(projects))
+    result = VerifiedStopLabsResult(targets=len(projects), max_parallel=parallel)
 
+    by_project: dict[str, ProjectStopResult] = {}
+    valid: list[str] = []
     for project in projects:
-        proj_result = stop_project_verified(
-            project,
-            compose_dir,
-            compose_file,
-            timeout_per_project,
-        )
+        proj_result = ProjectStopResult(project=project)
+        by_project[project] = proj_result
+        if is_lab_project(project):
+            valid.append(project)
+        else:
+            proj_result.error = f"Invalid project name: {project}"
+
+    # Phase 0: Pre-check
+    phase_start = time.monotonic()
+    running = _running_container_ids_by_project(valid)
+    _record_phase(by_project, valid, "pre_check", phase_start)
+    for project in valid:
+        by_project[project].pre_running = len(running.get(project, []))
+    to_stop = [p for p in valid if by_project[p].pre_running > 0]
+
+    # Phase 1: compose down with bounded concurrency
+    if to_stop:
+        def _down(project: str) -> None:
+            down_start = time.monotonic()
+            proj_result = by_project[project]
+            proj_result.down_rc, proj_result.down_stderr = _compose_down_project(
+                project, compose_dir, compose_file, timeout_per_project
+            )
+            proj_result.timings_ms["down"] = _elapsed_ms(down_start)
+
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="stop-labs") as pool:
+            list(pool.map(_down, to_stop))
+
+        # Phase 2: Verify after compose down
+        phase_start = time.monotonic()
+        remaining = _running_container_ids_by_project(to_stop)
+        _record_phase(by_project, to_stop, "verify_down", phase_start)
+        for project in to_stop:
+            by_project[project].remaining_after_down = len(remaining.get(project, []))
+
+        # Phase 3: Bulk force remove leftovers across all projects
+        leftover = [p for p in to_stop if remaining.get(p)]
+        if leftover:
+            all_ids = [cid for p in leftover for cid in remaining[p]]
+            logger.info(
+                f"{len(leftover)} project(s) have {len(all_ids)} containers after compose down, using rm -f"
+            )
+            phase_start = time.monotonic()
+            rm_rc, rm_stderr = force_remove_containers(all_ids, timeout=30.0)
+            _record_phase(by_project, leftover, "force_rm", phase_start)
+            for project in leftover:
+                by_project[project].rm_rc = rm_rc
+                by_project[project].rm_stderr = rm_stderr
+
+        # Phase 4: Final verify
+        phase_start = time.monotonic()
+        final = _running_container_ids_by_project(to_stop)
+        _record_phase(by_project, to_stop, "verify_final", phase_start)
+        for project in to_stop:
+            by_project[project].remaining_final = len(final.get(project, []))
+
+    stopped: list[str] = []
+    for project in valid:
+        proj_result = by_project[project]
+        proj_result.verified_stopped = proj_result.remaining_final == 0
+        if proj_result.verified_stopped:
+            stopped.append(project)
+        else:
+            proj_result.error = (
+                f"Failed to stop: {proj_result.remaining_final} containers still running"
+            )
+            logger.warning(
+                f"Project {project} still has {proj_result.remaining_final} running containers after all attempts"
+            )
 
+    # Phase 5: Network cleanup, only for projects verified stopped
+    if stopped:
+        phase_start = time.monotonic()
+        networks = _project_networks_by_project(stopped)
+        removed = _remove_networks_bulk([n for p in stopped for n in networks.get(p, [])])
+        _record_phase(by_project, stopped, "networks", phase_start)
+        for project in stopped:
+            for net in networks.get(project, []):
+                if net in removed:
+                    by_project[project].networks_removed += 1
+                else:
+                    by_project[project].networks_failed += 1
+
+    # Aggregate in input order
+    for project in projects:
+        proj_result = by_project[project]
+        proj_result.timings_ms["total"] = sum(proj_result.timings_ms.values())
         result.results.append(proj_result)
 
         if proj_result.verified_stopped:
@@ -3431,7 +4312,6 @@ def stop_projects_verified_batch(
 
         # Count force-removed containers
         if proj_result.rm_rc is not None and proj_result.rm_rc == 0:
-            # Estimate force-removed count
             force_removed = proj_result.remaining_after_down - proj_result.remaining_final
             if force_removed > 0:
                 result.containers_force_removed += force_removed
@@ -3443,4 +4323,10 @@ def stop_projects_verified_batch(
     if len(result.errors) > 20:
         result.errors = result.errors[:20] + [f"... and {len(result.errors) - 20} more"]
 
+    result.elapsed_ms = _elapsed_ms(batch_start)
+    logger.info(
+        f"Verified stop of {len(projects)} project(s) finished in {result.elapsed_ms}ms "
+        f"(parallel={parallel}, stopped={result.projects_stopped}, failed={result.projects_failed})"
+    )
+
     return result
@@ -17,7 +17,6 @@ SECURITY INVARIANTS:
 
 from __future__ import annotations
 
-import asyncio
 import base64
 import hashlib
 import hmac
@@ -41,10 +40,8 @@ from app.utils.fs import (
     safe_mkdir,
     EvidenceTreeError,
 )
-from app.utils.safe_extract import (
-    UnsafeArchiveError,
-    safe_extract_tarfile_from_path,
-)
+from app.services.volume_reader import extract_volume_to_dir
+from app.utils.subprocess_utils import arun_cmd
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -54,6 +51,9 @@ logger = logging.getLogger(__name__)
 # Timeout for docker operations
 DOCKER_TIMEOUT = 30
 
+# Cap on captured `docker compose logs` output (per stream)
+COMPOSE_LOG_MAX_BYTES = 64 * 1024 * 1024
+
 
 class EvidenceSealError(Exception):
     """Raised when evidence sealing fails."""
@@ -209,71 +209,62 @@ async def export_compose_logs_to_auth_volume(
         compose_args.extend(["-f", str(compose_path)])
     compose_args.extend(["logs", "--no-color", "--timestamps"])
 
-    def _export_logs() -> bool:
-        try:
-            # Get logs from compose
-            result = subprocess.run(
-                compose_args,
-                capture_output=True,
-                text=True,
-                timeout=settings.evidence_export_timeout_seconds,
-                shell=False,
-            )
-            logs_content = result.stdout or ""
-            if result.stderr:
-                logs_content += f"\n--- STDERR ---\n{result.stderr}"
-
-            if not logs_content.strip():
-                logger.warning(f"No compose logs available for lab {lab.id}")
-                return False
-
-            # Create temp file with logs
-            with tempfile.NamedTemporaryFile(
-                mode="w",
-                suffix=".log",
-                delete=False,
-            ) as tmp:
-                tmp.write(logs_content)
-                tmp_path = tmp.name
-
-            try:
-                # Write to auth volume via helper container
-                # shell=False, explicit args
-                write_cmd = [
-                    "docker",
-                    "run",
-                    "--rm",
-                    "-v",
-                    f"{auth_vol}:/evidence/auth",
-                    "-v",
-                    f"{tmp_path}:/input.log:ro",
-                    "alpine",
-                    "sh",
-                    "-c",
-                    "mkdir -p /evidence/auth/logs && cp /input.log /evidence/auth/logs/compose.log",
-                ]
-                subprocess.run(
-                    write_cmd,
-                    check=True,
-                    capture_output=True,
-                    timeout=DOCKER_TIMEOUT,
-                    shell=False,
-                )
-                return True
-            finally:
-                os.unlink(tmp_path)
-
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Timeout exporting logs for lab {lab.id}")
-            return False
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to export logs for lab {lab.id}: {type(e).__name__}")
-            return False
-        except Exception as e:
-            logger.warning(f"Error exporting logs for lab {lab.id}: {type(e).__name__}")
+    try:
+        # Get logs from compose
+        result = await arun_cmd(
+            compose_args,
+            timeout=settings.evidence_export_timeout_seconds,
+            max_output_bytes=COMPOSE_LOG_MAX_BYTES,
+        )
+        logs_content = result.stdout or ""
+        if result.stderr:
+            logs_content += f"\n--- STDERR ---\n{result.stderr}"
+        if result.truncated:
+            logs_content += f"\n--- TRUNCATED at {COMPOSE_LOG_MAX_BYTES} bytes per stream ---\n"
+
+        if not logs_content.strip():
+            logger.warning(f"No compose logs available for lab {lab.id}")
             return False
 
-    return await asyncio.to_thread(_export_logs)
+        # Create temp file with logs
+        with tempfile.NamedTemporaryFile(
+            mode="w",
+            suffix=".log",
+            delete=False,
+        ) as tmp:
+            tmp.write(logs_content)
+            tmp_path = tmp.name
+
+        try:
+            # Write to auth volume via helper container
+            # exec without shell, explicit args
+            write_cmd = [
+                "docker",
+                "run",
+                "--rm",
+                "-v",
+                f"{auth_vol}:/evidence/auth",
+                "-v",
+                f"{tmp_path}:/input.log:ro",
+                "alpine",
+                "sh",
+                "-c",
+                "mkdir -p /evidence/auth/logs && cp /input.log /evidence/auth/logs/compose.log",
+            ]
+            await arun_cmd(write_cmd, check=True, timeout=DOCKER_TIMEOUT)
+            return True
+        finally:
+            os.unlink(tmp_path)
+
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Timeout exporting logs for lab {lab.id}")
+        return False
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Failed to export logs for lab {lab.id}: {type(e).__name__}")
+        return False
+    except Exception as e:
+        logger.warning(f"Error exporting logs for lab {lab.id}: {type(e).__name__}")
+        return False
 
 
 async def _extract_auth_volume_to_dir(
@@ -283,96 +274,23 @@ async def _extract_auth_volume_to_dir(
     """
     Extract authoritative evidence volume to local directory.
 
-    Uses tar streaming: container creates tar to stdout, host extracts with
-    correct ownership. This avoids root-owned files on the host.
+    Streams the volume through the volume reader straight into the
+    safe_extract validator (no helper container run, no spool file).
 
     SECURITY:
-    - Container runs as root to read volume files (may have various perms)
-    - Tar is streamed to host and extracted with safe_extract (host user ownership)
     - Does NOT preserve uid/gid from container (extracts as current user)
     - Sets secure permissions: directories 0o700, files 0o600
-    - Does not follow symlinks (rejects them during extraction)
+    - Regular files only: symlinks, hardlinks and devices are never followed
+      or extracted; path traversal aborts the volume
 
     Args:
         volume_name: Docker volume name
         dest_dir: Local destination directory
 
     Returns:
-        List of relative file paths extracted
+        List of relative file paths extracted (prefixed with "auth/")
     """
-    target_dir = dest_dir / "auth"
-    safe_mkdir(target_dir, mode=0o700)
-
-    # Create tar from volume contents and stream to stdout
-    # Container runs as root to read any files in the volume
-    # We extract on host side with correct user ownership
-    # BUG FIX: Previous implementation used bidirectional bind mount which
-    # created root-owned files on host. Now we use tar streaming.
-    cmd = [
-        "docker",
-        "run",
-        "--rm",
-        "-v",
-        f"{volume_name}:/src:ro",
-        "alpine",
-        "sh",
-        "-c",
-        # Create tar of regular files only (no symlinks, devices)
-        "cd /src && find . -type f -print0 | tar -cf - --null -T - 2>/dev/null || true",
-    ]
-
-    def _stream_tar() -> bytes | None:
-        """Run docker and capture tar stream."""
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                timeout=DOCKER_TIMEOUT * 2,  # Longer timeout for tar
-                shell=False,
-            )
-            # Return stdout (tar data) even if returncode is non-zero
-            return result.stdout if result.stdout else None
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Timeout extracting auth volume {volume_name}")
-            return None
-        except Exception as e:
-            logger.warning(f"Error extracting auth volume {volume_name}: {type(e).__name__}")
-            return None
-
-    tar_data = await asyncio.to_thread(_stream_tar)
-
-    if not tar_data:
-        # Empty volume or error - return empty list
-        return []
-
-    # Spool tar to disk
-    spool_path = dest_dir / "auth_raw.tar"
-    try:
-        spool_path.write_bytes(tar_data)
-
-        # Extract using safe_extract (ignores tar uid/gid, sets 0o600/0o700)
-        try:
-            extracted = safe_extract_tarfile_from_path(
-                spool_path,
-                target_dir,
-                max_total_bytes=500 * 1024 * 1024,  # 500MB
-                max_member_bytes=200 * 1024 * 1024,  # 200MB per file
-            )
-        except UnsafeArchiveError as e:
-            logger.warning(f"Unsafe content in auth volume {volume_name}: {e}")
-            return []
-        except Exception as e:
-            logger.warning(f"Error extracting tar from auth volume {volume_name}: {type(e).__name__}")
-            return []
-    finally:
-        # Clean up spool file
-        try:
-            spool_path.unlink()
-        except FileNotFoundError:
-            pass
-
-    # Return paths relative to dest_dir (include "auth/" prefix)
-    return [f"auth/{f}" for f in extracted]
+    return await extract_volume_to_dir(volume_name, dest_dir, "auth")
 
 
 async def seal_auth_evidence(
@@ -449,31 +367,22 @@ async def seal_auth_evidence(
         os.chmod(sig_path, 0o600)
 
         # Copy manifest and sig to auth volume via helper container
-        def _write_seal_files() -> None:
-            cmd = [
-                "docker",
-                "run",
-                "--rm",
-                "-v",
-                f"{auth_vol}:/evidence/auth",
-                "-v",
-                f"{manifest_path}:/manifest.json:ro",
-                "-v",
-                f"{sig_path}:/manifest.sig:ro",
-                "alpine",
-                "sh",
-                "-c",
-                "cp /manifest.json /evidence/auth/manifest.json && cp /manifest.sig /evidence/auth/manifest.sig",
-            ]
-            subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                timeout=DOCKER_TIMEOUT,
-                shell=False,
-            )
-
-        await asyncio.to_thread(_write_seal_files)
+        cmd = [
+            "docker",
+            "run",
+            "--rm",
+            "-v",
+            f"{auth_vol}:/evidence/auth",
+            "-v",
+            f"{manifest_path}:/manifest.json:ro",
+            "-v",
+            f"{sig_path}:/manifest.sig:ro",
+            "alpine",
+            "sh",
+            "-c",
+            "cp /manifest.json /evidence/auth/manifest.json && cp /manifest.sig /evidence/auth/manifest.sig",
+        ]
+        await arun_cmd(cmd, check=True, timeout=DOCKER_TIMEOUT)
 
         # Update lab model
         lab.evidence_seal_status = EvidenceSealStatus.SEALED.value
@@ -580,96 +489,23 @@ async def _extract_user_volume_to_dir(
     """
     Extract user evidence volume to local directory.
 
-    Uses tar streaming: container creates tar to stdout, host extracts with
-    correct ownership. This avoids root-owned files on the host.
+    Streams the volume through the volume reader straight into the
+    safe_extract validator (no helper container run, no spool file).
 
     SECURITY:
-    - Container runs as root to read volume files (may have various perms)
-    - Tar is streamed to host and extracted with safe_extract (host user ownership)
     - Does NOT preserve uid/gid from container (extracts as current user)
     - Sets secure permissions: directories 0o700, files 0o600
-    - Does not follow symlinks (rejects them during extraction)
+    - Regular files only: symlinks, hardlinks and devices are never followed
+      or extracted; path traversal aborts the volume
 
     Args:
         volume_name: Docker volume name
         dest_dir: Local destination directory
 
     Returns:
-        List of relative file paths extracted
+        List of relative file paths extracted (prefixed with "untrusted/")
     """
-    target_dir = dest_dir / "untrusted"
-    safe_mkdir(target_dir, mode=0o700)
-
-    # Create tar from volume contents and stream to stdout
-    # Container runs as root to read any files in the volume
-    # We extract on host side with correct user ownership
-    # BUG FIX: Previous implementation used bidirectional bind mount which
-    # created root-owned files on host. Now we use tar streaming.
-    cmd = [
-        "docker",
-        "run",
-        "--rm",
-        "-v",
-        f"{volume_name}:/src:ro",
-        "alpine",
-        "sh",
-        "-c",
-        # Create tar of regular files only (no symlinks, devices)
-        "cd /src && find . -type f -print0 | tar -cf - --null -T - 2>/dev/null || true",
-    ]
-
-    def _stream_tar() -> bytes | None:
-        """Run docker and capture tar stream."""
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                timeout=DOCKER_TIMEOUT * 2,  # Longer timeout for tar
-                shell=False,
-            )
-            # Return stdout (tar data) even if returncode is non-zero
-            return result.stdout if result.stdout else None
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Timeout extracting user volume {volume_name}")
-            return None
-        except Exception as e:
-            logger.warning(f"Error extracting user volume {volume_name}: {type(e).__name__}")
-            return None
-
-    tar_data = await asyncio.to_thread(_stream_tar)
-
-    if not tar_data:
-        # Empty volume or error - return empty list
-        return []
-
-    # Spool tar to disk
-    spool_path = dest_dir / "untrusted_raw.tar"
-    try:
-        spool_path.write_bytes(tar_data)
-
-        # Extract using safe_extract (ignores tar uid/gid, sets 0o600/0o700)
-        try:
-            extracted = safe_extract_tarfile_from_path(
-                spool_path,
-                target_dir,
-                max_total_bytes=500 * 1024 * 1024,  # 500MB
-                max_member_bytes=200 * 1024 * 1024,  # 200MB per file
-            )
-        except UnsafeArchiveError as e:
-            logger.warning(f"Unsafe content in user volume {volume_name}: {e}")
-            return []
-        except Exception as e:
-            logger.warning(f"Error extracting tar from user volume {volume_name}: {type(e).__name__}")
-            return []
-    finally:
-        # Clean up spool file
-        try:
-            spool_path.unlink()
-        except FileNotFoundError:
-            pass
-
-    # Return paths relative to dest_dir (include "untrusted/" prefix)
-    return [f"untrusted/{f}" for f in extracted]
+    return await extract_volume_to_dir(volume_name, dest_dir, "untrusted")
 
 
 async def build_verified_evidence_bundle(
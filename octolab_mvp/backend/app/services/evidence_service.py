@@ -17,7 +17,6 @@ SECURITY:
 
 from __future__ import annotations
 
-import asyncio
 import base64
 import hashlib
 import io
@@ -37,6 +36,7 @@ from uuid import UUID
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.lab import Lab
 from app.runtime import get_runtime
 from app.runtime.k8s_runtime import K8sLabRuntime
@@ -47,12 +47,16 @@ from app.utils.fs import (
     rmtree_hardened,
     safe_mkdir,
 )
+from app.utils.subprocess_utils import arun_cmd
 
 logger = logging.getLogger(__name__)
 
 # Timeout for docker commands (seconds)
 DOCKER_TIMEOUT = 30
 
+# In-memory evidence tar.gz streams are capped at the bundle size limit
+_EVIDENCE_TAR_MAX_BYTES = settings.max_evidence_zip_mb * 1024 * 1024
+
 
 class EvidenceNotFoundError(Exception):
     """Raised when evidence for a lab cannot be located."""
@@ -1048,20 +1052,10 @@ async def _build_lab_evidence_tar_k8s(lab: Lab) -> bytes:
         "jsonpath={.items[0].metadata.name}",
     ]
 
-    def _get_pod_name() -> str:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=30,
-        )
-        pod_name = result.stdout.strip()
-        if not pod_name:
-            raise EvidenceNotFoundError(f"No pod found for lab {lab.id} in namespace {ns_name}")
-        return pod_name
-
-    pod_name = await asyncio.to_thread(_get_pod_name)
+    result = await arun_cmd(cmd, check=True, timeout=30)
+    pod_name = result.stdout.strip()
+    if not pod_name:
+        raise EvidenceNotFoundError(f"No pod found for lab {lab.id} in namespace {ns_name}")
 
     # Stream tar from pod's /evidence directory
     tar_cmd = runtime._kubectl_base_args(ns_name) + [
@@ -1077,22 +1071,19 @@ async def _build_lab_evidence_tar_k8s(lab: Lab) -> bytes:
         ".",
     ]
 
-    def _stream_tar() -> bytes:
-        proc = subprocess.Popen(
-            tar_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+    result = await arun_cmd(
+        tar_cmd, timeout=60, text=False, max_output_bytes=_EVIDENCE_TAR_MAX_BYTES
+    )
+    if result.returncode != 0:
+        error_msg = result.stderr.decode(errors="replace") if result.stderr else "Unknown error"
+        logger.error("kubectl exec failed for lab %s: %s", lab.id, error_msg)
+        raise EvidenceNotFoundError(
+            f"Failed to stream evidence from pod {pod_name}: {error_msg}"
         )
-        stdout, stderr = proc.communicate(timeout=60)
-        if proc.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown error"
-            logger.error("kubectl exec failed for lab %s: %s", lab.id, error_msg)
-            raise EvidenceNotFoundError(
-                f"Failed to stream evidence from pod {pod_name}: {error_msg}"
-            )
-        return stdout
+    if result.truncated:
+        raise EvidenceNotFoundError(f"Evidence archive for lab {lab.id} exceeds size limit")
 
-    tar_bytes = await asyncio.to_thread(_stream_tar)
+    tar_bytes = result.stdout
     logger.info("Streamed evidence tar.gz from pod %s for lab %s", pod_name, lab.id)
     return tar_bytes
 
@@ -1135,13 +1126,8 @@ async def build_lab_network_evidence_tar(lab: Lab) -> bytes:
     ]
 
     try:
-        check_result = await asyncio.to_thread(
-            subprocess.run,
-            check_log_cmd,
-            check=False,  # Don't fail if file doesn't exist
-            capture_output=True,
-            text=True,
-        )
+        # Don't fail if file doesn't exist (check=False)
+        check_result = await arun_cmd(check_log_cmd, timeout=DOCKER_TIMEOUT)
         if check_result.returncode == 0 and check_result.stdout.strip():
             commands_log_sha256 = check_result.stdout.strip()
     except Exception as e:
@@ -1161,13 +1147,8 @@ async def build_lab_network_evidence_tar(lab: Lab) -> bytes:
     ]
 
     try:
-        check_result = await asyncio.to_thread(
-            subprocess.run,
-            check_time_cmd,
-            check=False,  # Don't fail if file doesn't exist
-            capture_output=True,
-            text=True,
-        )
+        # Don't fail if file doesn't exist (check=False)
+        check_result = await arun_cmd(check_time_cmd, timeout=DOCKER_TIMEOUT)
         if check_result.returncode == 0 and check_result.stdout.strip():
             commands_timing_sha256 = check_result.stdout.strip()
     except Exception as e:
@@ -1211,16 +1192,19 @@ async def build_lab_network_evidence_tar(lab: Lab) -> bytes:
     ]
 
     try:
-        result = await asyncio.to_thread(
-            subprocess.run,
+        result = await arun_cmd(
             cmd,
             check=True,
-            capture_output=True,
+            timeout=DOCKER_TIMEOUT * 2,
+            text=False,
+            max_output_bytes=_EVIDENCE_TAR_MAX_BYTES,
         )
     except subprocess.CalledProcessError as exc:  # pragma: no cover - CLI failure
         raise EvidenceNotFoundError(
             f"Unable to collect evidence for lab {lab.id}"
         ) from exc
+    if result.truncated:
+        raise EvidenceNotFoundError(f"Evidence archive for lab {lab.id} exceeds size limit")
 
     return result.stdout
 
@@ -1243,12 +1227,7 @@ async def purge_lab_evidence(lab: Lab) -> None:
     for volume_name in volumes_to_remove:
         cmd = ["docker", "volume", "rm", volume_name]
         try:
-            await asyncio.to_thread(
-                subprocess.run,
-                cmd,
-                check=True,
-                capture_output=True,
-            )
+            await arun_cmd(cmd, check=True, timeout=DOCKER_TIMEOUT)
             logger.info("Removed evidence volume %s for lab %s", volume_name, lab.id)
         except subprocess.CalledProcessError:
             logger.info(
@@ -1268,15 +1247,16 @@ async def _extract_volume_to_dir(
     """
     Extract contents of a Docker volume to a local directory.
 
-    Uses tar streaming: container creates tar to stdout, host extracts with
-    correct ownership. This avoids root-owned files on the host.
+    Streams the volume through app.services.volume_reader (host mountpoint,
+    Engine archive API, or `docker cp` pipe) straight into the safe_extract
+    validator; the archive is never buffered in memory or spooled to disk.
 
     SECURITY:
-    - Container runs as root to read volume files (may have various perms)
-    - Tar is streamed to host and extracted with safe_extract (host user ownership)
     - Does NOT preserve uid/gid from container (extracts as current user)
     - Sets secure permissions: directories 0o700, files 0o600
-    - Does not follow symlinks (rejects them during extraction)
+    - Regular files only: symlinks, hardlinks and devices are never followed
+      or extracted; path traversal aborts the volume
+    - Size limits: 500MB per volume, 200MB per file (pcaps)
 
     Args:
         volume_name: Docker volume name
@@ -1286,95 +1266,9 @@ async def _extract_volume_to_dir(
     Returns:
         List of relative file paths extracted
     """
-    from app.utils.safe_extract import (
-        UnsafeArchiveError,
-        safe_extract_tarfile_from_path,
-        spool_docker_archive,
-    )
-
-    target_dir = dest_dir / subfolder
-    safe_mkdir(target_dir, mode=0o700)
-
-    # Create tar from volume contents and stream to stdout
-    # Container runs as UID 1000:1000 (pentester) to read OctoBox evidence files
-    # SECURITY: With --cap-drop ALL, even root can't bypass 0700 permissions
-    # Running as 1000:1000 (file owner) allows reading tlog/<lab_id>/commands.tsv
-    # We extract on host side with correct user ownership
-    # SECURITY: Hardened container with minimal privileges
-    cmd = [
-        "docker",
-        "run",
-        "--rm",
-        "--network", "none",  # No network access needed
-        "--cap-drop", "ALL",  # Drop all capabilities
-        "--security-opt", "no-new-privileges",  # Prevent privilege escalation
-        "--user", "1000:1000",  # Run as pentester UID to read 0700 dirs
-        "--pids-limit", "64",  # Limit processes (defense-in-depth)
-        "--memory", "128m",  # Memory limit (prevents OOM attacks)
-        "-v",
-        f"{volume_name}:/src:ro",  # Read-only mount
-        "alpine:3.20",  # Pinned version for reproducibility
-        "sh",
-        "-c",
-        # Create tar of regular files only (no symlinks, devices)
-        # Note: BusyBox tar doesn't support --null -T -, use tar with find output
-        "cd /src && tar -cf - $(find . -type f 2>/dev/null) 2>/dev/null || true",
-    ]
-
-    def _stream_tar() -> bytes | None:
-        """Run docker and capture tar stream."""
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                timeout=DOCKER_TIMEOUT * 2,  # Longer timeout for tar
-                shell=False,
-            )
-            # Return stdout (tar data) even if returncode is non-zero
-            # (e.g., empty volume returns empty tar)
-            return result.stdout if result.stdout else None
-        except subprocess.TimeoutExpired:
-            logger.warning(f"Timeout extracting volume {volume_name}")
-            return None
-        except Exception as e:
-            logger.warning(f"Error extracting volume {volume_name}: {type(e).__name__}")
-            return None
-
-    tar_data = await asyncio.to_thread(_stream_tar)
-
-    if not tar_data:
-        # Empty volume or error - return empty list
-        return []
-
-    # Spool tar to disk (avoids memory issues with large pcaps)
-    spool_path = dest_dir / f"{subfolder}_raw.tar"
-    try:
-        spool_path.write_bytes(tar_data)
-
-        # Extract using safe_extract (ignores tar uid/gid, sets 0o600/0o700)
-        try:
-            extracted = safe_extract_tarfile_from_path(
-                spool_path,
-                target_dir,
-                max_total_bytes=500 * 1024 * 1024,  # 500MB for pcaps
-                max_member_bytes=200 * 1024 * 1024,  # 200MB per file
-            )
-        except UnsafeArchiveError as e:
-            logger.warning(f"Unsafe content in volume {volume_name}: {e}")
-            return []
-        except Exception as e:
-            logger.warning(f"Error extracting tar from {volume_name}: {type(e).__name__}")
-            return []
-
-    finally:
-        # Clean up spool file
-        try:
-            spool_path.unlink()
-        except FileNotFoundError:
-            pass
+    from app.services.volume_reader import extract_volume_to_dir
 
-    # Return paths relative to dest_dir (include subfolder prefix)
-    return [f"{subfolder}/{f}" for f in extracted]
+    return await extract_volume_to_dir(volume_name, dest_dir, subfolder)
 
 
 async def build_evidence_bundle_zip(lab: Lab) -> bytes:
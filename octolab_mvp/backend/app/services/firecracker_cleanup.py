@@ -7,13 +7,21 @@ SECURITY:
 - Only cleans resources with known OctoLab prefixes (otp*, obr*, lab_*)
 - Never removes resources that might belong to other systems
 - Best-effort cleanup - failures are logged but don't block startup
+- Warm standby VMs held by another live worker (microvm_warm_pool markers)
+  are left alone, along with their TAPs and the bridges they hang off
+- The snapshot golden VM (TEMPLATE_LAB_ID) and its TAP are left alone; its
+  builder cleans up after interrupted builds. Bridges are also kept while
+  another worker is building a template
 """
 
+import errno
 import logging
 import shutil
 import subprocess
 from pathlib import Path
 
+from app.utils import rtnetlink
+
 logger = logging.getLogger(__name__)
 
 # Known prefixes for OctoLab resources
@@ -41,14 +49,33 @@ async def cleanup_orphaned_firecracker_resources() -> dict:
 
     logger.info("Starting orphaned Firecracker resource cleanup...")
 
+    # Import here to allow module to load without settings
+    from app.services.firecracker_paths import TEMPLATE_LAB_ID
+    from app.services.firecracker_snapshot import snapshot_build_in_progress
+    from app.services.microvm_warm_pool import host_standby_lab_ids
+
+    # Standby VMs other workers on this host are holding right now
+    standby_ids = host_standby_lab_ids()
+    if standby_ids:
+        logger.info(f"Keeping {len(standby_ids)} warm standby VM(s) of other workers")
+    building = snapshot_build_in_progress()
+    if building:
+        logger.info("Keeping network bridges: a snapshot template is being built")
+    keep_ids = standby_ids | {TEMPLATE_LAB_ID}
+
     # 1. Clean TAP interfaces
-    stats["tap_interfaces_deleted"] = _cleanup_tap_interfaces()
+    stats["tap_interfaces_deleted"] = _cleanup_tap_interfaces(
+        keep={_lab_tap_name(lab_id) for lab_id in keep_ids}
+    )
 
-    # 2. Clean bridge interfaces
-    stats["bridge_interfaces_deleted"] = _cleanup_bridge_interfaces()
+    # 2. Clean bridge interfaces (live standbys and the golden VM are attached to them)
+    if not standby_ids and not building:
+        stats["bridge_interfaces_deleted"] = _cleanup_bridge_interfaces()
 
     # 3. Clean VM directories
-    stats["vm_directories_deleted"] = _cleanup_vm_directories()
+    stats["vm_directories_deleted"] = _cleanup_vm_directories(
+        keep={f"{LAB_DIR_PREFIX}{lab_id}" for lab_id in keep_ids}
+    )
 
     total_cleaned = (
         stats["tap_interfaces_deleted"] +
@@ -69,43 +96,21 @@ async def cleanup_orphaned_firecracker_resources() -> dict:
     return stats
 
 
-def _cleanup_tap_interfaces() -> int:
+def _lab_tap_name(lab_id: str) -> str:
+    """TAP name netd derives for a lab ID (see microvm_netd.derive_tap_name)."""
+    return f"{TAP_PREFIX}{lab_id.replace('-', '')[:10]}"
+
+
+def _cleanup_tap_interfaces(keep: set[str] = frozenset()) -> int:
     """Delete orphaned TAP interfaces with otp* prefix.
 
+    Args:
+        keep: TAP names to leave in place
+
     Returns:
         Number of interfaces deleted
     """
-    deleted = 0
-    try:
-        result = subprocess.run(
-            ["ip", "link", "show"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-
-        for line in result.stdout.splitlines():
-            # Format: "123: otpXXX: <FLAGS>..."
-            if f": {TAP_PREFIX}" in line:
-                parts = line.split(":")
-                if len(parts) >= 2:
-                    tap_name = parts[1].strip().split("@")[0]
-                    if tap_name.startswith(TAP_PREFIX):
-                        try:
-                            subprocess.run(
-                                ["sudo", "ip", "link", "delete", tap_name],
-                                check=False,
-                                timeout=5,
-                                capture_output=True,
-                            )
-                            deleted += 1
-                            logger.debug(f"Deleted orphaned TAP: {tap_name}")
-                        except Exception as e:
-                            logger.warning(f"Failed to delete TAP {tap_name}: {e}")
-    except Exception as e:
-        logger.warning(f"Error listing TAP interfaces: {e}")
-
-    return deleted
+    return _delete_links_with_prefix(TAP_PREFIX, "TAP", keep)
 
 
 def _cleanup_bridge_interfaces() -> int:
@@ -114,41 +119,58 @@ def _cleanup_bridge_interfaces() -> int:
     Returns:
         Number of interfaces deleted
     """
-    deleted = 0
+    return _delete_links_with_prefix(BRIDGE_PREFIX, "bridge")
+
+
+def _delete_links_with_prefix(prefix: str, label: str, keep: set[str] = frozenset()) -> int:
+    """Delete every link whose name starts with prefix.
+
+    Links are listed and deleted over rtnetlink. Without CAP_NET_ADMIN the
+    delete fails with EPERM and falls back to `sudo ip link delete`.
+
+    Returns:
+        Number of interfaces deleted
+    """
     try:
-        result = subprocess.run(
-            ["ip", "link", "show"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
+        names = [link["name"] for link in rtnetlink.dump_links()]
+    except OSError as e:
+        logger.warning(f"Error listing {label} interfaces: {e}")
+        return 0
 
-        for line in result.stdout.splitlines():
-            if f": {BRIDGE_PREFIX}" in line:
-                parts = line.split(":")
-                if len(parts) >= 2:
-                    br_name = parts[1].strip().split("@")[0]
-                    if br_name.startswith(BRIDGE_PREFIX):
-                        try:
-                            subprocess.run(
-                                ["sudo", "ip", "link", "delete", br_name],
-                                check=False,
-                                timeout=5,
-                                capture_output=True,
-                            )
-                            deleted += 1
-                            logger.debug(f"Deleted orphaned bridge: {br_name}")
-                        except Exception as e:
-                            logger.warning(f"Failed to delete bridge {br_name}: {e}")
-    except Exception as e:
-        logger.warning(f"Error listing bridge interfaces: {e}")
+    deleted = 0
+    for name in names:
+        if not name.startswith(prefix) or name in keep:
+            continue
+        try:
+            rtnetlink.delete_link(name)
+        except OSError as e:
+            if e.errno == errno.ENODEV:
+                continue
+            if e.errno not in (errno.EPERM, errno.EACCES):
+                logger.warning(f"Failed to delete {label} {name}: {e}")
+                continue
+            try:
+                subprocess.run(
+                    ["sudo", "ip", "link", "delete", name],
+                    check=False,
+                    timeout=5,
+                    capture_output=True,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to delete {label} {name}: {e}")
+                continue
+        deleted += 1
+        logger.debug(f"Deleted orphaned {label}: {name}")
 
     return deleted
 
 
-def _cleanup_vm_directories() -> int:
+def _cleanup_vm_directories(keep: set[str] = frozenset()) -> int:
     """Delete orphaned VM directories under /var/lib/octolab/microvm/lab_*.
 
+    Args:
+        keep: Directory names to leave in place
+
     Returns:
         Number of directories deleted
     """
@@ -159,7 +181,7 @@ def _cleanup_vm_directories() -> int:
 
     try:
         for item in MICROVM_BASE_DIR.iterdir():
-            if item.is_dir() and item.name.startswith(LAB_DIR_PREFIX):
+            if item.is_dir() and item.name.startswith(LAB_DIR_PREFIX) and item.name not in keep:
                 try:
                     shutil.rmtree(item)
                     deleted += 1
@@ -15,27 +15,30 @@ This module provides:
 from __future__ import annotations
 
 import asyncio
+import base64
 import hashlib
 import json
 import logging
 import os
 import secrets
 import signal
-import socket
 import struct
 import subprocess
 import time
 from dataclasses import dataclass, field
 from pathlib import Path
+from collections.abc import Awaitable, Callable
 from typing import Any
 from uuid import UUID
 
 from app.config import settings
 from app.services.firecracker_paths import (
+    TEMPLATE_LAB_ID,
     PathContainmentError,
     cleanup_lab_state_dir,
     ensure_lab_state_dir,
     lab_log_path,
+    lab_overlay_path,
     lab_pid_path,
     lab_rootfs_path,
     lab_socket_path,
@@ -44,6 +47,16 @@ from app.services.firecracker_paths import (
     redact_path,
     validate_lab_id,
 )
+from app.services.firecracker_rootfs import image_store_path, provision_rootfs
+from app.services.firecracker_vsock import (
+    AgentTransportError,
+    agent_request,
+    agent_stream,
+    close_agent_connections,
+    frame_version,
+)
+from app.services.microvm_boot_admission import get_boot_admission
+from app.utils.metrics import track_operation
 
 logger = logging.getLogger(__name__)
 
@@ -66,32 +79,6 @@ ALLOWED_AGENT_ACTIONS = frozenset({"ping", "uname", "id"})
 MIN_GUEST_CID = 100
 MAX_GUEST_CID = 65535
 
-# =============================================================================
-# Boot Concurrency Control
-# =============================================================================
-# Semaphore to limit concurrent VM boots. Under load, multiple simultaneous
-# boots can cause timeouts due to resource contention. This serializes boot
-# operations to ensure reliable startup.
-#
-# Serialize VM boots to prevent I/O contention on limited hardware.
-# Two VMs loading 247MB images simultaneously causes disk saturation.
-# Can increase to 2+ after SSD/RAM upgrade or image optimization.
-# The semaphore is module-level (not per-request) for global coordination.
-MAX_CONCURRENT_BOOTS = 1
-_boot_semaphore: asyncio.Semaphore | None = None
-
-
-def _get_boot_semaphore() -> asyncio.Semaphore:
-    """Get or create the boot semaphore (lazy init for event loop safety).
-
-    The semaphore must be created in the context of a running event loop,
-    so we lazily initialize it on first use rather than at module import.
-    """
-    global _boot_semaphore
-    if _boot_semaphore is None:
-        _boot_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BOOTS)
-    return _boot_semaphore
-
 
 # =============================================================================
 # Data Classes
@@ -171,6 +158,10 @@ class VMMetadata:
     cid: int | None = None
     api_sock_path: str | None = None
     state_dir: str | None = None
+    # "cold" (kernel boot) or "snapshot" (restored from a template)
+    boot_mode: str = "cold"
+    # How the per-lab disk was provisioned (see firecracker_rootfs)
+    rootfs_strategy: str | None = None
     # token is intentionally not in to_dict()
 
     def to_dict(self) -> dict[str, Any]:
@@ -188,6 +179,8 @@ class VMMetadata:
             "state_dir_redacted": redact_path(self.state_dir)
             if self.state_dir
             else None,
+            "boot_mode": self.boot_mode,
+            "rootfs_strategy": self.rootfs_strategy,
         }
 
 
@@ -443,6 +436,12 @@ def _generate_cid(lab_id: str) -> int:
     return cid
 
 
+def _guest_mac(lab_id: str) -> str:
+    """Derive a deterministic guest MAC address from a validated lab ID."""
+    lab_hash = int(lab_id.replace("-", "")[:8], 16)
+    return f"AA:FC:00:{(lab_hash >> 16) & 0xFF:02X}:{(lab_hash >> 8) & 0xFF:02X}:{lab_hash & 0xFF:02X}"
+
+
 # =============================================================================
 # Token Management
 # =============================================================================
@@ -506,12 +505,18 @@ def _read_token(lab_id: str) -> str | None:
 async def create_vm(
     lab_id: UUID | str,
     network_config: "NetworkConfig | None" = None,
+    use_snapshot: bool = True,
 ) -> VMMetadata:
     """Create and boot a Firecracker microVM.
 
+    When snapshot boot is enabled and a template for the current rootfs
+    exists, the VM is restored from it instead (see firecracker_snapshot);
+    any restore failure falls back to a cold boot.
+
     Args:
         lab_id: Server-owned lab ID
         network_config: Optional network configuration with guest IP
+        use_snapshot: Allow restoring from a snapshot template
 
     Returns:
         VMMetadata with VM information
@@ -528,12 +533,13 @@ async def create_vm(
     safe_lab_id = validate_lab_id(lab_id)
     logger.info(f"Creating microVM for lab ...{safe_lab_id[-6:]}")
 
-    # Acquire boot slot to prevent resource contention
-    # Multiple simultaneous boots can cause timeouts under load
-    semaphore = _get_boot_semaphore()
-    logger.info(f"Lab ...{safe_lab_id[-6:]} waiting for boot slot (max {MAX_CONCURRENT_BOOTS} concurrent)")
-    async with semaphore:
-        logger.info(f"Lab ...{safe_lab_id[-6:]} acquired boot slot, starting VM boot")
+    # Acquire a host-wide boot slot; concurrency adapts to IO/memory pressure
+    # (see microvm_boot_admission)
+    async with get_boot_admission().slot(safe_lab_id) as waited:
+        logger.info(
+            f"Lab ...{safe_lab_id[-6:]} acquired boot slot after {waited:.1f}s, "
+            "starting VM boot"
+        )
 
         # Run preflight
         pf = preflight()
@@ -546,6 +552,23 @@ async def create_vm(
                 "Cannot start VM without isolation."
             )
 
+        if use_snapshot and network_config and settings.microvm_snapshot_enabled:
+            from app.services.firecracker_snapshot import (
+                get_snapshot_store,
+                restore_vm,
+            )
+
+            template = get_snapshot_store().current()
+            if template is not None:
+                try:
+                    return await restore_vm(safe_lab_id, template, network_config)
+                except Exception as e:
+                    logger.warning(
+                        f"Snapshot restore failed for lab ...{safe_lab_id[-6:]}: "
+                        f"{type(e).__name__}; falling back to cold boot"
+                    )
+                    await destroy_vm(safe_lab_id)
+
         # Create state directory
         state_dir = ensure_lab_state_dir(safe_lab_id)
 
@@ -560,16 +583,25 @@ async def create_vm(
         socket_path = lab_socket_path(safe_lab_id)
         log_path = lab_log_path(safe_lab_id)
         pid_path = lab_pid_path(safe_lab_id)
-        rootfs_copy = lab_rootfs_path(safe_lab_id)
 
-        # Copy base rootfs to per-lab rootfs (ephemeral)
+        # Provision per-lab disk from base rootfs (ephemeral)
         base_rootfs = Path(settings.microvm_rootfs_base_path)
         if not base_rootfs.exists():
             raise RuntimeError("Base rootfs not found")
 
-        import shutil
-
-        shutil.copy2(base_rootfs, rootfs_copy)
+        # The snapshot template's disk must be one standalone file (no overlay)
+        rootfs = await asyncio.to_thread(
+            provision_rootfs,
+            base_rootfs,
+            lab_rootfs_path(safe_lab_id),
+            lab_overlay_path(safe_lab_id),
+            allow_overlay=safe_lab_id != TEMPLATE_LAB_ID,
+            image_store=image_store_path(),
+        )
+        logger.info(
+            f"Lab ...{safe_lab_id[-6:]} rootfs provisioned: "
+            f"strategy={rootfs.strategy} in {rootfs.seconds}s"
+        )
 
         # Build Firecracker config
         kernel_path = Path(settings.microvm_kernel_path)
@@ -582,43 +614,39 @@ async def create_vm(
             "console=ttyS0 reboot=k panic=1 pci=off "
             f"octolab.token={token} octolab.vsock_port={settings.microvm_vsock_port}"
         )
+        if rootfs.boot_args:
+            boot_args += f" {rootfs.boot_args}"
         if network_config:
             # Add IP configuration to kernel cmdline
             # This configures eth0 with the specified IP, gateway, and netmask
             boot_args += (
-                f" ip={network_config.guest_ip}::{network_config.gateway}:255.255.0.0"
+                f" ip={network_config.guest_ip}::{network_config.gateway}:{network_config.netmask}"
                 "::eth0:none"
             )
             logger.info(f"VM will use IP {network_config.guest_ip} via {network_config.gateway}")
 
+        # Drive and vsock paths are relative to the state dir (Firecracker's
+        # cwd) so a snapshot of this VM can be restored in any lab's state dir
         config = {
             "boot-source": {
                 "kernel_image_path": str(kernel_path),
                 "boot_args": boot_args,
             },
-            "drives": [
-                {
-                    "drive_id": "rootfs",
-                    "path_on_host": str(rootfs_copy),
-                    "is_root_device": True,
-                    "is_read_only": False,
-                }
-            ],
+            "drives": rootfs.drives,
             "machine-config": {
                 "vcpu_count": settings.microvm_vcpu_count,
                 "mem_size_mib": settings.microvm_mem_size_mib,
             },
             "vsock": {
                 "guest_cid": cid,
-                "uds_path": str(state_dir / "vsock.sock"),
+                "uds_path": "vsock.sock",
             },
         }
 
         # Add network interface if network_config provided
         if network_config:
             # Generate deterministic MAC from lab_id
-            lab_hash = int(safe_lab_id.replace("-", "")[:8], 16)
-            guest_mac = f"AA:FC:00:{(lab_hash >> 16) & 0xFF:02X}:{(lab_hash >> 8) & 0xFF:02X}:{lab_hash & 0xFF:02X}"
+            guest_mac = _guest_mac(safe_lab_id)
             config["network-interfaces"] = [
                 {
                     "iface_id": "eth0",
@@ -651,6 +679,7 @@ async def create_vm(
                 stdout=asyncio.subprocess.DEVNULL,
                 stderr=open(log_path, "w"),
                 start_new_session=True,  # Detach from parent
+                cwd=str(state_dir),
             )
 
             # Store PID
@@ -668,6 +697,7 @@ async def create_vm(
                 cid=cid,
                 api_sock_path=str(socket_path),
                 state_dir=str(state_dir),
+                rootfs_strategy=rootfs.strategy,
             )
 
         except StaleRootfsError as e:
@@ -696,6 +726,7 @@ async def destroy_vm(lab_id: UUID | str) -> bool:
     safe_lab_id = validate_lab_id(lab_id)
     logger.info(f"Destroying microVM for lab ...{safe_lab_id[-6:]}")
 
+    close_agent_connections(str(lab_state_dir(safe_lab_id) / "vsock.sock"))
     destroyed = False
 
     # Try to read PID and terminate process
@@ -854,7 +885,11 @@ async def setup_network_for_lab(
         return None
 
 
-async def cleanup_network_for_lab(lab_id: str, tap_name: str | None = None) -> bool:
+async def cleanup_network_for_lab(
+    lab_id: str,
+    tap_name: str | None = None,
+    port_forwards: bool = False,
+) -> bool:
     """Clean up networking for a lab VM via microvm-netd.
 
     Best-effort cleanup - logs errors but doesn't raise.
@@ -862,14 +897,22 @@ async def cleanup_network_for_lab(lab_id: str, tap_name: str | None = None) -> b
     Args:
         lab_id: Lab UUID string
         tap_name: TAP device name (ignored - netd derives from lab_id)
+        port_forwards: Also remove the lab's port forwards (same round-trip)
 
     Returns:
         True if cleanup attempted
     """
-    from app.services.microvm_net_client import release_vm_net
+    from app.services.microvm_net_client import release_vm_net, release_vm_net_and_forwards
 
     safe_lab_id = validate_lab_id(lab_id)
 
+    if port_forwards:
+        forwards_removed, _ = await release_vm_net_and_forwards(safe_lab_id)
+        if forwards_removed:
+            logger.info(f"Port forward cleaned up for lab ...{safe_lab_id[-6:]}")
+        logger.info(f"Network released for lab ...{safe_lab_id[-6:]}")
+        return True
+
     try:
         await release_vm_net(safe_lab_id)
         logger.info(f"Network released for lab ...{safe_lab_id[-6:]}")
@@ -959,8 +1002,8 @@ def _get_command_timeout(command: str) -> int:
         return settings.microvm_compose_timeout_secs
     elif command == "diag":
         return settings.microvm_diag_timeout_secs
-    elif command == "docker_build":
-        # Docker build needs more time (5 minutes)
+    elif command in ("docker_build", "image_save", "image_load"):
+        # Docker build and image transfer need more time (5 minutes)
         return 300
     else:
         return settings.microvm_cmd_timeout_secs
@@ -971,12 +1014,39 @@ async def send_agent_command(
     command: str,
     timeout: int | None = None,
     **kwargs,
+) -> AgentResponse:
+    """Send a command to the guest agent, see _send_agent_command().
+
+    Latency is recorded per command under the "agent" metrics component;
+    responses with ok=False count as failures.
+
+    Args:
+        lab_id: Lab UUID string
+        command: Command to send
+        timeout: Optional timeout override (uses command-specific default if not provided)
+        **kwargs: Additional command arguments
+
+    Returns:
+        AgentResponse
+    """
+    with track_operation("agent", command) as op:
+        response = await _send_agent_command(lab_id, command, timeout, **kwargs)
+        op.ok = response.ok
+    return response
+
+
+async def _send_agent_command(
+    lab_id: str,
+    command: str,
+    timeout: int | None = None,
+    **kwargs,
 ) -> AgentResponse:
     """Send a command to the guest agent via Firecracker's UDS vsock.
 
     Uses Firecracker's hybrid vsock approach which works in nested virtualization
     (e.g., GCP VMs). The host connects to the vsock.sock UDS, sends "CONNECT <port>",
-    and then communicates with the guest agent.
+    and then communicates with the guest agent. Non-blocking, with connections
+    reused per VM (see firecracker_vsock).
 
     Supports extended commands: ping, upload_project, compose_up, compose_down, status, diag.
 
@@ -1009,78 +1079,136 @@ async def send_agent_command(
         **kwargs,
     }
 
+    return await _agent_response(agent_request(vsock_sock_path, request, effective_timeout))
+
+
+async def _agent_response(exchange: Awaitable[dict[str, Any]]) -> AgentResponse:
+    """Await an agent exchange and convert its result or failure."""
     try:
-        # Connect via Firecracker's UDS vsock (works in nested virtualization)
-        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        sock.settimeout(effective_timeout)
+        response_json = await exchange
+    except TimeoutError:
+        return AgentResponse(ok=False, error="Timeout")
+    except AgentTransportError as e:
+        return AgentResponse(ok=False, error=str(e))
+    except OSError as e:
+        return AgentResponse(ok=False, error=f"Socket error: {e.errno}")
+    except ValueError:
+        return AgentResponse(ok=False, error="Invalid JSON response")
+    except Exception as e:
+        return AgentResponse(ok=False, error=f"{type(e).__name__}")
 
-        try:
-            sock.connect(vsock_sock_path)
+    return AgentResponse(
+        ok=response_json.get("ok", False),
+        stdout=response_json.get("stdout", "")[:settings.microvm_max_output_bytes],
+        stderr=response_json.get("stderr", "")[:settings.microvm_max_output_bytes],
+        exit_code=response_json.get("exit_code", -1),
+        error=response_json.get("error"),
+        # Version fields (present in ping response)
+        agent_version=response_json.get("agent_version"),
+        rootfs_build_id=response_json.get("rootfs_build_id"),
+        # Diag fields (present in diag response)
+        docker_ready=response_json.get("docker_ready"),
+        last_compose_status=response_json.get("last_compose_status"),
+        # Docker build fields (present in docker_build response)
+        image=response_json.get("image"),
+        image_id=response_json.get("image_id"),
+    )
 
-            # Firecracker hybrid vsock protocol: send "CONNECT <port>\n" first
-            sock.sendall(f"CONNECT {settings.microvm_vsock_port}\n".encode())
 
-            # Read the OK response from Firecracker
-            connect_response = b""
-            while b"\n" not in connect_response:
-                chunk = sock.recv(1024)
-                if not chunk:
-                    return AgentResponse(ok=False, error="No CONNECT response")
-                connect_response += chunk
+def _inline_files(command: str, files: dict[str, bytes]) -> dict[str, Any] | None:
+    """JSON-line request fields carrying files, for agents without framing.
 
-            if not connect_response.startswith(b"OK"):
-                return AgentResponse(ok=False, error=f"CONNECT failed: {connect_response.decode().strip()}")
+    Returns None for commands that only exist in the framed protocol.
+    """
+    if command == "upload_project":
+        return {"data": base64.b64encode(files["project.tgz"]).decode()}
+    if command == "docker_build":
+        return {
+            "source_files": [
+                {"filename": name, "content": data.decode()} for name, data in files.items()
+            ]
+        }
+    return None
 
-            # Send the actual agent request
-            request_bytes = json.dumps(request).encode() + b"\n"
-            sock.sendall(request_bytes)
 
-            # Receive response
-            response_data = b""
-            while len(response_data) < settings.microvm_max_output_bytes:
-                try:
-                    chunk = sock.recv(65536)
-                    if not chunk:
-                        break
-                    response_data += chunk
-                    if b"\n" in response_data:
-                        break
-                except socket.timeout:
-                    break
-
-            # Parse response
-            if response_data:
-                response_json = json.loads(response_data.decode().strip())
-                return AgentResponse(
-                    ok=response_json.get("ok", False),
-                    stdout=response_json.get("stdout", "")[:settings.microvm_max_output_bytes],
-                    stderr=response_json.get("stderr", "")[:settings.microvm_max_output_bytes],
-                    exit_code=response_json.get("exit_code", -1),
-                    error=response_json.get("error"),
-                    # Version fields (present in ping response)
-                    agent_version=response_json.get("agent_version"),
-                    rootfs_build_id=response_json.get("rootfs_build_id"),
-                    # Diag fields (present in diag response)
-                    docker_ready=response_json.get("docker_ready"),
-                    last_compose_status=response_json.get("last_compose_status"),
-                    # Docker build fields (present in docker_build response)
-                    image=response_json.get("image"),
-                    image_id=response_json.get("image_id"),
-                )
-            else:
-                return AgentResponse(ok=False, error="No response")
+async def send_agent_stream(
+    lab_id: str,
+    command: str,
+    files: dict[str, bytes | Path],
+    timeout: int | None = None,
+    on_data: Callable[[bytes], Any] | None = None,
+    **kwargs,
+) -> AgentResponse:
+    """Send a command with files, or binary output, to the guest agent.
 
-        finally:
-            sock.close()
+    Files are streamed raw over the agent's framed protocol (see
+    firecracker_vsock) with progress logged; agents that don't offer it get
+    upload_project/docker_build files inlined in a JSON request as before,
+    and fail other commands. Latency is recorded like send_agent_command().
 
-    except socket.timeout:
-        return AgentResponse(ok=False, error="Timeout")
-    except socket.error as e:
-        return AgentResponse(ok=False, error=f"Socket error: {e.errno}")
-    except json.JSONDecodeError:
-        return AgentResponse(ok=False, error="Invalid JSON response")
-    except Exception as e:
-        return AgentResponse(ok=False, error=f"{type(e).__name__}")
+    Args:
+        lab_id: Lab UUID string
+        command: upload_project ("project.tgz"), docker_build (source files),
+            image_load ("image.tar") or image_save (no files, binary output)
+        files: File name -> contents (bytes, or a Path streamed from disk)
+        timeout: Optional timeout override (uses command-specific default if not provided)
+        on_data: Receives binary output chunks (image_save)
+        **kwargs: Additional command arguments
+
+    Returns:
+        AgentResponse
+    """
+    with track_operation("agent", command) as op:
+        response = await _send_agent_stream(lab_id, command, files, timeout, on_data, **kwargs)
+        op.ok = response.ok
+    return response
+
+
+async def _send_agent_stream(
+    lab_id: str,
+    command: str,
+    files: dict[str, bytes | Path],
+    timeout: int | None = None,
+    on_data: Callable[[bytes], Any] | None = None,
+    **kwargs,
+) -> AgentResponse:
+    safe_lab_id = validate_lab_id(lab_id)
+
+    token = _read_token(safe_lab_id)
+    if not token:
+        return AgentResponse(ok=False, error="Token not found")
+
+    vsock_sock_path = str(lab_state_dir(safe_lab_id) / "vsock.sock")
+    effective_timeout = timeout if timeout is not None else _get_command_timeout(command)
+
+    try:
+        version = await frame_version(vsock_sock_path, token, settings.microvm_cmd_timeout_secs)
+    except Exception:
+        # The JSON request below reports the failure
+        version = None
+    if version is None:
+        inline = _inline_files(command, files)
+        if inline is None:
+            return AgentResponse(ok=False, error="Agent does not support framed requests")
+        return await _send_agent_command(lab_id, command, timeout, **kwargs, **inline)
+
+    def report(received: int, total: int) -> None:
+        logger.info(
+            f"{command} to lab ...{safe_lab_id[-6:]}: "
+            f"{received / 2**20:.1f}/{total / 2**20:.1f} MiB"
+        )
+
+    request = {
+        "token": token,
+        "command": command,
+        **kwargs,
+    }
+    return await _agent_response(
+        agent_stream(
+            vsock_sock_path, request, files, effective_timeout,
+            on_progress=report, on_data=on_data,
+        )
+    )
 
 
 # =============================================================================
@@ -1185,7 +1313,7 @@ async def communicate_with_agent(
 
     Uses Firecracker's hybrid vsock approach which works in nested virtualization
     (e.g., GCP VMs). The host connects to the vsock.sock UDS, sends "CONNECT <port>",
-    and then communicates with the guest agent.
+    and then communicates with the guest agent (see firecracker_vsock).
 
     Args:
         vsock_sock_path: Path to Firecracker's vsock UDS socket
@@ -1218,76 +1346,31 @@ async def communicate_with_agent(
         "token": token,
         "action": action,
     }
-    request_bytes = json.dumps(request).encode()
 
     try:
-        # Connect via Firecracker's UDS vsock (works in nested virtualization)
-        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-
-        try:
-            sock.connect(vsock_sock_path)
-
-            # Firecracker hybrid vsock protocol: send "CONNECT <port>\n" first
-            sock.sendall(f"CONNECT {settings.microvm_vsock_port}\n".encode())
-
-            # Read the OK response from Firecracker
-            connect_response = b""
-            while b"\n" not in connect_response:
-                chunk = sock.recv(1024)
-                if not chunk:
-                    return AgentResponse(ok=False, error="No CONNECT response")
-                connect_response += chunk
-
-            if not connect_response.startswith(b"OK"):
-                return AgentResponse(ok=False, error=f"CONNECT failed: {connect_response.decode().strip()}")
-
-            # Now send the actual agent request
-            sock.sendall(request_bytes)
-            sock.sendall(b"\n")
-
-            # Receive response
-            response_data = b""
-            while len(response_data) < max_output:
-                try:
-                    chunk = sock.recv(4096)
-                    if not chunk:
-                        break
-                    response_data += chunk
-                    if b"\n" in response_data:
-                        break
-                except socket.timeout:
-                    break
-
-            # Parse response
-            if response_data:
-                # Truncate for safety
-                response_data = response_data[:max_output]
-                response_json = json.loads(response_data.decode().strip())
-                return AgentResponse(
-                    ok=response_json.get("ok", False),
-                    stdout=response_json.get("stdout", "")[:max_output],
-                    stderr=response_json.get("stderr", "")[:max_output],
-                    exit_code=response_json.get("exit_code", -1),
-                    # Version fields (present in ping response)
-                    agent_version=response_json.get("agent_version"),
-                    rootfs_build_id=response_json.get("rootfs_build_id"),
-                )
-            else:
-                return AgentResponse(ok=False, error="No response from agent")
-
-        finally:
-            sock.close()
-
-    except socket.timeout:
+        response_json = await agent_request(vsock_sock_path, request, timeout)
+    except TimeoutError:
         raise TimeoutError("vsock communication timed out")
-    except socket.error as e:
+    except AgentTransportError as e:
+        error = "No response from agent" if str(e) == "No response" else str(e)
+        return AgentResponse(ok=False, error=error)
+    except OSError as e:
         return AgentResponse(ok=False, error=f"vsock error: {e.errno}")
-    except json.JSONDecodeError:
+    except ValueError:
         return AgentResponse(ok=False, error="Invalid JSON response from agent")
     except Exception as e:
         return AgentResponse(ok=False, error=f"{type(e).__name__}")
 
+    return AgentResponse(
+        ok=response_json.get("ok", False),
+        stdout=response_json.get("stdout", "")[:max_output],
+        stderr=response_json.get("stderr", "")[:max_output],
+        exit_code=response_json.get("exit_code", -1),
+        # Version fields (present in ping response)
+        agent_version=response_json.get("agent_version"),
+        rootfs_build_id=response_json.get("rootfs_build_id"),
+    )
+
 
 async def run_agent_command(
     lab_id: UUID | str,
@@ -34,6 +34,13 @@ LAB_ID_PATTERN = re.compile(
     re.IGNORECASE,
 )
 
+# Reserved lab ID for the golden VM that snapshot templates are taken from.
+# Never assigned to a real lab; orphan sweeps must skip it.
+TEMPLATE_LAB_ID = "00000000-0000-0000-0000-00000000f00d"
+
+# Snapshot template build IDs come from the guest agent; keep them path-safe
+TEMPLATE_BUILD_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
 
 def validate_lab_id(lab_id: UUID | str) -> str:
     """Validate and normalize a lab ID.
@@ -148,6 +155,22 @@ def lab_rootfs_path(lab_id: UUID | str) -> Path:
     return lab_state_dir(lab_id) / "rootfs.ext4"
 
 
+def lab_overlay_path(lab_id: UUID | str) -> Path:
+    """Get the per-lab writable overlay drive path (overlay rootfs strategy).
+
+    Args:
+        lab_id: Server-owned lab ID
+
+    Returns:
+        Path to lab's overlay drive image
+
+    Raises:
+        InvalidLabIdError: If lab ID is invalid
+        PathContainmentError: If path escapes containment
+    """
+    return lab_state_dir(lab_id) / "overlay.ext4"
+
+
 def lab_log_path(lab_id: UUID | str) -> Path:
     """Get the Firecracker log path for a lab.
 
@@ -274,6 +297,69 @@ def cleanup_lab_state_dir(lab_id: UUID | str) -> bool:
     return True
 
 
+def templates_dir() -> Path:
+    """Get the directory holding snapshot templates (one subdir per build ID).
+
+    Lives next to the lab_* directories but is not one, so startup cleanup
+    of orphaned lab state leaves templates in place across restarts.
+    """
+    return get_state_dir() / "templates"
+
+
+def boot_leases_dir() -> Path:
+    """Get the directory holding boot slot lease files.
+
+    Shared by every backend worker on the host (see microvm_boot_admission).
+    """
+    return get_state_dir() / "boot-leases"
+
+
+def snapshot_build_lock_path() -> Path:
+    """Get the lock file held while a snapshot template is being built.
+
+    Shared by every backend worker on the host (see firecracker_snapshot).
+    """
+    return get_state_dir() / "snapshot-build.lock"
+
+
+def standby_markers_dir() -> Path:
+    """Get the directory holding warm standby VM markers (one file per lab ID).
+
+    Shared by every backend worker on the host (see microvm_warm_pool).
+    """
+    return get_state_dir() / "standby"
+
+
+def image_cache_dir() -> Path:
+    """Get the directory holding cached target image archives.
+
+    Shared by every backend worker on the host (see microvm_image_cache).
+    """
+    return get_state_dir() / "image-cache"
+
+
+def template_dir(build_id: str) -> Path:
+    """Get the directory for one snapshot template.
+
+    Args:
+        build_id: Rootfs build ID reported by the golden VM's agent
+
+    Raises:
+        ValueError: If build_id is not path-safe
+        PathContainmentError: If path escapes containment
+    """
+    if not TEMPLATE_BUILD_ID_PATTERN.match(build_id or ""):
+        raise ValueError("Invalid template build ID")
+
+    root = templates_dir().resolve()
+    path = root / build_id
+    try:
+        path.resolve().relative_to(root)
+    except ValueError:
+        raise PathContainmentError("Template directory escapes containment")
+    return path
+
+
 def redact_path(path: Path | str) -> str:
     """Redact a path for safe logging.
 
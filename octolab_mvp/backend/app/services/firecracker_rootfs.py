@@ -0,0 +1,259 @@
+"""Per-lab rootfs provisioning for Firecracker VMs.
+
+create_vm used to shutil.copy2 the whole base image (hundreds of MB) for
+every lab while holding the boot slot. This module provisions the lab's disk
+with the cheapest strategy the host supports, in order:
+
+1. reflink: FICLONE the base image (btrfs, xfs with reflink=1). Instant, and
+   blocks are shared until the guest writes them
+2. overlay: attach the base image read-only (shared by every VM) plus a
+   small sparse per-lab drive; /sbin/overlay-init in the guest mounts an
+   overlayfs over them. Needs a rootfs built with overlay-init, so it is
+   opt-in (microvm_rootfs_overlay_enabled)
+3. sparse_copy: copy only the allocated extents (SEEK_DATA/SEEK_HOLE) with
+   copy_file_range, leaving holes as holes
+
+Drive paths for per-lab files are relative to the lab state dir, which is
+Firecracker's cwd (see create_vm).
+
+Whatever the strategy, a deployed image store (images.ext4 from
+build-rootfs.sh: a Docker data root with the pre-baked images) is attached
+read-only after the lab's drives. The guest mounts it as /var/lib/docker
+through a per-VM copy-on-write snapshot instead of loading image tarballs
+on every boot.
+
+SECURITY:
+- The shared base image and image store are always attached read-only
+- Only writes inside the lab state directory
+"""
+
+from __future__ import annotations
+
+import errno
+import fcntl
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.utils.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+# ioctl(dest_fd, FICLONE, src_fd) from linux/fs.h
+FICLONE = 0x40049409
+
+# Chunk size for the copy_file_range / pread fallback
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+
+STRATEGY_REFLINK = "reflink"
+STRATEGY_OVERLAY = "overlay"
+STRATEGY_SPARSE_COPY = "sparse_copy"
+
+ROOTFS_PROVISIONS = get_registry().counter(
+    "octolab_microvm_rootfs_provisions_total",
+    "Per-lab rootfs provisions by strategy.",
+    ("strategy",),
+)
+
+
+@dataclass
+class RootfsProvision:
+    """How a lab's disk was provisioned and the drives to attach."""
+
+    strategy: str
+    drives: list[dict[str, Any]] = field(default_factory=list)
+    boot_args: str = ""
+    seconds: float = 0.0
+
+
+def file_identity(path: Path) -> str:
+    """Identity of an image file (inode, size, mtime).
+
+    Deploys replace the base rootfs by rename, so any rebuild changes this.
+
+    Raises:
+        OSError: If the file cannot be stat'ed
+    """
+    st = path.stat()
+    return f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def image_store_path() -> Path | None:
+    """The deployed image store drive, or None if there is none."""
+    path = settings.microvm_image_store_path
+    if path and Path(path).is_file():
+        return Path(path)
+    return None
+
+
+def image_store_identity() -> str:
+    """file_identity of the image store, or "" if none is deployed."""
+    path = image_store_path()
+    if path is None:
+        return ""
+    try:
+        return file_identity(path)
+    except OSError:
+        return ""
+
+
+def _attach_image_store(provision: RootfsProvision, image_store: Path) -> None:
+    # Firecracker names virtio-blk devices in config order: root is vda
+    device = f"/dev/vd{chr(ord('a') + len(provision.drives))}"
+    provision.drives.append(
+        {
+            "drive_id": "images",
+            "path_on_host": str(image_store),
+            "is_root_device": False,
+            "is_read_only": True,
+        }
+    )
+    provision.boot_args = f"{provision.boot_args} octolab.images={device}".strip()
+
+
+def _writable_root_drive(filename: str) -> dict[str, Any]:
+    return {
+        "drive_id": "rootfs",
+        "path_on_host": filename,
+        "is_root_device": True,
+        "is_read_only": False,
+    }
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    """Clone src to dst with FICLONE. Returns False if the filesystem
+    cannot (dst is then removed)."""
+    try:
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        return True
+    except OSError as e:
+        if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+            logger.debug(f"reflink failed: {type(e).__name__} errno={e.errno}")
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def _copy_range(fin: int, fout: int, offset: int, length: int) -> None:
+    end = offset + length
+    use_cfr = hasattr(os, "copy_file_range")
+    while offset < end:
+        count = min(COPY_CHUNK_BYTES, end - offset)
+        if use_cfr:
+            try:
+                copied = os.copy_file_range(fin, fout, count, offset, offset)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+                use_cfr = False
+                continue
+            if copied == 0:
+                raise OSError(errno.EIO, "short copy")
+        else:
+            data = os.pread(fin, count, offset)
+            if not data:
+                raise OSError(errno.EIO, "short read")
+            copied = os.pwrite(fout, data, offset)
+        offset += copied
+
+
+def sparse_copy(src: Path, dst: Path) -> None:
+    """Copy src to dst, skipping holes."""
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        fd_in, fd_out = fin.fileno(), fout.fileno()
+        size = os.fstat(fd_in).st_size
+        offset = 0
+        while offset < size:
+            try:
+                data = os.lseek(fd_in, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    break  # Only a hole remains
+                if e.errno != errno.EINVAL:
+                    raise
+                # No SEEK_DATA support: treat the rest as data
+                _copy_range(fd_in, fd_out, offset, size - offset)
+                break
+            hole = os.lseek(fd_in, data, os.SEEK_HOLE)
+            _copy_range(fd_in, fd_out, data, hole - data)
+            offset = hole
+        os.ftruncate(fd_out, size)
+
+
+def clone_rootfs(src: Path, dst: Path) -> str:
+    """Make dst a private writable copy of src (reflink, else sparse copy).
+
+    Returns:
+        The strategy used
+    """
+    if reflink(src, dst):
+        return STRATEGY_REFLINK
+    sparse_copy(src, dst)
+    return STRATEGY_SPARSE_COPY
+
+
+def provision_rootfs(
+    base_rootfs: Path,
+    rootfs_path: Path,
+    overlay_path: Path,
+    allow_overlay: bool = True,
+    image_store: Path | None = None,
+) -> RootfsProvision:
+    """Provision a lab's disk and return the Firecracker drives for it.
+
+    Args:
+        base_rootfs: Shared base image
+        rootfs_path: Per-lab full image path (reflink / sparse copy)
+        overlay_path: Per-lab overlay drive path (overlay strategy)
+        allow_overlay: False when the VM must have a single standalone
+            disk (snapshot templates)
+        image_store: Shared image store drive to attach read-only, if any
+
+    Blocking; call via asyncio.to_thread.
+    """
+    started = time.monotonic()
+
+    if reflink(base_rootfs, rootfs_path):
+        provision = RootfsProvision(
+            strategy=STRATEGY_REFLINK,
+            drives=[_writable_root_drive(rootfs_path.name)],
+        )
+    elif allow_overlay and settings.microvm_rootfs_overlay_enabled:
+        # Blank sparse file; overlay-init formats it on first boot
+        with open(overlay_path, "wb") as f:
+            f.truncate(settings.microvm_rootfs_overlay_size_mib * 1024 * 1024)
+        provision = RootfsProvision(
+            strategy=STRATEGY_OVERLAY,
+            drives=[
+                {
+                    "drive_id": "rootfs",
+                    "path_on_host": str(base_rootfs),
+                    "is_root_device": True,
+                    "is_read_only": True,
+                },
+                {
+                    "drive_id": "overlay",
+                    "path_on_host": overlay_path.name,
+                    "is_root_device": False,
+                    "is_read_only": False,
+                },
+            ],
+            boot_args="init=/sbin/overlay-init octolab.overlay=/dev/vdb",
+        )
+    else:
+        sparse_copy(base_rootfs, rootfs_path)
+        provision = RootfsProvision(
+            strategy=STRATEGY_SPARSE_COPY,
+            drives=[_writable_root_drive(rootfs_path.name)],
+        )
+
+    if image_store is not None:
+        _attach_image_store(provision, image_store)
+
+    provision.seconds = round(time.monotonic() - started, 3)
+    ROOTFS_PROVISIONS.inc(strategy=provision.strategy)
+    return provision
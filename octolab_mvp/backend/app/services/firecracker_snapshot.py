@@ -0,0 +1,630 @@
+"""Snapshot/restore boot path for Firecracker labs.
+
+A cold boot costs tens of seconds per lab: kernel boot, docker start and
+loading the pre-baked image tarballs. With microvm_snapshot_enabled:
+
+1. A background task boots a golden VM (TEMPLATE_LAB_ID) once per rootfs
+   build, waits for docker and the pre-baked images, pauses it and takes a
+   full memory and device snapshot into templates/<build_id>/
+2. create_vm restores each lab from the current template through
+   Firecracker's snapshot load API: copy the template disk into the lab's
+   state dir, start an empty Firecracker there, load the snapshot with the
+   lab's TAP as a network override, and resume
+3. The restored agent still expects the template token, so the host sends
+   reidentify (lab token, MAC, wall clock, RNG seed) before anything else;
+   IP, gateway and DNS follow via configure_network exactly as on cold boot
+
+Drive and vsock paths in the VM config are relative to the state dir, so
+one snapshot resolves to each lab's own disk copy and vsock socket. The
+guest CID is part of the snapshot and cannot be changed on load; with
+Firecracker's UDS-backed vsock the CID is private to each VM's device, so
+restored VMs sharing the template CID do not conflict.
+
+A template stays current while the base rootfs, image store, kernel,
+Firecracker binary and VM shape are unchanged (template_key()). Otherwise labs cold boot until
+the background task has built a new one. Every backend worker runs that
+task, but the golden VM has one fixed lab ID, so a build only runs under a
+host-wide flock; workers that find it held skip the build and pick up the
+finished template from disk.
+
+SECURITY:
+- The template token is stored 0600 in the template dir and is accepted by
+  a restored VM only until reidentify replaces it
+- Every restored VM gets fresh host entropy mixed into its RNG
+- Build IDs come from the guest and are validated before use as a path
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import secrets
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.config import settings
+from app.services.firecracker_manager import (
+    NetworkConfig,
+    VMMetadata,
+    _generate_token,
+    _get_binary_version,
+    _guest_mac,
+    _read_token,
+    _store_token,
+    _wait_for_agent,
+    cleanup_network_for_lab,
+    create_vm,
+    destroy_vm,
+    send_agent_command,
+    setup_network_for_lab,
+)
+from app.services.firecracker_paths import (
+    TEMPLATE_LAB_ID,
+    ensure_lab_state_dir,
+    lab_log_path,
+    lab_pid_path,
+    lab_rootfs_path,
+    lab_socket_path,
+    lab_state_dir,
+    snapshot_build_lock_path,
+    template_dir,
+    templates_dir,
+)
+from app.services.firecracker_rootfs import clone_rootfs, file_identity, image_store_identity
+from app.services.firecracker_vsock import close_agent_connections
+from app.utils.metrics import track_operation
+
+logger = logging.getLogger(__name__)
+
+# Host part is ignored for unix socket transports but required by httpx
+_API_BASE_URL = "http://firecracker"
+
+# Files in a template directory
+VMSTATE_FILE = "vmstate"
+MEMORY_FILE = "memory"
+ROOTFS_FILE = "rootfs.ext4"
+MANIFEST_FILE = "manifest.json"
+TOKEN_FILE = ".token"
+
+# Staging directories are renamed into place once a snapshot is complete
+STAGING_PREFIX = ".build-"
+
+# Writing a full memory file can take a while on slow disks
+SNAPSHOT_CREATE_TIMEOUT_SECS = 120.0
+
+# Random bytes mixed into each restored guest's RNG
+RESTORE_ENTROPY_BYTES = 64
+
+
+class SnapshotError(Exception):
+    """Raised when a template cannot be built or restored."""
+
+    pass
+
+
+@dataclass
+class TemplateManifest:
+    """What a template was built from. Stored as manifest.json."""
+
+    build_id: str
+    agent_version: str
+    key: str
+    vsock_cid: int
+    created_at: float
+
+
+@dataclass
+class SnapshotTemplate:
+    """A complete template directory."""
+
+    path: Path
+    manifest: TemplateManifest
+
+    @property
+    def vmstate_path(self) -> Path:
+        return self.path / VMSTATE_FILE
+
+    @property
+    def memory_path(self) -> Path:
+        return self.path / MEMORY_FILE
+
+    @property
+    def rootfs_path(self) -> Path:
+        return self.path / ROOTFS_FILE
+
+    def read_token(self) -> str:
+        return (self.path / TOKEN_FILE).read_text().strip()
+
+
+def _load_manifest(path: Path) -> TemplateManifest | None:
+    try:
+        data = json.loads((path / MANIFEST_FILE).read_text())
+        return TemplateManifest(**data)
+    except Exception:
+        return None
+
+
+def _write_private(path: Path, data: str) -> None:
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.write(fd, data.encode())
+    finally:
+        os.close(fd)
+
+
+def _try_build_lock() -> int | None:
+    """Take the host-wide build lock without waiting, or None if it is held."""
+    path = snapshot_build_lock_path()
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def snapshot_build_in_progress() -> bool:
+    """Whether some process on the host holds the template build lock."""
+    try:
+        fd = os.open(snapshot_build_lock_path(), os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+# =============================================================================
+# Firecracker API
+# =============================================================================
+
+
+async def _api_call(
+    api_sock: str,
+    method: str,
+    path: str,
+    body: dict[str, Any],
+    timeout: float = 30.0,
+) -> None:
+    """Call the Firecracker API over its unix socket.
+
+    Raises:
+        SnapshotError: If Firecracker rejects the request
+    """
+    transport = httpx.AsyncHTTPTransport(uds=api_sock)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=_API_BASE_URL, timeout=timeout
+    ) as client:
+        response = await client.request(method, path, json=body)
+
+    if response.status_code >= 300:
+        try:
+            fault = str(response.json().get("fault_message", ""))
+        except ValueError:
+            fault = response.text
+        raise SnapshotError(
+            f"Firecracker {method} {path} failed: {response.status_code} {fault[:200]}"
+        )
+
+
+async def _wait_for_api_socket(
+    socket_path: Path,
+    proc: asyncio.subprocess.Process,
+    timeout: float,
+) -> None:
+    deadline = time.monotonic() + timeout
+    while not socket_path.exists():
+        if proc.returncode is not None:
+            raise SnapshotError(f"Firecracker exited early (code {proc.returncode})")
+        if time.monotonic() >= deadline:
+            raise SnapshotError("Firecracker API socket did not appear")
+        await asyncio.sleep(0.02)
+
+
+# =============================================================================
+# Restore
+# =============================================================================
+
+
+async def _reidentify(lab_id: str, token: str, deadline: float) -> None:
+    """Hand the restored agent its lab identity, retrying until the vsock
+    transport is back after resume."""
+    while True:
+        response = await send_agent_command(
+            lab_id,
+            "reidentify",
+            timeout=2,
+            new_token=token,
+            mac=_guest_mac(lab_id),
+            epoch=time.time(),
+            entropy=base64.b64encode(secrets.token_bytes(RESTORE_ENTROPY_BYTES)).decode(),
+        )
+        if response.ok:
+            return
+        if time.monotonic() >= deadline:
+            raise SnapshotError(
+                f"reidentify failed: {response.error or response.stderr[:200]}"
+            )
+        await asyncio.sleep(0.2)
+
+
+async def restore_vm(
+    lab_id: str,
+    template: SnapshotTemplate,
+    network_config: NetworkConfig,
+) -> VMMetadata:
+    """Restore a lab VM from a snapshot template.
+
+    Called by create_vm (inside the boot slot) with a validated lab ID. On
+    failure the caller destroys the partial VM and cold boots instead.
+
+    Raises:
+        SnapshotError: If any restore step fails
+    """
+    timeout = settings.microvm_snapshot_restore_timeout_secs
+    deadline = time.monotonic() + timeout
+
+    with track_operation("firecracker", "snapshot_restore"):
+        state_dir = ensure_lab_state_dir(lab_id)
+        socket_path = lab_socket_path(lab_id)
+        template_token = template.read_token()
+
+        # The disk must match the memory image, so it comes from the template
+        rootfs_strategy = await asyncio.to_thread(
+            clone_rootfs, template.rootfs_path, lab_rootfs_path(lab_id)
+        )
+
+        log_path = lab_log_path(lab_id)
+        log_path.touch()
+
+        # SECURITY: shell=False, list args only
+        proc = await asyncio.create_subprocess_exec(
+            settings.firecracker_bin,
+            "--api-sock",
+            str(socket_path),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=open(log_path, "w"),
+            start_new_session=True,
+            cwd=str(state_dir),
+        )
+        lab_pid_path(lab_id).write_text(str(proc.pid))
+
+        await _wait_for_api_socket(socket_path, proc, timeout)
+        await _api_call(
+            str(socket_path),
+            "PUT",
+            "/snapshot/load",
+            {
+                "snapshot_path": str(template.vmstate_path),
+                "mem_backend": {
+                    "backend_type": "File",
+                    "backend_path": str(template.memory_path),
+                },
+                "enable_diff_snapshots": False,
+                "resume_vm": True,
+                "network_overrides": [
+                    {"iface_id": "eth0", "host_dev_name": network_config.tap_name},
+                ],
+            },
+            timeout=timeout,
+        )
+
+        # Until reidentify, the guest only knows the template token
+        token = _generate_token()
+        _store_token(lab_id, template_token)
+        await _reidentify(lab_id, token, deadline)
+        _store_token(lab_id, token)
+
+        ping = await _wait_for_agent(
+            str(state_dir / "vsock.sock"),
+            token,
+            timeout=max(deadline - time.monotonic(), 1.0),
+        )
+        if ping.rootfs_build_id != template.manifest.build_id:
+            raise SnapshotError("Restored agent reports a different rootfs build")
+
+    logger.info(
+        f"Restored lab ...{lab_id[-6:]} from template {template.manifest.build_id} "
+        f"(PID={proc.pid})"
+    )
+    return VMMetadata(
+        lab_id=lab_id,
+        pid=proc.pid,
+        cid=template.manifest.vsock_cid,
+        api_sock_path=str(socket_path),
+        state_dir=str(state_dir),
+        boot_mode="snapshot",
+        rootfs_strategy=rootfs_strategy,
+    )
+
+
+# =============================================================================
+# Templates
+# =============================================================================
+
+
+class SnapshotTemplateStore:
+    """Finds the current template and builds new ones.
+
+    Templates are write-once directories; a new rootfs build gets a new
+    directory and older ones are pruned after it is in place.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._current: SnapshotTemplate | None = None
+        self._firecracker_version: str | None = None
+        self._builds = 0
+        self._build_failures = 0
+        self._last_build_seconds: float | None = None
+
+    def template_key(self) -> str | None:
+        """Identity of everything a snapshot depends on, or None if the
+        kernel or base rootfs is missing."""
+        try:
+            rootfs = file_identity(Path(settings.microvm_rootfs_base_path))
+            kernel = file_identity(Path(settings.microvm_kernel_path))
+        except OSError:
+            return None
+
+        if self._firecracker_version is None:
+            self._firecracker_version = _get_binary_version(settings.firecracker_bin) or ""
+
+        parts = {
+            "rootfs": rootfs,
+            "images": image_store_identity(),
+            "kernel": kernel,
+            "firecracker": self._firecracker_version,
+            "vcpu": settings.microvm_vcpu_count,
+            "mem": settings.microvm_mem_size_mib,
+            "vsock_port": settings.microvm_vsock_port,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _find(self, key: str) -> SnapshotTemplate | None:
+        root = templates_dir()
+        if not root.is_dir():
+            return None
+        for path in root.iterdir():
+            if path.name.startswith(STAGING_PREFIX) or not path.is_dir():
+                continue
+            manifest = _load_manifest(path)
+            if manifest and manifest.key == key:
+                return SnapshotTemplate(path=path, manifest=manifest)
+        return None
+
+    def current(self) -> SnapshotTemplate | None:
+        """The template matching the current rootfs and VM config, if any."""
+        key = self.template_key()
+        if key is None:
+            return None
+        with self._lock:
+            cached = self._current
+        if cached and cached.manifest.key == key and cached.path.is_dir():
+            return cached
+
+        found = self._find(key)
+        with self._lock:
+            self._current = found
+        return found
+
+    def needs_build(self) -> bool:
+        return self.template_key() is not None and self.current() is None
+
+    async def build(self) -> SnapshotTemplate | None:
+        """Boot a golden VM, snapshot it and install the template.
+
+        Returns:
+            The new template, the current one if another worker finished it
+            meanwhile, or None if another worker is building right now
+
+        Raises:
+            SnapshotError: If the golden VM is not usable
+            RuntimeError: If the golden VM fails to boot
+            OSError: If the build lock cannot be opened
+        """
+        key = self.template_key()
+        if key is None:
+            raise SnapshotError("Kernel or base rootfs missing")
+
+        lock_fd = _try_build_lock()
+        if lock_fd is None:
+            logger.debug("Snapshot template build held by another worker")
+            return None
+        try:
+            # Built by another worker between our check and taking the lock
+            current = await asyncio.to_thread(self.current)
+            if current is not None:
+                return current
+            return await self._build_locked(key)
+        finally:
+            # Closing the descriptor drops the lock
+            os.close(lock_fd)
+
+    async def _build_locked(self, key: str) -> SnapshotTemplate:
+        started = time.monotonic()
+        logger.info("Building snapshot template")
+        # Leftovers from a build interrupted by a restart
+        await destroy_vm(TEMPLATE_LAB_ID)
+
+        try:
+            with track_operation("firecracker", "snapshot_build"):
+                network_config = await setup_network_for_lab(TEMPLATE_LAB_ID, host_port=0)
+                if network_config is None:
+                    raise SnapshotError("Network allocation failed for golden VM")
+                try:
+                    template = await self._boot_and_snapshot(network_config, key)
+                finally:
+                    await destroy_vm(TEMPLATE_LAB_ID)
+                    await cleanup_network_for_lab(TEMPLATE_LAB_ID)
+        except Exception:
+            with self._lock:
+                self._build_failures += 1
+            raise
+
+        with self._lock:
+            self._current = template
+            self._builds += 1
+            self._last_build_seconds = round(time.monotonic() - started, 1)
+        pruned = await asyncio.to_thread(self.prune, template.path)
+        logger.info(
+            f"Snapshot template {template.manifest.build_id} ready "
+            f"in {self._last_build_seconds}s (pruned {pruned})"
+        )
+        return template
+
+    async def _boot_and_snapshot(
+        self,
+        network_config: NetworkConfig,
+        key: str,
+    ) -> SnapshotTemplate:
+        metadata = await create_vm(TEMPLATE_LAB_ID, network_config, use_snapshot=False)
+
+        ping = await send_agent_command(TEMPLATE_LAB_ID, "ping")
+        if not ping.ok or not ping.rootfs_build_id:
+            raise SnapshotError("Golden VM agent did not report a build ID")
+        final = template_dir(ping.rootfs_build_id)
+
+        images = await send_agent_command(
+            TEMPLATE_LAB_ID,
+            "wait_for_images",
+            timeout=settings.microvm_snapshot_images_timeout_secs,
+        )
+        if not images.ok:
+            raise SnapshotError("Pre-baked images did not load in golden VM")
+
+        # Snapshot an agent that is back in accept(), not parked on a
+        # host connection that will not exist after restore
+        close_agent_connections(str(lab_state_dir(TEMPLATE_LAB_ID) / "vsock.sock"))
+        await asyncio.sleep(0.1)
+
+        api_sock = metadata.api_sock_path
+        await _api_call(api_sock, "PATCH", "/vm", {"state": "Paused"})
+
+        staging = templates_dir() / f"{STAGING_PREFIX}{secrets.token_hex(8)}"
+        staging.mkdir(parents=True, mode=0o700)
+        try:
+            await _api_call(
+                api_sock,
+                "PUT",
+                "/snapshot/create",
+                {
+                    "snapshot_type": "Full",
+                    "snapshot_path": str(staging / VMSTATE_FILE),
+                    "mem_file_path": str(staging / MEMORY_FILE),
+                },
+                timeout=SNAPSHOT_CREATE_TIMEOUT_SECS,
+            )
+
+            # The paused VM no longer writes its disk; it belongs to the snapshot
+            os.replace(lab_rootfs_path(TEMPLATE_LAB_ID), staging / ROOTFS_FILE)
+            _write_private(staging / TOKEN_FILE, _read_token(TEMPLATE_LAB_ID) or "")
+
+            manifest = TemplateManifest(
+                build_id=ping.rootfs_build_id,
+                agent_version=ping.agent_version or "",
+                key=key,
+                vsock_cid=metadata.cid or 0,
+                created_at=time.time(),
+            )
+            (staging / MANIFEST_FILE).write_text(json.dumps(asdict(manifest)))
+
+            # Restores in flight keep their mmap of the old memory file
+            if final.exists():
+                shutil.rmtree(final)
+            os.replace(staging, final)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        return SnapshotTemplate(path=final, manifest=manifest)
+
+    def prune(self, keep: Path) -> int:
+        """Remove every template and staging dir except keep."""
+        root = templates_dir()
+        if not root.is_dir():
+            return 0
+        removed = 0
+        for path in root.iterdir():
+            if path == keep or not path.is_dir():
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            current = self._current
+            return {
+                "current_build_id": current.manifest.build_id if current else None,
+                "builds": self._builds,
+                "build_failures": self._build_failures,
+                "last_build_seconds": self._last_build_seconds,
+            }
+
+
+async def snapshot_template_loop(store: SnapshotTemplateStore | None = None) -> None:
+    """Keep a template for the current rootfs build until cancelled."""
+    store = store or get_snapshot_store()
+    interval = settings.microvm_snapshot_check_interval_seconds
+    logger.info(f"Snapshot template loop started (interval={interval}s)")
+
+    while True:
+        try:
+            if await asyncio.to_thread(store.needs_build):
+                await store.build()
+            await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            logger.info("Snapshot template loop cancelled")
+            break
+        except Exception as e:
+            logger.error(f"Snapshot template loop error: {type(e).__name__}")
+            try:
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                logger.info("Snapshot template loop cancelled")
+                break
+
+
+# =============================================================================
+# Process-wide store
+# =============================================================================
+
+_store: SnapshotTemplateStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotTemplateStore:
+    """Get the process-wide template store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotTemplateStore()
+        return _store
+
+
+def reset_snapshot_store() -> None:
+    """Reset the process-wide template store. Useful for testing."""
+    global _store
+    with _store_lock:
+        _store = None
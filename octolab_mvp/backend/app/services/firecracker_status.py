@@ -6,7 +6,7 @@ runtime drift (labs marked running in DB but no firecracker process).
 SECURITY:
 - Admin-only access (enforced in routes)
 - No secrets in output (paths are basenames only)
-- subprocess.run with shell=False always
+- Processes run via arun_cmd (exec, never a shell)
 """
 
 import logging
@@ -22,6 +22,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models.lab import Lab, LabStatus, RuntimeType
+from app.utils.subprocess_utils import arun_cmd
 
 if TYPE_CHECKING:
     pass
@@ -58,20 +59,13 @@ class FirecrackerStatusResponse:
     summary: str
 
 
-def _list_firecracker_processes() -> list[FirecrackerProcess]:
+async def _list_firecracker_processes() -> list[FirecrackerProcess]:
     """List running firecracker processes using ps.
 
-    SECURITY: shell=False, no user input in command
+    SECURITY: exec without shell, no user input in command
     """
     try:
-        result = subprocess.run(
-            ["ps", "-eo", "pid,comm,args"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-            check=False,
-            shell=False,
-        )
+        result = await arun_cmd(["ps", "-eo", "pid,comm,args"], timeout=10)
         if result.returncode != 0:
             logger.warning(f"ps command failed: {result.stderr[:100]}")
             return []
@@ -171,12 +165,12 @@ async def get_firecracker_status(
     SECURITY:
     - Admin-only (enforced in route)
     - No secrets in output
-    - subprocess.run with shell=False
+    - Processes run via arun_cmd (exec, never a shell)
     """
     generated_at = datetime.now(timezone.utc).isoformat()
 
     # 1. List running Firecracker processes
-    processes = _list_firecracker_processes()
+    processes = await _list_firecracker_processes()
     fc_pids = {p.pid for p in processes}
 
     # 2. Get labs that should be running with Firecracker runtime
@@ -0,0 +1,399 @@
+"""Asyncio transport to the guest agent over Firecracker's hybrid vsock.
+
+Firecracker exposes guest vsock ports on the host as a Unix socket: the host
+connects to <state_dir>/vsock.sock, writes "CONNECT <port>\\n", reads an
+"OK <host_port>\\n" line and then talks to the guest agent directly. The
+agent protocol is one JSON request line answered by one JSON response line.
+
+The previous transport used blocking sockets on the event loop, so a
+compose_up froze every request in the process for minutes. This one:
+
+- Never blocks the loop (asyncio.open_unix_connection), and a cancelled or
+  timed-out request closes its connection instead of returning it
+- Reuses connections per VM: after a response the connection is parked for
+  microvm_agent_conn_idle_seconds and handed to the next request for the
+  same socket (agents answer several requests per connection and close it
+  themselves after a short idle period). A parked connection the agent has
+  already closed is detected by EOF before any response byte and the request
+  is retried once on a fresh connection; older agents that close after every
+  response are handled the same way
+- Reads responses with StreamReader.readuntil, bounded by a size limit
+
+Binary payloads (project archives, build sources) use the agent's framed
+protocol instead when its ping lists our version in "frame_versions": the
+request starts with FRAME_MAGIC and a version byte, then length-prefixed
+frames (H: JSON header with a file list, D: raw file bytes, E: end). The
+agent streams files to disk and answers with P (progress) frames and one R
+(JSON response) frame; commands producing binary output (image_save) send
+it as D frames before the R frame. This avoids base64 (+33%) and holding
+the whole payload in memory on either side.
+
+SECURITY:
+- Requests carry the lab token; it is never logged or put in errors
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import struct
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Parked connections kept per VM socket
+MAX_IDLE_CONNECTIONS_PER_VM = 2
+
+# CONNECT handshake reply ("OK <port>\n") is tiny
+HANDSHAKE_LIMIT_BYTES = 1024
+
+# Framed protocol (must match the guest agent)
+FRAME_MAGIC = b"OCTF"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct(">cI")  # type, payload length
+FRAME_CHUNK_BYTES = 1024 * 1024
+
+
+class AgentTransportError(Exception):
+    """Handshake failed or the agent closed the connection without a response."""
+
+
+class _StaleConnection(Exception):
+    """A reused connection was closed by the agent before it read the request."""
+
+
+class _AgentConnection:
+    def __init__(self, path: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.path = path
+        self.reader = reader
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.idle_timer: asyncio.TimerHandle | None = None
+
+    def close(self) -> None:
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+# vsock socket path -> parked connections (event loop only)
+_idle: dict[str, list[_AgentConnection]] = {}
+
+# vsock socket path -> negotiated frame version (None: JSON lines only)
+_frame_versions: dict[str, int | None] = {}
+
+
+def _response_limit() -> int:
+    # stdout and stderr are each capped at max_output_bytes after parsing;
+    # allow for both plus JSON escaping
+    return max(64 * 1024, 4 * settings.microvm_max_output_bytes)
+
+
+def _checkout(path: str) -> _AgentConnection | None:
+    loop = asyncio.get_running_loop()
+    conns = _idle.get(path)
+    while conns:
+        conn = conns.pop()
+        if conn.idle_timer is not None:
+            conn.idle_timer.cancel()
+            conn.idle_timer = None
+        if conn.loop is loop and not conn.reader.at_eof():
+            return conn
+        conn.close()
+    return None
+
+
+def _expire(conn: _AgentConnection) -> None:
+    conns = _idle.get(conn.path)
+    if conns and conn in conns:
+        conns.remove(conn)
+        if not conns:
+            del _idle[conn.path]
+    conn.idle_timer = None
+    conn.close()
+
+
+def _checkin(conn: _AgentConnection) -> None:
+    idle_seconds = settings.microvm_agent_conn_idle_seconds
+    conns = _idle.setdefault(conn.path, [])
+    if idle_seconds <= 0 or len(conns) >= MAX_IDLE_CONNECTIONS_PER_VM:
+        conn.close()
+        return
+    # Close before the agent's own idle timeout; a parked connection keeps a
+    # serial agent from accepting anyone else
+    conn.idle_timer = conn.loop.call_later(idle_seconds, _expire, conn)
+    conns.append(conn)
+
+
+async def _connect(path: str) -> _AgentConnection:
+    reader, writer = await asyncio.open_unix_connection(path, limit=_response_limit())
+    conn = _AgentConnection(path, reader, writer)
+    try:
+        writer.write(f"CONNECT {settings.microvm_vsock_port}\n".encode())
+        await writer.drain()
+        reply = await reader.readline()
+        if not reply:
+            raise AgentTransportError("No CONNECT response")
+        if not reply.startswith(b"OK"):
+            reply_text = reply[:HANDSHAKE_LIMIT_BYTES].decode(errors="replace").strip()
+            raise AgentTransportError(f"CONNECT failed: {reply_text}")
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+async def _roundtrip(conn: _AgentConnection, payload: bytes, reused: bool) -> bytes:
+    try:
+        conn.writer.write(payload)
+        await conn.writer.drain()
+        line = await conn.reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        conn.close()
+        if not e.partial:
+            if reused:
+                raise _StaleConnection()
+            raise AgentTransportError("No response")
+        # Agent closed without a trailing newline
+        return e.partial
+    except (ConnectionResetError, BrokenPipeError):
+        conn.close()
+        if reused:
+            raise _StaleConnection()
+        raise
+    except asyncio.LimitOverrunError:
+        conn.close()
+        raise AgentTransportError("Response too large")
+    except BaseException:
+        # Cancelled or failed mid-request: the stream position is unknown
+        conn.close()
+        raise
+
+    _checkin(conn)
+    return line
+
+
+async def _exchange(path: str, payload: bytes) -> bytes:
+    conn = _checkout(path)
+    if conn is not None:
+        try:
+            return await _roundtrip(conn, payload, reused=True)
+        except _StaleConnection:
+            pass
+    conn = await _connect(path)
+    return await _roundtrip(conn, payload, reused=False)
+
+
+def _file_size(data: bytes | Path) -> int:
+    return data.stat().st_size if isinstance(data, Path) else len(data)
+
+
+async def _file_chunks(data: bytes | Path):
+    if isinstance(data, Path):
+        with data.open("rb") as f:
+            while chunk := await asyncio.to_thread(f.read, FRAME_CHUNK_BYTES):
+                yield chunk
+        return
+    view = memoryview(data)
+    for offset in range(0, len(view), FRAME_CHUNK_BYTES):
+        yield view[offset:offset + FRAME_CHUNK_BYTES]
+
+
+async def _send_frames(
+    writer: asyncio.StreamWriter,
+    request: dict[str, Any],
+    files: dict[str, bytes | Path],
+) -> None:
+    header = dict(request, files=[{"name": name, "size": _file_size(data)} for name, data in files.items()])
+    payload = json.dumps(header).encode()
+    writer.write(FRAME_MAGIC + bytes([FRAME_VERSION]) + FRAME_HEADER.pack(b"H", len(payload)) + payload)
+    for data in files.values():
+        async for chunk in _file_chunks(data):
+            writer.write(FRAME_HEADER.pack(b"D", len(chunk)))
+            writer.write(chunk)
+            await writer.drain()
+    writer.write(FRAME_HEADER.pack(b"E", 0))
+    await writer.drain()
+
+
+async def _read_response_frame(
+    reader: asyncio.StreamReader,
+    on_progress: Callable[[int, int], None] | None,
+    on_data: Callable[[bytes], None] | None,
+) -> bytes:
+    while True:
+        kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+        if length > max(_response_limit(), FRAME_CHUNK_BYTES):
+            raise AgentTransportError("Response too large")
+        payload = await reader.readexactly(length)
+        if kind == b"R":
+            return payload
+        if kind == b"D" and on_data is not None:
+            on_data(payload)
+        elif kind == b"P":
+            if on_progress is not None:
+                progress = json.loads(payload)
+                on_progress(progress["received"], progress["total"])
+        else:
+            raise AgentTransportError("Unexpected frame")
+
+
+async def _stream_roundtrip(
+    conn: _AgentConnection,
+    request: dict[str, Any],
+    files: dict[str, bytes | Path],
+    on_progress: Callable[[int, int], None] | None,
+    on_data: Callable[[bytes], None] | None,
+    reused: bool,
+) -> bytes:
+    # Send and read concurrently: the agent may reject the request (and
+    # close) before reading the payload, and sends progress while receiving
+    # Once the agent has sent anything, a retry would repeat its output
+    answered = False
+
+    def progress(received: int, total: int) -> None:
+        nonlocal answered
+        answered = True
+        if on_progress is not None:
+            on_progress(received, total)
+
+    def data(chunk: bytes) -> None:
+        nonlocal answered
+        answered = True
+        on_data(chunk)
+
+    sender = asyncio.ensure_future(_send_frames(conn.writer, request, files))
+    try:
+        payload = await _read_response_frame(conn.reader, progress, data if on_data else None)
+    except asyncio.IncompleteReadError as e:
+        conn.close()
+        if reused and not e.partial and not answered:
+            raise _StaleConnection()
+        raise AgentTransportError("No response")
+    except (ConnectionResetError, BrokenPipeError):
+        conn.close()
+        if reused and not answered:
+            raise _StaleConnection()
+        raise
+    except BaseException:
+        conn.close()
+        raise
+    finally:
+        sender.cancel()
+        # A send failure only matters if no response came (handled above)
+        if sender.done() and not sender.cancelled():
+            sender.exception()
+
+    if sender.done() and not sender.cancelled() and sender.exception() is None:
+        _checkin(conn)
+    else:
+        # Answered before the whole payload was sent: stream position unknown
+        conn.close()
+    return payload
+
+
+async def _exchange_stream(
+    path: str,
+    request: dict[str, Any],
+    files: dict[str, bytes | Path],
+    on_progress: Callable[[int, int], None] | None,
+    on_data: Callable[[bytes], None] | None,
+) -> bytes:
+    conn = _checkout(path)
+    if conn is not None:
+        try:
+            return await _stream_roundtrip(conn, request, files, on_progress, on_data, reused=True)
+        except _StaleConnection:
+            pass
+    conn = await _connect(path)
+    return await _stream_roundtrip(conn, request, files, on_progress, on_data, reused=False)
+
+
+async def agent_request(path: str, request: dict[str, Any], timeout: float) -> dict[str, Any]:
+    """Send one request to the agent behind a VM's vsock socket.
+
+    Args:
+        path: Firecracker vsock UDS path (<state_dir>/vsock.sock)
+        request: Request object (including the token)
+        timeout: Seconds for connect, handshake, request and response
+
+    Returns:
+        Decoded response object
+
+    Raises:
+        TimeoutError: The exchange did not complete in time
+        AgentTransportError: Handshake failed or no response
+        OSError: Socket-level failure (e.g. VM not running)
+        ValueError: Response is not valid JSON
+    """
+    payload = json.dumps(request).encode() + b"\n"
+    line = await asyncio.wait_for(_exchange(path, payload), timeout)
+    return json.loads(line.decode().strip())
+
+
+async def frame_version(path: str, token: str, timeout: float) -> int | None:
+    """Framed protocol version the agent behind path accepts (None: JSON only).
+
+    Asks once per VM (ping's "frame_versions") and caches the answer until
+    close_agent_connections(path).
+
+    Raises:
+        Same as agent_request
+    """
+    if path not in _frame_versions:
+        response = await agent_request(path, {"token": token, "command": "ping"}, timeout)
+        if not response.get("ok"):
+            return None
+        offered = response.get("frame_versions") or []
+        _frame_versions[path] = FRAME_VERSION if FRAME_VERSION in offered else None
+    return _frame_versions[path]
+
+
+async def agent_stream(
+    path: str,
+    request: dict[str, Any],
+    files: dict[str, bytes | Path],
+    timeout: float,
+    on_progress: Callable[[int, int], None] | None = None,
+    on_data: Callable[[bytes], None] | None = None,
+) -> dict[str, Any]:
+    """Send one request with binary files using the framed protocol.
+
+    Only call this when frame_version(path, ...) returned a version.
+
+    Args:
+        path: Firecracker vsock UDS path (<state_dir>/vsock.sock)
+        request: Request object (including the token)
+        files: File name -> contents (bytes, or a Path read in chunks),
+            streamed raw in this order
+        timeout: Seconds for the whole exchange
+        on_progress: Called with (received, total) bytes as the agent reports
+        on_data: Called with each chunk of binary output (e.g. image_save);
+            output is refused without it
+
+    Returns:
+        Decoded response object
+
+    Raises:
+        Same as agent_request
+    """
+    payload = await asyncio.wait_for(
+        _exchange_stream(path, request, files, on_progress, on_data), timeout
+    )
+    return json.loads(payload.decode())
+
+
+def close_agent_connections(path: str) -> None:
+    """Close parked connections to one VM (it is being destroyed or snapshotted)."""
+    _frame_versions.pop(path, None)
+    for conn in _idle.pop(path, []):
+        conn.close()
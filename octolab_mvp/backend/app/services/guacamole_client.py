@@ -13,6 +13,7 @@ from typing import Any
 import httpx
 
 from app.config import settings
+from app.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
@@ -106,6 +107,7 @@ class GuacClient:
             raise RuntimeError("GuacClient must be used as async context manager")
         return self._client
 
+    @timed("guacamole", "health_check")
     async def health_check(self) -> bool:
         """Check if Guacamole server is reachable.
 
@@ -122,6 +124,7 @@ class GuacClient:
             logger.warning(f"Guacamole health check failed: {type(e).__name__}")
             return False
 
+    @timed("guacamole", "login")
     async def login(self, username: str, password: str) -> GuacToken:
         """Authenticate and obtain API token.
 
@@ -184,6 +187,7 @@ class GuacClient:
             settings.guac_admin_password.get_secret_value(),
         )
 
+    @timed("guacamole", "create_user")
     async def create_user(
         self,
         token: GuacToken,
@@ -240,6 +244,7 @@ class GuacClient:
             response.status_code,
         )
 
+    @timed("guacamole", "delete_user")
     async def delete_user(self, token: GuacToken, username: str) -> bool:
         """Delete a Guacamole user.
 
@@ -268,6 +273,7 @@ class GuacClient:
         )
         return False
 
+    @timed("guacamole", "create_connection")
     async def create_connection(
         self,
         token: GuacToken,
@@ -329,6 +335,7 @@ class GuacClient:
             response.status_code,
         )
 
+    @timed("guacamole", "delete_connection")
     async def delete_connection(self, token: GuacToken, connection_id: str) -> bool:
         """Delete a Guacamole connection.
 
@@ -357,6 +364,7 @@ class GuacClient:
         )
         return False
 
+    @timed("guacamole", "grant_connection_permission")
     async def grant_connection_permission(
         self,
         token: GuacToken,
@@ -23,16 +23,21 @@ import signal
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
+from uuid import UUID
 
 from app.services.firecracker_paths import (
+    TEMPLATE_LAB_ID,
     lab_pid_path,
     lab_state_dir,
     validate_lab_id,
 )
 from app.services.microvm_net_client import (
+    NetworkError,
     cleanup_port_forward,
-    release_vm_net,
+    list_allocations,
+    release_vm_net_and_forwards,
 )
+from app.utils.subprocess_utils import arun_cmd
 
 logger = logging.getLogger(__name__)
 
@@ -284,25 +289,16 @@ async def targeted_network_cleanup(lab_id: str) -> bool:
         True if cleanup attempted
     """
     safe_lab_id = validate_lab_id(lab_id)
-    success = True
 
-    # Clean up port forwarding via netd
-    try:
-        await cleanup_port_forward(safe_lab_id)
+    # Port forwards and network resources in one netd round-trip (best-effort;
+    # the network might already be released)
+    forwards_removed, released = await release_vm_net_and_forwards(safe_lab_id)
+    if forwards_removed:
         logger.info(f"Port forward cleaned for lab ...{safe_lab_id[-6:]}")
-    except Exception as e:
-        logger.warning(f"Port forward cleanup failed: {type(e).__name__}")
-        success = False
-
-    # Release network resources via netd
-    try:
-        await release_vm_net(safe_lab_id)
+    if released:
         logger.info(f"Network released for lab ...{safe_lab_id[-6:]}")
-    except Exception as e:
-        logger.warning(f"Network release failed: {type(e).__name__}")
-        # Don't fail overall - network might already be released
 
-    return success
+    return True
 
 
 # =============================================================================
@@ -476,8 +472,15 @@ async def find_orphaned_labs() -> list[str]:
     # Import here to avoid circular imports
     from app.db import AsyncSessionLocal
     from app.models.lab import Lab, LabStatus
+    from app.services.microvm_warm_pool import get_microvm_warm_pool, host_standby_lab_ids
     from sqlalchemy import select
 
+    # Standbys of every worker on the host, plus this one's if markers are unusable
+    microvm_pool = get_microvm_warm_pool()
+    standby_ids = await asyncio.to_thread(host_standby_lab_ids)
+    if microvm_pool is not None:
+        standby_ids |= microvm_pool.standby_lab_ids()
+
     async with AsyncSessionLocal() as session:
         for item in state_root.iterdir():
             if not item.is_dir() or not item.name.startswith("lab_"):
@@ -486,6 +489,14 @@ async def find_orphaned_labs() -> list[str]:
             # Extract lab ID from directory name
             lab_id = item.name.replace("lab_", "")
 
+            # Golden VM for snapshot templates; owned by the template builder
+            if lab_id == TEMPLATE_LAB_ID:
+                continue
+
+            # Warm standby VMs have no Lab row until claimed
+            if lab_id in standby_ids:
+                continue
+
             # Check if lab exists and is in active state
             result = await session.execute(
                 select(Lab).where(Lab.id == lab_id)
@@ -552,19 +563,70 @@ async def watchdog_cleanup() -> dict[str, Any]:
 
 
 async def cleanup_orphaned_nat_rules() -> dict[str, Any]:
-    """Clean up NAT rules that don't have matching active labs.
+    """Clean up port forwards that don't have matching active labs.
+
+    netd's allocation index says which lab owns each forward, so this is one
+    netd request and one query. A netd without the index is handled by
+    scraping iptables as before.
 
     Returns:
         Dict with cleanup results
     """
-    import subprocess
-
     results = {
         "rules_found": 0,
         "rules_cleaned": 0,
         "errors": [],
     }
 
+    try:
+        allocations = await list_allocations()
+    except NetworkError as e:
+        logger.warning(f"Cannot list netd allocations: {e.code}")
+        allocations = None
+    if allocations is None:
+        return await _cleanup_orphaned_iptables_nat_rules(results)
+
+    # Import here to avoid circular imports
+    from app.db import AsyncSessionLocal
+    from app.models.lab import Lab, LabStatus
+    from sqlalchemy import select
+
+    forwarded = {a["lab_id"]: a["forwards"] for a in allocations if a.get("forwards")}
+    results["rules_found"] = sum(len(forwards) for forwards in forwarded.values())
+    if not forwarded:
+        return results
+
+    try:
+        async with AsyncSessionLocal() as session:
+            rows = await session.execute(
+                select(Lab.id).where(
+                    Lab.id.in_([UUID(lab_id) for lab_id in forwarded]),
+                    Lab.status.in_([
+                        LabStatus.PROVISIONING,
+                        LabStatus.READY,
+                        LabStatus.DEGRADED,
+                    ]),
+                )
+            )
+            active = {str(lab_id) for lab_id in rows.scalars()}
+    except Exception as e:
+        results["errors"].append(f"cleanup_error:{type(e).__name__}")
+        return results
+
+    for lab_id, forwards in forwarded.items():
+        if lab_id in active:
+            continue
+        if await cleanup_port_forward(lab_id):
+            results["rules_cleaned"] += len(forwards)
+            logger.info(f"Cleaned orphaned port forwards for lab ...{lab_id[-6:]}")
+        else:
+            results["errors"].append(f"delete_failed:{lab_id[-12:]}")
+
+    return results
+
+
+async def _cleanup_orphaned_iptables_nat_rules(results: dict[str, Any]) -> dict[str, Any]:
+    """Fallback for a netd without an allocation index: parse iptables -L."""
     # Import here to avoid circular imports
     from app.db import AsyncSessionLocal
     from app.models.lab import Lab, LabStatus
@@ -572,10 +634,8 @@ async def cleanup_orphaned_nat_rules() -> dict[str, Any]:
 
     try:
         # Get current NAT rules
-        proc = subprocess.run(
+        proc = await arun_cmd(
             ["sudo", "iptables", "-t", "nat", "-L", "PREROUTING", "-n", "--line-numbers"],
-            capture_output=True,
-            text=True,
             timeout=10,
         )
 
@@ -625,7 +685,7 @@ async def cleanup_orphaned_nat_rules() -> dict[str, Any]:
         # Delete orphaned rules (in reverse order to preserve line numbers)
         for line_num, lab_id_short in sorted(rules_to_delete, reverse=True):
             try:
-                subprocess.run(
+                await arun_cmd(
                     ["sudo", "iptables", "-t", "nat", "-D", "PREROUTING", str(line_num)],
                     check=True,
                     timeout=5,
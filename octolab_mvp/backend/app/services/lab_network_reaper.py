@@ -0,0 +1,269 @@
+"""Background reaper for empty per-lab compose networks.
+
+ComposeLabRuntime.create_lab used to run preflight network cleanup before
+every lab: list every octolab network, inspect each one for attachments and
+remove the empty ones, all before the lab could start. This module moves that
+work off the create path:
+
+1. A full scan seeds the set of empty lab networks (at startup, and again
+   whenever the Docker inventory is not in sync, since events were missed)
+2. Docker network events keep the set current in between (create and
+   disconnect add a candidate, connect and destroy drop it)
+3. A background task removes candidates that have stayed empty for
+   compose_network_reaper_min_empty_seconds, every interval, or right away
+   once compose_network_reaper_pressure_threshold candidates pile up
+4. create_lab only reclaims synchronously (reclaim_lab_networks) when
+   compose up actually fails with address pool exhaustion
+
+The minimum empty age matters because compose creates a lab's networks
+before it attaches containers; a network that is empty for a moment may
+belong to a lab that is starting right now.
+
+SECURITY:
+- Only networks matching LAB_NETWORK_PATTERN are ever candidates
+  (never infrastructure or pool networks)
+- Attachments are re-checked right before removal, and the daemon itself
+  refuses to remove a network that is in use
+- Never force-disconnects containers
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any
+
+from app.config import settings
+from app.services.docker_inventory import get_docker_inventory, get_ready_inventory
+from app.services.docker_net import (
+    NetworkCleanupResult,
+    NetworkRemoveResult,
+    inspect_network_containers,
+    is_octolab_lab_network,
+    list_octolab_networks,
+    remove_network,
+)
+
+logger = logging.getLogger(__name__)
+
+# Full rescan at least this often even while events keep the set current
+FULL_RESCAN_SECONDS = 600.0
+
+
+def _attachments(network_name: str) -> list:
+    inventory = get_ready_inventory()
+    if inventory is not None:
+        return inventory.network_attachments(network_name)
+    return inspect_network_containers(network_name)
+
+
+class LabNetworkReaper:
+    """Set of empty lab networks, kept current from scans and Docker events.
+
+    Events arrive on the event loop; scans and removals run in worker
+    threads, so state is guarded by a threading.Lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Network name -> monotonic time it was first seen empty
+        self._empty: dict[str, float] = {}
+        self._last_rescan: float | None = None
+        self._wake: asyncio.Event | None = None
+        self._rescans = 0
+        self._reaped = 0
+        self._pressure_wakeups = 0
+        self._reclaims = 0
+
+    # -------------------------------------------------------------------------
+    # Candidate tracking
+    # -------------------------------------------------------------------------
+
+    def _mark_empty(self, name: str) -> None:
+        with self._lock:
+            self._empty.setdefault(name, time.monotonic())
+            pressure = len(self._empty) >= settings.compose_network_reaper_pressure_threshold
+        if pressure and self._wake is not None and not self._wake.is_set():
+            self._pressure_wakeups += 1
+            self._wake.set()
+
+    def _discard(self, name: str) -> None:
+        with self._lock:
+            self._empty.pop(name, None)
+
+    def on_event(self, event: dict[str, Any]) -> None:
+        """Docker inventory listener (runs on the event loop, after the
+        inventory has applied the event, so attachments are current)."""
+        if event.get("Type") != "network":
+            return
+        action = (event.get("Action") or "").split(":", 1)[0].strip()
+        name = ((event.get("Actor") or {}).get("Attributes") or {}).get("name", "")
+        if not is_octolab_lab_network(name):
+            return
+
+        if action in ("connect", "destroy"):
+            self._discard(name)
+        elif action == "create":
+            self._mark_empty(name)
+        elif action == "disconnect":
+            inventory = get_ready_inventory()
+            if inventory is not None and not inventory.network_attachments(name):
+                self._mark_empty(name)
+
+    def needs_rescan(self) -> bool:
+        """True when events alone cannot be trusted to have kept the set current."""
+        if self._last_rescan is None or get_ready_inventory() is None:
+            return True
+        return time.monotonic() - self._last_rescan >= FULL_RESCAN_SECONDS
+
+    def rescan_sync(self) -> int:
+        """Rebuild the candidate set from a full listing. Returns its size.
+
+        Networks already known empty keep their first-seen time.
+        """
+        inventory = get_ready_inventory()
+        if inventory is not None:
+            names = [n.name for n in inventory.networks()]
+        else:
+            names = [n.name for n in list_octolab_networks()]
+
+        empty = [
+            name for name in names
+            if is_octolab_lab_network(name) and not _attachments(name)
+        ]
+        now = time.monotonic()
+        with self._lock:
+            self._empty = {name: self._empty.get(name, now) for name in empty}
+            self._last_rescan = now
+            self._rescans += 1
+            return len(self._empty)
+
+    # -------------------------------------------------------------------------
+    # Removal
+    # -------------------------------------------------------------------------
+
+    def reap_sync(self, min_empty_seconds: float) -> NetworkCleanupResult:
+        """Remove candidates that have been empty for at least min_empty_seconds."""
+        result = NetworkCleanupResult()
+        now = time.monotonic()
+        with self._lock:
+            due = [name for name, since in self._empty.items() if now - since >= min_empty_seconds]
+
+        for name in due:
+            if _attachments(name):
+                # Reused since it was marked (events may lag); not a candidate
+                self._discard(name)
+                continue
+            outcome = remove_network(name)
+            if outcome in (NetworkRemoveResult.OK, NetworkRemoveResult.NOT_FOUND):
+                self._discard(name)
+            if outcome == NetworkRemoveResult.OK:
+                result.removed_count += 1
+
+        if result.removed_count:
+            with self._lock:
+                self._reaped += result.removed_count
+            logger.info(f"Network reaper removed {result.removed_count} empty lab network(s)")
+        return result
+
+    def reclaim_sync(self) -> NetworkCleanupResult:
+        """Rescan and remove every empty lab network now (pool exhaustion path)."""
+        with self._lock:
+            self._reclaims += 1
+        self.rescan_sync()
+        return self.reap_sync(min_empty_seconds=0.0)
+
+    # -------------------------------------------------------------------------
+    # Scheduling
+    # -------------------------------------------------------------------------
+
+    async def wait(self, timeout: float) -> None:
+        """Sleep until the next interval, or until pressure wakes the reaper."""
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "empty_candidates": len(self._empty),
+                "reaped": self._reaped,
+                "rescans": self._rescans,
+                "pressure_wakeups": self._pressure_wakeups,
+                "reclaims": self._reclaims,
+                "last_rescan_age_seconds": (
+                    round(time.monotonic() - self._last_rescan, 1) if self._last_rescan else None
+                ),
+            }
+
+
+async def network_reaper_loop(reaper: LabNetworkReaper | None = None) -> None:
+    """Keep reaping empty lab networks until cancelled."""
+    reaper = reaper or get_network_reaper()
+    interval = settings.compose_network_reaper_interval_seconds
+    min_empty = settings.compose_network_reaper_min_empty_seconds
+    inventory = get_docker_inventory()
+    inventory.add_event_listener(reaper.on_event)
+    logger.info(f"Lab network reaper loop started (interval={interval}s)")
+
+    try:
+        while True:
+            try:
+                if reaper.needs_rescan():
+                    await asyncio.to_thread(reaper.rescan_sync)
+                await asyncio.to_thread(reaper.reap_sync, min_empty)
+                await reaper.wait(interval)
+            except asyncio.CancelledError:
+                logger.info("Lab network reaper loop cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Lab network reaper loop error: {type(e).__name__}")
+                try:
+                    await asyncio.sleep(interval)
+                except asyncio.CancelledError:
+                    logger.info("Lab network reaper loop cancelled")
+                    break
+    finally:
+        inventory.remove_event_listener(reaper.on_event)
+
+
+async def reclaim_lab_networks() -> NetworkCleanupResult:
+    """Remove all empty lab networks now. Best-effort; never raises.
+
+    Called by create_lab after compose reports address pool exhaustion.
+    """
+    try:
+        return await asyncio.to_thread(get_network_reaper().reclaim_sync)
+    except Exception as e:
+        logger.debug(f"Lab network reclaim failed: {type(e).__name__}")
+        return NetworkCleanupResult()
+
+
+# =============================================================================
+# Process-wide reaper
+# =============================================================================
+
+_reaper: LabNetworkReaper | None = None
+_reaper_lock = threading.Lock()
+
+
+def get_network_reaper() -> LabNetworkReaper:
+    """Get the process-wide reaper."""
+    global _reaper
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = LabNetworkReaper()
+        return _reaper
+
+
+def reset_network_reaper() -> None:
+    """Reset the process-wide reaper. Useful for testing."""
+    global _reaper
+    with _reaper_lock:
+        _reaper = None
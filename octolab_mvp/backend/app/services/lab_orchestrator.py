@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import asyncio
 import logging
 import subprocess
 from pathlib import Path
@@ -12,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.models.lab import Lab, LabStatus
+from app.utils.subprocess_utils import arun_cmd
 
 logger = logging.getLogger(__name__)
 
@@ -72,26 +72,13 @@ class LabOrchestrator:
         return lab
 
     async def _run_compose(self, cmd: Sequence[str]) -> None:
-        """Execute a docker compose command asynchronously."""
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, self._run_blocking, cmd)
-
-    def _run_blocking(self, cmd: Sequence[str]) -> None:
-        """Run subprocess command and raise on failure."""
-        result = subprocess.run(
-            cmd,
+        """Execute a docker compose command and raise CalledProcessError on failure."""
+        await arun_cmd(
+            list(cmd),
             cwd=self.hackvm_dir,
-            capture_output=True,
-            text=True,
-            check=False,
+            check=True,
+            timeout=settings.lab_startup_timeout_seconds,
         )
-        if result.returncode != 0:
-            raise subprocess.CalledProcessError(
-                result.returncode,
-                cmd,
-                output=result.stdout,
-                stderr=result.stderr,
-            )
 
     async def _persist(self, session: AsyncSession, lab: Lab) -> None:
         """Commit and refresh lab state."""
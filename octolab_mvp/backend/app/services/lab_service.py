@@ -22,7 +22,9 @@ from app.runtime.compose_runtime import ComposeLabRuntime
 from app.runtime.firecracker_runtime import FirecrackerLabRuntime, FirecrackerRuntimeError
 from app.services.firecracker_manager import StaleRootfsError
 from app.runtime.exceptions import NetworkPoolExhaustedError, NetworkCleanupBlockedError
-from app.services.port_allocator import allocate_novnc_port, release_novnc_port
+from app.services.compose_warm_pool import get_warm_pool
+from app.services.microvm_warm_pool import get_microvm_warm_pool
+from app.services.port_allocator import allocate_novnc_port, release_novnc_port, reserve_novnc_port
 from app.services.novnc_probe import probe_novnc_ready, NovncNotReady
 from app.services.evidence_sealing import (
     export_compose_logs_to_auth_volume,
@@ -201,9 +203,30 @@ async def create_lab_for_user(
         runtime=runtime_value,  # Server-owned, never from client
     )
 
-    db.add(lab)
-    await db.commit()
-    await db.refresh(lab)
+    # Warm standby (compose only): the lab takes the standby's UUID, so the
+    # already-running project, networks and evidence volumes are its own
+    warm_pool = get_warm_pool() if effective_runtime == "compose" else None
+    standby = warm_pool.claim(recipe.name) if warm_pool is not None else None
+    if standby is not None:
+        lab.id = standby.lab_id
+
+    # Warm microVM (firecracker only): the lab takes the VM's UUID, so the
+    # booted VM's state dir and TAP/IP allocation are its own
+    microvm_pool = get_microvm_warm_pool() if effective_runtime == "firecracker" else None
+    standby_vm = microvm_pool.claim() if microvm_pool is not None else None
+    if standby_vm is not None:
+        lab.id = standby_vm.lab_id
+
+    try:
+        db.add(lab)
+        await db.commit()
+        await db.refresh(lab)
+    except BaseException:
+        if standby is not None:
+            warm_pool.abandon(standby.lab_id)
+        if standby_vm is not None:
+            microvm_pool.abandon(standby_vm.lab_id)
+        raise
 
     # Set evidence volume names (deterministic from lab.id)
     auth_vol, user_vol = get_evidence_volume_names(lab)
@@ -211,6 +234,18 @@ async def create_lab_for_user(
     lab.evidence_user_volume = user_vol
     await db.commit()
 
+    # The standby already publishes its noVNC port; reserve it for this lab.
+    # If another lab holds it, create_lab discards the standby and cold-starts.
+    if standby is not None:
+        reserved = await reserve_novnc_port(
+            db, lab_id=lab.id, owner_id=user.id, port=standby.novnc_port
+        )
+        if not reserved:
+            logger.info(
+                f"Standby port {standby.novnc_port} for lab {lab.id} is taken; "
+                "the lab will cold-start"
+            )
+
     # Re-fetch the lab with tenant isolation to ensure all server-side values
     # (especially updated_at with onupdate) are loaded for serialization
     result = await db.execute(
@@ -0,0 +1,82 @@
+"""Mark compose labs DEGRADED as soon as their target container dies.
+
+Listens to the Docker event stream (via the inventory in docker_inventory)
+for `die` events on a lab project's `target` service. The lab is moved from
+READY to DEGRADED: OctoBox still works, so the user can keep their session,
+but the UI can show that the target is down.
+
+Only READY labs are touched. Labs that are provisioning, ending or finished
+are left alone, because containers dying is expected during teardown. Events
+replayed after a stream reconnect are therefore harmless.
+"""
+
+import asyncio
+import logging
+from typing import Any
+
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal
+from app.models.lab import Lab, LabStatus
+from app.services.docker_inventory import DockerInventory, get_docker_inventory
+from app.services.docker_net import extract_lab_id_from_project
+
+logger = logging.getLogger(__name__)
+
+# Compose service name of the vulnerable target (octolab-hackvm/docker-compose.yml)
+TARGET_SERVICE = "target"
+
+# Strong references to in-flight update tasks (asyncio only keeps weak ones)
+_pending: set[asyncio.Task] = set()
+
+
+def target_death_lab_id(event: dict[str, Any]) -> str | None:
+    """Return the lab ID if the event is a lab target container dying."""
+    if event.get("Type") != "container" or event.get("Action") != "die":
+        return None
+    attributes = (event.get("Actor") or {}).get("Attributes") or {}
+    if attributes.get("com.docker.compose.service") != TARGET_SERVICE:
+        return None
+    return extract_lab_id_from_project(attributes.get("com.docker.compose.project", ""))
+
+
+async def mark_lab_degraded(lab_id: str) -> bool:
+    """Move a READY lab to DEGRADED.
+
+    Returns:
+        True if the lab was updated, False if it was not READY or not found
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Lab).where(Lab.id == lab_id))
+        lab = result.scalar_one_or_none()
+        if lab is None or lab.status != LabStatus.READY:
+            return False
+        lab.status = LabStatus.DEGRADED
+        await session.commit()
+    logger.warning(f"Lab {lab_id} target container died; marked DEGRADED")
+    return True
+
+
+def _on_docker_event(event: dict[str, Any]) -> None:
+    lab_id = target_death_lab_id(event)
+    if lab_id is None:
+        return
+
+    async def _update() -> None:
+        try:
+            await mark_lab_degraded(lab_id)
+        except Exception as e:
+            logger.warning(f"Failed to mark lab {lab_id} DEGRADED: {type(e).__name__}")
+
+    task = asyncio.get_running_loop().create_task(_update())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def register_target_watch(inventory: DockerInventory | None = None) -> None:
+    """Start reacting to target container deaths (call once at startup)."""
+    (inventory or get_docker_inventory()).add_event_listener(_on_docker_event)
+
+
+def unregister_target_watch(inventory: DockerInventory | None = None) -> None:
+    (inventory or get_docker_inventory()).remove_event_listener(_on_docker_event)
@@ -0,0 +1,319 @@
+"""Host-aware admission control for Firecracker VM boots.
+
+A process-local semaphore could not coordinate uvicorn workers, and a fixed
+limit is either too low for a fast disk or too high for a loaded host. Boot
+admission instead:
+
+- Sizes the number of concurrent boots between microvm_min_concurrent_boots
+  and microvm_max_concurrent_boots from PSI ("some avg10" of
+  /proc/pressure/io and /proc/pressure/memory, against their limits) and
+  MemAvailable, re-read on every admission attempt
+- Hands out slots as leases: slot-<n>.lease files under the state dir's
+  boot-leases/, held with flock for the duration of a boot. Every worker on
+  the host competes for the same files, and the kernel drops the lock when a
+  worker dies, so a crash never leaks a slot
+- Queues waiters FIFO within a process and gives each an estimated start
+  time from the recent average boot duration
+
+Shrinking the target never preempts a boot; it only stops new admissions
+until enough leases are released.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from app.config import settings
+from app.services.firecracker_paths import boot_leases_dir
+from app.utils.host_resources import mem_available_mib, pressure_some_avg10
+from app.utils.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+# Boot duration assumed for estimates until a boot has been measured
+INITIAL_BOOT_ESTIMATE_SECONDS = 10.0
+
+# Weight of the newest boot in the moving average
+BOOT_DURATION_EWMA_ALPHA = 0.3
+
+BOOT_QUEUE_DEPTH = get_registry().gauge(
+    "octolab_microvm_boot_queue_depth",
+    "VM boots waiting for admission in this process.",
+)
+BOOT_SLOTS = get_registry().gauge(
+    "octolab_microvm_boot_slots",
+    "Concurrent VM boots currently admitted host-wide (adaptive target).",
+)
+BOOT_IN_PROGRESS = get_registry().gauge(
+    "octolab_microvm_boots_in_progress",
+    "VM boots holding a slot in this process.",
+)
+BOOT_WAIT_SECONDS = get_registry().histogram(
+    "octolab_microvm_boot_wait_seconds",
+    "Time a VM boot waited for admission.",
+)
+
+
+@dataclass
+class BootTicket:
+    """A boot waiting for a slot."""
+
+    lab_id: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+    estimated_start_in: float = 0.0
+
+    def waited_seconds(self, now: float | None = None) -> float:
+        return (now or time.monotonic()) - self.enqueued_at
+
+
+class BootAdmission:
+    """Adaptive, cross-process boot slots.
+
+    State is guarded by a threading.Lock; the admin status endpoint reads
+    stats() while boots are being admitted.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._queue: list[BootTicket] = []
+        # slot index -> lease fd (None: lease dir unusable, process-local slot)
+        self._held: dict[int, int | None] = {}
+        self._target = max(1, settings.microvm_min_concurrent_boots)
+        self._readings: dict[str, float | int | None] = {}
+        self._avg_boot_seconds = INITIAL_BOOT_ESTIMATE_SECONDS
+        self._admitted = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._local_fallback_logged = False
+
+    # -------------------------------------------------------------------------
+    # Sizing
+    # -------------------------------------------------------------------------
+
+    def _bounds(self) -> tuple[int, int]:
+        low = max(1, settings.microvm_min_concurrent_boots)
+        return low, max(low, settings.microvm_max_concurrent_boots)
+
+    def target_slots(self) -> int:
+        """Concurrent boots the host can take right now.
+
+        Scales down linearly from the max as the worst PSI reading approaches
+        its limit, and is capped by how many more VMs fit in MemAvailable
+        above microvm_boot_min_free_mib. Never below the min, so boots always
+        make progress.
+        """
+        low, high = self._bounds()
+        io = pressure_some_avg10("io")
+        memory = pressure_some_avg10("memory")
+        available = mem_available_mib()
+
+        load = 0.0
+        for value, limit in (
+            (io, settings.microvm_boot_io_pressure_limit),
+            (memory, settings.microvm_boot_memory_pressure_limit),
+        ):
+            if value is not None and limit > 0:
+                load = max(load, value / limit)
+        slots = low + int((high - low) * max(0.0, 1.0 - load))
+
+        if available is not None:
+            fits = (available - settings.microvm_boot_min_free_mib) // max(
+                1, settings.microvm_mem_size_mib
+            )
+            slots = min(slots, fits)
+
+        slots = max(low, min(high, slots))
+        with self._lock:
+            self._target = slots
+            self._readings = {
+                "io_pressure": io,
+                "memory_pressure": memory,
+                "mem_available_mib": available,
+            }
+        BOOT_SLOTS.set(slots)
+        return slots
+
+    # -------------------------------------------------------------------------
+    # Leases
+    # -------------------------------------------------------------------------
+
+    def _try_lease(self, target: int, lab_id: str) -> int | None:
+        """Take the first free slot below target, or None if all are held."""
+        try:
+            lease_dir = boot_leases_dir()
+            lease_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        except OSError as e:
+            lease_dir = None
+            self._log_local_fallback(e)
+
+        for slot in range(target):
+            with self._lock:
+                if slot in self._held:
+                    continue
+            if lease_dir is None:
+                fd = None
+            else:
+                try:
+                    fd = os.open(lease_dir / f"slot-{slot}.lease", os.O_RDWR | os.O_CREAT, 0o600)
+                except OSError as e:
+                    self._log_local_fallback(e)
+                    fd = None
+                if fd is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        os.close(fd)
+                        continue  # Held by another worker
+                    # Holder info for operators; the lock is what counts
+                    os.ftruncate(fd, 0)
+                    os.write(fd, f"{os.getpid()} ...{lab_id[-6:]}\n".encode())
+            with self._lock:
+                self._held[slot] = fd
+            return slot
+        return None
+
+    def _log_local_fallback(self, error: OSError) -> None:
+        if not self._local_fallback_logged:
+            self._local_fallback_logged = True
+            logger.warning(
+                f"Boot lease dir unusable ({type(error).__name__}); "
+                "boot slots are only coordinated within this process"
+            )
+
+    def _release(self, slot: int) -> None:
+        with self._lock:
+            fd = self._held.pop(slot, None)
+        if fd is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    # -------------------------------------------------------------------------
+    # Admission
+    # -------------------------------------------------------------------------
+
+    def _update_estimates(self, target: int) -> None:
+        with self._lock:
+            for position, ticket in enumerate(self._queue):
+                ticket.estimated_start_in = round(
+                    (position // target + 1) * self._avg_boot_seconds, 1
+                )
+            BOOT_QUEUE_DEPTH.set(len(self._queue))
+            BOOT_IN_PROGRESS.set(len(self._held))
+
+    @asynccontextmanager
+    async def slot(self, lab_id: str) -> AsyncIterator[float]:
+        """Wait for a boot slot and hold it for the duration of the block.
+
+        Yields:
+            Seconds spent waiting for admission
+        """
+        ticket = BootTicket(lab_id=lab_id)
+        with self._lock:
+            self._queue.append(ticket)
+            position = len(self._queue) - 1
+
+        slot: int | None = None
+        logged = False
+        try:
+            while True:
+                target = self.target_slots()
+                with self._lock:
+                    is_head = self._queue[0] is ticket
+                if is_head:
+                    slot = self._try_lease(target, lab_id)
+                    if slot is not None:
+                        break
+                self._update_estimates(target)
+                if not logged:
+                    logged = True
+                    logger.info(
+                        f"Lab ...{lab_id[-6:]} queued for boot: position={position + 1} "
+                        f"slots={target} estimated_start_in={ticket.estimated_start_in}s"
+                    )
+                await asyncio.sleep(settings.microvm_boot_admission_poll_seconds)
+        finally:
+            with self._lock:
+                self._queue.remove(ticket)
+                BOOT_QUEUE_DEPTH.set(len(self._queue))
+
+        waited = ticket.waited_seconds()
+        BOOT_WAIT_SECONDS.observe(waited)
+        with self._lock:
+            self._admitted += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            BOOT_IN_PROGRESS.set(len(self._held))
+
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self._release(slot)
+            duration = time.monotonic() - started
+            with self._lock:
+                self._avg_boot_seconds += BOOT_DURATION_EWMA_ALPHA * (
+                    duration - self._avg_boot_seconds
+                )
+                BOOT_IN_PROGRESS.set(len(self._held))
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        low, high = self._bounds()
+        with self._lock:
+            return {
+                "min_slots": low,
+                "max_slots": high,
+                "target_slots": self._target,
+                "in_progress": len(self._held),
+                "queue_depth": len(self._queue),
+                "readings": dict(self._readings),
+                "avg_boot_seconds": round(self._avg_boot_seconds, 2),
+                "admitted": self._admitted,
+                "avg_wait_seconds": (
+                    round(self._total_wait / self._admitted, 3) if self._admitted else None
+                ),
+                "max_wait_seconds": round(self._max_wait, 3),
+                "waiting": [
+                    {
+                        "lab": f"...{ticket.lab_id[-6:]}",
+                        "position": position + 1,
+                        "waited_seconds": round(ticket.waited_seconds(now), 1),
+                        "estimated_start_in_seconds": ticket.estimated_start_in,
+                    }
+                    for position, ticket in enumerate(self._queue)
+                ],
+            }
+
+
+# =============================================================================
+# Process-wide controller
+# =============================================================================
+
+_admission: BootAdmission | None = None
+_admission_lock = threading.Lock()
+
+
+def get_boot_admission() -> BootAdmission:
+    """Get the process-wide boot admission controller."""
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = BootAdmission()
+        return _admission
+
+
+def reset_boot_admission() -> None:
+    """Reset the process-wide controller. Useful for testing."""
+    global _admission
+    with _admission_lock:
+        _admission = None
@@ -0,0 +1,281 @@
+"""Content-addressed cache of target images built inside Firecracker labs.
+
+Every lab deployed from a Dockerfile used to run docker_build in its own VM,
+so 30 students launching the same CVE recipe built the same image 30 times.
+Target images are now addressed by content:
+
+1. The key is a SHA-256 over the Dockerfile and source files, and the image
+   is tagged octolab/target-<key prefix>:latest in every lab
+2. On a miss the lab builds as before; the image is then exported with the
+   agent's image_save command to <state_dir>/image-cache/<key>.tar, before
+   the lab's project is uploaded or its port forwarded, so the archive only
+   ever holds what docker_build produced
+3. On a hit the archive is streamed into the new VM with image_load instead
+   of building
+
+Archives are shared by all backend workers on the host: they are written
+under a temporary name and renamed into place. A hit bumps the archive's
+mtime; once the total exceeds microvm_image_cache_max_mib the least
+recently used archives are deleted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.services.firecracker_paths import image_cache_dir
+from app.utils.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached image (e.g. when docker_build changes)
+KEY_VERSION = "1"
+
+ARCHIVE_SUFFIX = ".tar"
+
+CACHE_LOOKUPS = get_registry().counter(
+    "octolab_microvm_image_cache_lookups_total",
+    "Target image cache lookups at lab creation by result (hit or miss).",
+    ("result",),
+)
+CACHE_EVICTIONS = get_registry().counter(
+    "octolab_microvm_image_cache_evictions_total",
+    "Target image archives deleted to stay within the cache size limit.",
+)
+CACHE_BYTES = get_registry().gauge(
+    "octolab_microvm_image_cache_bytes",
+    "Total size of cached target image archives.",
+)
+
+# Receives the archive in chunks; returns whether the export succeeded
+Exporter = Callable[[Callable[[bytes], Any]], Awaitable[bool]]
+
+
+def target_image_key(dockerfile: str, source_files: list[dict]) -> str:
+    """Content hash of a target image's build inputs."""
+    inputs = {
+        "version": KEY_VERSION,
+        "dockerfile": dockerfile,
+        "source_files": sorted(
+            [sf.get("filename", ""), sf.get("content", "")] for sf in source_files
+        ),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class TargetImageCache:
+    """Size-bounded LRU of image archives on disk.
+
+    Counters are per process; the archives themselves are shared.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self._root = root
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._storing: set[str] = set()
+        self._hits = 0
+        self._misses = 0
+        self._stored = 0
+        self._store_failures = 0
+        self._evictions = 0
+
+    def archive_path(self, key: str) -> Path:
+        return self._root / f"{key}{ARCHIVE_SUFFIX}"
+
+    def lookup(self, key: str) -> Path | None:
+        """Archive for key (marked as recently used), or None on a miss."""
+        path = self.archive_path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+        with self._lock:
+            self._hits += 1
+        CACHE_LOOKUPS.inc(result="hit")
+        return path
+
+    def discard(self, key: str) -> None:
+        """Delete key's archive (it failed to load)."""
+        self.archive_path(key).unlink(missing_ok=True)
+
+    def _create_partial(self, key: str) -> tuple[int, Path]:
+        self._root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self._root, prefix=f".{key[:12]}.", suffix=".partial")
+        return fd, Path(tmp_name)
+
+    async def store(self, key: str, export: Exporter) -> bool:
+        """Write the archive produced by export under key, then evict.
+
+        Chunks are written by a worker thread, so the event loop never
+        waits on the disk.
+
+        Returns:
+            True if the archive was stored
+        """
+        fd, tmp_path = await asyncio.to_thread(self._create_partial, key)
+        chunks: queue.SimpleQueue[bytes | None] = queue.SimpleQueue()
+        writer = asyncio.ensure_future(asyncio.to_thread(_write_chunks, fd, chunks))
+        ok = False
+        try:
+            try:
+                ok = await export(chunks.put)
+            finally:
+                chunks.put(None)
+                await writer
+            if ok:
+                await asyncio.to_thread(os.replace, tmp_path, self.archive_path(key))
+        finally:
+            await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+
+        with self._lock:
+            if ok:
+                self._stored += 1
+            else:
+                self._store_failures += 1
+        if ok:
+            await asyncio.to_thread(self.evict)
+        return ok
+
+    async def store_once(self, key: str, export: Exporter) -> bool:
+        """store() unless key is cached already or this process is storing it.
+
+        Export failures are logged, not raised.
+
+        Returns:
+            True if this call stored the archive
+        """
+        with self._lock:
+            if key in self._storing:
+                return False
+            self._storing.add(key)
+        try:
+            if await asyncio.to_thread(self.archive_path(key).exists):
+                return False
+            if await self.store(key, export):
+                logger.info(f"Cached target image {key[:12]}")
+                return True
+            return False
+        except Exception as e:
+            with self._lock:
+                self._store_failures += 1
+            logger.warning(f"Caching target image {key[:12]} failed: {type(e).__name__}")
+            return False
+        finally:
+            with self._lock:
+                self._storing.discard(key)
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """(mtime, size, path) of every archive, least recently used first."""
+        entries = []
+        try:
+            with os.scandir(self._root) as it:
+                for entry in it:
+                    if not entry.name.endswith(ARCHIVE_SUFFIX) or entry.name.startswith("."):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, Path(entry.path)))
+        except FileNotFoundError:
+            pass
+        entries.sort()
+        return entries
+
+    def evict(self) -> int:
+        """Delete least recently used archives above the size limit.
+
+        Returns:
+            Number of archives deleted
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        CACHE_BYTES.set(total)
+        if evicted:
+            with self._lock:
+                self._evictions += evicted
+            CACHE_EVICTIONS.inc(evicted)
+            logger.info(f"Evicted {evicted} cached target image(s)")
+        return evicted
+
+    def stats(self) -> dict[str, Any]:
+        """Snapshot for the admin status endpoint."""
+        entries = self._entries()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "archives": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "stored": self._stored,
+                "store_failures": self._store_failures,
+                "evictions": self._evictions,
+                "storing": len(self._storing),
+            }
+
+
+def _write_chunks(fd: int, chunks: "queue.SimpleQueue[bytes | None]") -> None:
+    """Write chunks to fd until None (on a worker thread).
+
+    After a write error the rest is drained, then the error is raised.
+    """
+    error: OSError | None = None
+    with os.fdopen(fd, "wb") as f:
+        while (chunk := chunks.get()) is not None:
+            if error is None:
+                try:
+                    f.write(chunk)
+                except OSError as e:
+                    error = e
+    if error is not None:
+        raise error
+
+
+_cache: TargetImageCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_target_image_cache() -> TargetImageCache | None:
+    """Get the process-wide target image cache, or None when disabled."""
+    global _cache
+    if settings.microvm_image_cache_max_mib <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TargetImageCache(
+                image_cache_dir(),
+                settings.microvm_image_cache_max_mib * 1024 * 1024,
+            )
+        return _cache
+
+
+def reset_target_image_cache() -> None:
+    """Reset the process-wide cache. Useful for testing."""
+    global _cache
+    with _cache_lock:
+        _cache = None
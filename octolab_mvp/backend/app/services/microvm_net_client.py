@@ -25,11 +25,18 @@ Usage:
 
     # Diagnose network status
     status = await diag_vm_net(lab_id)
+
+    # Several operations in one round-trip
+    results = await batch([{"op": "cleanup_port_forward", "lab_id": ...}, ...])
+
+Async requests share up to microvm_netd_pool_size persistent connections
+(see Low-Level Communication); the *_sync variants use one connection each.
 """
 
 from __future__ import annotations
 
 import asyncio
+import ipaddress
 import json
 import logging
 import socket
@@ -38,6 +45,8 @@ from pathlib import Path
 from typing import Any
 from uuid import UUID
 
+from app.utils.metrics import track_operation
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,7 +56,7 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_SOCKET_PATH = "/run/octolab/microvm-netd.sock"
 DEFAULT_TIMEOUT = 5.0
-MAX_RESPONSE_SIZE = 16384
+MAX_RESPONSE_SIZE = 262144  # One response line (batch and list included)
 
 
 # =============================================================================
@@ -161,15 +170,11 @@ class VMNetworkParams:
 
     @property
     def cidr_prefix(self) -> int:
-        """Get CIDR prefix from netmask."""
-        # Convert netmask to CIDR prefix
-        netmask_map = {
-            "255.255.255.255": 32,
-            "255.255.255.0": 24,
-            "255.255.0.0": 16,
-            "255.0.0.0": 8,
-        }
-        return netmask_map.get(self.netmask, 16)
+        """Get CIDR prefix from netmask (netd sizes subnets freely)."""
+        try:
+            return ipaddress.IPv4Network(f"0.0.0.0/{self.netmask}").prefixlen
+        except ValueError:
+            return 16
 
     @property
     def guest_ip_cidr(self) -> str:
@@ -250,6 +255,254 @@ def netd_socket_exists() -> bool:
 # =============================================================================
 # Low-Level Communication
 # =============================================================================
+#
+# The async client keeps up to microvm_netd_pool_size persistent connections
+# per socket (netd protocol version 2): requests are newline-delimited JSON
+# tagged with an "id", several may be in flight on one connection, and a
+# reader task matches responses to waiters by id. A new connection starts
+# with a hello; a netd without protocol_version 2 answers it and closes the
+# connection, after which requests to that socket use one connection each.
+# netd operations are idempotent, so a request that loses its connection
+# before any response is retried once on a fresh one.
+
+
+class _ConnectionLost(NetdUnavailableError):
+    """The connection closed before the response arrived."""
+
+
+class _NetdConnection:
+    def __init__(self, path: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.path = path
+        self.reader = reader
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.pending: dict[int, asyncio.Future] = {}
+        self.next_id = 1
+        self.closed = False
+        self.reader_task = self.loop.create_task(self._read_responses())
+
+    async def _read_responses(self) -> None:
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                try:
+                    response = json.loads(line.decode("utf-8"))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    logger.warning("Discarding malformed netd response")
+                    continue
+                if not isinstance(response, dict):
+                    continue
+                request_id = response.get("id")
+                if request_id is None and len(self.pending) == 1:
+                    # One-shot netd: answers without the id, then closes
+                    request_id = next(iter(self.pending))
+                waiter = self.pending.pop(request_id, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(response)
+        except (OSError, ValueError):
+            # ValueError: response line over the stream limit
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        for waiter in self.pending.values():
+            if not waiter.done():
+                waiter.set_exception(_ConnectionLost("netd closed the connection"))
+        self.pending.clear()
+        if self.reader_task is not asyncio.current_task():
+            self.reader_task.cancel()
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+    async def request(self, request: dict[str, Any]) -> dict[str, Any]:
+        if self.closed:
+            raise _ConnectionLost("netd connection closed")
+        request_id = self.next_id
+        self.next_id += 1
+        waiter = self.loop.create_future()
+        self.pending[request_id] = waiter
+        try:
+            payload = json.dumps({**request, "id": request_id}).encode("utf-8") + b"\n"
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+            except (ConnectionResetError, BrokenPipeError) as e:
+                self.close()
+                raise _ConnectionLost(f"Cannot send to netd: {e}")
+            return await waiter
+        finally:
+            # Timed out or cancelled: a late response is simply dropped
+            self.pending.pop(request_id, None)
+
+
+# socket path -> persistent connections (event loop only)
+_connections: dict[str, list[_NetdConnection]] = {}
+
+# socket path -> connections being opened
+_opening: dict[str, int] = {}
+
+# socket path -> netd protocol version seen in the connection handshake
+_protocol_versions: dict[str, int] = {}
+
+
+def _pool_size() -> int:
+    try:
+        from app.config import settings
+        return max(0, int(getattr(settings, "microvm_netd_pool_size", 2)))
+    except ImportError:
+        return 2
+
+
+async def _open_stream(socket_path: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    try:
+        return await asyncio.open_unix_connection(socket_path, limit=MAX_RESPONSE_SIZE)
+    except OSError as e:
+        raise NetdUnavailableError(f"Cannot connect to netd: {e}")
+
+
+async def _open_connection(socket_path: str) -> _NetdConnection | None:
+    """Open a persistent connection, or None if netd only serves one-shot requests."""
+    reader, writer = await _open_stream(socket_path)
+    conn = _NetdConnection(socket_path, reader, writer)
+    try:
+        hello_response = await conn.request({"op": "hello"})
+    except BaseException:
+        conn.close()
+        raise
+
+    version = hello_response.get("protocol_version")
+    _protocol_versions[socket_path] = version if isinstance(version, int) else 1
+    if _protocol_versions[socket_path] < 2 or conn.closed:
+        conn.close()
+        return None
+    return conn
+
+
+async def _checkout(socket_path: str) -> _NetdConnection | None:
+    """Least-loaded live connection, opening one while below the pool size.
+
+    Returns None when requests to this socket should use one-shot connections.
+    """
+    size = _pool_size()
+    if size == 0 or _protocol_versions.get(socket_path, 2) < 2:
+        return None
+
+    loop = asyncio.get_running_loop()
+    conns = []
+    for conn in _connections.get(socket_path, []):
+        if conn.loop is loop and not conn.closed:
+            conns.append(conn)
+        elif conn.loop is not loop:
+            # Left over from another event loop (tests); unusable here
+            conn.closed = True
+    _connections[socket_path] = conns
+
+    idle = [conn for conn in conns if not conn.pending]
+    if idle:
+        return idle[0]
+    if len(conns) + _opening.get(socket_path, 0) < size:
+        _opening[socket_path] = _opening.get(socket_path, 0) + 1
+        try:
+            conn = await _open_connection(socket_path)
+        finally:
+            _opening[socket_path] -= 1
+        if conn is not None:
+            _connections.setdefault(socket_path, []).append(conn)
+            return conn
+        return None
+    if conns:
+        return min(conns, key=lambda c: len(c.pending))
+    # Every slot is still opening: wait for nothing, use a one-shot request
+    return None
+
+
+async def _exchange_once(socket_path: str, request: dict[str, Any]) -> dict[str, Any]:
+    """One request on its own connection (netd closes it after answering)."""
+    reader, writer = await _open_stream(socket_path)
+    try:
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await writer.drain()
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            # Older netd closes without a trailing newline
+            line = e.partial
+        except asyncio.LimitOverrunError:
+            raise NetdProtocolError("Response too large")
+    except (ConnectionResetError, BrokenPipeError) as e:
+        raise NetdUnavailableError(f"Connection to netd failed: {e}")
+    finally:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    if not line:
+        raise NetdProtocolError("Empty response from netd")
+    try:
+        response = json.loads(line.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise NetdProtocolError(f"Invalid JSON response: {e}")
+    return response
+
+
+async def _roundtrip(socket_path: str, request: dict[str, Any]) -> dict[str, Any]:
+    conn = await _checkout(socket_path)
+    if conn is None:
+        return await _exchange_once(socket_path, request)
+    try:
+        return await conn.request(request)
+    except _ConnectionLost:
+        # Closed by netd (idle timeout, restart) before answering: retry once
+        conn = await _checkout(socket_path)
+        if conn is None:
+            return await _exchange_once(socket_path, request)
+        return await conn.request(request)
+
+
+def _parse_response(response: Any) -> NetdResult:
+    """Turn a decoded netd response into a NetdResult.
+
+    Raises:
+        NetdProtocolError: Response is not a dict
+    """
+    # Validate response structure
+    if not isinstance(response, dict):
+        raise NetdProtocolError("Response is not a dict")
+
+    ok = response.get("ok", False)
+
+    if ok:
+        # For hello, the entire response IS the result
+        # For other ops, result is in response["result"]
+        result = response.get("result") or response
+        return NetdResult(ok=True, result=result)
+    else:
+        # Handle both old format (error={code, message}) and new format (error="CODE", message="...")
+        error = response.get("error")
+        message = response.get("message")
+
+        if isinstance(error, dict):
+            # Old format: {"error": {"code": "...", "message": "..."}}
+            error_code = error.get("code", "UNKNOWN")
+            error_message = error.get("message", "Unknown error")
+        elif isinstance(error, str):
+            # New format: {"error": "CODE", "message": "..."}
+            error_code = error
+            error_message = message or "Unknown error"
+        else:
+            error_code = "UNKNOWN"
+            error_message = str(error) if error else "Unknown error"
+
+        return NetdResult(ok=False, error_code=error_code, error_message=error_message)
 
 
 def _send_request_sync(
@@ -257,7 +510,23 @@ def _send_request_sync(
     socket_path: str | None = None,
     timeout: float = DEFAULT_TIMEOUT,
 ) -> NetdResult:
-    """Send request to netd synchronously.
+    """Send request to netd synchronously, recording latency per op.
+
+    Error results and raised errors count as failures in the metrics.
+    See _exchange_sync() for arguments and errors.
+    """
+    with track_operation("netd", str(request.get("op", "unknown"))) as op:
+        result = _exchange_sync(request, socket_path, timeout)
+        op.ok = result.ok
+    return result
+
+
+def _exchange_sync(
+    request: dict[str, Any],
+    socket_path: str | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> NetdResult:
+    """Send request to netd synchronously, on a one-shot connection.
 
     Args:
         request: Request dict (will be JSON encoded)
@@ -288,59 +557,36 @@ def _send_request_sync(
         except socket.error as e:
             raise NetdUnavailableError(f"Cannot connect to netd: {e}")
 
-        # Send request
-        request_data = json.dumps(request).encode("utf-8")
+        # Send request (no id: netd answers once and closes)
+        request_data = json.dumps(request).encode("utf-8") + b"\n"
         sock.sendall(request_data)
 
-        # Receive response
-        response_data = b""
-        while len(response_data) < MAX_RESPONSE_SIZE:
+        # Receive response: one line, or everything until close (older netd)
+        chunks: list[bytes] = []
+        received = 0
+        while received < MAX_RESPONSE_SIZE:
             try:
-                chunk = sock.recv(4096)
-                if not chunk:
-                    break
-                response_data += chunk
+                chunk = sock.recv(65536)
             except socket.timeout:
                 break
+            if not chunk:
+                break
+            chunks.append(chunk)
+            received += len(chunk)
+            if b"\n" in chunk:
+                break
+        response_data = b"".join(chunks)
 
         if not response_data:
             raise NetdProtocolError("Empty response from netd")
 
         # Parse response
         try:
-            response = json.loads(response_data.decode("utf-8"))
+            response = json.loads(response_data.split(b"\n", 1)[0].decode("utf-8"))
         except (json.JSONDecodeError, UnicodeDecodeError) as e:
             raise NetdProtocolError(f"Invalid JSON response: {e}")
 
-        # Validate response structure
-        if not isinstance(response, dict):
-            raise NetdProtocolError("Response is not a dict")
-
-        ok = response.get("ok", False)
-
-        if ok:
-            # For hello, the entire response IS the result
-            # For other ops, result is in response["result"]
-            result = response.get("result") or response
-            return NetdResult(ok=True, result=result)
-        else:
-            # Handle both old format (error={code, message}) and new format (error="CODE", message="...")
-            error = response.get("error")
-            message = response.get("message")
-
-            if isinstance(error, dict):
-                # Old format: {"error": {"code": "...", "message": "..."}}
-                error_code = error.get("code", "UNKNOWN")
-                error_message = error.get("message", "Unknown error")
-            elif isinstance(error, str):
-                # New format: {"error": "CODE", "message": "..."}
-                error_code = error
-                error_message = message or "Unknown error"
-            else:
-                error_code = "UNKNOWN"
-                error_message = str(error) if error else "Unknown error"
-
-            return NetdResult(ok=False, error_code=error_code, error_message=error_message)
+        return _parse_response(response)
 
     except NetdUnavailableError:
         raise
@@ -358,17 +604,36 @@ def _send_request_sync(
                 pass
 
 
+async def _exchange(
+    request: dict[str, Any],
+    socket_path: str | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> NetdResult:
+    if socket_path is None:
+        socket_path = get_netd_socket_path()
+
+    # Check socket exists
+    if not Path(socket_path).exists():
+        raise NetdUnavailableError(f"Socket not found: {socket_path}")
+
+    try:
+        response = await asyncio.wait_for(_roundtrip(socket_path, request), timeout)
+    except asyncio.TimeoutError:
+        raise NetdUnavailableError("Connection to netd timed out")
+    return _parse_response(response)
+
+
 async def _send_request(
     request: dict[str, Any],
     socket_path: str | None = None,
     timeout: float = DEFAULT_TIMEOUT,
 ) -> NetdResult:
-    """Send request to netd asynchronously.
+    """Send request to netd asynchronously, recording latency per op.
 
     Args:
         request: Request dict
         socket_path: Override socket path
-        timeout: Socket timeout
+        timeout: Timeout for the whole request (including connecting)
 
     Returns:
         NetdResult
@@ -377,11 +642,20 @@ async def _send_request(
         NetdUnavailableError: Socket not available
         NetdProtocolError: Invalid response
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        None,
-        lambda: _send_request_sync(request, socket_path, timeout),
-    )
+    with track_operation("netd", str(request.get("op", "unknown"))) as op:
+        result = await _exchange(request, socket_path, timeout)
+        op.ok = result.ok
+    return result
+
+
+def close_netd_connections() -> None:
+    """Close persistent netd connections (shutdown, or netd was restarted)."""
+    for conns in _connections.values():
+        for conn in conns:
+            conn.close()
+    _connections.clear()
+    _opening.clear()
+    _protocol_versions.clear()
 
 
 # =============================================================================
@@ -828,6 +1102,41 @@ async def list_lab_networks(
         )
 
 
+async def list_allocations(
+    timeout: float = DEFAULT_TIMEOUT,
+    socket_path: str | None = None,
+) -> list[dict[str, Any]] | None:
+    """List netd's allocation index: which lab owns which TAP, IP and ports.
+
+    Args:
+        timeout: Socket timeout
+        socket_path: Override socket path
+
+    Returns:
+        Dicts with lab_id, tap, guest_ip and forwards ([{host_port,
+        guest_port}]), or None if netd predates the allocation index
+
+    Raises:
+        NetworkError: If operation fails
+    """
+    try:
+        result = await _send_request({"op": "list"}, socket_path, timeout)
+    except NetworkError:
+        raise
+    except Exception as e:
+        raise NetworkError("LIST_FAILED", "Failed to list allocations", str(e))
+
+    if not result.ok:
+        raise NetworkError(
+            result.error_code or "LIST_FAILED",
+            "Failed to list allocations",
+            result.error_message,
+        )
+    if not result.result or "allocations" not in result.result:
+        return None
+    return result.result["allocations"]
+
+
 # =============================================================================
 # New API (Preferred)
 # =============================================================================
@@ -1058,7 +1367,8 @@ async def diag_vm_net(
             tap_master=tap.get("master"),
             bridge_name=bridge.get("name", ""),
             bridge_exists=bridge.get("exists", False),
-            guest_ip=net_params.get("guest_ip", ""),
+            # None until the lab has been allocated an address
+            guest_ip=net_params.get("guest_ip") or "",
             gateway=net_params.get("gateway", ""),
             netmask=net_params.get("netmask", ""),
             dns=net_params.get("dns", ""),
@@ -1358,3 +1668,111 @@ async def cleanup_port_forward(
             f"{type(e).__name__}"
         )
         return False
+
+
+# =============================================================================
+# Batch
+# =============================================================================
+
+
+async def batch(
+    requests: list[dict[str, Any]],
+    stop_on_error: bool = True,
+    timeout: float = DEFAULT_TIMEOUT,
+    socket_path: str | None = None,
+) -> list[NetdResult]:
+    """Run several netd operations in one round-trip, in order.
+
+    Falls back to one request per operation when netd has no batch op.
+
+    Args:
+        requests: Request dicts, e.g. {"op": "release_vm_net", "lab_id": ...}
+        stop_on_error: Skip the remaining operations after the first failure
+        timeout: Timeout for the whole batch
+        socket_path: Override socket path
+
+    Returns:
+        One NetdResult per request; operations skipped after a failure have
+        error_code "SKIPPED"
+
+    Raises:
+        NetworkError: If the batch itself fails
+    """
+    result = await _send_request(
+        {"op": "batch", "requests": requests, "stop_on_error": stop_on_error},
+        socket_path,
+        timeout,
+    )
+
+    if result.ok:
+        responses = result.result.get("responses") if result.result else None
+        if not isinstance(responses, list) or len(responses) != len(requests):
+            raise NetdProtocolError("Batch response does not match requests")
+        return [_parse_response(response) for response in responses]
+
+    if result.error_code != "UNKNOWN_OP":
+        raise NetworkError(
+            result.error_code or "BATCH_FAILED",
+            f"Batch failed: {result.error_message}",
+            result.error_message,
+        )
+
+    # Older netd: same semantics, one request at a time
+    results: list[NetdResult] = []
+    for request in requests:
+        if stop_on_error and results and not results[-1].ok:
+            results.append(NetdResult(
+                ok=False,
+                error_code="SKIPPED",
+                error_message="Skipped after earlier failure",
+            ))
+            continue
+        results.append(await _send_request(request, socket_path, timeout))
+    return results
+
+
+async def release_vm_net_and_forwards(
+    lab_id: UUID | str,
+    timeout: float = DEFAULT_TIMEOUT,
+    socket_path: str | None = None,
+) -> tuple[bool, bool]:
+    """Remove a lab's port forwards and release its network in one round-trip.
+
+    Best-effort operation, like cleanup_port_forward and release_vm_net -
+    logs errors but doesn't raise.
+
+    Args:
+        lab_id: Lab UUID
+        timeout: Timeout for the whole batch
+        socket_path: Override socket path
+
+    Returns:
+        Tuple of (forwards_removed, network_released)
+    """
+    lab_id_str = str(lab_id)
+    logger.info(f"Releasing network and port forwards for lab ...{lab_id_str[-6:]}")
+
+    try:
+        forward, release = await batch(
+            [
+                {"op": "cleanup_port_forward", "lab_id": lab_id_str},
+                {"op": "release_vm_net", "lab_id": lab_id_str},
+            ],
+            stop_on_error=False,
+            timeout=timeout,
+            socket_path=socket_path,
+        )
+    except Exception as e:
+        logger.warning(
+            f"Failed to release network for lab ...{lab_id_str[-6:]}: "
+            f"{type(e).__name__}"
+        )
+        return False, False
+
+    for name, result in (("Port forward cleanup", forward), ("Network release", release)):
+        if not result.ok:
+            logger.warning(
+                f"{name} returned error for lab ...{lab_id_str[-6:]}: {result.error_code}"
+            )
+
+    return forward.ok, release.ok
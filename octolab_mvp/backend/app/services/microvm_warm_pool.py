@@ -0,0 +1,497 @@
+"""Warm standby pool of pre-booted Firecracker microVMs.
+
+A Firecracker lab spends most of its create time before any lab-specific
+work happens: TAP allocation, rootfs provisioning, boot, agent handshake,
+guest network configuration and the pre-baked image load. None of that
+depends on the lab, so the pool does it ahead of demand:
+
+1. The background loop allocates a TAP/IP for a fresh lab UUID, boots the
+   VM and waits until the agent is up, the network configured and the
+   images loaded, then parks it
+2. create_lab_for_user claims a VM and creates the Lab row with that UUID,
+   so the state dir, TAP name and netd allocation all line up
+3. FirecrackerLabRuntime.create_lab takes the VM, sets up the port forward,
+   uploads the project and runs compose
+4. VMs idle longer than the TTL, or booted from a rootfs that has since been
+   replaced, are destroyed and replaced, as are abandoned claims
+
+Isolation:
+- A VM is used by exactly one lab and is never returned to the pool
+- A standby has no port forward and no project until it is activated
+
+Refill respects host memory: a VM is only started while MemAvailable stays
+above microvm_warm_pool_min_free_mib after its guest memory is reserved.
+
+Standby VMs have no Lab row. Each backend worker keeps its own pool, so
+while a worker owns a standby it holds an flock on a marker file named after
+its lab ID in the shared standby dir; the orphan watchdog and the startup
+sweep of every worker skip the lab IDs in host_standby_lab_ids(). The kernel
+drops the lock when its holder dies, so standbys of a dead worker are reaped
+as orphans.
+
+A claim create_lab has not taken within CLAIM_TAKE_TIMEOUT_SECONDS is handed
+over, not destroyed: create_lab may still be about to activate it. Its marker
+is released, so from then on the Lab row decides whether the VM is an orphan,
+and a late take() still gets the VM.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from uuid import UUID, uuid4
+
+from app.config import settings
+from app.services.firecracker_paths import LAB_ID_PATTERN, lab_state_dir, standby_markers_dir
+from app.services.firecracker_rootfs import file_identity, image_store_identity
+from app.utils.host_resources import mem_available_mib
+from app.utils.metrics import get_registry
+
+if TYPE_CHECKING:
+    from app.runtime.firecracker_runtime import FirecrackerLabRuntime
+    from app.services.firecracker_manager import NetworkConfig
+
+logger = logging.getLogger(__name__)
+
+# A claim create_lab has not taken within this window is handed over to its lab
+CLAIM_TAKE_TIMEOUT_SECONDS = 300.0
+
+POOL_CLAIMS = get_registry().counter(
+    "octolab_microvm_warm_pool_claims_total",
+    "Warm microVM claims at lab creation by result (hit or miss).",
+    ("result",),
+)
+POOL_READY = get_registry().gauge(
+    "octolab_microvm_warm_pool_ready",
+    "Booted, unclaimed standby microVMs.",
+)
+
+
+def current_rootfs_key() -> str | None:
+    """Identity of the deployed base rootfs and image store, or None if the
+    rootfs is missing."""
+    try:
+        rootfs = file_identity(Path(settings.microvm_rootfs_base_path))
+    except OSError:
+        return None
+    return f"{rootfs}/{image_store_identity()}"
+
+
+# =============================================================================
+# Host-wide standby markers
+# =============================================================================
+
+_marker_fallback_logged = False
+
+
+def _log_marker_fallback(error: OSError) -> None:
+    global _marker_fallback_logged
+    if not _marker_fallback_logged:
+        _marker_fallback_logged = True
+        logger.warning(
+            f"Standby marker dir unusable ({type(error).__name__}); "
+            "standby VMs are only protected from this process's orphan sweeps"
+        )
+
+
+def _hold_marker(lab_id: UUID) -> int | None:
+    """Mark a lab ID as a standby of this process until _release_marker().
+
+    The marker is locked under a temporary name and renamed into place, so a
+    scan never finds it unlocked. Returns None if the marker dir is unusable.
+    """
+    try:
+        markers = standby_markers_dir()
+        markers.mkdir(mode=0o700, parents=True, exist_ok=True)
+        staging = markers / f".{lab_id}.tmp"
+        fd = os.open(staging, os.O_RDWR | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+    except OSError as e:
+        _log_marker_fallback(e)
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # Holder info for operators; the lock is what counts
+        os.write(fd, f"{os.getpid()}\n".encode())
+        os.rename(staging, markers / str(lab_id))
+    except OSError as e:
+        os.close(fd)
+        staging.unlink(missing_ok=True)
+        _log_marker_fallback(e)
+        return None
+    return fd
+
+
+def _release_marker(lab_id: UUID, fd: int | None) -> None:
+    if fd is None:
+        return
+    try:
+        (standby_markers_dir() / str(lab_id)).unlink(missing_ok=True)
+    except OSError:
+        pass
+    finally:
+        # Closing the descriptor drops the lock
+        os.close(fd)
+
+
+def host_standby_lab_ids() -> set[str]:
+    """Lab IDs owned as standbys by any live backend worker on this host.
+
+    Markers whose holder has died are removed on the way.
+    """
+    try:
+        names = [path.name for path in standby_markers_dir().iterdir()]
+    except OSError:
+        return set()
+
+    live = set()
+    for name in names:
+        if not LAB_ID_PATTERN.match(name):
+            continue
+        path = standby_markers_dir() / name
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+        except OSError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            live.add(name)
+        else:
+            path.unlink(missing_ok=True)
+        finally:
+            os.close(fd)
+    return live
+
+
+# =============================================================================
+# Pool
+# =============================================================================
+
+
+@dataclass
+class StandbyVM:
+    """A booted, agent-ready, unassigned microVM."""
+
+    lab_id: UUID
+    network_config: "NetworkConfig"
+    rootfs_key: str | None
+    build_id: str | None = None
+    created_at: float = field(default_factory=time.monotonic)
+    claimed_at: float | None = None
+    # Set when the VM must not be activated (expired, or claim abandoned)
+    discard: bool = False
+
+    def age_seconds(self, now: float | None = None) -> float:
+        return (now or time.monotonic()) - self.created_at
+
+
+class MicroVMWarmPool:
+    """Bookkeeping for standby VMs; VM work is done by the runtime.
+
+    State is guarded by a threading.Lock and only touched from the event
+    loop, but the orphan watchdog reads standby_lab_ids() from its own task.
+    Every lab ID in _starting, _ready or _claimed has a marker in _markers.
+    """
+
+    def __init__(self, size: int, ttl_seconds: float) -> None:
+        self._lock = threading.Lock()
+        self._size = size
+        self._ttl = ttl_seconds
+        self._ready: list[StandbyVM] = []
+        self._starting: set[UUID] = set()
+        self._claimed: dict[UUID, StandbyVM] = {}
+        # Claims past CLAIM_TAKE_TIMEOUT_SECONDS: owned by their lab, no marker
+        self._handed_over: dict[UUID, StandbyVM] = {}
+        self._markers: dict[UUID, int | None] = {}
+        self._hits = 0
+        self._misses = 0
+        self._started = 0
+        self._start_failures = 0
+        self._memory_deferrals = 0
+        self._recycled = 0
+        self._claims_handed_over = 0
+        self._activated = 0
+        self._activation_failures = 0
+
+    def _update_gauge(self) -> None:
+        POOL_READY.set(len(self._ready))
+
+    # -------------------------------------------------------------------------
+    # Claim / take
+    # -------------------------------------------------------------------------
+
+    def claim(self) -> StandbyVM | None:
+        """Claim a standby VM.
+
+        Returns:
+            The VM (its lab_id must become the Lab ID), or None on a miss
+        """
+        now = time.monotonic()
+        rootfs_key = current_rootfs_key()
+        with self._lock:
+            # Oldest first: it is closest to its TTL
+            while self._ready:
+                vm = self._ready.pop(0)
+                vm.claimed_at = now
+                self._claimed[vm.lab_id] = vm
+                if vm.age_seconds(now) < self._ttl and vm.rootfs_key == rootfs_key:
+                    self._hits += 1
+                    self._update_gauge()
+                    POOL_CLAIMS.inc(result="hit")
+                    return vm
+                # Stale: leave it for the recycler via the claimed map
+                vm.discard = True
+            self._misses += 1
+            self._update_gauge()
+        POOL_CLAIMS.inc(result="miss")
+        return None
+
+    def take(self, lab_id: UUID) -> StandbyVM | None:
+        """Hand a claimed VM to create_lab (once)."""
+        with self._lock:
+            vm = self._claimed.pop(lab_id, None) or self._handed_over.pop(lab_id, None)
+            marker = self._markers.pop(lab_id, None)
+        # The lab row owns the VM from here on
+        _release_marker(lab_id, marker)
+        return vm
+
+    def abandon(self, lab_id: UUID) -> None:
+        """Mark a claim as not going to be taken (discarded on the next tick)."""
+        with self._lock:
+            vm = self._claimed.get(lab_id)
+            if vm is not None:
+                vm.discard = True
+
+    def standby_lab_ids(self) -> set[str]:
+        """Lab IDs owned by this process's pool (ready, starting or claimed-not-taken).
+
+        host_standby_lab_ids() covers every worker; this set is the fallback
+        when the marker dir is unusable.
+        """
+        with self._lock:
+            ids = {str(vm.lab_id) for vm in self._ready}
+            ids.update(str(lab_id) for lab_id in self._claimed)
+            ids.update(str(lab_id) for lab_id in self._starting)
+            return ids
+
+    def record_activation(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._activated += 1
+            else:
+                self._activation_failures += 1
+
+    # -------------------------------------------------------------------------
+    # Maintenance (background task)
+    # -------------------------------------------------------------------------
+
+    def _deficit(self) -> int:
+        with self._lock:
+            return max(0, self._size - len(self._ready) - len(self._starting))
+
+    def _expired(self, rootfs_key: str | None) -> list[StandbyVM]:
+        now = time.monotonic()
+        expired = []
+        handed_over = []
+        with self._lock:
+            keep = []
+            for vm in self._ready:
+                stale = vm.age_seconds(now) >= self._ttl or vm.rootfs_key != rootfs_key
+                (expired if stale else keep).append(vm)
+            self._ready = keep
+            for lab_id, vm in list(self._claimed.items()):
+                timed_out = (
+                    vm.claimed_at is not None
+                    and now - vm.claimed_at >= CLAIM_TAKE_TIMEOUT_SECONDS
+                )
+                if vm.discard:
+                    expired.append(self._claimed.pop(lab_id))
+                elif timed_out:
+                    # create_lab may be activating it right now; never destroy it
+                    self._handed_over[lab_id] = self._claimed.pop(lab_id)
+                    handed_over.append((lab_id, self._markers.pop(lab_id, None)))
+            # Forget handed-over VMs once their lab has been torn down
+            for lab_id in list(self._handed_over):
+                if not lab_state_dir(lab_id).exists():
+                    del self._handed_over[lab_id]
+            self._claims_handed_over += len(handed_over)
+            self._update_gauge()
+        for lab_id, marker in handed_over:
+            _release_marker(lab_id, marker)
+        if handed_over:
+            logger.info(f"Handed {len(handed_over)} untaken warm standby claim(s) to their labs")
+        return expired
+
+    async def recycle(self, runtime: "FirecrackerLabRuntime") -> int:
+        """Destroy expired standbys, abandoned claims and VMs of a replaced rootfs.
+
+        Returns:
+            Number of VMs discarded
+        """
+        expired = self._expired(current_rootfs_key())
+        for vm in expired:
+            await runtime.discard_standby(vm.lab_id)
+            self._forget_marker(vm.lab_id)
+        if expired:
+            with self._lock:
+                self._recycled += len(expired)
+            logger.info(f"Recycled {len(expired)} warm standby VM(s)")
+        return len(expired)
+
+    def _memory_allows_start(self) -> bool:
+        available = mem_available_mib()
+        if available is None:
+            return True
+        headroom = available - settings.microvm_mem_size_mib
+        return headroom >= settings.microvm_warm_pool_min_free_mib
+
+    def _forget_marker(self, lab_id: UUID) -> None:
+        with self._lock:
+            marker = self._markers.pop(lab_id, None)
+        _release_marker(lab_id, marker)
+
+    async def _start_one(self, runtime: "FirecrackerLabRuntime") -> None:
+        lab_id = uuid4()
+        rootfs_key = current_rootfs_key()
+        # Marked before the state dir exists, so no worker's sweep reaps it
+        marker = _hold_marker(lab_id)
+        with self._lock:
+            self._starting.add(lab_id)
+            self._markers[lab_id] = marker
+        started = False
+        try:
+            network_config, ping = await runtime.start_standby(lab_id)
+            started = True
+        except Exception as e:
+            with self._lock:
+                self._start_failures += 1
+            logger.warning(f"Warm standby VM start failed: {type(e).__name__}")
+            return
+        finally:
+            with self._lock:
+                self._starting.discard(lab_id)
+            if not started:
+                self._forget_marker(lab_id)
+
+        with self._lock:
+            self._ready.append(StandbyVM(
+                lab_id=lab_id,
+                network_config=network_config,
+                rootfs_key=rootfs_key,
+                build_id=ping.rootfs_build_id,
+            ))
+            self._started += 1
+            self._update_gauge()
+        logger.info(f"Warm standby VM ready: lab=...{str(lab_id)[-6:]}")
+
+    async def fill(self, runtime: "FirecrackerLabRuntime") -> None:
+        """Boot VMs until the pool is at its configured size or memory is short."""
+        for _ in range(self._deficit()):
+            if not self._memory_allows_start():
+                with self._lock:
+                    self._memory_deferrals += 1
+                logger.info("Warm pool refill deferred: host memory below reserve")
+                return
+            await self._start_one(runtime)
+
+    async def drain(self, runtime: "FirecrackerLabRuntime") -> None:
+        """Destroy every unclaimed standby (shutdown)."""
+        with self._lock:
+            vms = self._ready + list(self._claimed.values())
+            self._ready = []
+            self._claimed = {}
+            self._update_gauge()
+        for vm in vms:
+            await runtime.discard_standby(vm.lab_id)
+            self._forget_marker(vm.lab_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": self._size,
+                "ready": len(self._ready),
+                "starting": len(self._starting),
+                "claimed": len(self._claimed),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "started": self._started,
+                "start_failures": self._start_failures,
+                "memory_deferrals": self._memory_deferrals,
+                "recycled": self._recycled,
+                "claims_handed_over": self._claims_handed_over,
+                "activated": self._activated,
+                "activation_failures": self._activation_failures,
+            }
+
+
+async def microvm_warm_pool_loop(pool: MicroVMWarmPool | None = None) -> None:
+    """Keep the microVM warm pool filled and recycled until cancelled."""
+    pool = pool or get_microvm_warm_pool()
+    if pool is None:
+        return
+    # Local import to avoid circular imports (firecracker_runtime uses this module)
+    from app.runtime import get_runtime_for_type
+
+    runtime = get_runtime_for_type("firecracker")
+    interval = settings.microvm_warm_pool_interval_seconds
+    logger.info(f"MicroVM warm pool loop started (size={settings.microvm_warm_pool_size})")
+
+    while True:
+        try:
+            await pool.recycle(runtime)
+            await pool.fill(runtime)
+            await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            logger.info("MicroVM warm pool loop cancelled")
+            break
+        except Exception as e:
+            logger.error(f"MicroVM warm pool loop error: {type(e).__name__}")
+            try:
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                logger.info("MicroVM warm pool loop cancelled")
+                break
+
+    # Unclaimed VMs have no Lab row; do not leave them running
+    try:
+        await asyncio.shield(pool.drain(runtime))
+    except (asyncio.CancelledError, Exception) as e:
+        logger.warning(f"MicroVM warm pool drain incomplete: {type(e).__name__}")
+
+
+# =============================================================================
+# Process-wide pool
+# =============================================================================
+
+_pool: MicroVMWarmPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_microvm_warm_pool() -> MicroVMWarmPool | None:
+    """Get the process-wide microVM warm pool, or None when disabled."""
+    global _pool
+    if settings.microvm_warm_pool_size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = MicroVMWarmPool(
+                settings.microvm_warm_pool_size,
+                settings.microvm_warm_pool_ttl_seconds,
+            )
+        return _pool
+
+
+def reset_microvm_warm_pool() -> None:
+    """Reset the process-wide pool. Useful for testing."""
+    global _pool
+    with _pool_lock:
+        _pool = None
@@ -16,6 +16,8 @@ from datetime import datetime, timezone
 from typing import Optional
 from urllib.parse import quote
 
+from app.utils.subprocess_utils import arun_cmd
+
 logger = logging.getLogger(__name__)
 
 
@@ -144,26 +146,15 @@ async def _http_probe(url: str) -> None:
     # Use curl via subprocess for HTTP check (simpler than adding httpx dependency)
     # -s: silent, -o /dev/null: discard body, -w %{http_code}: output status code only
     # --max-time: timeout per request
-    proc = await asyncio.create_subprocess_exec(
-        "curl",
-        "-s",
-        "-o",
-        "/dev/null",
-        "-w",
-        "%{http_code}",
-        "--max-time",
-        "5",
-        url,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+    result = await arun_cmd(
+        ["curl", "-s", "-o", "/dev/null", "-w", "%{http_code}", "--max-time", "5", url],
+        timeout=10.0,
     )
 
-    stdout, stderr = await proc.communicate()
-
-    if proc.returncode != 0:
-        raise Exception(f"curl failed with return code {proc.returncode}")
+    if result.returncode != 0:
+        raise Exception(f"curl failed with return code {result.returncode}")
 
-    status_code = stdout.decode().strip()
+    status_code = result.stdout.strip()
 
     # Accept 2xx and 3xx as success (noVNC may redirect to vnc.html)
     if status_code.startswith("2") or status_code.startswith("3"):
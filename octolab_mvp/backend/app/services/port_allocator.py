@@ -139,4 +139,67 @@ async def release_novnc_port(session: AsyncSession, *, lab_id: UUID) -> bool:
             await session.rollback()
         except Exception:
             pass
-        return False
\ No newline at end of file
+        return False
+
+
+async def reserve_novnc_port(
+    session: AsyncSession, *, lab_id: UUID, owner_id: UUID, port: int
+) -> bool:
+    """
+    Reserve a specific noVNC port for a lab (warm standby stacks).
+
+    Standby stacks publish their port before any lab row exists; the claiming
+    lab records that port here so the usual allocate/release path applies.
+
+    Args:
+        session: Database session for transaction
+        lab_id: ID of the lab taking the port
+        owner_id: Owner ID for tenant scoping (must match authenticated principal)
+        port: Port already published by the standby stack
+
+    Returns:
+        True if reserved, False if the lab already has a port or another lab holds it
+    """
+    from sqlalchemy import text
+
+    try:
+        result = await session.execute(
+            text("UPDATE labs SET novnc_host_port = :port WHERE id = :lab_id AND owner_id = :owner_id AND novnc_host_port IS NULL"),
+            {"port": port, "lab_id": lab_id, "owner_id": owner_id}
+        )
+        if result.rowcount == 1:
+            await session.commit()
+            logger.info(f"Reserved standby port {port} for lab {lab_id}")
+            return True
+        await session.rollback()
+        return False
+    except IntegrityError:
+        # Another lab reserved this port while the standby was idle
+        await session.rollback()
+        return False
+
+
+async def pick_unreserved_port(session: AsyncSession, *, exclude: set[int] | None = None) -> int:
+    """
+    Pick a random port in the compose range not reserved by any lab.
+
+    Used for warm standby stacks, which have no lab row yet. The pick is not
+    reserved; a racing lab that takes the same port hits the usual
+    "port is already allocated" retry in ComposeLabRuntime.create_lab.
+
+    Raises:
+        RuntimeError: If no free port was found after bounded retries
+    """
+    result = await session.execute(
+        select(Lab.novnc_host_port).where(Lab.novnc_host_port.is_not(None))
+    )
+    used = set(result.scalars().all()) | (exclude or set())
+
+    for _ in range(50):
+        candidate_port = secrets.randbelow(settings.compose_port_max - settings.compose_port_min + 1) + settings.compose_port_min
+        if candidate_port not in used:
+            return candidate_port
+
+    raise RuntimeError(
+        f"Unable to pick an unreserved noVNC port in {settings.compose_port_min}-{settings.compose_port_max}"
+    )
@@ -0,0 +1,328 @@
+"""Stream Docker volume contents into a local directory.
+
+Evidence export and sealing used to start a throwaway alpine container per
+volume, run tar inside it, capture the whole tar stream in memory with
+subprocess.run(capture_output=True), write it to a spool file and only then
+extract it. For 200MB pcaps that is a container start plus three full
+copies of the data.
+
+This module reads a volume in the cheapest way available, never holding
+more than one chunk in memory:
+
+1. Mountpoint: when the backend runs on the docker host with read access to
+   the volume's Mountpoint, files are copied with safe_copy_tree (no
+   container, no tar)
+2. Engine API: a reader container is created but never started, and
+   GET /containers/{id}/archive is streamed into the tar validator
+3. CLI: same reader container via `docker create`, with `docker cp <id>:/src -`
+   piped (not captured) into the tar validator
+
+SECURITY:
+- Every path goes through app.utils.safe_extract: traversal is rejected,
+  links/devices/FIFOs are skipped, size limits are enforced while copying,
+  uid/gid/mode are never preserved (0o700 dirs, 0o600 files)
+- The reader container never runs a process; it only anchors the read-only
+  volume mount for the archive call (network none, caps dropped)
+- Missing volumes are detected up front so a read never creates a volume
+- All docker calls use argument lists (shell=False)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from app.config import settings
+from app.services.docker_engine import DockerEngineClient, DockerEngineError, try_engine
+from app.utils.fs import safe_mkdir
+from app.utils.safe_extract import (
+    COPY_CHUNK_SIZE,
+    UnsafeArchiveError,
+    safe_copy_tree,
+    safe_extract_tarfile_from_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+# Limits used by evidence export/sealing (pcaps dominate)
+VOLUME_MAX_TOTAL_BYTES = 500 * 1024 * 1024
+VOLUME_MAX_MEMBER_BYTES = 200 * 1024 * 1024
+
+# Wall-clock budget for one archive stream
+VOLUME_READ_TIMEOUT_SECONDS = 60
+
+# Pinned image for the (never started) reader container
+READER_IMAGE = "alpine:3.20"
+READER_LABEL = "octolab.volume_reader"
+_MOUNT_PATH = "/src"
+
+_CLI_TIMEOUT = 30
+
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            # Releases the HTTP stream when extraction stops early
+            close()
+        super().close()
+
+
+def _extract_stream(fileobj, target_dir: Path, max_total_bytes: int, max_member_bytes: int) -> list[str]:
+    # Archives are rooted at "src/"; skip_special mirrors the old `find -type f`
+    return safe_extract_tarfile_from_stream(
+        fileobj,
+        target_dir,
+        max_total_bytes=max_total_bytes,
+        max_member_bytes=max_member_bytes,
+        strip_components=1,
+        skip_special=True,
+    )
+
+
+def _inspect_volume(volume_name: str) -> tuple[bool, str | None]:
+    """Return (exists, mountpoint). Unknown errors count as existing."""
+    ok, info = try_engine(lambda c: c.inspect_volume(volume_name, timeout=_CLI_TIMEOUT))
+    if ok:
+        if info is None:
+            return False, None
+        return True, info.get("Mountpoint") or None
+
+    cmd = ["docker", "volume", "inspect", "--format", "{{.Mountpoint}}", volume_name]
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=_CLI_TIMEOUT,
+            shell=False,
+        )
+    except subprocess.TimeoutExpired:
+        logger.debug(f"Timeout inspecting volume {volume_name}")
+        return True, None
+    except Exception as e:
+        logger.debug(f"Error inspecting volume {volume_name}: {type(e).__name__}")
+        return True, None
+    if result.returncode != 0:
+        if "no such volume" in (result.stderr or "").lower():
+            return False, None
+        return True, None
+    return True, result.stdout.strip() or None
+
+
+def _readable_mountpoint(mountpoint: str | None) -> Path | None:
+    if not mountpoint or not settings.evidence_volume_mountpoint_read:
+        return None
+    path = Path(mountpoint)
+    try:
+        if path.is_dir() and os.access(path, os.R_OK | os.X_OK):
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def _reader_config(volume_name: str) -> dict:
+    return {
+        "Image": READER_IMAGE,
+        "Cmd": ["true"],
+        "User": "1000:1000",
+        "NetworkDisabled": True,
+        "Labels": {READER_LABEL: "1"},
+        "HostConfig": {
+            "Binds": [f"{volume_name}:{_MOUNT_PATH}:ro"],
+            "NetworkMode": "none",
+            "CapDrop": ["ALL"],
+            "SecurityOpt": ["no-new-privileges"],
+        },
+    }
+
+
+def _read_via_engine(
+    client: DockerEngineClient,
+    volume_name: str,
+    target_dir: Path,
+    max_total_bytes: int,
+    max_member_bytes: int,
+    timeout: float,
+) -> list[str]:
+    container_id = client.create_container(_reader_config(volume_name), timeout=_CLI_TIMEOUT)
+    try:
+        stream = _ChunkStream(
+            client.iter_archive(container_id, _MOUNT_PATH, chunk_size=COPY_CHUNK_SIZE, timeout=timeout)
+        )
+        with stream:
+            return _extract_stream(stream, target_dir, max_total_bytes, max_member_bytes)
+    finally:
+        try:
+            client.remove_container(container_id, force=True, volumes=False, timeout=_CLI_TIMEOUT)
+        except DockerEngineError as e:
+            logger.debug(f"Failed to remove volume reader container: {type(e).__name__}")
+
+
+def _read_via_cli(
+    volume_name: str,
+    target_dir: Path,
+    max_total_bytes: int,
+    max_member_bytes: int,
+    timeout: float,
+) -> list[str]:
+    create_cmd = [
+        "docker",
+        "create",
+        "--network", "none",
+        "--cap-drop", "ALL",
+        "--security-opt", "no-new-privileges",
+        "--user", "1000:1000",
+        "--label", f"{READER_LABEL}=1",
+        "-v", f"{volume_name}:{_MOUNT_PATH}:ro",
+        READER_IMAGE,
+        "true",
+    ]
+    try:
+        result = subprocess.run(
+            create_cmd,
+            capture_output=True,
+            text=True,
+            timeout=_CLI_TIMEOUT,
+            shell=False,
+        )
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Timeout creating reader for volume {volume_name}")
+        return []
+    except Exception as e:
+        logger.warning(f"Error creating reader for volume {volume_name}: {type(e).__name__}")
+        return []
+    container_id = result.stdout.strip()
+    if result.returncode != 0 or not container_id:
+        logger.warning(f"Failed to create reader for volume {volume_name}")
+        return []
+
+    try:
+        # stdout is piped straight into the extractor: nothing is captured
+        proc = subprocess.Popen(
+            ["docker", "cp", f"{container_id}:{_MOUNT_PATH}", "-"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            shell=False,
+        )
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        try:
+            with proc.stdout:
+                files = _extract_stream(proc.stdout, target_dir, max_total_bytes, max_member_bytes)
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        if proc.returncode != 0:
+            logger.warning(f"docker cp failed for volume {volume_name} (rc={proc.returncode})")
+        return files
+    finally:
+        try:
+            subprocess.run(
+                ["docker", "rm", "-f", container_id],
+                capture_output=True,
+                timeout=_CLI_TIMEOUT,
+                shell=False,
+            )
+        except Exception as e:
+            logger.debug(f"Failed to remove volume reader container: {type(e).__name__}")
+
+
+def read_volume_to_dir_sync(
+    volume_name: str,
+    target_dir: Path,
+    *,
+    max_total_bytes: int = VOLUME_MAX_TOTAL_BYTES,
+    max_member_bytes: int = VOLUME_MAX_MEMBER_BYTES,
+    timeout: float = VOLUME_READ_TIMEOUT_SECONDS,
+) -> list[str]:
+    """Copy the regular files of a volume into target_dir (must exist).
+
+    Returns:
+        File paths relative to target_dir; [] when the volume is missing,
+        empty, unreadable or contains unsafe content
+    """
+    exists, mountpoint = _inspect_volume(volume_name)
+    if not exists:
+        logger.debug(f"Volume {volume_name} does not exist")
+        return []
+
+    try:
+        source = _readable_mountpoint(mountpoint)
+        if source is not None:
+            return safe_copy_tree(
+                source,
+                target_dir,
+                max_total_bytes=max_total_bytes,
+                max_member_bytes=max_member_bytes,
+            )
+
+        ok, files = try_engine(
+            lambda c: _read_via_engine(
+                c, volume_name, target_dir, max_total_bytes, max_member_bytes, timeout
+            )
+        )
+        if ok:
+            return files
+        return _read_via_cli(volume_name, target_dir, max_total_bytes, max_member_bytes, timeout)
+    except UnsafeArchiveError as e:
+        logger.warning(f"Unsafe content in volume {volume_name}: {e}")
+        return []
+    except Exception as e:
+        logger.warning(f"Error reading volume {volume_name}: {type(e).__name__}")
+        return []
+
+
+async def extract_volume_to_dir(
+    volume_name: str,
+    dest_dir: Path,
+    subfolder: str,
+    *,
+    max_total_bytes: int = VOLUME_MAX_TOTAL_BYTES,
+    max_member_bytes: int = VOLUME_MAX_MEMBER_BYTES,
+) -> list[str]:
+    """Copy a volume into dest_dir/subfolder.
+
+    Returns:
+        File paths relative to dest_dir (prefixed with subfolder)
+    """
+    target_dir = dest_dir / subfolder
+    safe_mkdir(target_dir, mode=0o700)
+
+    files = await asyncio.to_thread(
+        read_volume_to_dir_sync,
+        volume_name,
+        target_dir,
+        max_total_bytes=max_total_bytes,
+        max_member_bytes=max_member_bytes,
+    )
+    return [f"{subfolder}/{f}" for f in files or []]
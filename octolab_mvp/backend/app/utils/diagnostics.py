@@ -9,13 +9,14 @@ Security:
 - shell=False for subprocess calls
 """
 
-import asyncio
 import logging
 import subprocess
 from pathlib import Path
 from typing import Optional
 from uuid import UUID
 
+from app.utils.subprocess_utils import arun_cmd
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,23 +56,17 @@ async def collect_compose_diagnostics(
 
     # Collect: docker compose ps
     try:
-        result = await asyncio.create_subprocess_exec(
-            *compose_cmd,
-            "ps",
-            "-a",  # Show all containers
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await asyncio.wait_for(result.communicate(), timeout=10.0)
+        # Show all containers
+        result = await arun_cmd([*compose_cmd, "ps", "-a"], timeout=10.0)
 
         if result.returncode == 0:
-            diagnostics["compose_ps"] = stdout.decode("utf-8", errors="replace")
+            diagnostics["compose_ps"] = result.stdout
         else:
-            error_msg = stderr.decode("utf-8", errors="replace")
+            error_msg = result.stderr
             errors.append(f"compose ps failed: {error_msg[:500]}")
             diagnostics["compose_ps"] = f"ERROR: {error_msg[:500]}"
 
-    except asyncio.TimeoutError:
+    except subprocess.TimeoutExpired:
         errors.append("compose ps timed out")
         diagnostics["compose_ps"] = "ERROR: Timed out"
     except Exception as e:
@@ -80,28 +75,23 @@ async def collect_compose_diagnostics(
 
     # Collect: docker compose logs (last N lines)
     try:
-        result = await asyncio.create_subprocess_exec(
-            *compose_cmd,
-            "logs",
-            "--tail",
-            str(max_log_lines),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+        result = await arun_cmd(
+            [*compose_cmd, "logs", "--tail", str(max_log_lines)],
+            timeout=30.0,
         )
-        stdout, stderr = await asyncio.wait_for(result.communicate(), timeout=30.0)
 
         if result.returncode == 0:
-            logs = stdout.decode("utf-8", errors="replace")
+            logs = result.stdout
             # Truncate if still too large
             if len(logs) > 50000:
                 logs = logs[-50000:] + "\n... (truncated)"
             diagnostics["compose_logs"] = logs
         else:
-            error_msg = stderr.decode("utf-8", errors="replace")
+            error_msg = result.stderr
             errors.append(f"compose logs failed: {error_msg[:500]}")
             diagnostics["compose_logs"] = f"ERROR: {error_msg[:500]}"
 
-    except asyncio.TimeoutError:
+    except subprocess.TimeoutExpired:
         errors.append("compose logs timed out")
         diagnostics["compose_logs"] = "ERROR: Timed out"
     except Exception as e:
@@ -0,0 +1,43 @@
+"""Host resource readings from /proc.
+
+Every reader returns None when the value is unavailable (non-Linux host,
+restricted /proc), so callers can decide whether to fail open or closed.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+MEMINFO_PATH = Path("/proc/meminfo")
+PRESSURE_DIR = Path("/proc/pressure")
+
+
+def mem_available_mib(path: Path = MEMINFO_PATH) -> int | None:
+    """MemAvailable from /proc/meminfo, in MiB."""
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def pressure_some_avg10(resource: str, pressure_dir: Path = PRESSURE_DIR) -> float | None:
+    """PSI "some avg10" for a resource (io, memory, cpu), in percent.
+
+    The share of the last 10 seconds in which at least one task was stalled
+    on the resource. None without PSI (kernel < 4.20 or psi=0).
+    """
+    try:
+        with open(pressure_dir / resource) as f:
+            for line in f:
+                if line.startswith("some "):
+                    for part in line.split()[1:]:
+                        key, _, value = part.partition("=")
+                        if key == "avg10":
+                            return float(value)
+    except (OSError, ValueError):
+        return None
+    return None
@@ -0,0 +1,84 @@
+"""Small state records shared by every backend worker on the host.
+
+The backend runs several uvicorn workers. Anything they must agree on (which
+lab owns a pooled resource) is kept in one-line files under a private
+directory and changed only under flock, so a read-check-write on a record is
+atomic host-wide. The kernel drops a flock when its holder dies, so a crashed
+worker never wedges the others.
+
+SECURITY:
+- Directories are created 0700 and refused if they are symlinks, owned by
+  another user or accessible to group/other
+- Record files are opened with O_NOFOLLOW and created 0600
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import stat
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+def ensure_private_dir(path: Path) -> Path:
+    """Create a 0700 directory (or check an existing one) owned by this user.
+
+    Raises:
+        PermissionError: The path is a symlink, not a directory, owned by
+            another user, or accessible to group/other
+        OSError: It could not be created
+    """
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"Not a private directory: {path.name}")
+    return path
+
+
+class LockedRecord:
+    """A record file held under an exclusive flock."""
+
+    def __init__(self, fd: int) -> None:
+        self._fd = fd
+
+    def read(self) -> str:
+        return os.pread(self._fd, 4096, 0).decode(errors="replace").strip()
+
+    def write(self, value: str) -> None:
+        os.ftruncate(self._fd, 0)
+        if value:
+            os.pwrite(self._fd, f"{value}\n".encode(), 0)
+
+
+@contextmanager
+def locked_record(path: Path, create: bool = True) -> Iterator[LockedRecord]:
+    """Open and exclusively lock a record file.
+
+    Raises:
+        FileNotFoundError: create is False and the record does not exist
+    """
+    flags = os.O_RDWR | os.O_NOFOLLOW | (os.O_CREAT if create else 0)
+    fd = os.open(path, flags, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield LockedRecord(fd)
+    finally:
+        # Closing the descriptor drops the lock
+        os.close(fd)
+
+
+def read_record(path: Path) -> tuple[str, float]:
+    """A record's value and mtime without locking ("" if it does not exist).
+
+    Good enough for scans; decisions are re-checked under locked_record().
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    except FileNotFoundError:
+        return "", 0.0
+    try:
+        return os.pread(fd, 4096, 0).decode(errors="replace").strip(), os.fstat(fd).st_mtime
+    finally:
+        os.close(fd)
@@ -0,0 +1,422 @@
+"""Lightweight in-process metrics registry (counters, gauges, histograms).
+
+Host operations (docker CLI/API calls, compose commands, guest agent
+commands, microvm-netd requests, Guacamole API calls) record their latency
+here so provisioning time can be broken down per operation type without an
+external metrics service. The registry renders in the Prometheus text
+exposition format for GET /admin/metrics.
+
+Histograms keep cumulative buckets (aggregatable across replicas) and a
+bounded window of recent observations per label set, from which p50/p95/p99
+are computed and exposed as a "<name>_recent" summary.
+
+Usage:
+    with track_operation("docker", "docker network rm") as op:
+        result = subprocess.run(...)
+        op.ok = result.returncode == 0
+
+    @timed("guacamole", "login")
+    async def login(...): ...
+
+SECURITY:
+- Label values must be operation names chosen by code, never lab IDs,
+  network names or other per-request values (unbounded cardinality, and
+  the endpoint output is visible to every admin)
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Sequence, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Histogram bucket upper bounds (seconds); a final +Inf bucket is implied
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0,
+)
+
+# Quantiles reported for each histogram label set
+DEFAULT_QUANTILES: tuple[float, ...] = (0.5, 0.95, 0.99)
+
+# Recent observations kept per label set for quantile estimation
+DEFAULT_WINDOW = 1024
+
+LabelKey = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_sample(name: str, labels: dict[str, str], value: float) -> str:
+    """One exposition line ("name{k="v"} value"), for collectors."""
+    return f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}"
+
+
+def quantile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted sequence (NaN if empty)."""
+    if not sorted_values:
+        return math.nan
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# =============================================================================
+# Metric types
+# =============================================================================
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {list(self.labelnames)}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return {"/".join(k): v for k, v in sorted(self._values.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label set."""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "sum", "recent")
+
+    def __init__(self, bucket_count: int, window: int):
+        self.buckets = [0] * (bucket_count + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution plus quantiles over a window of recent samples."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        window: int = DEFAULT_WINDOW,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.quantiles = tuple(quantiles)
+        self.window = max(1, window)
+        self._series: dict[LabelKey, _Series] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets), self.window)
+            series.buckets[bisect.bisect_left(self.buckets, value)] += 1
+            series.count += 1
+            series.sum += value
+            series.recent.append(value)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def _copy(self) -> list[tuple[LabelKey, list[int], int, float, list[float]]]:
+        with self._lock:
+            return [
+                (key, list(s.buckets), s.count, s.sum, sorted(s.recent))
+                for key, s in sorted(self._series.items())
+            ]
+
+    def render(self) -> list[str]:
+        series = self._copy()
+        lines = self._header()
+        bounds = [*(_format_value(b) for b in self.buckets), "+Inf"]
+        for key, buckets, count, total, _ in series:
+            cumulative = 0
+            for bound, n in zip(bounds, buckets):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+
+        recent = f"{self.name}_recent"
+        lines.append(
+            f"# HELP {recent} {self.documentation} "
+            f"(quantiles over the last {self.window} observations)"
+        )
+        lines.append(f"# TYPE {recent} summary")
+        for key, _, _, _, values in series:
+            for q in self.quantiles:
+                labels = _format_labels(self.labelnames, key, f'quantile="{q}"')
+                lines.append(f"{recent}{labels} {_format_value(quantile(values, q))}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{recent}_sum{labels} {_format_value(sum(values))}")
+            lines.append(f"{recent}_count{labels} {len(values)}")
+        return lines
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        result = {}
+        for key, _, count, total, values in self._copy():
+            entry: dict[str, Any] = {"count": count, "sum_seconds": round(total, 6)}
+            for q in self.quantiles:
+                entry[f"p{round(q * 100):g}"] = quantile(values, q)
+            result["/".join(key)] = entry
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+
+class MetricsRegistry:
+    """Named metrics plus collector callbacks rendered on each scrape.
+
+    counter()/gauge()/histogram() return the existing metric when the name is
+    already registered, so modules can declare their metrics at import time.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def _get_or_create(self, cls: type[_Metric], name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, **kwargs)
+
+    def register_collector(self, collector: Callable[[], list[str]]) -> None:
+        """Add a callback returning exposition lines, called on each render."""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+            collectors = list(self._collectors)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())  # type: ignore[attr-defined]
+        for collector in collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clear recorded values (metrics stay registered). Useful for testing."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()  # type: ignore[attr-defined]
+
+
+REGISTRY = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return REGISTRY
+
+
+# =============================================================================
+# Host operation helpers
+# =============================================================================
+
+HOST_OPERATION_SECONDS = REGISTRY.histogram(
+    "octolab_host_operation_seconds",
+    "Latency of host operations by component and operation type",
+    ("component", "operation"),
+)
+HOST_OPERATION_ERRORS = REGISTRY.counter(
+    "octolab_host_operation_errors_total",
+    "Host operations that raised or reported failure",
+    ("component", "operation"),
+)
+HOST_OPERATIONS_IN_FLIGHT = REGISTRY.gauge(
+    "octolab_host_operations_in_flight",
+    "Host operations currently running",
+    ("component",),
+)
+
+
+class OperationTimer:
+    """Handle yielded by track_operation(); set ok=False to count a failure."""
+
+    __slots__ = ("ok",)
+
+    def __init__(self) -> None:
+        self.ok = True
+
+
+@contextmanager
+def track_operation(component: str, operation: str) -> Iterator[OperationTimer]:
+    """Record latency (and failure) of one host operation.
+
+    An exception propagating out of the block counts as a failure; callers
+    with non-raising failures (exit codes, ok=False responses) set op.ok.
+    """
+    op = OperationTimer()
+    HOST_OPERATIONS_IN_FLIGHT.inc(component=component)
+    start = time.monotonic()
+    try:
+        yield op
+    except BaseException:
+        op.ok = False
+        raise
+    finally:
+        HOST_OPERATIONS_IN_FLIGHT.dec(component=component)
+        HOST_OPERATION_SECONDS.observe(
+            time.monotonic() - start, component=component, operation=operation
+        )
+        if not op.ok:
+            HOST_OPERATION_ERRORS.inc(component=component, operation=operation)
+
+
+def timed(component: str, operation: str) -> Callable[[F], F]:
+    """Decorator form of track_operation() for sync and async functions."""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with track_operation(component, operation):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with track_operation(component, operation):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,175 @@
+"""Minimal rtnetlink client (stdlib only).
+
+Lists and deletes network links by talking to the kernel over AF_NETLINK
+instead of running `ip link` and parsing its text output. Listing is
+unprivileged; deleting needs CAP_NET_ADMIN (callers fall back to their
+privileged path on EPERM).
+
+microvm-netd carries the same implementation (it is a standalone script);
+keep the two in step.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import socket
+import struct
+from typing import Any
+
+NETLINK_ROUTE = 0
+
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+IFLA_IFNAME = 3
+IFLA_MASTER = 10
+IFLA_OPERSTATE = 16
+IFLA_LINKINFO = 18
+IFLA_INFO_KIND = 1
+
+IFF_UP = 0x1
+
+OPERSTATES = ("unknown", "notpresent", "down", "lowerlayerdown", "testing", "dormant", "up")
+
+_NLMSGHDR = struct.Struct("=IHHII")  # len, type, flags, seq, pid
+_IFINFOMSG = struct.Struct("=BxHiII")  # family, type, index, flags, change
+_RTATTR = struct.Struct("=HH")  # len, type
+_NLMSGERR = struct.Struct("=i")
+
+RECV_BYTES = 256 * 1024
+TIMEOUT_SECS = 5.0
+
+_seq = itertools.count(1)
+
+
+class NetlinkError(OSError):
+    """The kernel rejected a netlink request (errno is set)."""
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _attr(attr_type: int, value: bytes) -> bytes:
+    length = _RTATTR.size + len(value)
+    return _RTATTR.pack(length, attr_type) + value + b"\0" * (_align(length) - length)
+
+
+def _parse_attrs(data: bytes) -> dict[int, bytes]:
+    attrs: dict[int, bytes] = {}
+    offset = 0
+    while offset + _RTATTR.size <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        # Strip NLA_F_NESTED / NLA_F_NET_BYTEORDER
+        attrs[attr_type & 0x3FFF] = data[offset + _RTATTR.size : offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def _str(value: bytes) -> str:
+    return value.split(b"\0", 1)[0].decode(errors="replace")
+
+
+def _ifinfo(index: int = 0, flags: int = 0, change: int = 0) -> bytes:
+    return _IFINFOMSG.pack(socket.AF_UNSPEC, 0, index, flags, change)
+
+
+def _ifname(name: str) -> bytes:
+    return _attr(IFLA_IFNAME, name.encode() + b"\0")
+
+
+def call(msg_type: int, flags: int, payload: bytes) -> list[tuple[int, bytes]]:
+    """Send one request; return (type, body) replies up to the ACK or DONE.
+
+    Raises:
+        NetlinkError: The kernel answered with an error
+        OSError: Socket failure (e.g. AF_NETLINK unavailable)
+    """
+    seq = next(_seq)
+    header = _NLMSGHDR.pack(
+        _NLMSGHDR.size + len(payload), msg_type, flags | NLM_F_REQUEST | NLM_F_ACK, seq, 0
+    )
+    replies: list[tuple[int, bytes]] = []
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.settimeout(TIMEOUT_SECS)
+        sock.bind((0, 0))
+        sock.send(header + payload)
+        while True:
+            data = sock.recv(RECV_BYTES)
+            offset = 0
+            while offset + _NLMSGHDR.size <= len(data):
+                length, reply_type, _, reply_seq, _ = _NLMSGHDR.unpack_from(data, offset)
+                if length < _NLMSGHDR.size:
+                    return replies
+                body = data[offset + _NLMSGHDR.size : offset + length]
+                offset += _align(length)
+                if reply_seq != seq:
+                    continue
+                if reply_type == NLMSG_DONE:
+                    return replies
+                if reply_type == NLMSG_ERROR:
+                    error = -_NLMSGERR.unpack_from(body)[0]
+                    if error:
+                        raise NetlinkError(error, os.strerror(error))
+                    return replies  # ACK
+                replies.append((reply_type, body))
+
+
+def parse_link(body: bytes) -> dict[str, Any]:
+    """Decode an RTM_NEWLINK body (master is an ifindex, 0 for none)."""
+    _, _, index, flags, _ = _IFINFOMSG.unpack_from(body)
+    attrs = _parse_attrs(body[_IFINFOMSG.size :])
+
+    kind = None
+    if IFLA_LINKINFO in attrs:
+        info = _parse_attrs(attrs[IFLA_LINKINFO])
+        if IFLA_INFO_KIND in info:
+            kind = _str(info[IFLA_INFO_KIND])
+
+    operstate = "unknown"
+    if attrs.get(IFLA_OPERSTATE):
+        value = attrs[IFLA_OPERSTATE][0]
+        operstate = OPERSTATES[value] if value < len(OPERSTATES) else "unknown"
+
+    master = 0
+    if len(attrs.get(IFLA_MASTER, b"")) >= 4:
+        master = struct.unpack_from("=I", attrs[IFLA_MASTER])[0]
+
+    return {
+        "index": index,
+        "name": _str(attrs.get(IFLA_IFNAME, b"")),
+        "kind": kind,
+        "up": bool(flags & IFF_UP),
+        "operstate": operstate,
+        "master": master,
+    }
+
+
+def dump_links() -> list[dict[str, Any]]:
+    """All links, with master resolved to a name (None if not enslaved)."""
+    replies = call(RTM_GETLINK, NLM_F_DUMP, _ifinfo())
+    links = [parse_link(body) for reply_type, body in replies if reply_type == RTM_NEWLINK]
+    names = {link["index"]: link["name"] for link in links}
+    for link in links:
+        link["master"] = names.get(link["master"])
+    return links
+
+
+def delete_link(name: str) -> None:
+    """Delete a link by name.
+
+    Raises:
+        NetlinkError: ENODEV if it does not exist, EPERM without CAP_NET_ADMIN
+    """
+    call(RTM_DELLINK, 0, _ifinfo() + _ifname(name))
@@ -30,6 +30,7 @@ from __future__ import annotations
 
 import logging
 import os
+import stat
 import tarfile
 from pathlib import Path
 from typing import BinaryIO
@@ -343,6 +344,205 @@ def safe_extract_tarfile_from_fileobj(
     return extracted_files
 
 
+def safe_extract_tarfile_from_stream(
+    fileobj: BinaryIO,
+    dest_dir: Path,
+    *,
+    max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+    max_member_bytes: int = DEFAULT_MAX_MEMBER_BYTES,
+    strip_components: int = 0,
+    skip_special: bool = False,
+) -> list[str]:
+    """
+    Safely extract a tar stream that is read once, front to back.
+
+    Unlike safe_extract_tarfile_from_fileobj this never seeks, so fileobj can
+    be a pipe or an HTTP response body: the archive is never buffered in
+    memory or spooled to disk, only one COPY_CHUNK_SIZE chunk at a time.
+
+    Args:
+        fileobj: Readable tar stream (plain or compressed)
+        dest_dir: Destination directory (must exist)
+        max_total_bytes: Maximum total extracted size (default 250MB)
+        max_member_bytes: Maximum single file size (default 50MB)
+        strip_components: Leading path components to drop from member names
+            (Docker archives are rooted at the basename of the copied path);
+            members with nothing left after stripping are skipped
+        skip_special: Skip links, devices and FIFOs instead of raising. Used
+            where the source used to be filtered with `find -type f`, so a
+            planted symlink drops that entry rather than the whole volume.
+            Path traversal is always rejected.
+
+    Returns:
+        List of extracted file paths (relative to dest_dir)
+
+    Raises:
+        UnsafeArchiveError: If archive contains unsafe content
+        ArchiveSizeLimitError: If size limits exceeded
+        tarfile.TarError: If the stream is corrupt or truncated
+    """
+    dest_dir = dest_dir.resolve()
+
+    if not dest_dir.exists():
+        raise FileNotFoundError(f"Destination directory does not exist: {dest_dir}")
+
+    extracted_files: list[str] = []
+    total_extracted = 0
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if strip_components:
+                parts = [p for p in member.name.split("/") if p not in ("", ".")]
+                if len(parts) <= strip_components:
+                    continue
+                member.name = "/".join(parts[strip_components:])
+
+            if skip_special and not (member.isfile() or member.isdir()):
+                logger.debug(f"Skipping non-regular archive member: {member.name}")
+                continue
+
+            # Validate member safety
+            _validate_member(member, dest_dir)
+
+            # Extract safely
+            bytes_extracted = _extract_member_safe(
+                tf,
+                member,
+                dest_dir,
+                max_member_bytes,
+                total_extracted,
+                max_total_bytes,
+            )
+
+            total_extracted += bytes_extracted
+
+            if member.isfile():
+                extracted_files.append(member.name)
+
+    return extracted_files
+
+
+def safe_copy_tree(
+    src_dir: Path,
+    dest_dir: Path,
+    *,
+    max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+    max_member_bytes: int = DEFAULT_MAX_MEMBER_BYTES,
+) -> list[str]:
+    """
+    Copy the regular files of an untrusted directory tree into dest_dir.
+
+    Applies the same rules as tar extraction to a live directory (e.g. a
+    Docker volume mountpoint):
+    - Walks with directory fds and O_NOFOLLOW, so a symlink swapped in
+      mid-walk is never followed (symlinks, devices, FIFOs are skipped)
+    - Re-checks S_ISREG on the opened fd before copying
+    - Enforces size limits while copying (file may grow after stat)
+    - Uses secure permissions (0o700 dirs, files created 0o600 with
+      O_EXCL|O_NOFOLLOW), ignores uid/gid
+
+    Args:
+        src_dir: Source directory (trusted path, untrusted contents)
+        dest_dir: Destination directory (must exist)
+        max_total_bytes: Maximum total copied size (default 250MB)
+        max_member_bytes: Maximum single file size (default 50MB)
+
+    Returns:
+        List of copied file paths (relative to dest_dir)
+
+    Raises:
+        ArchiveSizeLimitError: If size limits exceeded
+        UnsafeArchiveError: If an entry name would escape dest_dir
+        OSError: If src_dir cannot be opened
+    """
+    dest_dir = dest_dir.resolve()
+
+    if not dest_dir.exists():
+        raise FileNotFoundError(f"Destination directory does not exist: {dest_dir}")
+
+    copied: list[str] = []
+    total = 0
+    dir_flags = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW
+
+    def _walk(dir_fd: int, rel: str) -> None:
+        nonlocal total
+        with os.scandir(dir_fd) as entries:
+            names = sorted(entry.name for entry in entries)
+
+        for name in names:
+            rel_name = f"{rel}/{name}" if rel else name
+            if not is_safe_relative_path(rel_name):
+                raise UnsafeArchiveError(f"Unsafe path in source tree (blocked): {rel_name}")
+
+            try:
+                st = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+
+            if stat.S_ISDIR(st.st_mode):
+                try:
+                    child_fd = os.open(name, dir_flags, dir_fd=dir_fd)
+                except OSError:
+                    # Replaced by a symlink or removed since stat
+                    continue
+                try:
+                    safe_mkdir(dest_dir / rel_name, mode=0o700)
+                    _walk(child_fd, rel_name)
+                finally:
+                    os.close(child_fd)
+                continue
+
+            if not stat.S_ISREG(st.st_mode):
+                logger.debug(f"Skipping non-regular file: {rel_name}")
+                continue
+
+            try:
+                src_fd = os.open(name, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK, dir_fd=dir_fd)
+            except OSError:
+                continue
+            with os.fdopen(src_fd, "rb") as src:
+                if not stat.S_ISREG(os.fstat(src.fileno()).st_mode):
+                    continue
+                if st.st_size > max_member_bytes:
+                    raise ArchiveSizeLimitError(
+                        f"Member '{rel_name}' exceeds size limit "
+                        f"({st.st_size} > {max_member_bytes} bytes)"
+                    )
+
+                target_path = dest_dir / rel_name
+                copied_bytes = 0
+                dst_fd = os.open(
+                    target_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY | os.O_NOFOLLOW, 0o600
+                )
+                with os.fdopen(dst_fd, "wb") as dst:
+                    while True:
+                        chunk = src.read(COPY_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        copied_bytes += len(chunk)
+                        if copied_bytes > max_member_bytes:
+                            raise ArchiveSizeLimitError(
+                                f"Member '{rel_name}' exceeds size limit during copy"
+                            )
+                        if total + copied_bytes > max_total_bytes:
+                            raise ArchiveSizeLimitError(
+                                "Total copy exceeds limit during streaming"
+                            )
+                        dst.write(chunk)
+
+            total += copied_bytes
+            copied.append(rel_name)
+
+    root_fd = os.open(src_dir, dir_flags)
+    try:
+        _walk(root_fd, "")
+    finally:
+        os.close(root_fd)
+
+    logger.debug(f"Safely copied {len(copied)} files, {total} bytes from {src_dir}")
+    return copied
+
+
 def spool_docker_archive(
     stream,
     tmpdir: Path,
@@ -2,15 +2,50 @@
 
 All subprocess calls use shell=False and capture output.
 Never log command arguments containing secrets.
+
+Code running on the event loop uses arun_cmd(), built on
+asyncio.create_subprocess_exec, instead of subprocess.run in a worker
+thread (which ties up the default executor for the whole command):
+- Per-binary concurrency caps (settings.subprocess_concurrency_limits)
+- Cancelling the awaiting task kills the child's process group
+- stdout/stderr capture is bounded; excess output is drained and dropped
+- Latency and exit-code histograms per binary, see command_stats()
+
+run_cmd() remains for code that already runs in a worker thread.
 """
 
 from __future__ import annotations
 
+import asyncio
+import bisect
+import os
+import signal
 import subprocess
-from typing import NamedTuple
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, NamedTuple
 
+from app.config import settings
+from app.utils.metrics import get_registry, render_sample
 from app.utils.redact import redact_argv
 
+# Histogram bucket upper bounds (seconds); a final +Inf bucket is implied
+LATENCY_BUCKETS: tuple[float, ...] = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Binaries that share a concurrency cap with another
+_BINARY_ALIASES = {
+    "docker-compose": "docker",
+    "iptables-save": "iptables",
+    "iptables-restore": "iptables",
+    "ip6tables": "iptables",
+    "ip6tables-save": "iptables",
+    "ip6tables-restore": "iptables",
+}
+
+_READ_CHUNK = 64 * 1024
+
 
 class CmdResult(NamedTuple):
     """Result from running a command."""
@@ -18,6 +53,145 @@ class CmdResult(NamedTuple):
     returncode: int
     stdout: str
     stderr: str
+    # True if stdout or stderr was cut at the output cap
+    truncated: bool = False
+
+
+def binary_key(argv: list[str]) -> str:
+    """Name used for concurrency caps and stats ("sudo -n iptables" -> iptables)."""
+    args = list(argv)
+    if args and os.path.basename(args[0]) == "sudo":
+        args = [a for a in args[1:] if not a.startswith("-")]
+    if not args:
+        return "unknown"
+    name = os.path.basename(args[0])
+    return _BINARY_ALIASES.get(name, name)
+
+
+# =============================================================================
+# Stats
+# =============================================================================
+
+
+class _CommandStats:
+    """Per-binary latency histogram and exit-code counts (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+        self._exits: dict[str, dict[str, int]] = {}
+        self._running: dict[str, int] = {}
+
+    def started(self, key: str) -> None:
+        with self._lock:
+            self._running[key] = self._running.get(key, 0) + 1
+
+    def finished(self, key: str, seconds: float, outcome: int | str) -> None:
+        with self._lock:
+            self._running[key] = self._running.get(key, 1) - 1
+            buckets = self._buckets.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 1))
+            buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + seconds
+            exits = self._exits.setdefault(key, {})
+            exits[str(outcome)] = exits.get(str(outcome), 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            result = {}
+            for key, buckets in self._buckets.items():
+                cumulative, bounds = 0, {}
+                for bound, count in zip((*LATENCY_BUCKETS, float("inf")), buckets):
+                    cumulative += count
+                    bounds["+Inf" if bound == float("inf") else str(bound)] = cumulative
+                result[key] = {
+                    "count": cumulative,
+                    "sum_seconds": round(self._sums[key], 6),
+                    "latency_buckets": bounds,
+                    "exit_codes": dict(self._exits.get(key, {})),
+                    "running": self._running.get(key, 0),
+                }
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._sums.clear()
+            self._exits.clear()
+            self._running.clear()
+
+
+_stats = _CommandStats()
+
+
+def command_stats() -> dict[str, Any]:
+    """Snapshot of per-binary latency buckets (cumulative) and exit codes.
+
+    Exit codes are keyed by returncode, plus "timeout", "cancelled" and
+    "error" (spawn failures such as a missing binary).
+    """
+    return _stats.snapshot()
+
+
+def reset_command_stats() -> None:
+    """Clear collected stats. Useful for testing."""
+    _stats.reset()
+
+
+def _render_command_stats() -> list[str]:
+    """Expose command_stats() on the metrics endpoint."""
+    stats = command_stats()
+    lines = [
+        "# HELP octolab_subprocess_seconds Child process run time by binary",
+        "# TYPE octolab_subprocess_seconds histogram",
+    ]
+    for key, entry in sorted(stats.items()):
+        for bound, count in entry["latency_buckets"].items():
+            lines.append(render_sample("octolab_subprocess_seconds_bucket", {"binary": key, "le": bound}, count))
+        lines.append(render_sample("octolab_subprocess_seconds_sum", {"binary": key}, entry["sum_seconds"]))
+        lines.append(render_sample("octolab_subprocess_seconds_count", {"binary": key}, entry["count"]))
+    lines += [
+        "# HELP octolab_subprocess_exits_total Child process outcomes by binary",
+        "# TYPE octolab_subprocess_exits_total counter",
+    ]
+    for key, entry in sorted(stats.items()):
+        for code, count in sorted(entry["exit_codes"].items()):
+            lines.append(render_sample("octolab_subprocess_exits_total", {"binary": key, "code": code}, count))
+    lines += [
+        "# HELP octolab_subprocess_running Child processes currently running by binary",
+        "# TYPE octolab_subprocess_running gauge",
+    ]
+    for key, entry in sorted(stats.items()):
+        lines.append(render_sample("octolab_subprocess_running", {"binary": key}, entry["running"]))
+    return lines
+
+
+get_registry().register_collector(_render_command_stats)
+
+
+# =============================================================================
+# Concurrency caps
+# =============================================================================
+
+# Semaphores bind to the loop that created them
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _limit_for(key: str) -> int:
+    return max(1, settings.subprocess_concurrency_limits.get(key, settings.subprocess_default_concurrency))
+
+
+@asynccontextmanager
+async def _limited(key: str) -> AsyncIterator[None]:
+    loop = asyncio.get_running_loop()
+    semaphores = _limiters.setdefault(loop, {})
+    semaphore = semaphores.get(key)
+    if semaphore is None:
+        semaphore = semaphores[key] = asyncio.Semaphore(_limit_for(key))
+    async with semaphore:
+        yield
 
 
 def run_cmd(
@@ -47,15 +221,30 @@ def run_cmd(
         - Always uses shell=False
         - Always captures output to prevent terminal leakage
     """
-    result = subprocess.run(
-        argv,
-        capture_output=True,
-        text=True,
-        timeout=timeout,
-        check=check,
-        shell=False,  # SECURITY: Never use shell=True
-        env=env,
-    )
+    key = binary_key(argv)
+    _stats.started(key)
+    start = time.monotonic()
+    outcome: int | str = "error"
+    try:
+        result = subprocess.run(
+            argv,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            shell=False,  # SECURITY: Never use shell=True
+            env=env,
+        )
+        outcome = result.returncode
+    except subprocess.TimeoutExpired:
+        outcome = "timeout"
+        raise
+    finally:
+        _stats.finished(key, time.monotonic() - start, outcome)
+
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(
+            result.returncode, argv, output=result.stdout, stderr=result.stderr
+        )
 
     return CmdResult(
         returncode=result.returncode,
@@ -64,6 +253,147 @@ def run_cmd(
     )
 
 
+async def _read_bounded(stream: asyncio.StreamReader | None, limit: int) -> tuple[bytes, bool]:
+    """Read a stream to EOF, keeping at most limit bytes."""
+    if stream is None:
+        return b"", False
+    kept = bytearray()
+    truncated = False
+    while True:
+        chunk = await stream.read(_READ_CHUNK)
+        if not chunk:
+            return bytes(kept), truncated
+        room = limit - len(kept)
+        if room > 0:
+            kept += chunk[:room]
+        if len(chunk) > room:
+            # Keep draining so the child never blocks on a full pipe
+            truncated = True
+
+
+async def _feed_stdin(stream: asyncio.StreamWriter | None, data: bytes | None) -> None:
+    if stream is None:
+        return
+    try:
+        if data:
+            stream.write(data)
+            await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stream.close()
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is not None:
+        return
+    try:
+        # Child runs in its own session: take down anything it spawned too
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
+
+async def arun_cmd(
+    argv: list[str],
+    *,
+    timeout: float = 30.0,
+    check: bool = False,
+    env: dict[str, str] | None = None,
+    cwd: str | os.PathLike[str] | None = None,
+    input: bytes | str | None = None,
+    max_output_bytes: int | None = None,
+    text: bool = True,
+) -> CmdResult:
+    """
+    Run a subprocess from the event loop without tying up a worker thread.
+
+    Waits for a slot under the binary's concurrency cap first; the timeout
+    covers only the time the child runs.
+
+    Args:
+        argv: Command and arguments as list (NO shell=True)
+        timeout: Timeout in seconds
+        check: If True, raise CalledProcessError on non-zero exit
+        env: Environment variables (defaults to inheriting current env)
+        cwd: Working directory for the child
+        input: Data written to the child's stdin (then closed)
+        max_output_bytes: Per-stream capture cap
+            (default settings.subprocess_max_output_bytes)
+        text: Decode output as UTF-8; with False, stdout/stderr are bytes
+            (archives). Callers must check truncated before using them.
+
+    Returns:
+        CmdResult with returncode, stdout, stderr, truncated
+
+    Raises:
+        subprocess.CalledProcessError: If check=True and returncode != 0
+        subprocess.TimeoutExpired: If command exceeds timeout (child killed)
+        asyncio.CancelledError: If the caller is cancelled (child killed)
+        OSError: If the binary cannot be executed
+
+    SECURITY:
+        - Always uses exec (no shell)
+        - Always captures output to prevent terminal leakage
+        - stdin is /dev/null unless input is given (never inherited)
+    """
+    key = binary_key(argv)
+    limit = max_output_bytes if max_output_bytes is not None else settings.subprocess_max_output_bytes
+    data = input.encode() if isinstance(input, str) else input
+
+    async with _limited(key):
+        _stats.started(key)
+        start = time.monotonic()
+        outcome: int | str = "error"
+        proc: asyncio.subprocess.Process | None = None
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=asyncio.subprocess.PIPE if data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=env,
+                cwd=cwd,
+                start_new_session=True,
+            )
+            io_task = asyncio.gather(
+                _read_bounded(proc.stdout, limit),
+                _read_bounded(proc.stderr, limit),
+                _feed_stdin(proc.stdin, data),
+                proc.wait(),
+            )
+            try:
+                (out, out_cut), (err, err_cut), _, returncode = await asyncio.wait_for(io_task, timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise subprocess.TimeoutExpired(argv, timeout) from None
+            outcome = returncode
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            if proc is not None and proc.returncode is None:
+                _kill(proc)
+                # Reap even while being cancelled so no zombie is left behind
+                await asyncio.shield(proc.wait())
+            _stats.finished(key, time.monotonic() - start, outcome)
+
+    stdout: Any = out.decode("utf-8", errors="replace") if text else out
+    stderr: Any = err.decode("utf-8", errors="replace") if text else err
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, argv, output=stdout, stderr=stderr)
+
+    return CmdResult(
+        returncode=returncode,
+        stdout=stdout,
+        stderr=stderr,
+        truncated=out_cut or err_cut,
+    )
+
+
 def format_cmd_for_display(argv: list[str], *, redact: bool = True) -> str:
     """
     Format command for safe display/logging.
@@ -3,7 +3,7 @@
 SECURITY:
 - Verifies admin-only access
 - Verifies no secrets/full paths in response
-- Verifies subprocess.run uses shell=False
+- Verifies process listing goes through the exec-only executor
 """
 
 import pytest
@@ -16,9 +16,10 @@ pytestmark = pytest.mark.no_db
 class TestFirecrackerStatusService:
     """Tests for the firecracker_status service."""
 
-    def test_list_firecracker_processes_uses_shell_false(self):
-        """Verify that process listing uses shell=False."""
-        with patch("subprocess.run") as mock_run:
+    @pytest.mark.asyncio
+    async def test_list_firecracker_processes_uses_executor(self):
+        """Verify that process listing runs ps through arun_cmd (no shell)."""
+        with patch("app.services.firecracker_status.arun_cmd", new_callable=AsyncMock) as mock_run:
             mock_run.return_value = MagicMock(
                 returncode=0,
                 stdout="  PID COMMAND ARGS\n  123 firecracker --api-sock /tmp/test.sock\n",
@@ -26,12 +27,11 @@ class TestFirecrackerStatusService:
 
             from app.services.firecracker_status import _list_firecracker_processes
 
-            _list_firecracker_processes()
+            result = await _list_firecracker_processes()
 
-            # Verify shell=False was used
-            mock_run.assert_called_once()
-            call_kwargs = mock_run.call_args[1]
-            assert call_kwargs.get("shell") is False
+            mock_run.assert_awaited_once()
+            assert mock_run.call_args[0][0] == ["ps", "-eo", "pid,comm,args"]
+            assert [p.pid for p in result] == [123]
 
     def test_redact_cmdline_removes_full_paths(self):
         """Verify that full paths are redacted to basenames."""
@@ -61,27 +61,29 @@ class TestFirecrackerStatusService:
         path2 = "/var/lib/octolab/microvm/12345678-1234-1234-1234-123456789012/firecracker.sock"
         assert _extract_lab_id_from_socket_path(path2) == "12345678-1234-1234-1234-123456789012"
 
-    def test_process_listing_handles_timeout(self):
+    @pytest.mark.asyncio
+    async def test_process_listing_handles_timeout(self):
         """Verify that process listing handles timeouts gracefully."""
         import subprocess
         from app.services.firecracker_status import _list_firecracker_processes
 
-        with patch("subprocess.run") as mock_run:
+        with patch("app.services.firecracker_status.arun_cmd", new_callable=AsyncMock) as mock_run:
             mock_run.side_effect = subprocess.TimeoutExpired(cmd="ps", timeout=10)
 
-            result = _list_firecracker_processes()
+            result = await _list_firecracker_processes()
 
             # Should return empty list on timeout, not raise
             assert result == []
 
-    def test_process_listing_handles_error(self):
+    @pytest.mark.asyncio
+    async def test_process_listing_handles_error(self):
         """Verify that process listing handles errors gracefully."""
         from app.services.firecracker_status import _list_firecracker_processes
 
-        with patch("subprocess.run") as mock_run:
+        with patch("app.services.firecracker_status.arun_cmd", new_callable=AsyncMock) as mock_run:
             mock_run.return_value = MagicMock(returncode=1, stderr="ps failed")
 
-            result = _list_firecracker_processes()
+            result = await _list_firecracker_processes()
 
             # Should return empty list on error
             assert result == []
@@ -9,6 +9,7 @@ These tests verify:
 """
 
 import pytest
+import subprocess
 from unittest.mock import patch, MagicMock
 from dataclasses import dataclass
 
@@ -290,33 +291,28 @@ class TestStopProjectsVerifiedBatch:
 
     def test_counts_verified_stops_not_exit_codes(self):
         """Test: batch counts based on verification, not exit codes."""
-        from app.services.docker_net import stop_projects_verified_batch, ProjectStopResult
-
-        projects = [
-            "octolab_aaaaaaaa-bbbb-cccc-dddd-111111111111",
-            "octolab_aaaaaaaa-bbbb-cccc-dddd-222222222222",
-        ]
-
-        def mock_stop_verified(project, compose_dir, compose_file, timeout):
-            if "111111111111" in project:
-                return ProjectStopResult(
-                    project=project,
-                    pre_running=2,
-                    remaining_final=0,
-                    verified_stopped=True,
-                )
-            else:
-                return ProjectStopResult(
-                    project=project,
-                    pre_running=2,
-                    remaining_final=1,  # Still running!
-                    verified_stopped=False,
-                    error="1 containers still running",
-                )
-
-        with patch("app.services.docker_net.stop_project_verified", side_effect=mock_stop_verified):
+        from app.services.docker_net import stop_projects_verified_batch
+
+        p1 = "octolab_aaaaaaaa-bbbb-cccc-dddd-111111111111"
+        p2 = "octolab_aaaaaaaa-bbbb-cccc-dddd-222222222222"
+
+        # pre-check, after down, final verify (p2 keeps one container running)
+        listings = iter([
+            {p1: ["a1", "a2"], p2: ["b1", "b2"]},
+            {p2: ["b2"]},
+            {p2: ["b2"]},
+        ])
+
+        with patch("app.services.docker_net._running_container_ids_by_project",
+                   side_effect=lambda projects, timeout=10.0: next(listings)), \
+             patch("app.services.docker_net._compose_down_project", return_value=(0, None)), \
+             patch("app.services.docker_net.force_remove_containers", return_value=(0, None)), \
+             patch("app.services.docker_net._project_networks_by_project",
+                   return_value={p1: [f"{p1}_lab_net"]}), \
+             patch("app.services.docker_net._remove_networks_bulk",
+                   return_value={f"{p1}_lab_net"}):
             result = stop_projects_verified_batch(
-                projects=projects,
+                projects=[p1, p2],
                 compose_dir="/tmp",
                 compose_file="/tmp/docker-compose.yml",
             )
@@ -325,6 +321,95 @@ class TestStopProjectsVerifiedBatch:
         assert result.projects_stopped == 1  # Only 1 verified stopped
         assert result.projects_failed == 1  # 1 failed (containers still running)
         assert len(result.results) == 2
+        assert result.results[1].error == "Failed to stop: 1 containers still running"
+        assert result.networks_removed == 1
+
+    def test_bulk_phases_and_bounded_concurrency(self):
+        """Test: one listing per phase, one rm -f for all projects, capped parallel downs."""
+        import threading
+        import time as _time
+
+        from app.services.docker_net import stop_projects_verified_batch
+
+        projects = [f"octolab_aaaaaaaa-bbbb-cccc-dddd-{i:012d}" for i in range(6)]
+        listings = iter([
+            {p: ["c" + p[-4:]] for p in projects},  # pre-check: all running
+            {projects[0]: ["x0"], projects[1]: ["x1"]},  # two survive compose down
+            {},  # rm -f worked
+        ])
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def mock_down(project, compose_dir, compose_file, timeout):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            _time.sleep(0.02)
+            with lock:
+                active -= 1
+            return 0, None
+
+        with patch("app.services.docker_net._running_container_ids_by_project",
+                   side_effect=lambda p, timeout=10.0: next(listings)) as mock_list, \
+             patch("app.services.docker_net._compose_down_project", side_effect=mock_down), \
+             patch("app.services.docker_net.force_remove_containers", return_value=(0, None)) as mock_rm, \
+             patch("app.services.docker_net._project_networks_by_project", return_value={}), \
+             patch("app.services.docker_net._remove_networks_bulk", return_value=set()):
+            result = stop_projects_verified_batch(
+                projects=projects,
+                compose_dir="/tmp",
+                compose_file="/tmp/docker-compose.yml",
+                max_parallel=2,
+            )
+
+        assert mock_list.call_count == 3
+        mock_rm.assert_called_once()
+        assert sorted(mock_rm.call_args[0][0]) == ["x0", "x1"]
+        assert peak <= 2
+        assert result.max_parallel == 2
+        assert result.projects_stopped == 6
+        assert result.containers_force_removed == 2
+        assert "down" in result.results[0].timings_ms
+        assert "total" in result.results[0].timings_ms
+
+
+class TestBatchHelpers:
+    """Tests for the bulk docker helpers used by batch stop."""
+
+    def test_running_ids_grouped_from_single_listing(self):
+        from app.services.docker_net import _running_container_ids_by_project
+
+        p1 = "octolab_aaaaaaaa-bbbb-cccc-dddd-111111111111"
+        stdout = f"abc\t{p1}\ndef\tguacamole\nghi\t{p1}\n"
+
+        with patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0, stdout=stdout, stderr="")) as mock_run:
+            grouped = _running_container_ids_by_project([p1])
+
+        assert grouped == {p1: ["abc", "ghi"]}
+        assert mock_run.call_count == 1
+        assert mock_run.call_args[1]["shell"] is False
+
+    def test_bulk_network_rm_verifies_partial_failure(self):
+        from app.services.docker_net import _remove_networks_bulk
+
+        nets = [
+            "octolab_aaaaaaaa-bbbb-cccc-dddd-111111111111_lab_net",
+            "octolab_aaaaaaaa-bbbb-cccc-dddd-111111111111_egress_net",
+            "bridge",  # never touched
+        ]
+
+        def mock_run(cmd, **kwargs):
+            if cmd[:3] == ["docker", "network", "rm"]:
+                assert "bridge" not in cmd
+                return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="has active endpoints")
+            return subprocess.CompletedProcess(cmd, 0, stdout=f"bridge\n{nets[1]}\n", stderr="")
+
+        with patch("subprocess.run", side_effect=mock_run):
+            removed = _remove_networks_bulk(nets)
+
+        assert removed == {nets[0]}
 
 
 class TestSecurityInvariants:
@@ -0,0 +1,151 @@
+"""Tests for event-driven readiness and target death detection.
+
+These tests verify:
+- wait_for_healthy returns on the octobox health_status event, not the poll timer
+- Polling is used unchanged when the event stream is not available
+- A lab target container dying is recognised (and only that)
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.services.docker_inventory import DockerInventory
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+
+class MockLab:
+    """Mock Lab object for testing."""
+
+    def __init__(self, lab_id=None):
+        self.id = lab_id or uuid4()
+        self.owner_id = uuid4()
+
+
+def _health(status):
+    return {"State": {"Health": {"Status": status}}, "Config": {"Healthcheck": {"Test": ["CMD"]}}}
+
+
+@pytest.fixture
+def runtime(tmp_path):
+    from app.runtime.compose_runtime import ComposeLabRuntime
+
+    compose_file = tmp_path / "docker-compose.yml"
+    compose_file.write_text("version: '3'\n")
+    return ComposeLabRuntime(compose_file)
+
+
+class TestWaitForHealthyEvents:
+    """Tests for ComposeLabRuntime.wait_for_healthy with the event stream."""
+
+    @pytest.mark.asyncio
+    async def test_health_event_completes_wait_before_poll_interval(self, runtime):
+        lab = MockLab()
+        container_name = f"octolab_{lab.id}-octobox-1"
+        inventory = DockerInventory()
+        inventory.replace_all([], [], [])
+
+        statuses = iter([_health("starting"), _health("healthy")])
+        inspect = AsyncMock(side_effect=lambda name: next(statuses))
+
+        async def fire_event():
+            await asyncio.sleep(0.05)
+            inventory.dispatch({
+                "Type": "container",
+                "Action": "health_status: healthy",
+                "Actor": {"ID": "c1", "Attributes": {"name": container_name}},
+            })
+
+        with patch("app.runtime.compose_runtime.get_ready_inventory", return_value=inventory), \
+             patch.object(runtime, "_inspect_container_health", inspect):
+            started = time.monotonic()
+            event_task = asyncio.create_task(fire_event())
+            assert await runtime.wait_for_healthy(lab, timeout_seconds=30, poll_interval_seconds=5.0)
+            await event_task
+
+        assert time.monotonic() - started < 2.0
+        assert inspect.await_count == 2
+        # Listener is removed once the wait completes
+        assert inventory._listeners == []
+
+    @pytest.mark.asyncio
+    async def test_other_container_events_do_not_wake(self, runtime):
+        lab = MockLab()
+        inventory = DockerInventory()
+        inventory.replace_all([], [], [])
+        inspect = AsyncMock(return_value=_health("starting"))
+
+        async def fire_event():
+            await asyncio.sleep(0.05)
+            inventory.dispatch({
+                "Type": "container",
+                "Action": "health_status: healthy",
+                "Actor": {"ID": "c2", "Attributes": {"name": "some-other-container"}},
+            })
+
+        with patch("app.runtime.compose_runtime.get_ready_inventory", return_value=inventory), \
+             patch.object(runtime, "_inspect_container_health", inspect):
+            event_task = asyncio.create_task(fire_event())
+            with pytest.raises(TimeoutError):
+                await runtime.wait_for_healthy(lab, timeout_seconds=0.3, poll_interval_seconds=5.0)
+            await event_task
+
+        # Initial check plus the final diagnostics inspect only
+        assert inspect.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_polling_fallback_without_event_stream(self, runtime):
+        lab = MockLab()
+        statuses = iter([_health("starting"), _health("unhealthy")])
+        inspect = AsyncMock(side_effect=lambda name: next(statuses))
+
+        with patch("app.runtime.compose_runtime.get_ready_inventory", return_value=None), \
+             patch.object(runtime, "_inspect_container_health", inspect):
+            with pytest.raises(RuntimeError, match="unhealthy"):
+                await runtime.wait_for_healthy(lab, timeout_seconds=5, poll_interval_seconds=0.01)
+
+
+class TestTargetDeathDetection:
+    """Tests for target_death_lab_id."""
+
+    def _event(self, action="die", service="target", project=None):
+        return {
+            "Type": "container",
+            "Action": action,
+            "Actor": {"ID": "c1", "Attributes": {
+                "com.docker.compose.service": service,
+                "com.docker.compose.project": project or "octolab_12345678-1234-1234-1234-123456789abc",
+            }},
+        }
+
+    def test_target_die_yields_lab_id(self):
+        from app.services.lab_target_watch import target_death_lab_id
+
+        assert target_death_lab_id(self._event()) == "12345678-1234-1234-1234-123456789abc"
+
+    def test_ignores_other_services_actions_and_projects(self):
+        from app.services.lab_target_watch import target_death_lab_id
+
+        assert target_death_lab_id(self._event(service="octobox")) is None
+        assert target_death_lab_id(self._event(action="start")) is None
+        assert target_death_lab_id(self._event(project="octolab_mvp")) is None
+
+    @pytest.mark.asyncio
+    async def test_listener_schedules_degraded_update(self):
+        from app.services import lab_target_watch
+
+        inventory = DockerInventory()
+        lab_target_watch.register_target_watch(inventory)
+        try:
+            with patch.object(lab_target_watch, "mark_lab_degraded", AsyncMock(return_value=True)) as mark:
+                inventory.dispatch(self._event())
+                await asyncio.sleep(0)
+                await asyncio.gather(*lab_target_watch._pending)
+            mark.assert_awaited_once_with("12345678-1234-1234-1234-123456789abc")
+        finally:
+            lab_target_watch.unregister_target_watch(inventory)
@@ -0,0 +1,275 @@
+"""Tests for the pre-created compose network pool.
+
+These tests verify:
+- Subnets are carved deterministically and pool names never match lab cleanup patterns
+- Claims hand out a pair once, host-wide, and release only returns empty pairs
+- Overrides are written only into the private state dir, never through an
+  existing path
+- Leaked pairs are reaped once control-plane containers are disconnected
+- Startup reconcile re-claims pairs for running labs
+- create_lab uses the override on a pool hit
+"""
+
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.services.compose_network_pool import (
+    ComposeNetworkPool,
+    carve_pairs,
+    override_path,
+    remove_override,
+)
+from app.services.docker_net import is_octolab_lab_network
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+LAB_PROJECT = "octolab_12345678-1234-1234-1234-123456789abc"
+POOL = "app.services.compose_network_pool"
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    path = tmp_path / "compose-state"
+    monkeypatch.setattr("app.config.settings.compose_state_dir", str(path))
+    return path
+
+
+def _pool(size=2):
+    return ComposeNetworkPool(carve_pairs("10.248.0.0/16", 24, size))
+
+
+def _empty():
+    return patch(f"{POOL}.get_network_container_count", return_value=0)
+
+
+class TestCarvePairs:
+    """Tests for subnet reservation."""
+
+    def test_slots_get_adjacent_subnets(self):
+        pairs = carve_pairs("10.248.0.0/16", 24, 2)
+        assert [(p.lab_subnet, p.egress_subnet) for p in pairs] == [
+            ("10.248.0.0/24", "10.248.1.0/24"),
+            ("10.248.2.0/24", "10.248.3.0/24"),
+        ]
+        assert pairs[1].lab_net == "octolab_pool_001_lab_net"
+
+    def test_pool_names_are_not_lab_networks(self):
+        for pair in carve_pairs("10.248.0.0/16", 24, 3):
+            assert not is_octolab_lab_network(pair.lab_net)
+            assert not is_octolab_lab_network(pair.egress_net)
+
+    def test_cidr_too_small(self):
+        with pytest.raises(ValueError):
+            carve_pairs("10.248.0.0/23", 24, 2)
+
+    def test_override_declares_external_networks(self):
+        pair = carve_pairs("10.248.0.0/16", 24, 1)[0]
+        path = pair.write_override(LAB_PROJECT)
+        try:
+            assert path == override_path(LAB_PROJECT)
+            assert path.stat().st_mode & 0o777 == 0o600
+            assert path.parent.stat().st_mode & 0o777 == 0o700
+            text = path.read_text()
+            assert "external: true" in text
+            assert f"name: {pair.lab_net}" in text
+            assert f"name: {pair.egress_net}" in text
+        finally:
+            remove_override(LAB_PROJECT)
+        assert not path.exists()
+
+    def test_override_refuses_existing_path(self, state_dir, tmp_path):
+        pair = carve_pairs("10.248.0.0/16", 24, 1)[0]
+        (state_dir / "overrides").mkdir(parents=True, mode=0o700)
+        target = tmp_path / "elsewhere.yml"
+        override_path(LAB_PROJECT).symlink_to(target)
+
+        with pytest.raises(FileExistsError):
+            pair.write_override(LAB_PROJECT)
+        assert not target.exists()
+
+    def test_override_refuses_shared_directory(self, state_dir):
+        pair = carve_pairs("10.248.0.0/16", 24, 1)[0]
+        (state_dir / "overrides").mkdir(parents=True, mode=0o777)
+        (state_dir / "overrides").chmod(0o777)
+
+        with pytest.raises(PermissionError):
+            pair.write_override(LAB_PROJECT)
+
+
+class TestClaimRelease:
+    """Tests for claim/release bookkeeping."""
+
+    def _filled(self, size=2):
+        pool = _pool(size)
+        with patch(f"{POOL}.create_labeled_network", return_value=True), \
+             patch(f"{POOL}.get_network_container_count", return_value=0):
+            assert pool.refill_sync() == size
+        return pool
+
+    def test_claim_is_idempotent_and_exhausts(self):
+        pool = self._filled(size=1)
+
+        with _empty():
+            pair = pool.claim_sync(LAB_PROJECT)
+            assert pair is not None
+            assert pool.claim_sync(LAB_PROJECT) == pair
+            assert pool.claimed_pair(LAB_PROJECT) == pair
+            assert pool.claim_sync("octolab_other") is None
+
+        stats = pool.stats()
+        assert stats["claimed"] == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_release_empty_pair_returns_it(self):
+        pool = self._filled(size=1)
+        with _empty():
+            pool.claim_sync(LAB_PROJECT)
+
+        with patch(f"{POOL}.get_network_container_count", return_value=0):
+            assert pool.release_sync(LAB_PROJECT) is True
+
+        assert pool.claimed_pair(LAB_PROJECT) is None
+        assert pool.stats()["ready"] == 1
+
+    def test_release_attached_pair_marks_leaked_then_reaps(self):
+        pool = self._filled(size=1)
+        with _empty():
+            pair = pool.claim_sync(LAB_PROJECT)
+
+        with patch(f"{POOL}.get_network_container_count", return_value=1):
+            assert pool.release_sync(LAB_PROJECT) is False
+        assert pool.stats()["leaked"] == 1
+        assert pool.claim_sync("octolab_other") is None
+
+        attached = {pair.lab_net: ["octolab-guacd"], pair.egress_net: []}
+
+        def fake_disconnect(network, container):
+            attached[network].remove(container)
+            return True
+
+        with patch(f"{POOL}.get_network_containers", side_effect=lambda n: list(attached[n])), \
+             patch(f"{POOL}.disconnect_container", side_effect=fake_disconnect) as disconnect, \
+             patch(f"{POOL}.get_network_container_count", side_effect=lambda n: len(attached[n])):
+            assert pool.reap_sync() == 1
+
+        disconnect.assert_called_once_with(pair.lab_net, "octolab-guacd")
+        assert pool.stats()["ready"] == 1
+
+    def test_reaper_never_disconnects_lab_containers(self):
+        pool = self._filled(size=1)
+        with _empty():
+            pair = pool.claim_sync(LAB_PROJECT)
+        with patch(f"{POOL}.get_network_container_count", return_value=1):
+            pool.release_sync(LAB_PROJECT)
+
+        with patch(f"{POOL}.get_network_containers", return_value=[f"{LAB_PROJECT}-target-1"]), \
+             patch(f"{POOL}.disconnect_container") as disconnect, \
+             patch(f"{POOL}.get_network_container_count", return_value=1):
+            assert pool.reap_sync() == 0
+
+        disconnect.assert_not_called()
+        assert pool.claimed_pair(LAB_PROJECT) is None
+        assert pool.stats()["leaked"] == 1
+        assert pair.slot == 0
+
+    def test_refill_failure_leaves_slot_unready(self):
+        pool = _pool(size=1)
+        with patch(f"{POOL}.create_labeled_network", return_value=False):
+            assert pool.refill_sync() == 0
+        assert pool.claim_sync(LAB_PROJECT) is None
+
+    def test_workers_never_claim_the_same_pair(self):
+        # Two workers, each with its own pool object and ready hints
+        first, second = self._filled(size=2), self._filled(size=2)
+
+        with _empty():
+            a = first.claim_sync(LAB_PROJECT)
+            b = second.claim_sync("octolab_other")
+            assert second.claim_sync(LAB_PROJECT) == a
+
+        assert a.slot != b.slot
+        # Either worker can release any claim
+        with _empty():
+            assert second.release_sync(LAB_PROJECT) is True
+        assert first.claimed_pair(LAB_PROJECT) is None
+
+    def test_attached_pair_without_holder_is_not_handed_out(self):
+        pool = self._filled(size=1)
+
+        with patch(f"{POOL}.get_network_container_count", return_value=1):
+            assert pool.claim_sync(LAB_PROJECT) is None
+
+        assert pool.stats()["leaked"] == 1
+
+
+class TestReconcile:
+    """Tests for startup reconciliation."""
+
+    def test_attached_lab_reclaims_pair(self):
+        pool = _pool(size=2)
+        pairs = carve_pairs("10.248.0.0/16", 24, 2)
+        attached = {pairs[1].lab_net: [f"{LAB_PROJECT}-octobox-1", "octolab-guacd"]}
+
+        with patch(f"{POOL}.get_network_containers", side_effect=lambda n: attached.get(n, [])), \
+             patch(f"{POOL}._list_pool_network_names", return_value=[]):
+            pool.reconcile_sync()
+
+        assert pool.claimed_pair(LAB_PROJECT) == pairs[1]
+
+        # Only the free slot is refilled
+        with patch(f"{POOL}.create_labeled_network", return_value=True) as create, \
+             patch(f"{POOL}.get_network_container_count", return_value=0):
+            assert pool.refill_sync() == 1
+        assert {c.args[0] for c in create.call_args_list} == set(pairs[0].names)
+
+    def test_removes_empty_networks_beyond_size(self):
+        pool = _pool(size=1)
+        with patch(f"{POOL}.get_network_containers", return_value=[]), \
+             patch(f"{POOL}._list_pool_network_names",
+                   return_value=["octolab_pool_000_lab_net", "octolab_pool_005_lab_net"]), \
+             patch(f"{POOL}.get_network_container_count", return_value=0), \
+             patch(f"{POOL}.remove_network") as remove:
+            pool.reconcile_sync()
+
+        remove.assert_called_once_with("octolab_pool_005_lab_net")
+
+
+class TestCreateLabUsesPool:
+    """create_lab takes the pooled path on a hit."""
+
+    @pytest.mark.asyncio
+    async def test_pool_hit_passes_override(self, tmp_path):
+        from app.runtime.compose_runtime import ComposeLabRuntime
+
+        compose_file = tmp_path / "docker-compose.yml"
+        compose_file.write_text("version: '3'\n")
+        runtime = ComposeLabRuntime(compose_file)
+
+        class Lab:
+            id = uuid4()
+            owner_id = uuid4()
+
+        project = runtime._project_name(Lab)
+        pool = _pool(size=1)
+        with patch(f"{POOL}.create_labeled_network", return_value=True), _empty():
+            pool.refill_sync()
+
+        run_compose = AsyncMock(return_value=("", ""))
+        reclaim = AsyncMock()
+        with patch("app.runtime.compose_runtime.get_network_pool", return_value=pool), \
+             patch("app.runtime.compose_runtime.reclaim_lab_networks", reclaim), \
+             patch("app.runtime.compose_runtime.allocate_novnc_port", AsyncMock(return_value=30001)), \
+             patch.object(runtime, "_run_compose", run_compose), \
+             _empty():
+            try:
+                await runtime.create_lab(Lab, None, db_session=AsyncMock(), vnc_password="pw")
+            finally:
+                remove_override(project)
+
+        reclaim.assert_not_called()
+        assert run_compose.await_args.kwargs["extra_compose_files"] == [override_path(project)]
+        assert pool.claimed_pair(project) is not None
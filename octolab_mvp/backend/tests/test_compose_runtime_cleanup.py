@@ -38,7 +38,8 @@ class TestNetworkCountDiagnostics:
         def mock_run(*args, **kwargs):
             return subprocess.CompletedProcess(args[0], 0, stdout=mock_output, stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             result = get_network_counts()
 
         # Should have counts, not lists
@@ -58,7 +59,8 @@ class TestNetworkCountDiagnostics:
         def mock_run(*args, **kwargs):
             return subprocess.CompletedProcess(args[0], 0, stdout=mock_output, stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             result = get_network_counts()
 
         assert result.octolab_count == 250
@@ -72,7 +74,8 @@ class TestNetworkCountDiagnostics:
         def mock_run(*args, **kwargs):
             raise subprocess.TimeoutExpired(args[0], 10)
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             result = get_network_counts()
 
         # Should return empty counts, not raise
@@ -86,7 +89,8 @@ class TestNetworkCountDiagnostics:
         def mock_run(*args, **kwargs):
             return subprocess.CompletedProcess(args[0], 1, stdout="", stderr="error")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             result = get_network_counts()
 
         assert result.total_count == 0
@@ -115,7 +119,8 @@ class TestCleanupProject:
             captured_commands.append(args[0])
             return subprocess.CompletedProcess(args[0], 0, stdout="ok", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             result = await runtime._cleanup_project("test_project")
 
         # Should have called compose down
@@ -138,7 +143,8 @@ class TestCleanupProject:
             captured_commands.append(args[0])
             return subprocess.CompletedProcess(args[0], 0, stdout="ok", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             await runtime._cleanup_project("test_project")
 
         # Should never call docker network prune or docker system prune
@@ -155,7 +161,8 @@ class TestCleanupProject:
         def mock_run(*args, **kwargs):
             raise subprocess.CalledProcessError(1, args[0], stdout="", stderr="error")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             # Should not raise
             result = await runtime._cleanup_project("test_project")
 
@@ -202,11 +209,12 @@ class TestCleanupOnFailure:
         # Mock database session and port allocator
         mock_session = AsyncMock()
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             with patch("app.runtime.compose_runtime.allocate_novnc_port", return_value=30000):
                 with patch("app.runtime.compose_runtime.release_novnc_port"):
-                    with patch("app.runtime.compose_runtime.preflight_network_cleanup") as mock_preflight:
-                        mock_preflight.return_value = MagicMock(removed_count=0)
+                    with patch("app.runtime.compose_runtime.reclaim_lab_networks") as mock_reclaim:
+                        mock_reclaim.return_value = MagicMock(removed_count=0)
                         with patch("app.runtime.compose_runtime.settings") as mock_settings:
                             mock_settings.compose_bind_host = "127.0.0.1"
                             mock_settings.vnc_auth_mode = "password"
@@ -259,7 +267,8 @@ class TestDiagnosticsIncludeNetworkCounts:
                 return subprocess.CompletedProcess(cmd, 0, stdout=mock_network_output, stderr="")
             return mock_compose_output
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             diagnostics = runtime._collect_compose_diagnostics("test_project")
 
         # Should include network counts
@@ -297,7 +306,8 @@ class TestNoAutomaticPrune:
             else:
                 return subprocess.CompletedProcess(args[0], 0, stdout="", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             preflight_cleanup_stale_lab_networks()
 
         # Verify no prune commands
@@ -94,7 +94,7 @@ class TestRunCompose:
             captured_cwd.append(kwargs.get("cwd"))
             return subprocess.CompletedProcess(args[0], 0, stdout="ok", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             await runtime._run_compose(["-p", "test_project", "up", "-d"])
 
         assert len(captured_cmd) == 1
@@ -121,7 +121,7 @@ class TestRunCompose:
             e.stderr = f"Error: VNC_PASSWORD={secret} is invalid"
             raise e
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             with pytest.raises(ComposeCommandError) as exc_info:
                 await runtime._run_compose(
                     ["-p", "test_project", "up", "-d"],
@@ -146,7 +146,7 @@ class TestRunCompose:
             e.stderr = huge_stderr
             raise e
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             with pytest.raises(ComposeCommandError) as exc_info:
                 await runtime._run_compose(["-p", "test_project", "up", "-d"])
 
@@ -164,7 +164,7 @@ class TestRunCompose:
             e.stderr = "some error"
             raise e
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             stdout, stderr = await runtime._run_compose(
                 ["-p", "test_project", "down"],
                 suppress_errors=True,
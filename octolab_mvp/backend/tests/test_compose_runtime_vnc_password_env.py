@@ -93,12 +93,12 @@ class TestVncPasswordEnvInjection:
         with patch("app.runtime.compose_runtime.allocate_novnc_port") as mock_alloc:
             mock_alloc.return_value = 30000
 
-            # Mock preflight cleanup
-            with patch("app.runtime.compose_runtime.preflight_network_cleanup") as mock_cleanup:
+            # Mock pool-exhaustion reclaim
+            with patch("app.runtime.compose_runtime.reclaim_lab_networks") as mock_cleanup:
                 mock_cleanup.return_value = MagicMock(removed_count=0)
 
-                # Mock subprocess.run to capture the environment
-                with patch("subprocess.run") as mock_run:
+                # Mock the executor to capture the environment
+                with patch("app.runtime.compose_runtime.arun_cmd") as mock_run:
                     def capture_env(*args, **kwargs):
                         captured_env.update(kwargs.get("env", {}))
                         # Simulate success
@@ -140,10 +140,10 @@ class TestVncPasswordEnvInjection:
         with patch("app.runtime.compose_runtime.allocate_novnc_port") as mock_alloc:
             mock_alloc.return_value = 30000
 
-            with patch("app.runtime.compose_runtime.preflight_network_cleanup") as mock_cleanup:
+            with patch("app.runtime.compose_runtime.reclaim_lab_networks") as mock_cleanup:
                 mock_cleanup.return_value = MagicMock(removed_count=0)
 
-                with patch("subprocess.run") as mock_run:
+                with patch("app.runtime.compose_runtime.arun_cmd") as mock_run:
                     mock_run.return_value = MagicMock(returncode=0)
 
                     with patch("app.runtime.compose_runtime.settings") as mock_settings:
@@ -183,10 +183,10 @@ class TestLabIdEnvInjection:
         with patch("app.runtime.compose_runtime.allocate_novnc_port") as mock_alloc:
             mock_alloc.return_value = 30000
 
-            with patch("app.runtime.compose_runtime.preflight_network_cleanup") as mock_cleanup:
+            with patch("app.runtime.compose_runtime.reclaim_lab_networks") as mock_cleanup:
                 mock_cleanup.return_value = MagicMock(removed_count=0)
 
-                with patch("subprocess.run") as mock_run:
+                with patch("app.runtime.compose_runtime.arun_cmd") as mock_run:
                     def capture_env(*args, **kwargs):
                         captured_env.update(kwargs.get("env", {}))
                         return MagicMock(returncode=0)
@@ -231,7 +231,7 @@ class TestVncPasswordPresenceLogging:
         env = os.environ.copy()
         env["VNC_PASSWORD"] = test_password
 
-        with patch("subprocess.run") as mock_run:
+        with patch("app.runtime.compose_runtime.arun_cmd") as mock_run:
             # Simulate command failure to see error logging
             mock_run.side_effect = subprocess.CalledProcessError(1, ["docker", "compose"])
 
@@ -54,7 +54,8 @@ class TestDestroyLabComposeDown:
             })
             return subprocess.CompletedProcess(args[0], 0, stdout="", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             with patch("app.runtime.compose_runtime.release_novnc_port", new_callable=AsyncMock):
                 await runtime.destroy_lab(lab)
 
@@ -91,7 +92,8 @@ class TestDestroyLabComposeDown:
             captured_commands.append(args[0])
             return subprocess.CompletedProcess(args[0], 0, stdout="", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             with patch("app.runtime.compose_runtime.release_novnc_port", new_callable=AsyncMock):
                 await runtime.destroy_lab(lab)
 
@@ -144,7 +146,8 @@ class TestLabelBasedNetworkCleanup:
             else:
                 return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             stats = runtime._cleanup_project_networks_by_label(project)
 
         # Should have found 2 networks (the octolab ones)
@@ -184,7 +187,8 @@ class TestLabelBasedNetworkCleanup:
             else:
                 return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             stats = runtime._cleanup_project_networks_by_label(project)
 
         # Should have found 1 network
@@ -242,7 +246,8 @@ class TestDestroyLabLabelCleanup:
             else:
                 return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             with patch("app.runtime.compose_runtime.release_novnc_port", new_callable=AsyncMock):
                 await runtime.destroy_lab(lab)
 
@@ -303,11 +308,12 @@ class TestCreateLabFailureTriggersTeardown:
         mock_session = AsyncMock()
         mock_recipe = MagicMock()
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             with patch("app.runtime.compose_runtime.allocate_novnc_port", return_value=30000):
                 with patch("app.runtime.compose_runtime.release_novnc_port"):
-                    with patch("app.runtime.compose_runtime.preflight_network_cleanup") as mock_preflight:
-                        mock_preflight.return_value = MagicMock(removed_count=0)
+                    with patch("app.runtime.compose_runtime.reclaim_lab_networks") as mock_reclaim:
+                        mock_reclaim.return_value = MagicMock(removed_count=0)
                         with patch("app.runtime.compose_runtime.settings") as mock_settings:
                             mock_settings.compose_bind_host = "127.0.0.1"
                             mock_settings.vnc_auth_mode = "password"
@@ -347,7 +353,8 @@ class TestListNetworksByComposeProject:
                 stderr=""
             )
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             networks = list_networks_by_compose_project(project)
 
         # Should only include octolab_ networks
@@ -362,7 +369,8 @@ class TestListNetworksByComposeProject:
         def mock_run(*args, **kwargs):
             raise subprocess.TimeoutExpired(args[0], 10)
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             networks = list_networks_by_compose_project("test_project")
 
         assert networks == []
@@ -378,7 +386,8 @@ class TestGetNetworkContainerCount:
         def mock_run(*args, **kwargs):
             return subprocess.CompletedProcess(args[0], 0, stdout="3", stderr="")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             count = get_network_container_count("test_network")
 
         assert count == 3
@@ -390,7 +399,8 @@ class TestGetNetworkContainerCount:
         def mock_run(*args, **kwargs):
             return subprocess.CompletedProcess(args[0], 1, stdout="", stderr="not found")
 
-        with patch("subprocess.run", side_effect=mock_run):
+        with patch("subprocess.run", side_effect=mock_run), \
+             patch("app.runtime.compose_runtime.arun_cmd", side_effect=mock_run):
             count = get_network_container_count("nonexistent_network")
 
         assert count == -1
@@ -0,0 +1,237 @@
+"""Tests for the warm standby pool of compose lab stacks.
+
+These tests verify:
+- Claims prefer the recipe's own pool, fall back to shared, and count hits/misses
+- Claims and takes are host-wide: every worker sees the same stacks
+- Expired and abandoned standbys are never handed out and get recycled
+- Claims never taken are dropped without tearing the project down
+- The fill loop starts stacks up to the configured sizes, across workers
+- create_lab activates a standby (password rebind + target only) or cold-starts
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.services.compose_warm_pool import (
+    CLAIM_TAKE_TIMEOUT_SECONDS,
+    ComposeWarmPool,
+    StandbyStack,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.config.settings.compose_state_dir", str(tmp_path / "compose-state"))
+
+
+def _stack(key="*", port=30001, age=0.0):
+    stack = StandbyStack(lab_id=uuid4(), novnc_port=port, pool_key=key)
+    stack.created_at -= age
+    return stack
+
+
+def _pool(sizes=None, ttl_seconds=600, stacks=()):
+    pool = ComposeWarmPool(sizes or {"*": 1}, ttl_seconds=ttl_seconds)
+    for stack in stacks:
+        pool._create(stack)
+    return pool
+
+
+def _no_db_session():
+    return patch("app.db.AsyncSessionLocal")
+
+
+class FakeRuntime:
+    """Records standby lifecycle calls."""
+
+    def __init__(self, fail=False):
+        self.started = []
+        self.discarded = []
+        self.fail = fail
+
+    async def start_standby(self, lab_id, novnc_port):
+        if self.fail:
+            raise RuntimeError("unhealthy")
+        self.started.append((lab_id, novnc_port))
+
+    async def discard_standby(self, lab_id):
+        self.discarded.append(lab_id)
+
+
+class TestClaim:
+    """Tests for claim/take bookkeeping."""
+
+    def test_recipe_pool_then_shared(self):
+        shared, own = _stack("*"), _stack("apache")
+        pool = _pool({"*": 1, "apache": 1}, stacks=[shared, own])
+
+        assert pool.claim("apache").lab_id == own.lab_id
+        assert pool.claim("apache").lab_id == shared.lab_id
+        assert pool.claim("apache") is None
+
+        stats = pool.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["by_recipe"]["apache"] == {"hits": 2, "misses": 1}
+
+    def test_take_is_once_across_workers(self):
+        stack = _stack()
+        pool = _pool(stacks=[stack])
+        other_worker = _pool()
+
+        pool.claim("any")
+        assert stack.project in other_worker.standby_projects()
+        assert other_worker.take(stack.lab_id).novnc_port == stack.novnc_port
+        assert pool.take(stack.lab_id) is None
+        assert stack.project not in pool.standby_projects()
+
+    def test_claimed_stack_is_not_claimed_again_by_another_worker(self):
+        pool = _pool(stacks=[_stack()])
+
+        assert pool.claim("any") is not None
+        assert _pool().claim("any") is None
+
+    @pytest.mark.asyncio
+    async def test_expired_never_claimed_and_recycled(self):
+        old, other = _stack(age=120), _stack(port=30002, age=120)
+        pool = _pool({"*": 2}, ttl_seconds=60, stacks=[old, other])
+        assert pool.claim("any") is None
+
+        runtime = FakeRuntime()
+        assert await pool.recycle(runtime) == 2
+        assert set(runtime.discarded) == {old.lab_id, other.lab_id}
+        assert pool.standby_projects() == set()
+
+    @pytest.mark.asyncio
+    async def test_claim_not_taken_is_dropped_without_teardown(self):
+        stack = _stack()
+        pool = _pool(stacks=[stack])
+        pool.claim("any")
+
+        with patch("app.services.compose_warm_pool.time.time",
+                   return_value=stack.created_at + CLAIM_TAKE_TIMEOUT_SECONDS + 1):
+            runtime = FakeRuntime()
+            assert await pool.recycle(runtime) == 0
+
+        assert runtime.discarded == []
+        assert pool.take(stack.lab_id) is None
+        assert pool.stats()["claims_dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_abandoned_claim_recycled(self):
+        stack = _stack()
+        pool = _pool(stacks=[stack])
+        pool.claim("any")
+
+        pool.abandon(stack.lab_id)
+        runtime = FakeRuntime()
+        assert await pool.recycle(runtime) == 1
+        assert runtime.discarded == [stack.lab_id]
+
+
+class TestFill:
+    """Tests for the fill step."""
+
+    @pytest.mark.asyncio
+    async def test_fill_starts_deficit(self):
+        pool = _pool({"*": 2, "apache": 1}, stacks=[_stack(port=30001)])
+        runtime = FakeRuntime()
+        ports = iter([30002, 30003])
+
+        with _no_db_session() as session_factory, \
+             patch("app.services.port_allocator.pick_unreserved_port",
+                   AsyncMock(side_effect=lambda session, exclude: next(ports))):
+            session_factory.return_value.__aenter__ = AsyncMock()
+            session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+            await pool.fill(runtime)
+
+        assert sorted(port for _, port in runtime.started) == [30002, 30003]
+        assert pool.stats()["ready"] == {"*": 2, "apache": 1}
+
+        # Another worker finds the pools full
+        other_runtime = FakeRuntime()
+        await _pool({"*": 2, "apache": 1}).fill(other_runtime)
+        assert other_runtime.started == []
+
+    @pytest.mark.asyncio
+    async def test_failed_start_is_counted(self):
+        pool = _pool()
+
+        with _no_db_session() as session_factory, \
+             patch("app.services.port_allocator.pick_unreserved_port", AsyncMock(return_value=30001)):
+            session_factory.return_value.__aenter__ = AsyncMock()
+            session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+            await pool.fill(FakeRuntime(fail=True))
+
+        stats = pool.stats()
+        assert stats["start_failures"] == 1
+        assert stats["ready"] == {"*": 0}
+        assert pool.standby_projects() == set()
+
+
+class TestActivation:
+    """create_lab on a claimed standby."""
+
+    @pytest.fixture
+    def runtime(self, tmp_path):
+        from app.runtime.compose_runtime import ComposeLabRuntime
+
+        compose_file = tmp_path / "docker-compose.yml"
+        compose_file.write_text("version: '3'\n")
+        return ComposeLabRuntime(compose_file)
+
+    def _lab_and_pool(self, port=30001):
+        stack = _stack(port=port)
+        pool = _pool(stacks=[stack])
+        pool.claim("any")
+
+        class Lab:
+            id = stack.lab_id
+            owner_id = uuid4()
+
+        return Lab, pool
+
+    @pytest.mark.asyncio
+    async def test_standby_activation_starts_only_target(self, runtime):
+        lab, pool = self._lab_and_pool()
+        run_compose = AsyncMock(return_value=("", ""))
+        rebind = AsyncMock()
+
+        with patch("app.runtime.compose_runtime.get_warm_pool", return_value=pool), \
+             patch("app.runtime.compose_runtime.reclaim_lab_networks") as reclaim, \
+             patch("app.runtime.compose_runtime.allocate_novnc_port", AsyncMock(return_value=30001)), \
+             patch.object(runtime, "_rebind_vnc_password", rebind), \
+             patch.object(runtime, "_run_compose", run_compose):
+            await runtime.create_lab(lab, None, db_session=AsyncMock(), vnc_password="pw")
+
+        reclaim.assert_not_called()
+        rebind.assert_awaited_once_with(f"octolab_{lab.id}", "pw")
+        args = run_compose.await_args.args[0]
+        assert args[-3:] == ["-d", "--no-deps", "target"]
+        assert run_compose.await_args.kwargs["env"]["VNC_PASSWORD"] == "pw"
+        assert pool.stats()["activated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_port_mismatch_discards_and_cold_starts(self, runtime):
+        lab, pool = self._lab_and_pool(port=30001)
+        run_compose = AsyncMock(return_value=("", ""))
+        discard = AsyncMock()
+
+        with patch("app.runtime.compose_runtime.get_warm_pool", return_value=pool), \
+             patch("app.runtime.compose_runtime.get_network_pool", return_value=None), \
+             patch("app.runtime.compose_runtime.reclaim_lab_networks",
+                   AsyncMock(return_value=type("R", (), {"removed_count": 0})())), \
+             patch("app.runtime.compose_runtime.allocate_novnc_port", AsyncMock(return_value=30999)), \
+             patch.object(runtime, "discard_standby", discard), \
+             patch.object(runtime, "_run_compose", run_compose):
+            await runtime.create_lab(lab, None, db_session=AsyncMock(), vnc_password="pw")
+
+        discard.assert_awaited_once_with(lab.id)
+        assert run_compose.await_args.args[0] == ["-p", f"octolab_{lab.id}", "up", "-d"]
+        assert pool.stats()["activation_failures"] == 1
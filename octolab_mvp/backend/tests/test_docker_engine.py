@@ -0,0 +1,208 @@
+"""Tests for the Docker Engine API client and its CLI fallback wiring.
+
+These tests verify:
+- Engine API responses are parsed into typed results
+- Filters and path segments are encoded safely
+- 404/409 responses map to the same outcomes as the CLI path
+- Transport failures put the client in cooldown and callers fall back to the CLI
+"""
+
+import asyncio
+import json
+import subprocess
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services.docker_engine import (
+    DockerEngineClient,
+    DockerEngineError,
+    DockerEngineUnavailableError,
+    try_engine,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+LAB_PROJECT = "octolab_12345678-1234-1234-1234-123456789abc"
+LAB_NET = f"{LAB_PROJECT}_lab_net"
+
+
+def _client(handler) -> DockerEngineClient:
+    return DockerEngineClient(
+        "/nonexistent/docker.sock",
+        transport=httpx.MockTransport(handler),
+        async_transport=httpx.MockTransport(handler),
+    )
+
+
+class TestDockerEngineClient:
+    """Tests for request building and response parsing."""
+
+    def test_list_containers_parses_summary_and_encodes_filters(self):
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["path"] = request.url.path
+            seen["params"] = dict(request.url.params)
+            return httpx.Response(200, json=[{
+                "Id": "a" * 64,
+                "Names": [f"/{LAB_PROJECT}-octobox-1"],
+                "State": "running",
+                "Status": "Up 2 minutes",
+                "Labels": {"com.docker.compose.project": LAB_PROJECT},
+                "NetworkSettings": {"Networks": {LAB_NET: {}}},
+            }])
+
+        containers = _client(handler).list_containers(
+            all=True, filters={"label": [f"com.docker.compose.project={LAB_PROJECT}"]}
+        )
+
+        assert seen["path"] == "/containers/json"
+        assert seen["params"]["all"] == "1"
+        assert json.loads(seen["params"]["filters"]) == {
+            "label": [f"com.docker.compose.project={LAB_PROJECT}"]
+        }
+        assert len(containers) == 1
+        assert containers[0].name == f"{LAB_PROJECT}-octobox-1"
+        assert containers[0].project == LAB_PROJECT
+        assert containers[0].running
+        assert containers[0].networks == [LAB_NET]
+
+    def test_inspect_network_returns_none_on_404(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404, json={"message": "network not found"})
+
+        assert _client(handler).inspect_network(LAB_NET) is None
+
+    def test_inspect_network_returns_attached_containers(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={
+                "Id": "n1",
+                "Name": LAB_NET,
+                "Containers": {"c1": {"Name": f"{LAB_PROJECT}-target-1"}},
+            })
+
+        net = _client(handler).inspect_network(LAB_NET)
+        assert net is not None
+        assert net.container_names == [f"{LAB_PROJECT}-target-1"]
+
+    def test_path_segments_are_quoted(self):
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["raw_path"] = request.url.raw_path
+            return httpx.Response(204)
+
+        _client(handler).remove_network("../containers/x")
+        assert b"/networks/..%2Fcontainers%2Fx" == seen["raw_path"]
+
+    def test_remove_network_error_carries_status_and_message(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(403, json={"message": "error: network has active endpoints"})
+
+        with pytest.raises(DockerEngineError) as exc_info:
+            _client(handler).remove_network(LAB_NET)
+        assert exc_info.value.status_code == 403
+        assert "active endpoints" in exc_info.value.message
+
+    def test_transport_error_marks_client_unavailable(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused")
+
+        client = _client(handler)
+        with pytest.raises(DockerEngineUnavailableError):
+            client.list_networks()
+        assert client.available is False
+
+    @pytest.mark.asyncio
+    async def test_async_inspect_container(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"Name": "/x", "State": {"Health": {"Status": "healthy"}}})
+
+        data = await _client(handler).ainspect_container("x")
+        assert data["State"]["Health"]["Status"] == "healthy"
+
+    def test_async_client_from_previous_loop_is_closed(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"Name": "/x"})
+
+        client = _client(handler)
+        asyncio.run(client.ainspect_container("x"))
+        first = client._async_client
+
+        asyncio.run(client.ainspect_container("x"))
+
+        assert first.is_closed
+        assert client._async_client is not first
+
+
+class TestTryEngine:
+    """Tests for the fallback helper."""
+
+    def test_disabled_api_falls_back(self):
+        with patch("app.services.docker_engine.get_engine_client", return_value=None):
+            assert try_engine(lambda c: c.list_networks()) == (False, None)
+
+    def test_engine_error_falls_back(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(500, json={"message": "boom"})
+
+        with patch("app.services.docker_engine.get_engine_client", return_value=_client(handler)):
+            assert try_engine(lambda c: c.list_networks()) == (False, None)
+
+
+class TestDockerNetEngineWiring:
+    """docker_net helpers use the API when available, CLI otherwise."""
+
+    def test_remove_network_maps_404_to_not_found_without_cli(self):
+        from app.services.docker_net import NetworkRemoveResult, remove_network
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404, json={"message": f"network {LAB_NET} not found"})
+
+        with patch("app.services.docker_net.get_engine_client", return_value=_client(handler)), \
+             patch("subprocess.run") as mock_run:
+            assert remove_network(LAB_NET) == NetworkRemoveResult.NOT_FOUND
+        mock_run.assert_not_called()
+
+    def test_remove_network_maps_active_endpoints_to_in_use(self):
+        from app.services.docker_net import NetworkRemoveResult, remove_network
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(403, json={"message": "error while removing network: network has active endpoints"})
+
+        with patch("app.services.docker_net.get_engine_client", return_value=_client(handler)):
+            assert remove_network(LAB_NET) == NetworkRemoveResult.IN_USE
+
+    def test_scan_running_lab_projects_groups_by_label(self):
+        from app.services.docker_net import scan_running_lab_projects
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json=[
+                {"Id": "1", "Names": [f"/{LAB_PROJECT}-octobox-1"], "State": "running",
+                 "Labels": {"com.docker.compose.project": LAB_PROJECT}},
+                {"Id": "2", "Names": ["/octolab-guacd"], "State": "running",
+                 "Labels": {"com.docker.compose.project": "guacamole"}},
+            ])
+
+        with patch("app.services.docker_engine.get_engine_client", return_value=_client(handler)), \
+             patch("subprocess.run") as mock_run:
+            projects = scan_running_lab_projects()
+
+        assert projects == {LAB_PROJECT: [f"{LAB_PROJECT}-octobox-1"]}
+        mock_run.assert_not_called()
+
+    def test_unreachable_engine_falls_back_to_cli(self):
+        from app.services.docker_net import list_networks_by_compose_project
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused")
+
+        def mock_run(*args, **kwargs):
+            return subprocess.CompletedProcess(args[0], 0, stdout=f"{LAB_NET}\n", stderr="")
+
+        with patch("app.services.docker_engine.get_engine_client", return_value=_client(handler)), \
+             patch("subprocess.run", side_effect=mock_run):
+            assert list_networks_by_compose_project(LAB_PROJECT) == [LAB_NET]
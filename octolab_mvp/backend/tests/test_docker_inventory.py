@@ -0,0 +1,226 @@
+"""Tests for the event-driven Docker inventory.
+
+These tests verify:
+- Resync snapshots and events keep the inventory current
+- Queries group resources by compose project
+- docker_net scans answer from the inventory without any docker calls
+- The sync loop marks the inventory stale on stream loss and resyncs
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.docker_engine import (
+    DockerEngineUnavailableError,
+    EngineContainer,
+    EngineNetwork,
+    EngineVolume,
+)
+from app.services.docker_inventory import (
+    DockerInventory,
+    apply_event,
+    docker_inventory_loop,
+    get_ready_inventory,
+    reset_docker_inventory,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+LAB_PROJECT = "octolab_12345678-1234-1234-1234-123456789abc"
+LAB_NET = f"{LAB_PROJECT}_lab_net"
+EGRESS_NET = f"{LAB_PROJECT}_egress_net"
+PROJECT_LABEL = {"com.docker.compose.project": LAB_PROJECT}
+
+
+def _container(cid, name, state="running", project=LAB_PROJECT, networks=None):
+    labels = {"com.docker.compose.project": project} if project else {}
+    return EngineContainer(
+        id=cid, name=name, state=state, status="", labels=labels, networks=networks or []
+    )
+
+
+class FakeEngine:
+    """Minimal async Engine client backed by in-memory lists."""
+
+    def __init__(self, containers=None, networks=None, volumes=None, events=None):
+        self.containers = containers or []
+        self.networks = networks or []
+        self.volumes = volumes or []
+        self.events = events or []
+        self.streams_opened = 0
+
+    async def alist_containers(self, *, all=False, filters=None, timeout=None):
+        ids = (filters or {}).get("id")
+        return [c for c in self.containers if not ids or c.id in ids]
+
+    async def alist_networks(self, *, filters=None, timeout=None):
+        return list(self.networks)
+
+    async def alist_volumes(self, *, filters=None, timeout=None):
+        names = (filters or {}).get("name")
+        return [v for v in self.volumes if not names or v.name in names]
+
+    async def ainspect_network(self, network, timeout=None):
+        return next((n for n in self.networks if n.id == network), None)
+
+    async def astream_events(self, *, since=None, filters=None):
+        self.streams_opened += 1
+        for event in self.events:
+            yield event
+        raise DockerEngineUnavailableError("stream closed")
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    reset_docker_inventory()
+    yield
+    reset_docker_inventory()
+
+
+class TestInventoryEvents:
+    """Tests for apply_event."""
+
+    @pytest.mark.asyncio
+    async def test_container_start_and_destroy(self):
+        inventory = DockerInventory()
+        inventory.replace_all([], [], [])
+        engine = FakeEngine(containers=[_container("c1", f"{LAB_PROJECT}-octobox-1")])
+
+        await apply_event(engine, inventory, {
+            "Type": "container", "Action": "start", "Actor": {"ID": "c1"},
+        })
+        assert [c.name for c in inventory.containers()] == [f"{LAB_PROJECT}-octobox-1"]
+
+        await apply_event(engine, inventory, {
+            "Type": "container", "Action": "destroy", "Actor": {"ID": "c1"},
+        })
+        assert inventory.containers(running_only=False) == []
+
+    @pytest.mark.asyncio
+    async def test_health_status_action_refreshes_container(self):
+        inventory = DockerInventory()
+        inventory.replace_all([_container("c1", "x", state="created")], [], [])
+        engine = FakeEngine(containers=[_container("c1", "x", state="running")])
+
+        await apply_event(engine, inventory, {
+            "Type": "container", "Action": "health_status: healthy", "Actor": {"ID": "c1"},
+        })
+        assert inventory.containers()[0].running
+
+    @pytest.mark.asyncio
+    async def test_network_connect_refreshes_attachments(self):
+        inventory = DockerInventory()
+        inventory.replace_all([_container("c1", "x")], [], [])
+        engine = FakeEngine(containers=[_container("c1", "x", networks=[LAB_NET])])
+
+        await apply_event(engine, inventory, {
+            "Type": "network", "Action": "connect",
+            "Actor": {"ID": "n1", "Attributes": {"container": "c1", "name": LAB_NET}},
+        })
+        assert [c.id for c in inventory.network_attachments(LAB_NET)] == ["c1"]
+
+    @pytest.mark.asyncio
+    async def test_network_and_volume_lifecycle(self):
+        inventory = DockerInventory()
+        inventory.replace_all([], [], [])
+        engine = FakeEngine(
+            networks=[EngineNetwork(id="n1", name=LAB_NET, labels=PROJECT_LABEL)],
+            volumes=[EngineVolume(name=f"{LAB_PROJECT}_evidence", labels=PROJECT_LABEL)],
+        )
+
+        await apply_event(engine, inventory, {"Type": "network", "Action": "create", "Actor": {"ID": "n1"}})
+        await apply_event(engine, inventory, {
+            "Type": "volume", "Action": "create", "Actor": {"ID": f"{LAB_PROJECT}_evidence"},
+        })
+        resources = inventory.project_resources(LAB_PROJECT)
+        assert [n.name for n in resources.networks] == [LAB_NET]
+        assert [v.name for v in resources.volumes] == [f"{LAB_PROJECT}_evidence"]
+
+        await apply_event(engine, inventory, {"Type": "network", "Action": "destroy", "Actor": {"ID": "n1"}})
+        assert inventory.networks() == []
+
+
+class TestInventoryLoop:
+    """Tests for docker_inventory_loop."""
+
+    @pytest.mark.asyncio
+    async def test_stream_loss_marks_stale_and_resyncs(self):
+        inventory = DockerInventory()
+        engine = FakeEngine(containers=[_container("c1", "x")])
+
+        with patch("app.services.docker_inventory.get_engine_client", return_value=engine), \
+             patch("app.services.docker_inventory._RECONNECT_BACKOFF_INITIAL", 0.01):
+            task = asyncio.create_task(docker_inventory_loop(inventory))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if engine.streams_opened >= 2:
+                    break
+            task.cancel()
+            await task
+
+        assert engine.streams_opened >= 2
+        assert inventory.stats()["resyncs"] >= 2
+        assert inventory.ready is False
+
+    def test_not_ready_until_synced(self):
+        assert get_ready_inventory() is None
+
+
+class TestDockerNetUsesInventory:
+    """docker_net scans answer from the inventory when it is ready."""
+
+    def _inventory(self):
+        inventory = DockerInventory()
+        inventory.replace_all(
+            [
+                _container("c1", f"{LAB_PROJECT}-octobox-1", networks=[LAB_NET]),
+                _container("c2", "octolab-guacd", project="guacamole", networks=[LAB_NET]),
+                _container("c3", f"{LAB_PROJECT}-target-1", state="exited", networks=[EGRESS_NET]),
+            ],
+            [
+                EngineNetwork(id="n1", name=LAB_NET, labels=PROJECT_LABEL),
+                EngineNetwork(id="n2", name=EGRESS_NET, labels=PROJECT_LABEL),
+                EngineNetwork(id="n3", name="bridge"),
+            ],
+            [],
+        )
+        return inventory
+
+    def test_scans_make_no_docker_calls(self):
+        from app.services.docker_net import (
+            get_network_counts,
+            get_running_container_status,
+            list_all_octolab_networks,
+            scan_running_lab_projects,
+        )
+
+        with patch("app.services.docker_net.get_ready_inventory", return_value=self._inventory()), \
+             patch("subprocess.run") as mock_run:
+            assert scan_running_lab_projects() == {LAB_PROJECT: [f"{LAB_PROJECT}-octobox-1"]}
+            assert sorted(list_all_octolab_networks()) == sorted([LAB_NET, EGRESS_NET])
+            counts = get_network_counts()
+            status = get_running_container_status()
+
+        mock_run.assert_not_called()
+        assert counts.total_count == 3
+        assert counts.octolab_count == 2
+        assert status.running_lab_containers == 1
+        assert status.running_nonlab_containers == 1
+
+    def test_scan_network_leaks_classifies_from_inventory(self):
+        from app.services.docker_net import scan_network_leaks
+
+        with patch("app.services.docker_net.get_ready_inventory", return_value=self._inventory()), \
+             patch("subprocess.run") as mock_run:
+            result = scan_network_leaks()
+
+        mock_run.assert_not_called()
+        assert result.total_candidates == 2
+        assert result.in_use == 2
+        assert result.blocked_by_nonlab == 1
+        lab_net = next(n for n in result.networks if n.network == LAB_NET)
+        assert lab_net.nonlab_attached == 1
+        assert lab_net.blocked_by_nonlab is True
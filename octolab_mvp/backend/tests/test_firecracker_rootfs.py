@@ -0,0 +1,155 @@
+"""Tests for per-lab rootfs provisioning.
+
+These tests verify:
+- sparse_copy reproduces the image and keeps holes unallocated
+- Strategies are tried in order: reflink, overlay (opt-in), sparse copy
+- Overlay provisioning attaches the base read-only plus a sparse overlay drive
+- The snapshot template never gets an overlay disk
+- The image store is attached read-only after the lab's drives
+"""
+
+import errno
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.config import settings
+from app.services.firecracker_rootfs import (
+    STRATEGY_OVERLAY,
+    STRATEGY_REFLINK,
+    STRATEGY_SPARSE_COPY,
+    image_store_identity,
+    image_store_path,
+    provision_rootfs,
+    reflink,
+    sparse_copy,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+ROOTFS = "app.services.firecracker_rootfs"
+MIB = 1024 * 1024
+
+
+@pytest.fixture
+def base(tmp_path):
+    path = tmp_path / "base.ext4"
+    with open(path, "wb") as f:
+        f.write(b"superblock")
+        f.seek(32 * MIB)
+        f.write(b"inode table")
+        f.truncate(64 * MIB)
+    return path
+
+
+def _paths(tmp_path):
+    lab = tmp_path / "lab"
+    lab.mkdir()
+    return lab / "rootfs.ext4", lab / "overlay.ext4"
+
+
+class TestSparseCopy:
+    """Tests for the copy fallback."""
+
+    def test_content_and_holes_preserved(self, base, tmp_path):
+        dst = tmp_path / "copy.ext4"
+        sparse_copy(base, dst)
+        assert dst.read_bytes() == base.read_bytes()
+        assert dst.stat().st_size == 64 * MIB
+        # Only the two written extents are allocated, not 64 MiB
+        assert dst.stat().st_blocks * 512 < 8 * MIB
+
+    def test_without_copy_file_range(self, base, tmp_path):
+        dst = tmp_path / "copy.ext4"
+        with patch(f"{ROOTFS}.os.copy_file_range", side_effect=OSError(errno.EXDEV, "x")):
+            sparse_copy(base, dst)
+        assert dst.read_bytes() == base.read_bytes()
+
+
+class TestProvision:
+    """Tests for strategy selection."""
+
+    def test_reflink_preferred(self, base, tmp_path):
+        rootfs, overlay = _paths(tmp_path)
+        with patch(f"{ROOTFS}.fcntl.ioctl") as ioctl:
+            result = provision_rootfs(base, rootfs, overlay)
+        ioctl.assert_called_once()
+        assert result.strategy == STRATEGY_REFLINK
+        assert result.drives == [{
+            "drive_id": "rootfs", "path_on_host": "rootfs.ext4",
+            "is_root_device": True, "is_read_only": False,
+        }]
+
+    def test_reflink_unsupported_removes_partial_file(self, base, tmp_path):
+        rootfs, _ = _paths(tmp_path)
+        with patch(f"{ROOTFS}.fcntl.ioctl", side_effect=OSError(errno.EOPNOTSUPP, "x")):
+            assert not reflink(base, rootfs)
+        assert not rootfs.exists()
+
+    def test_sparse_copy_when_overlay_disabled(self, base, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_rootfs_overlay_enabled", False)
+        rootfs, overlay = _paths(tmp_path)
+        with patch(f"{ROOTFS}.reflink", return_value=False):
+            result = provision_rootfs(base, rootfs, overlay)
+        assert result.strategy == STRATEGY_SPARSE_COPY
+        assert rootfs.read_bytes() == base.read_bytes()
+        assert result.boot_args == ""
+
+    def test_overlay_shares_base_read_only(self, base, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_rootfs_overlay_enabled", True)
+        monkeypatch.setattr(settings, "microvm_rootfs_overlay_size_mib", 256)
+        rootfs, overlay = _paths(tmp_path)
+        with patch(f"{ROOTFS}.reflink", return_value=False):
+            result = provision_rootfs(base, rootfs, overlay)
+
+        assert result.strategy == STRATEGY_OVERLAY
+        assert not rootfs.exists()
+        assert overlay.stat().st_size == 256 * MIB
+        assert overlay.stat().st_blocks == 0
+        root, upper = result.drives
+        assert root["path_on_host"] == str(base) and root["is_read_only"]
+        assert upper["path_on_host"] == "overlay.ext4" and not upper["is_read_only"]
+        assert "init=/sbin/overlay-init" in result.boot_args
+
+    def test_overlay_not_allowed_for_templates(self, base, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_rootfs_overlay_enabled", True)
+        rootfs, overlay = _paths(tmp_path)
+        with patch(f"{ROOTFS}.reflink", return_value=False):
+            result = provision_rootfs(base, rootfs, overlay, allow_overlay=False)
+        assert result.strategy == STRATEGY_SPARSE_COPY
+        assert not os.path.exists(overlay)
+
+
+class TestImageStore:
+    """Tests for the shared image store drive."""
+
+    def test_attached_read_only_after_lab_drives(self, base, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_rootfs_overlay_enabled", True)
+        store = tmp_path / "images.ext4"
+        store.write_bytes(b"docker data root")
+        rootfs, overlay = _paths(tmp_path)
+        with patch(f"{ROOTFS}.reflink", return_value=False):
+            result = provision_rootfs(base, rootfs, overlay, image_store=store)
+
+        assert [d["drive_id"] for d in result.drives] == ["rootfs", "overlay", "images"]
+        images = result.drives[-1]
+        assert images["path_on_host"] == str(store) and images["is_read_only"]
+        assert result.boot_args.endswith("octolab.overlay=/dev/vdb octolab.images=/dev/vdc")
+
+        with patch(f"{ROOTFS}.fcntl.ioctl"):
+            result = provision_rootfs(base, rootfs, overlay, image_store=store)
+        assert result.boot_args == "octolab.images=/dev/vdb"
+
+    def test_missing_store_not_attached(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_image_store_path", str(tmp_path / "images.ext4"))
+        assert image_store_path() is None
+        assert image_store_identity() == ""
+
+        (tmp_path / "images.ext4").write_bytes(b"store")
+        assert image_store_path() == tmp_path / "images.ext4"
+        assert image_store_identity() != ""
+
+        monkeypatch.setattr(settings, "microvm_image_store_path", "")
+        assert image_store_path() is None
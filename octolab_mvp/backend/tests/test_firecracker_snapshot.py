@@ -0,0 +1,296 @@
+"""Tests for the Firecracker snapshot/restore boot path.
+
+These tests verify:
+- Templates are found on disk by key and ignored once the rootfs changes
+- Building a template snapshots the golden VM and prunes older templates
+- Restore loads the snapshot with the lab's TAP and switches to a lab token
+- create_vm falls back to cold boot when a restore fails
+- The guest agent's reidentify command validates input and replaces the token
+"""
+
+import fcntl
+import importlib.util
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import settings
+from app.services import firecracker_cleanup
+from app.services.firecracker_manager import AgentResponse, NetworkConfig, VMMetadata
+from app.services.firecracker_paths import (
+    TEMPLATE_LAB_ID,
+    lab_rootfs_path,
+    lab_state_dir,
+    lab_token_path,
+    snapshot_build_lock_path,
+    template_dir,
+    templates_dir,
+)
+from app.services.firecracker_snapshot import (
+    MANIFEST_FILE,
+    SnapshotError,
+    SnapshotTemplateStore,
+    restore_vm,
+)
+from app.utils import rtnetlink
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+SNAPSHOT = "app.services.firecracker_snapshot"
+LAB_ID = "12345678-1234-1234-1234-123456789abc"
+AGENT_FILE = (
+    Path(__file__).resolve().parent.parent.parent
+    / "infra" / "firecracker" / "guest-agent" / "agent.py"
+)
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    rootfs = tmp_path / "base-rootfs.ext4"
+    kernel = tmp_path / "vmlinux"
+    rootfs.write_bytes(b"rootfs")
+    kernel.write_bytes(b"kernel")
+    monkeypatch.setattr(settings, "microvm_state_dir", str(tmp_path / "microvm"))
+    monkeypatch.setattr(settings, "microvm_rootfs_base_path", str(rootfs))
+    monkeypatch.setattr(settings, "microvm_kernel_path", str(kernel))
+    with patch(f"{SNAPSHOT}._get_binary_version", return_value="Firecracker v1.12.0"):
+        yield tmp_path
+
+
+def _network() -> NetworkConfig:
+    return NetworkConfig(
+        tap_name="otp12345678", bridge_name="obr0", guest_ip="10.200.0.5",
+        host_port=6080, gateway="10.200.0.1",
+    )
+
+
+def _install_template(store: SnapshotTemplateStore, build_id: str = "b1") -> Path:
+    path = template_dir(build_id)
+    path.mkdir(parents=True)
+    for name in ("vmstate", "memory", "rootfs.ext4"):
+        (path / name).write_bytes(name.encode())
+    (path / ".token").write_text("t" * 64)
+    (path / MANIFEST_FILE).write_text(json.dumps({
+        "build_id": build_id, "agent_version": "1.0", "key": store.template_key(),
+        "vsock_cid": 1234, "created_at": 0.0,
+    }))
+    return path
+
+
+class TestTemplates:
+    """Tests for finding and building templates."""
+
+    def test_template_dir_rejects_unsafe_build_ids(self, state_dir):
+        for bad in ("", "../x", "a/b", ".hidden"):
+            with pytest.raises(ValueError):
+                template_dir(bad)
+
+    def test_current_found_on_disk_until_rootfs_changes(self, state_dir):
+        store = SnapshotTemplateStore()
+        assert store.current() is None
+        path = _install_template(store)
+
+        assert SnapshotTemplateStore().current().path == path
+        (state_dir / "base-rootfs.ext4").write_bytes(b"rebuilt rootfs")
+        assert store.current() is None
+        assert store.needs_build()
+
+    def test_image_store_is_part_of_key(self, state_dir, monkeypatch):
+        images = state_dir / "images.ext4"
+        monkeypatch.setattr(settings, "microvm_image_store_path", str(images))
+        store = SnapshotTemplateStore()
+        without = store.template_key()
+        images.write_bytes(b"store")
+        assert store.template_key() != without
+
+    @pytest.mark.asyncio
+    async def test_build_snapshots_golden_vm(self, state_dir):
+        store = SnapshotTemplateStore()
+        old = _install_template(store, "old")
+        (state_dir / "base-rootfs.ext4").write_bytes(b"rebuilt rootfs")
+
+        async def boot(lab_id, network_config, use_snapshot):
+            assert lab_id == TEMPLATE_LAB_ID and not use_snapshot
+            lab_rootfs_path(lab_id).parent.mkdir(parents=True)
+            lab_rootfs_path(lab_id).write_bytes(b"golden disk")
+            lab_token_path(lab_id).write_text("g" * 64)
+            return VMMetadata(lab_id=lab_id, cid=777, api_sock_path="/x/firecracker.sock")
+
+        async def api(sock, method, path, body, timeout=30.0):
+            if path == "/snapshot/create":
+                Path(body["snapshot_path"]).write_bytes(b"state")
+                Path(body["mem_file_path"]).write_bytes(b"mem")
+
+        agent = AsyncMock(side_effect=[
+            AgentResponse(ok=True, agent_version="1.1", rootfs_build_id="b2"),
+            AgentResponse(ok=True),
+        ])
+        with patch(f"{SNAPSHOT}.create_vm", side_effect=boot), \
+             patch(f"{SNAPSHOT}.send_agent_command", agent), \
+             patch(f"{SNAPSHOT}._api_call", side_effect=api) as api_call, \
+             patch(f"{SNAPSHOT}.setup_network_for_lab", AsyncMock(return_value=_network())), \
+             patch(f"{SNAPSHOT}.cleanup_network_for_lab", AsyncMock()) as release, \
+             patch(f"{SNAPSHOT}.destroy_vm", AsyncMock()):
+            template = await store.build()
+
+        assert template.path == template_dir("b2")
+        assert template.manifest.vsock_cid == 777
+        assert template.rootfs_path.read_bytes() == b"golden disk"
+        assert template.read_token() == "g" * 64
+        assert [c.args[2] for c in api_call.call_args_list] == ["/vm", "/snapshot/create"]
+        assert not old.exists()
+        assert [p.name for p in templates_dir().iterdir()] == ["b2"]
+        release.assert_awaited_once_with(TEMPLATE_LAB_ID)
+        assert store.current().path == template.path
+
+    @pytest.mark.asyncio
+    async def test_build_skipped_while_another_worker_holds_lock(self, state_dir):
+        store = SnapshotTemplateStore()
+        snapshot_build_lock_path().parent.mkdir(parents=True)
+        with open(snapshot_build_lock_path(), "w") as other:
+            fcntl.flock(other, fcntl.LOCK_EX)
+            with patch(f"{SNAPSHOT}.destroy_vm", AsyncMock()) as destroy, \
+                 patch(f"{SNAPSHOT}.setup_network_for_lab", AsyncMock()) as setup:
+                assert await store.build() is None
+        destroy.assert_not_awaited()
+        setup.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_build_uses_template_finished_by_another_worker(self, state_dir):
+        store = SnapshotTemplateStore()
+        assert store.current() is None
+        path = _install_template(store)
+        with patch(f"{SNAPSHOT}.destroy_vm", AsyncMock()) as destroy:
+            template = await store.build()
+        assert template.path == path
+        destroy.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_startup_sweep_keeps_golden_vm_while_building(self, state_dir, monkeypatch):
+        orphan = "12345678-1234-1234-1234-123456789abc"
+        for lab_id in (TEMPLATE_LAB_ID, orphan):
+            lab_state_dir(lab_id).mkdir(parents=True)
+        golden_tap = f"otp{TEMPLATE_LAB_ID.replace('-', '')[:10]}"
+        orphan_tap = f"otp{orphan.replace('-', '')[:10]}"
+        deleted = []
+        monkeypatch.setattr(firecracker_cleanup, "MICROVM_BASE_DIR", state_dir / "microvm")
+        monkeypatch.setattr(rtnetlink, "dump_links", lambda: [
+            {"name": golden_tap}, {"name": orphan_tap}, {"name": "obr0"},
+        ])
+        monkeypatch.setattr(rtnetlink, "delete_link", deleted.append)
+
+        with open(snapshot_build_lock_path(), "w") as builder:
+            fcntl.flock(builder, fcntl.LOCK_EX)
+            await firecracker_cleanup.cleanup_orphaned_firecracker_resources()
+
+        assert deleted == [orphan_tap]
+        assert lab_state_dir(TEMPLATE_LAB_ID).exists()
+        assert not lab_state_dir(orphan).exists()
+
+
+class TestRestore:
+    """Tests for restoring labs from a template."""
+
+    @pytest.mark.asyncio
+    async def test_restore_injects_identity(self, state_dir):
+        store = SnapshotTemplateStore()
+        _install_template(store)
+        template = store.current()
+
+        tokens_seen = []
+
+        async def agent(lab_id, command, timeout=None, **kwargs):
+            tokens_seen.append(lab_token_path(lab_id).read_text())
+            assert command == "reidentify"
+            return AgentResponse(ok=True)
+
+        proc = MagicMock(pid=4321, returncode=None)
+        with patch(f"{SNAPSHOT}.asyncio.create_subprocess_exec", AsyncMock(return_value=proc)) as spawn, \
+             patch(f"{SNAPSHOT}._wait_for_api_socket", AsyncMock()), \
+             patch(f"{SNAPSHOT}._api_call", AsyncMock()) as api_call, \
+             patch(f"{SNAPSHOT}.send_agent_command", side_effect=agent) as send, \
+             patch(f"{SNAPSHOT}._wait_for_agent",
+                   AsyncMock(return_value=AgentResponse(ok=True, rootfs_build_id="b1"))):
+            metadata = await restore_vm(LAB_ID, template, _network())
+
+        assert metadata.boot_mode == "snapshot" and metadata.cid == 1234
+        assert spawn.call_args.kwargs["cwd"].endswith(f"lab_{LAB_ID}")
+        load = api_call.call_args.args[3]
+        assert load["network_overrides"] == [{"iface_id": "eth0", "host_dev_name": "otp12345678"}]
+        assert load["mem_backend"]["backend_path"] == str(template.memory_path)
+        assert lab_rootfs_path(LAB_ID).read_bytes() == b"rootfs.ext4"
+
+        new_token = send.call_args.kwargs["new_token"]
+        assert tokens_seen == ["t" * 64]
+        assert lab_token_path(LAB_ID).read_text() == new_token != "t" * 64
+
+    @pytest.mark.asyncio
+    async def test_restore_rejects_other_build(self, state_dir):
+        store = SnapshotTemplateStore()
+        _install_template(store)
+        with patch(f"{SNAPSHOT}.asyncio.create_subprocess_exec",
+                   AsyncMock(return_value=MagicMock(pid=1, returncode=None))), \
+             patch(f"{SNAPSHOT}._wait_for_api_socket", AsyncMock()), \
+             patch(f"{SNAPSHOT}._api_call", AsyncMock()), \
+             patch(f"{SNAPSHOT}.send_agent_command", AsyncMock(return_value=AgentResponse(ok=True))), \
+             patch(f"{SNAPSHOT}._wait_for_agent",
+                   AsyncMock(return_value=AgentResponse(ok=True, rootfs_build_id="other"))):
+            with pytest.raises(SnapshotError):
+                await restore_vm(LAB_ID, store.current(), _network())
+
+    @pytest.mark.asyncio
+    async def test_create_vm_falls_back_to_cold_boot(self, state_dir, monkeypatch):
+        from app.services import firecracker_manager
+
+        monkeypatch.setattr(settings, "microvm_snapshot_enabled", True)
+        store = MagicMock()
+        store.current.return_value = MagicMock()
+        preflight = MagicMock(can_run=True, jailer_usable=True)
+        (state_dir / "base-rootfs.ext4").unlink()
+
+        with patch.object(firecracker_manager, "preflight", return_value=preflight), \
+             patch(f"{SNAPSHOT}.get_snapshot_store", return_value=store), \
+             patch(f"{SNAPSHOT}.restore_vm", AsyncMock(side_effect=SnapshotError("x"))), \
+             patch.object(firecracker_manager, "destroy_vm", AsyncMock()) as destroy:
+            # Cold boot runs and fails on the missing base rootfs
+            with pytest.raises(RuntimeError, match="Base rootfs not found"):
+                await firecracker_manager.create_vm(LAB_ID, _network())
+        destroy.assert_awaited_once_with(LAB_ID)
+
+
+class TestAgentReidentify:
+    """Tests for the guest agent side of restore."""
+
+    @pytest.fixture
+    def agent(self):
+        spec = importlib.util.spec_from_file_location("agent", AGENT_FILE)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.agent_token = "t" * 64
+        return module
+
+    def test_rejects_bad_token(self, agent):
+        result = agent.handle_reidentify({"new_token": "short"})
+        assert not result["ok"]
+        assert agent.agent_token == "t" * 64
+
+    def test_rejects_bad_mac(self, agent):
+        result = agent.handle_reidentify({"new_token": "a" * 64, "mac": "AA:BB;reboot"})
+        assert not result["ok"]
+        assert agent.agent_token == "t" * 64
+
+    def test_replaces_token_and_sets_mac(self, agent):
+        ok = {"ok": True, "stdout": "", "stderr": "", "exit_code": 0}
+        with patch.object(agent, "run_cmd", return_value=ok) as run_cmd:
+            result = agent.handle_reidentify(
+                {"new_token": "a" * 64, "mac": "AA:FC:00:12:34:56", "epoch": 1700000000}
+            )
+        assert result["ok"]
+        assert agent.agent_token == "a" * 64
+        commands = [c.args[0] for c in run_cmd.call_args_list]
+        assert ["date", "-u", "-s", "@1700000000"] in commands
+        assert ["ip", "link", "set", "eth0", "address", "aa:fc:00:12:34:56"] in commands
+        assert "reidentify" in agent.ALLOWED_COMMANDS
@@ -0,0 +1,366 @@
+"""Tests for the asyncio guest agent transport.
+
+These tests verify:
+- The CONNECT handshake and request/response exchange over a Unix socket
+- Connections are reused per VM, and a reused connection the agent closed is
+  retried once on a fresh one
+- Timeouts and cancellation close the connection and never block the loop
+- The guest agent serves several requests per connection
+- Files stream over the framed protocol when the agent offers it, with
+  progress, and are inlined as JSON for agents that don't; binary output
+  comes back as data frames
+"""
+
+import asyncio
+import base64
+import importlib.util
+import io
+import json
+import os
+import socket
+import tarfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.config import settings
+from app.services.firecracker_manager import communicate_with_agent, send_agent_stream
+from app.services.firecracker_vsock import (
+    AgentTransportError,
+    _idle,
+    agent_request,
+    agent_stream,
+    close_agent_connections,
+    frame_version,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+AGENT_FILE = (
+    Path(__file__).resolve().parent.parent.parent
+    / "infra" / "firecracker" / "guest-agent" / "agent.py"
+)
+
+
+class FakeFirecracker:
+    """Hybrid vsock UDS: CONNECT handshake, then newline-delimited JSON."""
+
+    def __init__(self, path, keepalive=True, delay=0.0, handshake=b"OK 1073741824\n"):
+        self.path = str(path)
+        self.keepalive = keepalive
+        self.delay = delay
+        self.handshake = handshake
+        self.connections = 0
+        self.requests = []
+        self.server = None
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            if not (await reader.readline()).startswith(b"CONNECT "):
+                return
+            writer.write(self.handshake)
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                request = json.loads(line)
+                self.requests.append(request)
+                await asyncio.sleep(self.delay)
+                writer.write(json.dumps({
+                    "ok": True,
+                    "stdout": request.get("action") or request.get("command"),
+                    "agent_version": "1", "rootfs_build_id": "b1",
+                }).encode() + b"\n")
+                await writer.drain()
+                if not self.keepalive:
+                    return
+        finally:
+            writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+        return self
+
+    async def __aexit__(self, *exc):
+        close_agent_connections(self.path)
+        self.server.close()
+        await self.server.wait_closed()
+
+
+@pytest.fixture(autouse=True)
+def reuse(monkeypatch):
+    monkeypatch.setattr(settings, "microvm_agent_conn_idle_seconds", 2.0)
+    yield
+    _idle.clear()
+
+
+class TestTransport:
+    """Tests for agent_request."""
+
+    @pytest.mark.asyncio
+    async def test_connection_reused(self, tmp_path):
+        async with FakeFirecracker(tmp_path / "v.sock") as fc:
+            for command in ("ping", "status", "diag"):
+                response = await agent_request(fc.path, {"token": "t", "command": command}, 1)
+                assert response["stdout"] == command
+        assert fc.connections == 1
+        assert len(fc.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_agent_closing_after_response_is_retried(self, tmp_path):
+        async with FakeFirecracker(tmp_path / "v.sock", keepalive=False) as fc:
+            for _ in range(2):
+                await agent_request(fc.path, {"command": "ping"}, 1)
+                await asyncio.sleep(0.01)
+            assert fc.connections == 2
+            assert len(fc.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_reuse_disabled(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_agent_conn_idle_seconds", 0)
+        async with FakeFirecracker(tmp_path / "v.sock") as fc:
+            await agent_request(fc.path, {"command": "ping"}, 1)
+            await agent_request(fc.path, {"command": "ping"}, 1)
+        assert fc.connections == 2
+
+    @pytest.mark.asyncio
+    async def test_timeout_does_not_block_loop(self, tmp_path):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        async with FakeFirecracker(tmp_path / "v.sock", delay=0.5) as fc:
+            task = asyncio.create_task(ticker())
+            with pytest.raises(TimeoutError):
+                await agent_request(fc.path, {"command": "compose_up"}, 0.2)
+            task.cancel()
+            assert ticks >= 10
+            # The timed-out connection was not parked
+            assert fc.path not in _idle or not _idle[fc.path]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request_closes_connection(self, tmp_path):
+        async with FakeFirecracker(tmp_path / "v.sock", delay=0.2) as fc:
+            request = asyncio.create_task(agent_request(fc.path, {"command": "ping"}, 5))
+            await asyncio.sleep(0.05)
+            request.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await request
+            fc.delay = 0
+            await agent_request(fc.path, {"command": "ping"}, 1)
+        assert fc.connections == 2
+
+    @pytest.mark.asyncio
+    async def test_connect_rejected(self, tmp_path):
+        async with FakeFirecracker(tmp_path / "v.sock", handshake=b"ERR no listener\n") as fc:
+            with pytest.raises(AgentTransportError, match="CONNECT failed"):
+                await agent_request(fc.path, {"command": "ping"}, 1)
+
+    @pytest.mark.asyncio
+    async def test_communicate_with_agent(self, tmp_path):
+        async with FakeFirecracker(tmp_path / "v.sock") as fc:
+            response = await communicate_with_agent(fc.path, "secret", "ping", timeout=1)
+        assert response.ok and response.rootfs_build_id == "b1"
+        assert fc.requests == [{"token": "secret", "action": "ping"}]
+
+    @pytest.mark.asyncio
+    async def test_missing_socket(self, tmp_path):
+        response = await communicate_with_agent(str(tmp_path / "none.sock"), "t", "ping", timeout=1)
+        assert not response.ok and response.error.startswith("vsock error")
+
+
+class TestAgentKeepAlive:
+    """The guest agent side of connection reuse."""
+
+    def test_serves_several_requests_per_connection(self):
+        spec = importlib.util.spec_from_file_location("octolab_guest_agent_ka", AGENT_FILE)
+        agent = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(agent)
+        agent.KEEPALIVE_IDLE_TIMEOUT = 0.2
+        agent.agent_token = "right"
+
+        host, guest = socket.socketpair()
+        worker = threading.Thread(target=agent.handle_client, args=(guest,))
+        worker.start()
+        try:
+            reader = host.makefile("rb")
+            for _ in range(2):
+                host.sendall(json.dumps({"token": "wrong", "command": "ping"}).encode() + b"\n")
+                assert json.loads(reader.readline())["error"] == "Authentication failed"
+            # A token change (reidentify) applies to the open connection
+            agent.agent_token = "wrong"
+            host.sendall(json.dumps({"token": "wrong", "command": "ping"}).encode() + b"\n")
+            assert json.loads(reader.readline())["ok"]
+            # Closed by the agent once idle
+            assert reader.readline() == b""
+        finally:
+            worker.join(timeout=2)
+            host.close()
+        assert not worker.is_alive()
+
+
+def _load_agent(name):
+    spec = importlib.util.spec_from_file_location(name, AGENT_FILE)
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+class AgentBehindFirecracker:
+    """The real guest agent behind a hybrid vsock UDS, on threads."""
+
+    def __init__(self, agent, path):
+        self.agent = agent
+        self.path = str(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            line = b""
+            while not line.endswith(b"\n"):
+                line += conn.recv(1)
+            conn.sendall(b"OK 1\n")
+            threading.Thread(target=self.agent.handle_client, args=(conn,), daemon=True).start()
+
+    def __enter__(self):
+        self.server.bind(self.path)
+        self.server.listen()
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        close_agent_connections(self.path)
+        self.server.close()
+
+
+def _project_archive(padding=0):
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w:gz") as tar:
+        for name, data in (("docker-compose.yml", b"services: {}\n"), ("pad.bin", os.urandom(padding))):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return out.getvalue()
+
+
+class TestFramedStream:
+    """Binary uploads over the framed protocol."""
+
+    TOKEN = "t" * 64
+
+    @pytest.fixture
+    def agent(self, tmp_path):
+        agent = _load_agent("octolab_guest_agent_frames")
+        agent.agent_token = self.TOKEN
+        agent.PROJECT_BASE = tmp_path / "opt"
+        agent.PROJECT_DIR = agent.PROJECT_BASE / "project"
+        agent.PROJECT_TAR = agent.PROJECT_BASE / "project.tgz"
+        agent.STAGING_BASE = agent.PROJECT_BASE / "incoming"
+        agent.PROGRESS_INTERVAL_BYTES = 256 * 1024
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_upload_streamed_with_progress(self, agent, tmp_path):
+        archive = _project_archive(padding=3 * 1024 * 1024)
+        progress = []
+        with AgentBehindFirecracker(agent, tmp_path / "v.sock") as vm:
+            assert await frame_version(vm.path, self.TOKEN, 2) == 1
+            response = await agent_stream(
+                vm.path,
+                {"token": self.TOKEN, "command": "upload_project", "project": "p1"},
+                {"project.tgz": archive},
+                timeout=10,
+                on_progress=lambda received, total: progress.append((received, total)),
+            )
+            assert response["ok"], response
+            # Same connection serves JSON requests afterwards
+            ping = await agent_request(vm.path, {"token": self.TOKEN, "command": "ping"}, 2)
+            assert ping["ok"] and len(_idle[vm.path]) == 1
+
+        assert (agent.PROJECT_DIR / "docker-compose.yml").exists()
+        assert agent.PROJECT_TAR.read_bytes() == archive
+        assert progress and all(total == len(archive) for _, total in progress)
+        assert list(agent.STAGING_BASE.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_binary_output_and_file_source(self, agent, tmp_path):
+        def save(request):
+            for _ in range(3):
+                request["_output"](b"x" * 100_000)
+            return {"ok": True, "size": 300_000}
+
+        agent.COMMAND_HANDLERS["image_save"] = save
+        archive = tmp_path / "image.tar"
+        archive.write_bytes(os.urandom(2 * 1024 * 1024 + 5))
+        staged = {}
+        agent.COMMAND_HANDLERS["image_load"] = lambda request: staged.update(
+            data=request["_staged"]["image.tar"].read_bytes()
+        ) or {"ok": True}
+
+        received = bytearray()
+        with AgentBehindFirecracker(agent, tmp_path / "v.sock") as vm:
+            response = await agent_stream(
+                vm.path,
+                {"token": self.TOKEN, "command": "image_save", "image": "octolab/t:latest"},
+                {},
+                timeout=10,
+                on_data=received.extend,
+            )
+            assert response["size"] == len(received) == 300_000
+
+            response = await agent_stream(
+                vm.path,
+                {"token": self.TOKEN, "command": "image_load", "project": "p1"},
+                {"image.tar": archive},
+                timeout=10,
+            )
+            assert response["ok"]
+        assert staged["data"] == archive.read_bytes()
+
+    @pytest.mark.asyncio
+    async def test_rejected_before_payload(self, agent, tmp_path):
+        with AgentBehindFirecracker(agent, tmp_path / "v.sock") as vm:
+            response = await agent_stream(
+                vm.path,
+                {"token": "wrong", "command": "upload_project", "project": "p1"},
+                {"project.tgz": os.urandom(4 * 1024 * 1024)},
+                timeout=10,
+            )
+            assert response["error"] == "Authentication failed"
+            assert not _idle.get(vm.path)
+
+            response = await agent_stream(
+                vm.path,
+                {"token": self.TOKEN, "command": "docker_build", "project": "p1"},
+                {"../escape": b"x"},
+                timeout=10,
+            )
+            assert response["error"] == "Invalid file name"
+        assert not agent.PROJECT_BASE.exists()
+
+    @pytest.mark.asyncio
+    async def test_inlined_for_agents_without_framing(self, tmp_path):
+        with patch("app.services.firecracker_manager._read_token", return_value="secret"), \
+             patch("app.services.firecracker_manager.lab_state_dir", return_value=tmp_path):
+            async with FakeFirecracker(tmp_path / "vsock.sock") as fc:
+                response = await send_agent_stream(
+                    "00000000-0000-0000-0000-000000000001",
+                    "upload_project",
+                    {"project.tgz": b"\x1f\x8b binary"},
+                    project="p1",
+                )
+        assert response.ok
+        assert fc.requests[-1]["data"] == base64.b64encode(b"\x1f\x8b binary").decode()
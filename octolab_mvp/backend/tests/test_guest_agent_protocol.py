@@ -8,8 +8,12 @@ SECURITY: No actual VM or Docker execution - safe to run without elevated privil
 
 import pytest
 import json
+import socket
 import sys
 import importlib.util
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -246,6 +250,117 @@ class TestGuestAgentProtocol:
                 assert status["error"] == "compose_up_failed"
 
 
+@pytest.mark.no_db
+class TestGuestAgentConcurrency:
+    """Test that slow commands do not block the agent."""
+
+    @staticmethod
+    def _request(agent, command, **fields):
+        raw = json.dumps({"token": "t", "command": command, **fields}).encode()
+        return json.loads(agent.handle_request(raw, "t"))
+
+    def _blocking_handler(self, agent, command):
+        """Replace a handler with one that waits for an event."""
+        started, release = threading.Event(), threading.Event()
+
+        def handler(request):
+            started.set()
+            release.wait(5)
+            return {"ok": True, "project": request.get("project")}
+
+        agent.COMMAND_HANDLERS[command] = handler
+        return started, release
+
+    def test_read_only_commands_answered_during_compose_up(self):
+        """ping/status run while a compose_up holds its project lock."""
+        agent = load_agent_module()
+        started, release = self._blocking_handler(agent, "compose_up")
+        agent.COMMAND_HANDLERS["status"] = lambda request: {"ok": True}
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            slow = pool.submit(self._request, agent, "compose_up", project="p1")
+            assert started.wait(2)
+            assert self._request(agent, "ping")["ok"]
+            assert self._request(agent, "status")["ok"]
+            assert not slow.done()
+            release.set()
+            assert slow.result(2)["ok"]
+
+    def test_project_commands_serialized_across_projects(self):
+        """Mutations share one workspace, so they queue whatever project they name."""
+        agent = load_agent_module()
+        started, release = self._blocking_handler(agent, "compose_up")
+        agent.COMMAND_HANDLERS["compose_down"] = lambda request: {"ok": True}
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            pool.submit(self._request, agent, "compose_up", project="p1")
+            assert started.wait(2)
+            same = pool.submit(self._request, agent, "compose_down", project="p1")
+            other = pool.submit(self._request, agent, "compose_down", project="p2")
+            assert self._request(agent, "ping")["ok"]
+            time.sleep(0.1)
+            assert not same.done() and not other.done()
+            release.set()
+            assert same.result(2)["ok"] and other.result(2)["ok"]
+
+    def test_idle_connections_hold_no_worker(self):
+        """A kept-alive connection waits in the watcher, not on a worker."""
+        agent = load_agent_module()
+        agent.agent_token = "t"
+        request = json.dumps({"token": "t", "command": "ping"}).encode() + b"\n"
+
+        with ThreadPoolExecutor(max_workers=1) as workers:
+            idle = agent.IdleConnections(workers)
+            threading.Thread(target=idle.run, daemon=True).start()
+            hosts = []
+            for _ in range(3):
+                host, guest = socket.socketpair()
+                host.settimeout(2)
+                idle.park(guest, agent.REQUEST_TIMEOUT)
+                host.sendall(request)
+                # Answered by the only worker while earlier connections stay open
+                assert json.loads(host.recv(65536))["ok"]
+                hosts.append(host)
+
+            host = hosts[0]
+            host.sendall(request)
+            assert json.loads(host.recv(65536))["ok"]
+            for host in hosts:
+                host.close()
+
+    def test_idle_connection_closed_after_timeout(self):
+        agent = load_agent_module()
+        with ThreadPoolExecutor(max_workers=1) as workers:
+            idle = agent.IdleConnections(workers)
+            threading.Thread(target=idle.run, daemon=True).start()
+            host, guest = socket.socketpair()
+            host.settimeout(2)
+            idle.park(guest, 0.05)
+            assert host.recv(1) == b""
+            host.close()
+
+    def test_mutating_commands_leave_workers_for_read_only(self):
+        """Once the mutating slots are taken, mutations are refused."""
+        agent = load_agent_module()
+        started, release = self._blocking_handler(agent, "docker_build")
+        slots = agent.MAX_WORKERS - agent.READ_ONLY_RESERVE
+
+        with ThreadPoolExecutor(max_workers=slots) as pool:
+            builds = [
+                pool.submit(self._request, agent, "docker_build", project=f"p{n}")
+                for n in range(slots)
+            ]
+            deadline = time.monotonic() + 2
+            while agent._mutating_slots._value and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            busy = self._request(agent, "compose_down", project="other")
+            assert busy == {"ok": False, "error": "Agent busy"}
+            assert self._request(agent, "ping")["ok"]
+            release.set()
+            assert all(build.result(2)["ok"] for build in builds)
+
+
 @pytest.mark.no_db
 class TestBackendTimeoutConfiguration:
     """Test backend timeout configuration for commands."""
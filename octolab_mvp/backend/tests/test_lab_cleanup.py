@@ -201,3 +201,71 @@ class TestSmartCleanup:
             assert result.success is True
             assert result.tier_used == 3
             assert "firecracker_process" in result.issues_resolved
+
+
+class TestCleanupOrphanedNatRules:
+    """Tests for cleanup_orphaned_nat_rules (netd allocation index)."""
+
+    ACTIVE_LAB = "0000000a-0000-0000-0000-00000000000a"
+    GONE_LAB = "0000000b-0000-0000-0000-00000000000b"
+
+    @staticmethod
+    def _session_factory(active_ids):
+        from uuid import UUID
+
+        rows = MagicMock()
+        rows.scalars.return_value = [UUID(lab_id) for lab_id in active_ids]
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=rows)
+        factory = MagicMock()
+        factory.return_value.__aenter__ = AsyncMock(return_value=session)
+        factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        return factory
+
+    @pytest.mark.asyncio
+    async def test_cleans_forwards_of_inactive_labs(self):
+        """Only labs missing from the active set lose their forwards."""
+        from app.services.lab_cleanup import cleanup_orphaned_nat_rules
+
+        allocations = [
+            {"lab_id": self.ACTIVE_LAB, "forwards": [{"host_port": 30001, "guest_port": 6080}]},
+            {"lab_id": self.GONE_LAB, "forwards": [
+                {"host_port": 30002, "guest_port": 6080},
+                {"host_port": 30003, "guest_port": 5900},
+            ]},
+        ]
+
+        with patch(
+            "app.services.lab_cleanup.list_allocations",
+            new_callable=AsyncMock,
+            return_value=allocations,
+        ), patch(
+            "app.services.lab_cleanup.cleanup_port_forward",
+            new_callable=AsyncMock,
+            return_value=True,
+        ) as cleanup, patch(
+            "app.db.AsyncSessionLocal",
+            self._session_factory([self.ACTIVE_LAB]),
+        ):
+            result = await cleanup_orphaned_nat_rules()
+
+        cleanup.assert_awaited_once_with(self.GONE_LAB)
+        assert result == {"rules_found": 3, "rules_cleaned": 2, "errors": []}
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_iptables_for_old_netd(self):
+        """A netd without the allocation index is handled by the iptables scan."""
+        from app.services.lab_cleanup import cleanup_orphaned_nat_rules
+
+        with patch(
+            "app.services.lab_cleanup.list_allocations",
+            new_callable=AsyncMock,
+            return_value=None,
+        ), patch(
+            "app.services.lab_cleanup._cleanup_orphaned_iptables_nat_rules",
+            new_callable=AsyncMock,
+            side_effect=lambda results: results,
+        ) as fallback:
+            await cleanup_orphaned_nat_rules()
+
+        fallback.assert_awaited_once()
@@ -0,0 +1,146 @@
+"""Tests for the background reaper of empty lab networks.
+
+These tests verify:
+- A full scan seeds candidates from lab networks with no attachments only
+- Network events add and drop candidates without rescanning
+- Candidates are removed only after the minimum empty age, and re-checked first
+- Reclaim removes every empty lab network immediately
+- Pressure wakes the reaper before the interval
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.docker_net import NetworkRemoveResult
+from app.services.lab_network_reaper import LabNetworkReaper
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+REAPER = "app.services.lab_network_reaper"
+LAB_NET = "octolab_12345678-1234-1234-1234-123456789abc_lab_net"
+EGRESS_NET = "octolab_12345678-1234-1234-1234-123456789abc_egress_net"
+BUSY_NET = "octolab_87654321-4321-4321-4321-cba987654321_lab_net"
+
+
+def _inventory(attached: dict[str, list] | None = None):
+    attached = {} if attached is None else attached
+    inventory = MagicMock()
+    inventory.networks.return_value = [
+        SimpleNamespace(name=name) for name in (LAB_NET, EGRESS_NET, BUSY_NET, "octolab_mvp_default")
+    ]
+    inventory.network_attachments.side_effect = lambda name: attached.get(name, [])
+    return inventory
+
+
+def _event(action: str, name: str) -> dict:
+    return {"Type": "network", "Action": action, "Actor": {"ID": "x", "Attributes": {"name": name}}}
+
+
+class TestCandidates:
+    """Tests for candidate tracking."""
+
+    def test_rescan_keeps_only_empty_lab_networks(self):
+        reaper = LabNetworkReaper()
+        inventory = _inventory({BUSY_NET: ["c1"], "octolab_mvp_default": ["guacd"]})
+        with patch(f"{REAPER}.get_ready_inventory", return_value=inventory):
+            assert reaper.rescan_sync() == 2
+            assert not reaper.needs_rescan()
+
+    def test_rescan_without_inventory_inspects(self):
+        reaper = LabNetworkReaper()
+        listed = [SimpleNamespace(name=LAB_NET), SimpleNamespace(name=BUSY_NET)]
+        with patch(f"{REAPER}.get_ready_inventory", return_value=None), \
+             patch(f"{REAPER}.list_octolab_networks", return_value=listed), \
+             patch(f"{REAPER}.inspect_network_containers",
+                   side_effect=lambda name: {"c1": {}} if name == BUSY_NET else {}):
+            assert reaper.rescan_sync() == 1
+            assert reaper.needs_rescan()
+
+    def test_events_update_candidates(self):
+        reaper = LabNetworkReaper()
+        inventory = _inventory()
+        with patch(f"{REAPER}.get_ready_inventory", return_value=inventory):
+            reaper.on_event(_event("create", LAB_NET))
+            reaper.on_event(_event("create", "octolab_mvp_default"))
+            assert reaper.stats()["empty_candidates"] == 1
+
+            reaper.on_event(_event("connect", LAB_NET))
+            assert reaper.stats()["empty_candidates"] == 0
+
+            reaper.on_event(_event("disconnect", LAB_NET))
+            assert reaper.stats()["empty_candidates"] == 1
+
+            reaper.on_event(_event("destroy", LAB_NET))
+            assert reaper.stats()["empty_candidates"] == 0
+
+    def test_disconnect_with_remaining_attachments_ignored(self):
+        reaper = LabNetworkReaper()
+        with patch(f"{REAPER}.get_ready_inventory", return_value=_inventory({LAB_NET: ["c2"]})):
+            reaper.on_event(_event("disconnect", LAB_NET))
+        assert reaper.stats()["empty_candidates"] == 0
+
+
+class TestReap:
+    """Tests for removal."""
+
+    def test_young_candidates_kept(self):
+        reaper = LabNetworkReaper()
+        remove = MagicMock(return_value=NetworkRemoveResult.OK)
+        with patch(f"{REAPER}.get_ready_inventory", return_value=_inventory()), \
+             patch(f"{REAPER}.remove_network", remove):
+            reaper.on_event(_event("create", LAB_NET))
+            assert reaper.reap_sync(min_empty_seconds=60).removed_count == 0
+        remove.assert_not_called()
+
+    def test_reattached_candidate_dropped_not_removed(self):
+        reaper = LabNetworkReaper()
+        attached: dict[str, list] = {}
+        remove = MagicMock(return_value=NetworkRemoveResult.OK)
+        with patch(f"{REAPER}.get_ready_inventory", return_value=_inventory(attached)), \
+             patch(f"{REAPER}.remove_network", remove):
+            reaper.on_event(_event("create", LAB_NET))
+            attached[LAB_NET] = ["octobox"]
+            assert reaper.reap_sync(min_empty_seconds=0).removed_count == 0
+        remove.assert_not_called()
+        assert reaper.stats()["empty_candidates"] == 0
+
+    def test_in_use_candidate_retried_later(self):
+        reaper = LabNetworkReaper()
+        with patch(f"{REAPER}.get_ready_inventory", return_value=_inventory()), \
+             patch(f"{REAPER}.remove_network", return_value=NetworkRemoveResult.IN_USE):
+            reaper.on_event(_event("create", LAB_NET))
+            assert reaper.reap_sync(min_empty_seconds=0).removed_count == 0
+        assert reaper.stats()["empty_candidates"] == 1
+
+    def test_reclaim_removes_all_empty(self):
+        reaper = LabNetworkReaper()
+        remove = MagicMock(return_value=NetworkRemoveResult.OK)
+        with patch(f"{REAPER}.get_ready_inventory", return_value=_inventory({BUSY_NET: ["c1"]})), \
+             patch(f"{REAPER}.remove_network", remove):
+            result = reaper.reclaim_sync()
+        assert result.removed_count == 2
+        assert sorted(c.args[0] for c in remove.call_args_list) == sorted([LAB_NET, EGRESS_NET])
+        assert reaper.stats()["reaped"] == 2
+
+
+class TestPressure:
+    """Tests for early wakeup under pressure."""
+
+    @pytest.mark.asyncio
+    async def test_pressure_wakes_wait(self):
+        reaper = LabNetworkReaper()
+        with patch(f"{REAPER}.get_ready_inventory", return_value=_inventory()), \
+             patch(f"{REAPER}.settings") as mock_settings:
+            mock_settings.compose_network_reaper_pressure_threshold = 2
+            waiter = asyncio.create_task(reaper.wait(30))
+            await asyncio.sleep(0)
+            reaper.on_event(_event("create", LAB_NET))
+            await asyncio.sleep(0)
+            assert not waiter.done()
+            reaper.on_event(_event("create", EGRESS_NET))
+            await asyncio.wait_for(waiter, 1)
+        assert reaper.stats()["pressure_wakeups"] == 1
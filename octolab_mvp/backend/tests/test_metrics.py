@@ -0,0 +1,182 @@
+"""Tests for the in-process metrics registry.
+
+These tests verify:
+- Counters, gauges and histograms render in Prometheus text format
+- Histograms report p50/p95/p99 over the recent-observation window
+- track_operation/timed record latency, failures and in-flight counts
+- docker CLI commands map to operation labels without object names
+"""
+
+import asyncio
+import math
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from app.services.docker_net import docker_operation_name, remove_network
+from app.utils.metrics import (
+    HOST_OPERATION_ERRORS,
+    HOST_OPERATION_SECONDS,
+    HOST_OPERATIONS_IN_FLIGHT,
+    MetricsRegistry,
+    get_registry,
+    quantile,
+    timed,
+    track_operation,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    get_registry().reset()
+    yield
+    get_registry().reset()
+
+
+class TestRegistry:
+    """Tests for metric types and rendering."""
+
+    def test_counter_and_gauge_render(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "A counter", ("kind",))
+        gauge = registry.gauge("test_level", "A gauge")
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        gauge.set(7)
+        gauge.dec()
+
+        text = registry.render()
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{kind="a"} 3' in text
+        assert "# TYPE test_level gauge" in text
+        assert "test_level 6" in text
+
+    def test_get_or_create_returns_same_metric(self):
+        registry = MetricsRegistry()
+        assert registry.counter("x_total", "x") is registry.counter("x_total", "x")
+        with pytest.raises(ValueError):
+            registry.gauge("x_total", "x")
+
+    def test_label_mismatch_rejected(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("y_total", "y", ("kind",))
+        with pytest.raises(ValueError):
+            counter.inc(other="a")
+
+    def test_label_values_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("z_total", "z", ("op",)).inc(op='a"b\\c')
+        assert 'z_total{op="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_histogram_buckets_and_quantiles(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+        for value in [0.05] * 50 + [0.5] * 45 + [5.0] * 5:
+            hist.observe(value, op="rm")
+
+        text = registry.render()
+        assert 'op_seconds_bucket{op="rm",le="0.1"} 50' in text
+        assert 'op_seconds_bucket{op="rm",le="1"} 95' in text
+        assert 'op_seconds_bucket{op="rm",le="+Inf"} 100' in text
+        assert 'op_seconds_count{op="rm"} 100' in text
+        assert "# TYPE op_seconds_recent summary" in text
+        assert 'op_seconds_recent{op="rm",quantile="0.5"} 0.05' in text
+        assert 'op_seconds_recent{op="rm",quantile="0.95"} 0.5' in text
+        assert 'op_seconds_recent{op="rm",quantile="0.99"} 5' in text
+
+        snap = hist.snapshot()["rm"]
+        assert snap["count"] == 100
+        assert snap["p50"] == 0.05 and snap["p99"] == 5.0
+
+    def test_quantile_window_is_bounded(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram("w_seconds", "w", window=10)
+        for _ in range(100):
+            hist.observe(10.0)
+        for _ in range(10):
+            hist.observe(1.0)
+        snap = hist.snapshot()[""]
+        assert snap["count"] == 110
+        assert snap["p99"] == 1.0
+
+    def test_quantile_empty(self):
+        assert math.isnan(quantile([], 0.5))
+
+    def test_collectors_rendered(self):
+        registry = MetricsRegistry()
+        registry.register_collector(lambda: ["extra_metric 1"])
+        assert "extra_metric 1" in registry.render()
+
+
+class TestTrackOperation:
+    """Tests for track_operation and timed."""
+
+    def test_success_recorded(self):
+        with track_operation("docker", "docker ps"):
+            pass
+        snap = HOST_OPERATION_SECONDS.snapshot()
+        assert snap["docker/docker ps"]["count"] == 1
+        assert HOST_OPERATION_ERRORS.value(component="docker", operation="docker ps") == 0
+        assert HOST_OPERATIONS_IN_FLIGHT.value(component="docker") == 0
+
+    def test_exception_counts_as_error(self):
+        with pytest.raises(RuntimeError):
+            with track_operation("netd", "create"):
+                raise RuntimeError("boom")
+        assert HOST_OPERATION_ERRORS.value(component="netd", operation="create") == 1
+        assert HOST_OPERATION_SECONDS.snapshot()["netd/create"]["count"] == 1
+
+    def test_ok_false_counts_as_error(self):
+        with track_operation("agent", "compose_up") as op:
+            op.ok = False
+        assert HOST_OPERATION_ERRORS.value(component="agent", operation="compose_up") == 1
+
+    def test_timed_async(self):
+        @timed("guacamole", "login")
+        async def login():
+            assert HOST_OPERATIONS_IN_FLIGHT.value(component="guacamole") == 1
+            return "token"
+
+        assert asyncio.run(login()) == "token"
+        assert HOST_OPERATION_SECONDS.snapshot()["guacamole/login"]["count"] == 1
+
+    def test_rendered_on_registry(self):
+        with track_operation("compose", "create_lab"):
+            pass
+        text = get_registry().render()
+        assert 'octolab_host_operation_seconds_count{component="compose",operation="create_lab"} 1' in text
+        assert 'octolab_host_operation_seconds_recent{component="compose",operation="create_lab",quantile="0.99"}' in text
+
+
+class TestDockerOperationName:
+    """Tests for docker CLI operation labels."""
+
+    @pytest.mark.parametrize(
+        "cmd,expected",
+        [
+            (["docker", "network", "rm", "octolab_x_lab_net"], "docker network rm"),
+            (["docker", "network", "inspect", "n", "--format", "{{json .Containers}}"], "docker network inspect"),
+            (["docker", "ps", "-a", "--filter", "label=x"], "docker ps"),
+            (["docker", "rm", "-f", "abc"], "docker rm"),
+            (["docker", "compose", "-p", "octolab_x", "down", "-v"], "docker compose down"),
+            (
+                ["docker", "compose", "--project-directory", "/d", "-f", "a.yml", "-f", "b.yml", "up", "-d"],
+                "docker compose up",
+            ),
+            ([], "unknown"),
+        ],
+    )
+    def test_names(self, cmd, expected):
+        assert docker_operation_name(cmd) == expected
+
+    def test_cli_call_recorded(self):
+        result = subprocess.CompletedProcess(args=[], returncode=1, stdout="", stderr="Error: No such network")
+        with patch("app.services.docker_net._engine_remove_network", return_value=None), \
+             patch("subprocess.run", return_value=result):
+            remove_network("octolab_x_lab_net")
+        assert HOST_OPERATION_SECONDS.snapshot()["docker/docker network rm"]["count"] == 1
+        assert HOST_OPERATION_ERRORS.value(component="docker", operation="docker network rm") == 1
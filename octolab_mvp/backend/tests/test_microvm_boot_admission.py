@@ -0,0 +1,154 @@
+"""Tests for adaptive Firecracker boot admission.
+
+These tests verify:
+- PSI and meminfo readings are parsed, and missing files read as None
+- The slot target scales with IO/memory pressure and free memory within bounds
+- Slots are file leases shared by independent controllers (worker processes)
+- Waiters are admitted FIFO with an estimated start, and cancellation dequeues
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.config import settings
+from app.services.microvm_boot_admission import BootAdmission
+from app.utils.host_resources import mem_available_mib, pressure_some_avg10
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+ADMISSION = "app.services.microvm_boot_admission"
+
+
+@pytest.fixture(autouse=True)
+def bounds(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "microvm_state_dir", str(tmp_path / "microvm"))
+    monkeypatch.setattr(settings, "microvm_min_concurrent_boots", 1)
+    monkeypatch.setattr(settings, "microvm_max_concurrent_boots", 5)
+    monkeypatch.setattr(settings, "microvm_boot_io_pressure_limit", 40.0)
+    monkeypatch.setattr(settings, "microvm_boot_memory_pressure_limit", 20.0)
+    monkeypatch.setattr(settings, "microvm_boot_min_free_mib", 1024)
+    monkeypatch.setattr(settings, "microvm_mem_size_mib", 512)
+    monkeypatch.setattr(settings, "microvm_boot_admission_poll_seconds", 0.01)
+
+
+def _host(io=0.0, memory=0.0, available=64 * 1024):
+    readings = {"io": io, "memory": memory}
+    return (
+        patch(f"{ADMISSION}.pressure_some_avg10", side_effect=lambda r: readings[r]),
+        patch(f"{ADMISSION}.mem_available_mib", return_value=available),
+    )
+
+
+def _target(**host):
+    psi, mem = _host(**host)
+    with psi, mem:
+        return BootAdmission().target_slots()
+
+
+class TestReadings:
+    """Tests for /proc parsing."""
+
+    def test_pressure_and_meminfo(self, tmp_path):
+        (tmp_path / "io").write_text(
+            "some avg10=12.50 avg60=3.00 avg300=1.00 total=123\n"
+            "full avg10=2.00 avg60=1.00 avg300=0.50 total=45\n"
+        )
+        meminfo = tmp_path / "meminfo"
+        meminfo.write_text("MemTotal: 16384000 kB\nMemAvailable: 8192000 kB\n")
+
+        assert pressure_some_avg10("io", pressure_dir=tmp_path) == 12.5
+        assert pressure_some_avg10("memory", pressure_dir=tmp_path) is None
+        assert mem_available_mib(meminfo) == 8000
+        assert mem_available_mib(tmp_path / "missing") is None
+
+
+class TestTarget:
+    """Tests for slot sizing."""
+
+    def test_idle_host_gets_max(self):
+        assert _target() == 5
+
+    def test_pressure_scales_down(self):
+        assert _target(io=20.0) == 3  # half the IO limit
+        assert _target(memory=20.0) == 1
+        assert _target(io=90.0, memory=50.0) == 1
+
+    def test_free_memory_caps_slots(self):
+        # (2048 - 1024) // 512 = 2 more VMs fit
+        assert _target(available=2048) == 2
+        # Never below the minimum, so boots still make progress
+        assert _target(available=512) == 1
+
+    def test_no_psi_means_no_pressure(self):
+        psi = patch(f"{ADMISSION}.pressure_some_avg10", return_value=None)
+        mem = patch(f"{ADMISSION}.mem_available_mib", return_value=None)
+        with psi, mem:
+            assert BootAdmission().target_slots() == 5
+
+
+class TestLeases:
+    """Tests for admission across controllers."""
+
+    @pytest.mark.asyncio
+    async def test_slots_shared_across_workers(self, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_max_concurrent_boots", 1)
+        worker_a, worker_b = BootAdmission(), BootAdmission()
+        psi, mem = _host()
+        with psi, mem:
+            held_by_b = worker_b.slot("lab-bbbbbb")
+            async with worker_a.slot("lab-aaaaaa"):
+                waiter = asyncio.create_task(held_by_b.__aenter__())
+                await asyncio.sleep(0.05)
+                assert not waiter.done()
+                assert worker_b.stats()["queue_depth"] == 1
+            await asyncio.wait_for(waiter, 1)
+            assert worker_b.stats()["in_progress"] == 1
+            await held_by_b.__aexit__(None, None, None)
+            assert worker_b.stats()["in_progress"] == 0
+
+    @pytest.mark.asyncio
+    async def test_fifo_with_estimates(self, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_max_concurrent_boots", 1)
+        admission = BootAdmission()
+        order = []
+        release = asyncio.Event()
+
+        async def boot(lab_id):
+            async with admission.slot(lab_id):
+                order.append(lab_id)
+                await release.wait()
+
+        psi, mem = _host()
+        with psi, mem:
+            tasks = [asyncio.create_task(boot(f"lab-{n:06d}")) for n in range(3)]
+            await asyncio.sleep(0.05)
+
+            waiting = admission.stats()["waiting"]
+            assert [w["position"] for w in waiting] == [1, 2]
+            assert waiting[0]["estimated_start_in_seconds"] < waiting[1]["estimated_start_in_seconds"]
+
+            release.set()
+            await asyncio.wait_for(asyncio.gather(*tasks), 2)
+
+        assert order == ["lab-000000", "lab-000001", "lab-000002"]
+        stats = admission.stats()
+        assert stats["admitted"] == 3 and stats["queue_depth"] == 0
+        assert stats["max_wait_seconds"] > 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_max_concurrent_boots", 1)
+        admission = BootAdmission()
+        psi, mem = _host()
+        with psi, mem:
+            async with admission.slot("lab-aaaaaa"):
+                waiter = asyncio.create_task(admission.slot("lab-bbbbbb").__aenter__())
+                await asyncio.sleep(0.05)
+                waiter.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await waiter
+                assert admission.stats()["queue_depth"] == 0
+            assert admission.stats()["in_progress"] == 0
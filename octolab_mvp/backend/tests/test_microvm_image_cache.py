@@ -0,0 +1,194 @@
+"""Tests for the content-addressed target image cache.
+
+These tests verify:
+- Keys depend on the Dockerfile and source files, not their order
+- Archives are stored atomically, and failed exports leave nothing behind
+- Least recently used archives are evicted above the size limit
+- Labs load a cached image instead of building, and cache fresh builds
+  before the build step returns
+"""
+
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.config import settings
+from app.services.firecracker_manager import AgentResponse
+from app.services.microvm_image_cache import (
+    TargetImageCache,
+    reset_target_image_cache,
+    target_image_key,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+RUNTIME = "app.runtime.firecracker_runtime"
+LAB_ID = "00000000-0000-0000-0000-00000000abcd"
+DOCKERFILE = "FROM httpd:2.4\nCOPY app.py /app.py\n"
+
+
+def _exporter(*chunks, ok=True):
+    async def export(write):
+        for chunk in chunks:
+            write(chunk)
+        return ok
+    return export
+
+
+class TestKey:
+    """Tests for target_image_key."""
+
+    def test_content_addressed(self):
+        a = {"filename": "a.py", "content": "print(1)"}
+        b = {"filename": "b.py", "content": "print(2)"}
+        assert target_image_key(DOCKERFILE, [a, b]) == target_image_key(DOCKERFILE, [b, a])
+        assert target_image_key(DOCKERFILE, [a]) != target_image_key(DOCKERFILE, [a, b])
+        assert target_image_key(DOCKERFILE, [a]) != target_image_key(
+            DOCKERFILE, [{"filename": "a.py", "content": "print(3)"}]
+        )
+
+
+class TestCache:
+    """Tests for TargetImageCache."""
+
+    @pytest.mark.asyncio
+    async def test_store_and_lookup(self, tmp_path):
+        cache = TargetImageCache(tmp_path, max_bytes=1024)
+        assert cache.lookup("k1") is None
+
+        assert await cache.store("k1", _exporter(b"abc", b"def"))
+        archive = cache.lookup("k1")
+        assert archive.read_bytes() == b"abcdef"
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+        assert stats["archives"] == 1 and stats["bytes"] == 6
+
+    @pytest.mark.asyncio
+    async def test_failed_export_leaves_nothing(self, tmp_path):
+        cache = TargetImageCache(tmp_path, max_bytes=1024)
+        assert not await cache.store("k1", _exporter(b"partial", ok=False))
+        assert list(tmp_path.iterdir()) == []
+        assert cache.stats()["store_failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, tmp_path):
+        cache = TargetImageCache(tmp_path, max_bytes=250)
+        for n, key in enumerate(("old", "used", "new")):
+            await cache.store(key, _exporter(b"x" * 100))
+            os.utime(cache.archive_path(key), (1000 + n, 1000 + n))
+        # Storing "new" went over the limit and evicted "old"
+        assert not cache.archive_path("old").exists()
+
+        # A hit makes "used" the most recent; the next store evicts "new"
+        cache.lookup("used")
+        await cache.store("newest", _exporter(b"x" * 100))
+        assert cache.archive_path("used").exists()
+        assert not cache.archive_path("new").exists()
+        assert cache.stats()["evictions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_store_once_deduplicated(self, tmp_path):
+        cache = TargetImageCache(tmp_path, max_bytes=1024)
+        release = asyncio.Event()
+        calls = 0
+
+        async def export(write):
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            write(b"img")
+            return True
+
+        first = asyncio.create_task(cache.store_once("k1", export))
+        await asyncio.sleep(0)
+        assert not await cache.store_once("k1", export)
+        release.set()
+        assert await first
+        # Already cached (e.g. by another worker)
+        assert not await cache.store_once("k1", export)
+        assert calls == 1
+        assert cache.archive_path("k1").read_bytes() == b"img"
+
+    @pytest.mark.asyncio
+    async def test_store_once_logs_write_failure(self, tmp_path):
+        cache = TargetImageCache(tmp_path, max_bytes=1024)
+        with patch("app.services.microvm_image_cache._write_chunks", side_effect=OSError("disk full")):
+            assert not await cache.store_once("k1", _exporter(b"img"))
+        assert cache.stats()["store_failures"] == 1
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestRuntime:
+    """Tests for FirecrackerLabRuntime._build_target_image with the cache."""
+
+    @pytest.fixture
+    def runtime(self, tmp_path, monkeypatch):
+        from app.runtime.firecracker_runtime import FirecrackerLabRuntime
+
+        monkeypatch.setattr(settings, "microvm_state_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "microvm_image_cache_max_mib", 16)
+        reset_target_image_cache()
+        yield FirecrackerLabRuntime()
+        reset_target_image_cache()
+
+    @pytest.mark.asyncio
+    async def test_miss_builds_and_caches(self, runtime):
+        from app.services.microvm_image_cache import get_target_image_cache
+
+        async def agent(lab_id, command, files, on_data=None, **kwargs):
+            if command == "image_save":
+                on_data(b"image-archive")
+            return AgentResponse(ok=True, image=f"octolab/{kwargs.get('project', 'x')}:latest")
+
+        with patch(f"{RUNTIME}.send_agent_stream", AsyncMock(side_effect=agent)) as send:
+            tag = await runtime._build_target_image(LAB_ID, DOCKERFILE, [])
+            cache = get_target_image_cache()
+
+        key = target_image_key(DOCKERFILE, [])
+        assert tag == f"octolab/target-{key[:12]}:latest"
+        assert [call.args[1] for call in send.await_args_list] == ["docker_build", "image_save"]
+        assert send.await_args.kwargs["image"] == tag
+        assert cache.archive_path(key).read_bytes() == b"image-archive"
+
+    @pytest.mark.asyncio
+    async def test_hit_loads_instead_of_building(self, runtime):
+        from app.services.microvm_image_cache import get_target_image_cache
+
+        key = target_image_key(DOCKERFILE, [])
+        await get_target_image_cache().store(key, _exporter(b"image-archive"))
+
+        with patch(f"{RUNTIME}.send_agent_stream", AsyncMock(return_value=AgentResponse(ok=True))) as send:
+            tag = await runtime._build_target_image(LAB_ID, DOCKERFILE, [])
+
+        assert tag == f"octolab/target-{key[:12]}:latest"
+        send.assert_awaited_once()
+        assert send.await_args.args[1] == "image_load"
+        assert send.await_args.args[2]["image.tar"].read_bytes() == b"image-archive"
+
+    @pytest.mark.asyncio
+    async def test_failed_load_falls_back_to_build(self, runtime):
+        from app.services.microvm_image_cache import get_target_image_cache
+
+        key = target_image_key(DOCKERFILE, [])
+        await get_target_image_cache().store(key, _exporter(b"corrupt"))
+
+        responses = {
+            "image_load": AgentResponse(ok=False, stderr="invalid tar header", exit_code=1),
+            "docker_build": AgentResponse(ok=True),
+            "image_save": AgentResponse(ok=False, error="Agent does not support framed requests"),
+        }
+
+        async def agent(lab_id, command, files, **kwargs):
+            return responses[command]
+
+        with patch(f"{RUNTIME}.send_agent_stream", AsyncMock(side_effect=agent)) as send:
+            tag = await runtime._build_target_image(LAB_ID, DOCKERFILE, [])
+
+        assert tag == f"octolab/target-{key[:12]}:latest"
+        assert [call.args[1] for call in send.await_args_list] == ["image_load", "docker_build", "image_save"]
+        # The archive that failed to load is gone
+        assert not get_target_image_cache().archive_path(key).exists()
@@ -0,0 +1,233 @@
+"""Tests for the microvm-netd allocation index and its journal.
+
+The netd module is loaded from infra/; interface and firewall operations are
+replaced with stubs that always succeed.
+
+SECURITY: No network interfaces or firewall rules are touched.
+"""
+
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.no_db
+
+NETD_FILE = (
+    Path(__file__).resolve().parent.parent.parent / "infra" / "microvm" / "netd" / "microvm_netd.py"
+)
+
+LAB_A = "0000000a-0000-0000-0000-00000000000a"
+LAB_B = "0000000b-0000-0000-0000-00000000000b"
+
+
+def load_netd_module():
+    spec = importlib.util.spec_from_file_location("microvm_netd", NETD_FILE)
+    netd = importlib.util.module_from_spec(spec)
+    # dataclasses resolve string annotations through sys.modules
+    sys.modules[spec.name] = netd
+    spec.loader.exec_module(netd)
+    return netd
+
+
+@pytest.fixture
+def netd(monkeypatch):
+    netd = load_netd_module()
+    monkeypatch.setattr(netd, "ensure_bridge", lambda subnet: (True, ""))
+    monkeypatch.setattr(netd, "create_tap", lambda tap, bridge: (True, ""))
+    monkeypatch.setattr(netd, "destroy_interface", lambda name: (True, ""))
+    monkeypatch.setattr(netd, "_forward_backend_in_use", lambda: netd.FORWARD_BACKEND_IPTABLES)
+    monkeypatch.setattr(netd, "_iptables_setup_port_forward", lambda *args: (True, ""))
+    monkeypatch.setattr(netd, "_iptables_cleanup_port_forward", lambda lab_id: 2)
+    return netd
+
+
+@pytest.fixture
+def journal(netd, tmp_path, monkeypatch):
+    path = tmp_path / "netd.journal"
+    monkeypatch.setattr(netd, "_allocations", netd.AllocationIndex(str(path)))
+    return path
+
+
+def _reload(netd, path):
+    index = netd.AllocationIndex(str(path))
+    index.load()
+    return index
+
+
+class TestHandlers:
+    def test_list_reports_allocations(self, netd):
+        guest_ip = netd.handle_alloc_vm_net(LAB_A)["result"]["guest_ip"]
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        result = netd.handle_list()["result"]
+
+        assert result["allocations"] == [{
+            "lab_id": LAB_A,
+            "tap": netd.derive_tap_name(LAB_A),
+            "guest_ip": guest_ip,
+            "forwards": [{"host_port": 30001, "guest_port": 6080}],
+        }]
+        assert {"name": netd.derive_tap_name(LAB_A), "type": "tap"} in result["interfaces"]
+
+    def test_release_and_cleanup_remove_the_allocation(self, netd):
+        netd.handle_alloc_vm_net(LAB_A)
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        netd.handle_release_vm_net(LAB_A)
+        assert netd.handle_list()["result"]["allocations"][0]["tap"] is None
+
+        netd.handle_cleanup_port_forward(LAB_A)
+        assert netd.handle_list()["result"]["allocations"] == []
+
+    def test_failed_tap_creation_is_not_recorded(self, netd, monkeypatch):
+        monkeypatch.setattr(netd, "create_tap", lambda tap, bridge: (False, "CREATE_FAILED"))
+
+        assert netd.handle_alloc_vm_net(LAB_A)["ok"] is False
+        assert netd.handle_list()["result"]["allocations"] == []
+
+    def test_failed_forward_keeps_previous_owner(self, netd, monkeypatch):
+        netd.handle_alloc_vm_net(LAB_A)
+        netd.handle_alloc_vm_net(LAB_B)
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        monkeypatch.setattr(netd, "_iptables_setup_port_forward", lambda *args: (False, "boom"))
+
+        assert netd.handle_setup_port_forward(LAB_B, 30001, 6080)["ok"] is False
+
+        assert netd._allocations.port_owners == {30001: LAB_A}
+
+    def test_diag_includes_allocation(self, netd, monkeypatch):
+        monkeypatch.setattr(netd, "interface_exists", lambda name: False)
+        netd.handle_alloc_vm_net(LAB_A)
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        allocation = netd.handle_diag_vm_net(LAB_A)["result"]["allocation"]
+
+        assert allocation["forwards"] == [{"host_port": 30001, "guest_port": 6080}]
+
+
+class TestJournal:
+    def test_replay_restores_index(self, netd, journal):
+        netd.handle_alloc_vm_net(LAB_A)
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        netd.handle_alloc_vm_net(LAB_B)
+        netd.handle_setup_port_forward(LAB_B, 30001, 5900)  # port moves to LAB_B
+        netd.handle_release_vm_net(LAB_A)
+
+        index = _reload(netd, journal)
+
+        assert index.snapshot() == netd._allocations.snapshot()
+        assert index.port_owners == {30001: LAB_B}
+        assert LAB_A not in index.allocations
+
+    def test_torn_last_record_is_skipped(self, netd, journal):
+        netd.handle_alloc_vm_net(LAB_A)
+        with journal.open("a") as f:
+            f.write('{"op":"alloc","lab_id":"0000000b-')
+
+        index = _reload(netd, journal)
+
+        assert list(index.allocations) == [LAB_A]
+
+    def test_journal_is_compacted(self, netd, journal, monkeypatch):
+        monkeypatch.setattr(netd, "JOURNAL_COMPACT_RECORDS", 10)
+        for _ in range(20):
+            netd.handle_alloc_vm_net(LAB_A)
+            netd.handle_release_vm_net(LAB_A)
+        netd.handle_alloc_vm_net(LAB_A)
+
+        assert len(journal.read_text().splitlines()) <= 10
+        assert list(_reload(netd, journal).allocations) == [LAB_A]
+
+
+class TestReconcile:
+    def test_kernel_state_wins(self, netd, journal):
+        netd.handle_alloc_vm_net(LAB_A)
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        netd.handle_setup_port_forward(LAB_A, 30002, 6080)
+        netd.handle_alloc_vm_net(LAB_B)
+
+        index = _reload(netd, journal)
+        guest_a = index.allocations[LAB_A].guest_ip
+        index.reconcile(
+            interfaces=[
+                {"name": netd.SHARED_BRIDGE_NAME, "type": "bridge"},
+                {"name": netd.derive_tap_name(LAB_A), "type": "tap"},
+                {"name": "otpffffffffff", "type": "tap"},
+            ],
+            # 30002 is gone; 30005 was added before the journal existed
+            forwards={30001: (guest_a, 6080), 30005: (guest_a, 5900), 30009: ("10.200.9.9", 6080)},
+        )
+
+        assert list(index.allocations) == [LAB_A]  # LAB_B's TAP is gone
+        assert index.allocations[LAB_A].forwards == {30001: 6080, 30005: 5900}
+        assert index.links["otpffffffffff"]["orphan"] is True
+        assert "orphan" not in index.links[netd.SHARED_BRIDGE_NAME]
+        # Reconcile compacts: the journal now holds exactly the reconciled state
+        assert _reload(netd, journal).snapshot() == index.snapshot()
+        assert all(json.loads(line)["op"] in ("alloc", "forward") for line in journal.read_text().splitlines())
+
+    def test_unavailable_kernel_state_keeps_journal(self, netd, journal):
+        netd.handle_alloc_vm_net(LAB_A)
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        index = _reload(netd, journal)
+        index.reconcile(interfaces=None, forwards=None)
+
+        assert index.snapshot() == netd._allocations.snapshot()
+
+
+class TestGuestAddresses:
+    def test_subnet_hands_out_each_address_once(self, netd):
+        subnet = netd.GuestSubnet("br-octonet", "10.9.0.0/29")
+
+        taken = [subnet.allocate() for _ in range(5)]
+
+        assert taken == [f"10.9.0.{host}" for host in range(2, 7)]
+        assert subnet.allocate() is None
+        subnet.release("10.9.0.4")
+        assert subnet.allocate() == "10.9.0.4"
+
+    def test_freed_address_waits_for_wraparound(self, netd):
+        subnet = netd.GuestSubnet("br-octonet", "10.9.0.0/24")
+        first = subnet.allocate()
+        subnet.release(first)
+
+        assert subnet.allocate() != first
+
+    def test_overlapping_subnets_are_rejected(self, netd):
+        with pytest.raises(ValueError, match="overlaps"):
+            netd.parse_guest_subnets(["br-a=10.9.0.0/16", "br-b=10.9.4.0/24"])
+
+    def test_next_subnet_is_used_when_first_is_full(self, netd, monkeypatch):
+        subnets = netd.parse_guest_subnets(["br-a=10.9.0.0/29", "br-b=10.9.1.0/29"])
+        monkeypatch.setattr(netd, "_allocations", netd.AllocationIndex(subnets=subnets))
+        labs = [f"0000000{n}-0000-0000-0000-000000000000" for n in range(6)]
+
+        results = [netd.handle_alloc_vm_net(lab_id)["result"] for lab_id in labs]
+
+        assert len({result["guest_ip"] for result in results}) == 6
+        assert results[-1]["guest_ip"] == "10.9.1.2"
+        assert results[-1]["bridge"] == "br-b"
+
+    def test_replayed_addresses_are_not_reused(self, netd, journal):
+        guest_a = netd.handle_alloc_vm_net(LAB_A)["result"]["guest_ip"]
+
+        index = _reload(netd, journal)
+        guest_b, _ = index.record_alloc(LAB_B, netd.derive_tap_name(LAB_B))
+
+        assert index.allocations[LAB_A].guest_ip == guest_a
+        assert guest_b != guest_a
+
+    def test_legacy_tap_keeps_its_derived_address(self, netd):
+        tap = netd.derive_tap_name(LAB_A)
+        index = netd.AllocationIndex()
+        index.reconcile(interfaces=[{"name": tap, "type": "tap"}], forwards={})
+
+        guest_ip, had_tap = index.record_alloc(LAB_A, tap)
+
+        assert guest_ip == netd.legacy_guest_ip(tap)
+        assert had_tap is True
+        assert index.interfaces() == [{"name": tap, "type": "tap"}]
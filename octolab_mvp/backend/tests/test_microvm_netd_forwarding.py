@@ -0,0 +1,266 @@
+"""Tests for microvm-netd port forwarding backends.
+
+The netd module is loaded from infra/ and its run_cmd is replaced with a
+fake that models the nftables forward map and iptables nat chains.
+
+SECURITY: No nft/iptables commands are executed.
+"""
+
+import importlib.util
+import json
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.no_db
+
+# Test file: backend/tests/...; netd: infra/microvm/netd/microvm_netd.py
+NETD_FILE = (
+    Path(__file__).resolve().parent.parent.parent / "infra" / "microvm" / "netd" / "microvm_netd.py"
+)
+
+LAB_A = "0000000a-0000-0000-0000-00000000000a"
+LAB_B = "0000000b-0000-0000-0000-00000000000b"
+
+
+def load_netd_module():
+    spec = importlib.util.spec_from_file_location("microvm_netd", NETD_FILE)
+    netd = importlib.util.module_from_spec(spec)
+    # dataclasses resolve string annotations through sys.modules
+    sys.modules[spec.name] = netd
+    spec.loader.exec_module(netd)
+    return netd
+
+
+class FakeHost:
+    """Just enough of nft and iptables for the port forward code paths."""
+
+    def __init__(self, nft_available: bool = True):
+        self.nft_available = nft_available
+        self.table = False
+        self.forwards: dict[int, tuple[str, int]] = {}
+        self.iptables: dict[str, list[str]] = {"PREROUTING": [], "OUTPUT": []}
+        self.calls: list[list[str]] = []
+
+    def run_cmd(self, args, timeout=None, input_text=None, output_limit=2048):
+        self.calls.append(list(args))
+        if args[0] == "nft":
+            if not self.nft_available:
+                return -1, "", "Command not found: nft"
+            return self._nft(args[1:], input_text)
+        if args[0] == "iptables":
+            return self._iptables(args[3:])
+        return 1, "", "unexpected command"
+
+    def _nft(self, args, input_text):
+        if args == ["--version"]:
+            return 0, "nftables v1.0.9", ""
+        if args[:2] == ["-j", "list"]:
+            if not self.table:
+                return 1, "", "No such file or directory"
+            elem = [[port, {"concat": [ip, gp]}] for port, (ip, gp) in self.forwards.items()]
+            return 0, json.dumps({"nftables": [{"metainfo": {}}, {"map": {"name": "port_forwards", "elem": elem}}]}), ""
+        if args[0] == "list":
+            return (0, "", "") if self.table else (1, "", "No such file or directory")
+        if args == ["-f", "-"]:
+            if "map port_forwards {" in input_text:
+                self.table = True
+                self.forwards.clear()
+                return 0, "", ""
+            # Transaction: apply to a copy, commit only if every line succeeds
+            saved = dict(self.forwards)
+            for line in input_text.strip().splitlines():
+                rc, _, err = self._element(line.split()[0], line)
+                if rc != 0:
+                    self.forwards = saved
+                    return rc, "", err
+            return 0, "", ""
+        if args[0] in ("add", "delete") and args[1] == "element":
+            return self._element(args[0], " ".join(args))
+        return 1, "", "unsupported nft command"
+
+    def _element(self, verb, text):
+        body = text[text.index("{") + 1 : text.rindex("}")]
+        if verb == "add":
+            port, ip, gp = re.match(r"\s*(\d+) : ([\d.]+) \. (\d+)", body).groups()
+            if int(port) in self.forwards:
+                return 1, "", "Error: Could not process rule: File exists"
+            self.forwards[int(port)] = (ip, int(gp))
+            return 0, "", ""
+        ports = [int(p) for p in body.split(",")]
+        if any(p not in self.forwards for p in ports):
+            return 1, "", "Error: Could not process rule: No such file or directory"
+        for port in ports:
+            del self.forwards[port]
+        return 0, "", ""
+
+    def _iptables(self, args):
+        action, chain = args[0], args[1]
+        if action == "-S":
+            return 0, "\n".join([f"-P {chain} ACCEPT", *self.iptables[chain]]), ""
+        if action == "-D" and args[2:] and args[2].isdigit():
+            del self.iptables[chain][int(args[2]) - 1]
+            return 0, "", ""
+        if action == "-D":
+            rule = " ".join(["-A", chain, *args[2:]])
+            if rule in self.iptables[chain]:
+                self.iptables[chain].remove(rule)
+                return 0, "", ""
+            return 1, "", "Bad rule"
+        if action == "-A":
+            self.iptables[chain].append(" ".join(args))
+            return 0, "", ""
+        if action == "-L":
+            lines = ["Chain " + chain, "num target"]
+            lines += [f"{n} DNAT {rule}" for n, rule in enumerate(self.iptables[chain], 1)]
+            return 0, "\n".join(lines), ""
+        return 1, "", "unsupported iptables command"
+
+
+@pytest.fixture
+def netd():
+    netd = load_netd_module()
+    # Forwards target the lab's allocated guest IP
+    for lab_id in (LAB_A, LAB_B):
+        netd._allocations.record_alloc(lab_id, netd.derive_tap_name(lab_id))
+    return netd
+
+
+def guest_ip_of(netd, lab_id):
+    return netd._allocations.get(lab_id, netd.derive_tap_name(lab_id))["guest_ip"]
+
+
+@pytest.fixture
+def host(netd, monkeypatch):
+    fake = FakeHost()
+    monkeypatch.setattr(netd, "run_cmd", fake.run_cmd)
+    return fake
+
+
+class TestNftablesForwarding:
+    def test_setup_adds_one_map_element(self, netd, host):
+        result = netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        assert result["ok"] is True
+        assert result["result"]["backend"] == "nftables"
+        guest_ip = result["result"]["guest_ip"]
+        assert host.forwards == {30001: (guest_ip, 6080)}
+        assert host.calls[-1] == [
+            "nft", "add", "element", "ip", "octolab", "port_forwards",
+            f"{{ 30001 : {guest_ip} . 6080 }}",
+        ]
+
+    def test_table_is_created_once(self, netd, host):
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        netd.handle_setup_port_forward(LAB_B, 30002, 6080)
+
+        creates = [c for c in host.calls if c == ["nft", "-f", "-"]]
+        assert len(creates) == 1
+        assert len(host.forwards) == 2
+
+    def test_setup_is_idempotent(self, netd, host):
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        calls = len(host.calls)
+
+        result = netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        assert result["ok"] is True
+        assert len(host.calls) == calls
+
+    def test_reused_host_port_is_replaced(self, netd, host):
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        result = netd.handle_setup_port_forward(LAB_B, 30001, 6080)
+
+        assert result["ok"] is True
+        assert host.forwards == {30001: (result["result"]["guest_ip"], 6080)}
+        # LAB_A no longer owns the port, so its cleanup leaves it alone
+        assert netd.handle_cleanup_port_forward(LAB_A)["result"]["deleted_rules"] == 0
+        assert 30001 in host.forwards
+
+    def test_cleanup_deletes_only_the_labs_elements(self, netd, host):
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        netd.handle_setup_port_forward(LAB_A, 30003, 5900)
+        netd.handle_setup_port_forward(LAB_B, 30002, 6080)
+
+        result = netd.handle_cleanup_port_forward(LAB_A)
+
+        assert result["ok"] is True
+        assert result["result"]["deleted_rules"] == 2
+        assert list(host.forwards) == [30002]
+        assert host.calls[-1][-1] == "{ 30001, 30003 }"
+
+    def test_cleanup_recovers_from_stale_index(self, netd, host):
+        netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+        netd.handle_setup_port_forward(LAB_A, 30003, 6080)
+        del host.forwards[30003]  # removed behind netd's back
+
+        result = netd.handle_cleanup_port_forward(LAB_A)
+
+        assert result["ok"] is True
+        assert result["result"]["deleted_rules"] == 1
+        assert host.forwards == {}
+
+    def test_index_is_rebuilt_from_kernel_map(self, netd, host):
+        guest_ip = guest_ip_of(netd, LAB_A)
+        host.table = True
+        host.forwards[30001] = (guest_ip, 6080)
+
+        result = netd.handle_cleanup_port_forward(LAB_A)
+
+        assert result["result"]["deleted_rules"] == 1
+        assert host.forwards == {}
+
+    def test_iptables_rules_are_migrated(self, netd, host):
+        guest_ip = guest_ip_of(netd, LAB_A)
+        comment = "octolab_" + LAB_A.replace("-", "")[-12:]
+        host.iptables["PREROUTING"].append(
+            f"-A PREROUTING -p tcp -m tcp --dport 30001 -m comment --comment {comment} "
+            f"-j DNAT --to-destination {guest_ip}:6080"
+        )
+        host.iptables["OUTPUT"].append(
+            f"-A OUTPUT -d 127.0.0.1/32 -p tcp -m tcp --dport 30001 -m comment --comment {comment} "
+            f"-j DNAT --to-destination {guest_ip}:6080"
+        )
+
+        netd.handle_setup_port_forward(LAB_B, 30002, 6080)
+
+        assert host.forwards[30001] == (guest_ip, 6080)
+        assert host.iptables == {"PREROUTING": [], "OUTPUT": []}
+
+
+class TestIptablesFallback:
+    def test_falls_back_when_nft_missing(self, netd, host):
+        host.nft_available = False
+
+        result = netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        assert result["ok"] is True
+        assert result["result"]["backend"] == "iptables"
+        assert len(host.iptables["PREROUTING"]) == 1
+        assert len(host.iptables["OUTPUT"]) == 1
+
+        result = netd.handle_cleanup_port_forward(LAB_A)
+        assert result["result"]["deleted_rules"] == 2
+        assert host.iptables == {"PREROUTING": [], "OUTPUT": []}
+
+    def test_iptables_backend_can_be_forced(self, netd, host):
+        netd.configure_forward_backend("iptables")
+
+        result = netd.handle_setup_port_forward(LAB_A, 30001, 6080)
+
+        assert result["result"]["backend"] == "iptables"
+        assert not any(c[0] == "nft" for c in host.calls)
+
+    def test_unallocated_lab_is_rejected(self, netd, host):
+        lab_id = "0000000c-0000-0000-0000-00000000000c"
+
+        result = netd.handle_setup_port_forward(lab_id, 30001, 6080)
+
+        assert result["error"]["code"] == "NOT_ALLOCATED"
+        assert host.calls == []
+
+    def test_unknown_backend_is_rejected(self, netd):
+        with pytest.raises(ValueError):
+            netd.configure_forward_backend("pf")
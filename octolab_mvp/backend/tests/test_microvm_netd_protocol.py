@@ -0,0 +1,237 @@
+"""Tests for the microvm-netd request protocol and the pooled async client.
+
+The real netd socket server (infra/microvm/netd) runs in a thread on a
+temporary socket; only unprivileged ops (ping, hello, batch and a test op)
+are exercised.
+
+SECURITY: No network interfaces or firewall rules are touched.
+"""
+
+import asyncio
+import contextlib
+import importlib.util
+import json
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services import microvm_net_client as client
+
+pytestmark = pytest.mark.no_db
+
+NETD_FILE = (
+    Path(__file__).resolve().parent.parent.parent / "infra" / "microvm" / "netd" / "microvm_netd.py"
+)
+
+
+def load_netd_module():
+    spec = importlib.util.spec_from_file_location("microvm_netd", NETD_FILE)
+    netd = importlib.util.module_from_spec(spec)
+    # dataclasses resolve string annotations through sys.modules
+    sys.modules[spec.name] = netd
+    spec.loader.exec_module(netd)
+    return netd
+
+
+@pytest.fixture
+def socket_dir():
+    # AF_UNIX paths are limited to ~108 bytes; pytest's tmp_path can be longer
+    path = Path(tempfile.mkdtemp(prefix="netd", dir="/tmp"))
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def netd_server(socket_dir, monkeypatch):
+    netd = load_netd_module()
+    release = threading.Event()
+
+    def handle_wait(tag: str = "") -> dict:
+        release.wait(5)
+        return {"ok": True, "result": {"tag": tag}}
+
+    monkeypatch.setitem(netd.OP_REGISTRY, "wait", (handle_wait, False, [("tag", False, "")]))
+
+    server = netd.NetdServer(str(socket_dir / "netd.sock"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not Path(server.socket_path).exists():
+        assert time.monotonic() < deadline, "netd did not start"
+        time.sleep(0.01)
+
+    server.release = release
+    yield server
+    release.set()
+    server.stop()
+    thread.join(timeout=5)
+
+
+@pytest.fixture(autouse=True)
+def fresh_client_state():
+    client.close_netd_connections()
+    yield
+    client.close_netd_connections()
+
+
+def _one_shot(path: str, payload: bytes) -> bytes:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5)
+    sock.connect(path)
+    sock.sendall(payload)
+    chunks = []
+    while chunk := sock.recv(4096):
+        chunks.append(chunk)
+    sock.close()
+    return b"".join(chunks)
+
+
+class TestNetdServerFraming:
+    def test_request_without_id_is_answered_and_closed(self, netd_server):
+        # Original clients: unterminated JSON, read until close
+        data = _one_shot(netd_server.socket_path, b'{"op": "ping"}')
+
+        assert json.loads(data)["ok"] is True
+
+    def test_pipelined_requests_answer_out_of_order(self, netd_server):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(5)
+        sock.connect(netd_server.socket_path)
+        sock.sendall(b'{"op": "wait", "id": 1}\n{"op": "ping", "id": 2}\n')
+
+        reader = sock.makefile("rb")
+        first = json.loads(reader.readline())
+        netd_server.release.set()
+        second = json.loads(reader.readline())
+        sock.close()
+
+        assert (first["id"], second["id"]) == (2, 1)
+        assert first["ok"] and second["ok"]
+
+    def test_response_written_before_close_after_client_eof(self, netd_server):
+        # The server closes on EOF once in-flight requests hold no permit;
+        # a permit is only returned after the response is written
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(5)
+        sock.connect(netd_server.socket_path)
+        sock.sendall(b'{"op": "wait", "id": 7}\n')
+        sock.shutdown(socket.SHUT_WR)
+        time.sleep(0.1)
+        netd_server.release.set()
+
+        response = json.loads(sock.makefile("rb").readline())
+        sock.close()
+
+        assert response["id"] == 7 and response["ok"]
+
+    def test_batch_stops_after_failure(self, netd_server):
+        request = {
+            "op": "batch",
+            "requests": [{"op": "ping"}, {"op": "nope"}, {"op": "ping"}],
+        }
+        data = _one_shot(netd_server.socket_path, json.dumps(request).encode() + b"\n")
+        responses = json.loads(data)["result"]["responses"]
+
+        assert [r["ok"] for r in responses] == [True, False, False]
+        assert responses[1]["error"] == "UNKNOWN_OP"
+        assert responses[2]["error"] == "SKIPPED"
+
+    def test_hello_reports_protocol_version(self, netd_server):
+        data = _one_shot(netd_server.socket_path, b'{"op": "hello"}\n')
+        hello = json.loads(data)
+
+        assert hello["protocol_version"] == 2
+        assert "batch" in hello["supported_ops"]
+
+
+class TestPooledClient:
+    @pytest.mark.asyncio
+    async def test_requests_share_one_connection(self, netd_server, monkeypatch):
+        monkeypatch.setattr("app.config.settings.microvm_netd_pool_size", 1)
+        path = netd_server.socket_path
+
+        slow = asyncio.create_task(client._send_request({"op": "wait", "tag": "slow"}, path))
+        await asyncio.sleep(0.1)
+        ping = await client._send_request({"op": "ping"}, path)
+        assert ping.ok is True
+        assert not slow.done()
+
+        netd_server.release.set()
+        result = await slow
+        assert result.result["tag"] == "slow"
+        assert len(client._connections[path]) == 1
+
+    @pytest.mark.asyncio
+    async def test_timed_out_request_leaves_connection_usable(self, netd_server, monkeypatch):
+        monkeypatch.setattr("app.config.settings.microvm_netd_pool_size", 1)
+        path = netd_server.socket_path
+
+        with pytest.raises(client.NetdUnavailableError):
+            await client._send_request({"op": "wait"}, path, timeout=0.2)
+        netd_server.release.set()
+
+        assert (await client._send_request({"op": "ping"}, path)).ok is True
+        assert len(client._connections[path]) == 1
+
+    @pytest.mark.asyncio
+    async def test_batch(self, netd_server):
+        results = await client.batch(
+            [{"op": "ping"}, {"op": "nope"}, {"op": "ping"}],
+            stop_on_error=False,
+            socket_path=netd_server.socket_path,
+        )
+
+        assert [r.ok for r in results] == [True, False, True]
+        assert results[1].error_code == "UNKNOWN_OP"
+
+
+@contextlib.asynccontextmanager
+async def legacy_netd(socket_dir: Path):
+    """A netd without protocol_version 2: answers once and closes."""
+    path = str(socket_dir / "legacy.sock")
+    requests = []
+
+    async def handle(reader, writer):
+        request = json.loads(await reader.read(4096))
+        requests.append(request)
+        if request["op"] == "hello":
+            response = {"ok": True, "api_version": 1, "supported_ops": ["ping"]}
+        elif request["op"] == "ping":
+            response = {"ok": True, "result": {"status": "ok"}}
+        else:
+            response = {"ok": False, "error": "UNKNOWN_OP", "message": "Unknown operation"}
+        writer.write(json.dumps(response).encode())
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_unix_server(handle, path)
+    try:
+        yield path, requests
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+class TestOneShotNetdFallback:
+    @pytest.mark.asyncio
+    async def test_requests_use_one_connection_each(self, socket_dir):
+        async with legacy_netd(socket_dir) as (path, requests):
+            assert (await client._send_request({"op": "ping"}, path)).ok is True
+            assert (await client._send_request({"op": "ping"}, path)).ok is True
+
+        assert client._protocol_versions[path] == 1
+        assert [r["op"] for r in requests] == ["hello", "ping", "ping"]
+
+    @pytest.mark.asyncio
+    async def test_batch_falls_back_to_single_requests(self, socket_dir):
+        async with legacy_netd(socket_dir) as (path, requests):
+            results = await client.batch([{"op": "ping"}, {"op": "ping"}], socket_path=path)
+
+        assert [r.ok for r in results] == [True, True]
+        assert [r["op"] for r in requests][-2:] == ["ping", "ping"]
@@ -0,0 +1,325 @@
+"""Tests for the warm standby pool of Firecracker microVMs.
+
+These tests verify:
+- Claims hand out ready VMs once and count hits/misses
+- VMs of a replaced rootfs, expired VMs and abandoned claims are recycled
+- Refill boots up to the configured size and stops when host memory is short
+- Standbys are marked host-wide; orphan sweeps of any worker skip them
+- Untaken claims are handed to their lab, never destroyed
+- create_lab on a claimed VM skips network setup and boot, cold-boots otherwise
+"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from app.services import firecracker_cleanup
+from app.services.firecracker_manager import AgentResponse, NetworkConfig
+from app.services.firecracker_paths import lab_state_dir, standby_markers_dir
+from app.services.microvm_warm_pool import (
+    CLAIM_TAKE_TIMEOUT_SECONDS,
+    MicroVMWarmPool,
+    StandbyVM,
+    _hold_marker,
+    current_rootfs_key,
+    host_standby_lab_ids,
+)
+from app.utils import rtnetlink
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+POOL = "app.services.microvm_warm_pool"
+RUNTIME = "app.runtime.firecracker_runtime"
+
+
+@pytest.fixture(autouse=True)
+def rootfs(tmp_path, monkeypatch):
+    path = tmp_path / "base-rootfs.ext4"
+    path.write_bytes(b"rootfs")
+    monkeypatch.setattr(settings, "microvm_rootfs_base_path", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    path = tmp_path / "microvm"
+    monkeypatch.setattr(settings, "microvm_state_dir", str(path))
+    return path
+
+
+def _network() -> NetworkConfig:
+    return NetworkConfig(
+        tap_name="otp12345678", bridge_name="obr0", guest_ip="10.200.0.5",
+        host_port=0, gateway="10.200.0.1", netmask="255.255.255.0",
+    )
+
+
+def _vm(age=0.0, rootfs_key=None):
+    vm = StandbyVM(
+        lab_id=uuid4(),
+        network_config=_network(),
+        rootfs_key=rootfs_key or current_rootfs_key(),
+    )
+    vm.created_at -= age
+    return vm
+
+
+class FakeRuntime:
+    """Records standby lifecycle calls."""
+
+    def __init__(self, fail=False):
+        self.started = []
+        self.discarded = []
+        self.fail = fail
+
+    async def start_standby(self, lab_id):
+        if self.fail:
+            raise RuntimeError("agent not ready")
+        self.started.append(lab_id)
+        return _network(), AgentResponse(ok=True, rootfs_build_id="b1")
+
+    async def discard_standby(self, lab_id):
+        self.discarded.append(lab_id)
+
+
+class TestClaim:
+    """Tests for claim/take bookkeeping."""
+
+    def test_claim_take_once(self):
+        pool = MicroVMWarmPool(size=1, ttl_seconds=600)
+        vm = _vm()
+        pool._ready.append(vm)
+
+        assert pool.claim() is vm
+        assert str(vm.lab_id) in pool.standby_lab_ids()
+        assert pool.claim() is None
+        assert pool.take(vm.lab_id) is vm
+        assert pool.take(vm.lab_id) is None
+        assert pool.standby_lab_ids() == set()
+
+        stats = pool.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    @pytest.mark.asyncio
+    async def test_replaced_rootfs_never_claimed_and_recycled(self):
+        pool = MicroVMWarmPool(size=2, ttl_seconds=600)
+        old_build, parked = _vm(rootfs_key="1:1:1"), _vm(rootfs_key="1:1:1")
+        pool._ready = [old_build]
+        assert pool.claim() is None
+
+        pool._ready = [parked]
+        runtime = FakeRuntime()
+        assert await pool.recycle(runtime) == 2
+        assert set(runtime.discarded) == {old_build.lab_id, parked.lab_id}
+
+    @pytest.mark.asyncio
+    async def test_expired_and_abandoned_recycled(self):
+        pool = MicroVMWarmPool(size=2, ttl_seconds=60)
+        expired, claimed = _vm(age=120), _vm()
+        pool._ready = [claimed]
+        pool.claim()
+        pool.abandon(claimed.lab_id)
+        pool._ready = [expired]
+
+        runtime = FakeRuntime()
+        assert await pool.recycle(runtime) == 2
+        assert set(runtime.discarded) == {expired.lab_id, claimed.lab_id}
+        assert pool.standby_lab_ids() == set()
+
+    @pytest.mark.asyncio
+    async def test_untaken_claim_handed_over_not_destroyed(self):
+        pool = MicroVMWarmPool(size=1, ttl_seconds=600)
+        runtime = FakeRuntime()
+        with patch(f"{POOL}.mem_available_mib", return_value=None):
+            await pool.fill(runtime)
+        vm = pool.claim()
+        lab_state_dir(vm.lab_id).mkdir(parents=True)
+        vm.claimed_at -= CLAIM_TAKE_TIMEOUT_SECONDS
+
+        assert await pool.recycle(runtime) == 0
+        assert runtime.discarded == []
+        # The lab row owns it now; a late create_lab still gets the VM
+        assert host_standby_lab_ids() == set()
+        assert pool.stats()["claims_handed_over"] == 1
+        assert pool.take(vm.lab_id) is vm
+
+
+class TestMarkers:
+    """Standbys are visible to the orphan sweeps of every worker."""
+
+    @pytest.mark.asyncio
+    async def test_standbys_marked_until_taken_or_drained(self):
+        pool = MicroVMWarmPool(size=2, ttl_seconds=600)
+        runtime = FakeRuntime()
+        with patch(f"{POOL}.mem_available_mib", return_value=None):
+            await pool.fill(runtime)
+        assert host_standby_lab_ids() == {str(lab_id) for lab_id in runtime.started}
+
+        vm = pool.claim()
+        assert str(vm.lab_id) in host_standby_lab_ids()
+        pool.take(vm.lab_id)
+        await pool.drain(runtime)
+        assert host_standby_lab_ids() == set()
+        assert list(standby_markers_dir().iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_marker_visible_while_standby_boots(self):
+        pool = MicroVMWarmPool(size=1, ttl_seconds=600)
+        booting = asyncio.Event()
+        release = asyncio.Event()
+
+        class SlowRuntime(FakeRuntime):
+            async def start_standby(self, lab_id):
+                booting.set()
+                await release.wait()
+                return await super().start_standby(lab_id)
+
+        runtime = SlowRuntime()
+        with patch(f"{POOL}.mem_available_mib", return_value=None):
+            task = asyncio.create_task(pool.fill(runtime))
+            await booting.wait()
+            assert len(host_standby_lab_ids()) == 1
+            release.set()
+            await task
+
+    def test_marker_of_dead_worker_is_stale(self):
+        lab_id = uuid4()
+        standby_markers_dir().mkdir(parents=True)
+        (standby_markers_dir() / str(lab_id)).write_text("4242\n")
+
+        assert host_standby_lab_ids() == set()
+        assert not (standby_markers_dir() / str(lab_id)).exists()
+
+    @pytest.mark.asyncio
+    async def test_startup_sweep_keeps_other_workers_standbys(self, state_dir, monkeypatch):
+        other, orphan = uuid4(), uuid4()
+        held = _hold_marker(other)
+        for lab_id in (other, orphan):
+            lab_state_dir(lab_id).mkdir(parents=True)
+        other_tap = f"otp{other.hex[:10]}"
+        orphan_tap = f"otp{orphan.hex[:10]}"
+        deleted = []
+        monkeypatch.setattr(firecracker_cleanup, "MICROVM_BASE_DIR", state_dir)
+        monkeypatch.setattr(rtnetlink, "dump_links", lambda: [
+            {"name": other_tap}, {"name": orphan_tap}, {"name": "obr0"},
+        ])
+        monkeypatch.setattr(rtnetlink, "delete_link", deleted.append)
+        try:
+            stats = await firecracker_cleanup.cleanup_orphaned_firecracker_resources()
+        finally:
+            os.close(held)
+
+        assert deleted == [orphan_tap]
+        assert stats["vm_directories_deleted"] == 1
+        assert lab_state_dir(other).exists() and not lab_state_dir(orphan).exists()
+
+
+class TestFill:
+    """Tests for the refill step."""
+
+    @pytest.mark.asyncio
+    async def test_fill_starts_deficit(self, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_warm_pool_min_free_mib", 1024)
+        pool = MicroVMWarmPool(size=3, ttl_seconds=600)
+        pool._ready.append(_vm())
+        runtime = FakeRuntime()
+
+        with patch(f"{POOL}.mem_available_mib", return_value=64 * 1024):
+            await pool.fill(runtime)
+
+        assert len(runtime.started) == 2
+        assert pool.stats()["ready"] == 3
+        assert {vm.build_id for vm in pool._ready[1:]} == {"b1"}
+
+    @pytest.mark.asyncio
+    async def test_fill_deferred_when_memory_short(self, monkeypatch):
+        monkeypatch.setattr(settings, "microvm_mem_size_mib", 512)
+        monkeypatch.setattr(settings, "microvm_warm_pool_min_free_mib", 2048)
+        pool = MicroVMWarmPool(size=2, ttl_seconds=600)
+        runtime = FakeRuntime()
+
+        with patch(f"{POOL}.mem_available_mib", return_value=2048):
+            await pool.fill(runtime)
+
+        assert runtime.started == []
+        assert pool.stats()["memory_deferrals"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_start_is_counted(self):
+        pool = MicroVMWarmPool(size=1, ttl_seconds=600)
+        with patch(f"{POOL}.mem_available_mib", return_value=None):
+            await pool.fill(FakeRuntime(fail=True))
+
+        stats = pool.stats()
+        assert (stats["start_failures"], stats["ready"]) == (1, 0)
+        assert pool.standby_lab_ids() == set()
+
+
+class TestActivation:
+    """create_lab on a claimed standby VM."""
+
+    @pytest.fixture
+    def runtime(self):
+        from app.runtime.firecracker_runtime import FirecrackerLabRuntime
+
+        runtime = FirecrackerLabRuntime()
+        runtime._ensure_preflight = lambda: None
+        runtime.compose_up_inside_vm = AsyncMock()
+        return runtime
+
+    def _lab_and_pool(self):
+        pool = MicroVMWarmPool(size=1, ttl_seconds=600)
+        vm = _vm()
+        pool._ready.append(vm)
+        pool.claim()
+        lab = SimpleNamespace(id=vm.lab_id, owner_id=uuid4(), runtime_meta=None)
+        return lab, pool
+
+    def _patches(self, pool):
+        return (
+            patch(f"{RUNTIME}.get_microvm_warm_pool", return_value=pool),
+            patch(f"{RUNTIME}.run_doctor", return_value=SimpleNamespace(ok=True)),
+            patch(f"{RUNTIME}.setup_network_for_lab", AsyncMock(return_value=_network())),
+            patch(f"{RUNTIME}.create_vm", AsyncMock()),
+            patch(f"{RUNTIME}.setup_port_forward_for_lab", AsyncMock()),
+            patch(f"{RUNTIME}.send_agent_command", AsyncMock(return_value=AgentResponse(
+                ok=True, agent_version="1", rootfs_build_id="b1",
+            ))),
+            patch(f"{RUNTIME}.send_agent_stream", AsyncMock(return_value=AgentResponse(ok=True))),
+        )
+
+    @pytest.mark.asyncio
+    async def test_standby_skips_boot(self, runtime):
+        lab, pool = self._lab_and_pool()
+        p_pool, p_doctor, p_net, p_vm, p_fwd, p_agent, p_stream = self._patches(pool)
+        with p_pool, p_doctor, p_net as setup_net, p_vm as create_vm, p_fwd as fwd, \
+             p_agent as agent, p_stream as stream:
+            await runtime.create_lab(lab, None, vnc_password="pw")
+
+        setup_net.assert_not_called()
+        create_vm.assert_not_called()
+        fwd.assert_awaited_once_with(str(lab.id), 6080, guest_port=5900)
+        commands = [call.args[1] for call in agent.await_args_list]
+        assert "ping" not in commands
+        assert stream.await_args.args[1] == "upload_project"
+        assert lab.runtime_meta["guest_ip"] == "10.200.0.5"
+        assert pool.stats()["activated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_abandoned_standby_discarded_and_cold_booted(self, runtime):
+        lab, pool = self._lab_and_pool()
+        pool.abandon(lab.id)
+        runtime.discard_standby = AsyncMock()
+        p_pool, p_doctor, p_net, p_vm, p_fwd, p_agent, p_stream = self._patches(pool)
+        with p_pool, p_doctor, p_net as setup_net, p_vm as create_vm, p_fwd, p_agent, p_stream:
+            await runtime.create_lab(lab, None, vnc_password="pw")
+
+        runtime.discard_standby.assert_awaited_once_with(lab.id)
+        setup_net.assert_awaited_once()
+        create_vm.assert_awaited_once()
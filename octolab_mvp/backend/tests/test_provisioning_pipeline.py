@@ -0,0 +1,124 @@
+"""Tests for the dependency-ordered provisioning pipeline.
+
+These tests verify:
+- Phases start once their dependencies finish, and independent ones overlap
+- Per-phase timings and results are recorded
+- A failure starts nothing new, cancels running phases but lets shielded
+  (resource-acquiring) phases finish before the error propagates
+- Unknown dependencies and cycles are rejected before anything runs
+"""
+
+import asyncio
+
+import pytest
+
+from app.runtime.pipeline import PipelineError, ProvisioningPipeline
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+
+def _phase(log, name, delay=0.0, result=None, error=None):
+    async def run():
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        log.append(f"end {name}")
+        return result if result is not None else name
+
+    return run
+
+
+class TestOrdering:
+    """Tests for dependency-driven scheduling."""
+
+    @pytest.mark.asyncio
+    async def test_independent_phases_overlap(self):
+        log = []
+        pipeline = ProvisioningPipeline("test")
+        pipeline.add("port", _phase(log, "port", 0.05, result=6080))
+        pipeline.add("network", _phase(log, "network", 0.05))
+        pipeline.add("vm", _phase(log, "vm"), after=("network",))
+        pipeline.add("forward", _phase(log, "forward"), after=("port", "vm"))
+
+        started = asyncio.get_running_loop().time()
+        results = await pipeline.run()
+        elapsed = asyncio.get_running_loop().time() - started
+
+        assert log[:2] == ["start port", "start network"]
+        assert log.index("start vm") > log.index("end network")
+        assert log.index("start forward") > max(log.index("end port"), log.index("end vm"))
+        assert elapsed < 0.09  # port and network ran concurrently
+        assert results["port"] == 6080
+        assert set(pipeline.timings) == {"port", "network", "vm", "forward"}
+        assert pipeline.timings["port"] >= 0.05
+        assert pipeline.summary().startswith("port=")
+
+    @pytest.mark.asyncio
+    async def test_results_visible_to_dependents(self):
+        pipeline = ProvisioningPipeline("test")
+
+        async def double():
+            return pipeline.results["base"] * 2
+
+        pipeline.add("base", _phase([], "base", result=21))
+        pipeline.add("double", double, after=("base",))
+        assert (await pipeline.run())["double"] == 42
+
+
+class TestFailure:
+    """Tests for failure handling."""
+
+    @pytest.mark.asyncio
+    async def test_shielded_phases_finish_and_others_cancelled(self):
+        log = []
+        pipeline = ProvisioningPipeline("test")
+        pipeline.add("port", _phase(log, "port", error=ValueError("no ports")))
+        pipeline.add("network", _phase(log, "network", 0.05), shielded=True)
+        pipeline.add("lookup", _phase(log, "lookup", 0.05))
+        pipeline.add("vm", _phase(log, "vm"), after=("network",), shielded=True)
+
+        with pytest.raises(ValueError, match="no ports"):
+            await pipeline.run()
+
+        assert "end network" in log  # Allowed to finish: cleanup needs its TAP
+        assert "end lookup" not in log  # Cancelled
+        assert "start vm" not in log  # Nothing new after the failure
+        assert pipeline.results == {"network": "network"}
+        assert pipeline.started == {"port", "network", "lookup"}
+
+    @pytest.mark.asyncio
+    async def test_outside_cancel_waits_for_shielded(self):
+        log = []
+        pipeline = ProvisioningPipeline("test")
+        pipeline.add("vm", _phase(log, "vm", 0.05), shielded=True)
+        pipeline.add("images", _phase(log, "images", 1.0))
+
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert "end vm" in log and "end images" not in log
+        assert pipeline.results == {"vm": "vm"}
+
+    @pytest.mark.asyncio
+    async def test_invalid_graphs_rejected(self):
+        log = []
+        pipeline = ProvisioningPipeline("test")
+        pipeline.add("a", _phase(log, "a"), after=("missing",))
+        with pytest.raises(PipelineError, match="unknown"):
+            await pipeline.run()
+
+        pipeline = ProvisioningPipeline("test")
+        pipeline.add("a", _phase(log, "a"), after=("b",))
+        pipeline.add("b", _phase(log, "b"), after=("a",))
+        pipeline.add("c", _phase(log, "c"))
+        with pytest.raises(PipelineError, match="cycle"):
+            await pipeline.run()
+        assert log == []
+
+        with pytest.raises(PipelineError, match="Duplicate"):
+            pipeline.add("c", _phase(log, "c"))
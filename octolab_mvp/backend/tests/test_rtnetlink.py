@@ -0,0 +1,151 @@
+"""Tests for rtnetlink link management (backend module and netd's copy).
+
+Only unprivileged requests reach the kernel (dumping links, deleting a link
+that does not exist); everything else uses a faked link table.
+
+SECURITY: No network interfaces are created or deleted.
+"""
+
+import errno
+import importlib.util
+import socket
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.services import firecracker_cleanup
+from app.utils import rtnetlink
+
+pytestmark = pytest.mark.no_db
+
+NETD_FILE = (
+    Path(__file__).resolve().parent.parent.parent / "infra" / "microvm" / "netd" / "microvm_netd.py"
+)
+
+requires_netlink = pytest.mark.skipif(
+    not hasattr(socket, "AF_NETLINK"), reason="AF_NETLINK is Linux-only"
+)
+
+
+def load_netd_module():
+    spec = importlib.util.spec_from_file_location("microvm_netd", NETD_FILE)
+    netd = importlib.util.module_from_spec(spec)
+    # dataclasses resolve string annotations through sys.modules
+    sys.modules[spec.name] = netd
+    spec.loader.exec_module(netd)
+    return netd
+
+
+def _link(name, kind=None, master=None):
+    return {"index": 0, "name": name, "kind": kind, "up": True, "operstate": "up", "master": master}
+
+
+class TestMessages:
+    def test_attributes_round_trip(self):
+        data = rtnetlink._attr(rtnetlink.IFLA_IFNAME, b"otp12345\0") + rtnetlink._attr(
+            rtnetlink.IFLA_MASTER, b"\x07\0\0\0"
+        )
+
+        attrs = rtnetlink._parse_attrs(data)
+
+        assert rtnetlink._str(attrs[rtnetlink.IFLA_IFNAME]) == "otp12345"
+        assert attrs[rtnetlink.IFLA_MASTER] == b"\x07\0\0\0"
+
+    def test_parse_link(self):
+        linkinfo = rtnetlink._attr(
+            rtnetlink.IFLA_LINKINFO, rtnetlink._attr(rtnetlink.IFLA_INFO_KIND, b"bridge")
+        )
+        body = (
+            rtnetlink._ifinfo(index=4, flags=rtnetlink.IFF_UP)
+            + rtnetlink._ifname("br-octonet")
+            + rtnetlink._attr(rtnetlink.IFLA_OPERSTATE, b"\x06")
+            + linkinfo
+        )
+
+        link = rtnetlink.parse_link(body)
+
+        assert link == {
+            "index": 4,
+            "name": "br-octonet",
+            "kind": "bridge",
+            "up": True,
+            "operstate": "up",
+            "master": 0,
+        }
+
+
+@requires_netlink
+class TestKernel:
+    def test_dump_includes_loopback(self):
+        links = {link["name"]: link for link in rtnetlink.dump_links()}
+
+        assert links["lo"]["index"] == 1
+        assert links["lo"]["up"] is True
+
+    def test_delete_missing_link_raises_enodev(self):
+        with pytest.raises(rtnetlink.NetlinkError) as exc_info:
+            rtnetlink.delete_link("otpmissing0")
+
+        assert exc_info.value.errno == errno.ENODEV
+
+
+class TestOrphanCleanup:
+    def test_deletes_only_prefixed_links(self, monkeypatch):
+        deleted = []
+        monkeypatch.setattr(
+            rtnetlink,
+            "dump_links",
+            lambda: [_link("lo"), _link("otp0a1b2c"), _link("obr123"), _link("eth0")],
+        )
+        monkeypatch.setattr(rtnetlink, "delete_link", deleted.append)
+
+        assert firecracker_cleanup._cleanup_tap_interfaces() == 1
+        assert firecracker_cleanup._cleanup_bridge_interfaces() == 1
+        assert deleted == ["otp0a1b2c", "obr123"]
+
+    def test_falls_back_to_sudo_without_cap_net_admin(self, monkeypatch):
+        commands = []
+
+        def delete_link(name):
+            raise rtnetlink.NetlinkError(errno.EPERM, "Operation not permitted")
+
+        monkeypatch.setattr(rtnetlink, "dump_links", lambda: [_link("otp0a1b2c")])
+        monkeypatch.setattr(rtnetlink, "delete_link", delete_link)
+        monkeypatch.setattr(
+            firecracker_cleanup.subprocess, "run", lambda args, **kwargs: commands.append(args)
+        )
+
+        assert firecracker_cleanup._cleanup_tap_interfaces() == 1
+        assert commands == [["sudo", "ip", "link", "delete", "otp0a1b2c"]]
+
+
+class TestNetdLinks:
+    def test_list_lab_interfaces_filters_dump(self, monkeypatch):
+        netd = load_netd_module()
+        monkeypatch.setattr(
+            netd,
+            "nl_dump_links",
+            lambda: [
+                _link("lo"),
+                _link("br-octonet", "bridge"),
+                _link("otp0a1b2c", "tun", "br-octonet"),
+                _link("obr123", "bridge"),
+            ],
+        )
+
+        assert netd.list_lab_interfaces() == [
+            {"name": "br-octonet", "type": "bridge"},
+            {"name": "otp0a1b2c", "type": "tap"},
+            {"name": "obr123", "type": "bridge", "legacy": True},
+        ]
+
+    def test_destroy_missing_interface_is_idempotent(self, monkeypatch):
+        netd = load_netd_module()
+
+        def delete_link(name):
+            raise netd.NetlinkError(errno.ENODEV, "No such device")
+
+        monkeypatch.setattr(netd, "nl_delete_link", delete_link)
+
+        assert netd.destroy_interface("otp0a1b2c") == (True, "")
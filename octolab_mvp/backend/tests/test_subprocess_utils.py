@@ -0,0 +1,144 @@
+"""Tests for the async subprocess executor.
+
+These tests verify:
+- binary_key collapses sudo and aliased binaries onto one cap
+- arun_cmd honours per-binary concurrency caps
+- Timeouts and cancellation kill the child (and its process group)
+- Output capture is bounded, stdin is passed through
+- command_stats records latency buckets and exit outcomes
+"""
+
+import asyncio
+import subprocess
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.subprocess_utils import (
+    arun_cmd,
+    binary_key,
+    command_stats,
+    reset_command_stats,
+    run_cmd,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+
+@pytest.fixture(autouse=True)
+def _clean_stats():
+    reset_command_stats()
+    yield
+    reset_command_stats()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Killed but not yet reaped by init still counts as dead
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+class TestBinaryKey:
+    """Tests for binary_key."""
+
+    def test_plain_and_path(self):
+        assert binary_key(["docker", "ps"]) == "docker"
+        assert binary_key(["/usr/sbin/iptables", "-L"]) == "iptables"
+
+    def test_sudo_flags_skipped(self):
+        assert binary_key(["sudo", "-n", "iptables", "-t", "nat", "-S"]) == "iptables"
+
+    def test_aliases(self):
+        assert binary_key(["iptables-save"]) == "iptables"
+        assert binary_key(["docker-compose", "up"]) == "docker"
+
+    def test_empty(self):
+        assert binary_key([]) == "unknown"
+
+
+class TestArunCmd:
+    """Tests for arun_cmd."""
+
+    @pytest.mark.asyncio
+    async def test_captures_output_and_input(self):
+        result = await arun_cmd(["cat"], input="hello\n")
+        assert result.returncode == 0
+        assert result.stdout == "hello\n"
+        assert result.truncated is False
+
+    @pytest.mark.asyncio
+    async def test_check_raises(self):
+        with pytest.raises(subprocess.CalledProcessError) as exc_info:
+            await arun_cmd(["sh", "-c", "echo boom >&2; exit 3"], check=True)
+        assert exc_info.value.returncode == 3
+        assert "boom" in exc_info.value.stderr
+
+    @pytest.mark.asyncio
+    async def test_output_truncated(self):
+        result = await arun_cmd(["head", "-c", "100000", "/dev/zero"], max_output_bytes=1000, text=False)
+        assert result.returncode == 0
+        assert result.stdout == b"\x00" * 1000
+        assert result.truncated is True
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_process_group(self, tmp_path):
+        pidfile = tmp_path / "pid"
+        with pytest.raises(subprocess.TimeoutExpired):
+            await arun_cmd(["sh", "-c", f"sleep 30 & echo $! > {pidfile}; wait"], timeout=0.5)
+
+        grandchild = int(pidfile.read_text())
+        await asyncio.sleep(0.1)
+        assert not _pid_alive(grandchild)
+        assert command_stats()["sh"]["exit_codes"] == {"timeout": 1}
+
+    @pytest.mark.asyncio
+    async def test_cancel_kills_child(self, tmp_path):
+        pidfile = tmp_path / "pid"
+        task = asyncio.create_task(arun_cmd(["sh", "-c", f"echo $$ > {pidfile}; exec sleep 30"]))
+        for _ in range(50):
+            if pidfile.exists() and pidfile.read_text().strip():
+                break
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert not _pid_alive(int(pidfile.read_text()))
+        stats = command_stats()["sh"]
+        assert stats["exit_codes"] == {"cancelled": 1}
+        assert stats["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self):
+        with patch("app.utils.subprocess_utils.settings.subprocess_concurrency_limits", {"sleep": 1}):
+            start = time.monotonic()
+            await asyncio.gather(arun_cmd(["sleep", "0.3"]), arun_cmd(["sleep", "0.3"]))
+            serialized = time.monotonic() - start
+
+        assert serialized >= 0.6
+
+    @pytest.mark.asyncio
+    async def test_missing_binary_recorded_as_error(self):
+        with pytest.raises(OSError):
+            await arun_cmd(["octolab-no-such-binary"])
+        assert command_stats()["octolab-no-such-binary"]["exit_codes"] == {"error": 1}
+
+
+class TestCommandStats:
+    """Tests for command_stats."""
+
+    def test_sync_and_async_share_stats(self):
+        run_cmd(["true"])
+        run_cmd(["false"])
+        asyncio.run(arun_cmd(["true"]))
+
+        stats = command_stats()["true"]
+        assert stats["count"] == 2
+        assert stats["exit_codes"] == {"0": 2}
+        assert stats["latency_buckets"]["+Inf"] == 2
+        assert command_stats()["false"]["exit_codes"] == {"1": 1}
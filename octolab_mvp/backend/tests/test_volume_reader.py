@@ -0,0 +1,182 @@
+"""Tests for streaming volume reads into the safe_extract validator.
+
+These tests verify:
+- Tar streams are extracted without seeking, rooted archives are stripped
+- Links are skipped (not followed), traversal and size limits still abort
+- Mountpoint copies never follow symlinks and enforce the same limits
+- read_volume_to_dir_sync picks mountpoint, then archive; missing volumes
+  never create a reader
+"""
+
+import io
+import os
+import subprocess
+import tarfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.volume_reader import _ChunkStream, read_volume_to_dir_sync
+from app.utils.safe_extract import (
+    ArchiveSizeLimitError,
+    UnsafeArchiveError,
+    safe_copy_tree,
+    safe_extract_tarfile_from_stream,
+)
+
+# Mark all tests as not requiring database
+pytestmark = pytest.mark.no_db
+
+READER = "app.services.volume_reader"
+
+
+def _tar_bytes(files=None, links=None):
+    """Docker-style archive rooted at src/."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tf:
+        root = tarfile.TarInfo("src")
+        root.type = tarfile.DIRTYPE
+        tf.addfile(root)
+        for name, data in (files or {}).items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+        for name, target in (links or {}).items():
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.SYMTYPE
+            info.linkname = target
+            tf.addfile(info)
+    return buf.getvalue()
+
+
+def _chunks(data, size=7):
+    return _ChunkStream(data[i:i + size] for i in range(0, len(data), size))
+
+
+class TestStreamExtract:
+    """Tests for safe_extract_tarfile_from_stream."""
+
+    def test_strips_root_and_skips_links(self, tmp_path):
+        data = _tar_bytes(
+            files={"src/tlog/commands.tsv": b"ls\n", "src/capture.pcap": b"\x00" * 100},
+            links={"src/passwd": "/etc/passwd"},
+        )
+        files = safe_extract_tarfile_from_stream(
+            _chunks(data), tmp_path, strip_components=1, skip_special=True
+        )
+
+        assert sorted(files) == ["capture.pcap", "tlog/commands.tsv"]
+        assert (tmp_path / "tlog" / "commands.tsv").read_bytes() == b"ls\n"
+        assert not (tmp_path / "passwd").exists()
+        assert (tmp_path / "capture.pcap").stat().st_mode & 0o777 == 0o600
+
+    def test_links_rejected_without_skip(self, tmp_path):
+        data = _tar_bytes(links={"src/passwd": "/etc/passwd"})
+        with pytest.raises(UnsafeArchiveError):
+            safe_extract_tarfile_from_stream(_chunks(data), tmp_path, strip_components=1)
+
+    def test_traversal_always_rejected(self, tmp_path):
+        data = _tar_bytes(files={"src/../../escape.txt": b"x"})
+        with pytest.raises(UnsafeArchiveError):
+            safe_extract_tarfile_from_stream(
+                _chunks(data), tmp_path, strip_components=1, skip_special=True
+            )
+
+    def test_member_limit(self, tmp_path):
+        data = _tar_bytes(files={"src/big.pcap": b"\x00" * 2048})
+        with pytest.raises(ArchiveSizeLimitError):
+            safe_extract_tarfile_from_stream(
+                _chunks(data, size=512), tmp_path, max_member_bytes=1024, strip_components=1
+            )
+
+
+class TestSafeCopyTree:
+    """Tests for copying a live directory (volume mountpoint)."""
+
+    def test_copies_regular_files_only(self, tmp_path):
+        src, dest = tmp_path / "src", tmp_path / "dest"
+        (src / "tlog").mkdir(parents=True)
+        dest.mkdir()
+        (src / "tlog" / "session.jsonl").write_text("{}\n")
+        secret = tmp_path / "secret"
+        secret.write_text("s3cr3t")
+        os.symlink(secret, src / "link")
+        os.symlink(tmp_path, src / "dirlink")
+        os.mkfifo(src / "fifo")
+
+        files = safe_copy_tree(src, dest)
+
+        assert files == ["tlog/session.jsonl"]
+        assert not (dest / "link").exists()
+        assert not (dest / "dirlink").exists()
+        assert (dest / "tlog").stat().st_mode & 0o777 == 0o700
+        assert (dest / "tlog" / "session.jsonl").stat().st_mode & 0o777 == 0o600
+
+    def test_never_writes_through_existing_destination(self, tmp_path):
+        src, dest = tmp_path / "src", tmp_path / "dest"
+        src.mkdir()
+        dest.mkdir()
+        (src / "a").write_text("data")
+        outside = tmp_path / "outside"
+        os.symlink(outside, dest / "a")
+
+        with pytest.raises(FileExistsError):
+            safe_copy_tree(src, dest)
+        assert not outside.exists()
+
+    def test_total_limit(self, tmp_path):
+        src, dest = tmp_path / "src", tmp_path / "dest"
+        src.mkdir()
+        dest.mkdir()
+        for name in ("a", "b"):
+            (src / name).write_bytes(b"\x00" * 600)
+
+        with pytest.raises(ArchiveSizeLimitError):
+            safe_copy_tree(src, dest, max_total_bytes=1000)
+
+
+class TestReadVolume:
+    """Tests for strategy selection in read_volume_to_dir_sync."""
+
+    def test_missing_volume_creates_nothing(self, tmp_path):
+        with patch(f"{READER}._inspect_volume", return_value=(False, None)), \
+             patch(f"{READER}.subprocess.run") as run:
+            assert read_volume_to_dir_sync("octolab_x_evidence_user", tmp_path) == []
+        run.assert_not_called()
+
+    def test_readable_mountpoint_is_copied(self, tmp_path):
+        mountpoint, dest = tmp_path / "_data", tmp_path / "dest"
+        mountpoint.mkdir()
+        dest.mkdir()
+        (mountpoint / "commands.log").write_text("id\n")
+
+        with patch(f"{READER}._inspect_volume", return_value=(True, str(mountpoint))), \
+             patch(f"{READER}.subprocess.run") as run:
+            assert read_volume_to_dir_sync("vol", dest) == ["commands.log"]
+        run.assert_not_called()
+
+    def test_cli_pipes_docker_cp_into_extractor(self, tmp_path):
+        archive = tmp_path / "archive.tar"
+        archive.write_bytes(_tar_bytes(files={"src/pcap/capture.pcap": b"\x01" * 64}))
+        dest = tmp_path / "dest"
+        dest.mkdir()
+
+        run = MagicMock(return_value=subprocess.CompletedProcess([], 0, stdout="abc123\n", stderr=""))
+        real_popen = subprocess.Popen
+
+        def fake_popen(cmd, **kwargs):
+            assert cmd == ["docker", "cp", "abc123:/src", "-"]
+            return real_popen(["cat", str(archive)], **kwargs)
+
+        with patch(f"{READER}._inspect_volume", return_value=(True, None)), \
+             patch(f"{READER}.subprocess.run", run), \
+             patch(f"{READER}.subprocess.Popen", side_effect=fake_popen):
+            files = read_volume_to_dir_sync("vol", dest)
+
+        assert files == ["pcap/capture.pcap"]
+        create_cmd = run.call_args_list[0].args[0]
+        assert create_cmd[:2] == ["docker", "create"]
+        assert "vol:/src:ro" in create_cmd
+        assert run.call_args_list[-1].args[0] == ["docker", "rm", "-f", "abc123"]
+        assert Path(dest / "pcap" / "capture.pcap").read_bytes() == b"\x01" * 64
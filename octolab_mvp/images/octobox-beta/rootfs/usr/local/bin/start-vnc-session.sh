@@ -88,7 +88,14 @@ if [[ -z "$VNC_PASSWORD" ]]; then
     fi
 fi
 
-sudo -u pentester /bin/bash -c "set -euo pipefail; echo '$VNC_PASSWORD' | '$PASSWORD_TOOL' -f > '$HOME/.vnc/passwd'"
+# Warm standby stacks get the lab password bound after start (passwd.bound,
+# written by the backend when a lab claims the stack); keep it across restarts
+if [[ -s "$HOME/.vnc/passwd.bound" ]]; then
+  log "Using bound VNC password file"
+  cp "$HOME/.vnc/passwd.bound" "$HOME/.vnc/passwd"
+else
+  sudo -u pentester /bin/bash -c "set -euo pipefail; echo '$VNC_PASSWORD' | '$PASSWORD_TOOL' -f > '$HOME/.vnc/passwd'"
+fi
 chown pentester:pentester "$HOME/.vnc/passwd"
 chmod 600 "$HOME/.vnc/passwd"
 
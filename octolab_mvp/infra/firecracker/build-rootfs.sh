@@ -18,6 +18,7 @@
 # Options:
 #   --output DIR      Output directory (default: ./out)
 #   --size SIZE       Rootfs size (default: 4G)
+#   --images-size SIZE  Image store drive size, sparse (default: 16G)
 #   --with-kernel     Also download/install guest kernel
 #   --deploy          Copy artifacts to /var/lib/octolab/firecracker/
 #   --help            Show this help
@@ -26,6 +27,9 @@
 #   - Root privileges (debootstrap needs it)
 #   - debootstrap, curl, losetup, mkfs.ext4
 #
+# Artifacts: rootfs.ext4, images.ext4 (pre-baked Docker data root, attached
+# read-only to every VM) and optionally vmlinux.
+#
 # Examples:
 #   # Build rootfs only
 #   sudo ./build-rootfs.sh
@@ -52,6 +56,7 @@ set -euo pipefail
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 OUTPUT_DIR="${SCRIPT_DIR}/out"
 ROOTFS_SIZE="4G"
+IMAGES_SIZE="16G"
 DEBIAN_RELEASE="bookworm"  # Debian 12
 ARCH="amd64"
 
@@ -71,6 +76,7 @@ KERNEL_URL="https://s3.amazonaws.com/spec.ccfc.min/firecracker-ci/v1.6/x86_64/vm
 DEPLOY_DIR="/var/lib/octolab/firecracker"
 DEPLOY_KERNEL="${DEPLOY_DIR}/vmlinux"
 DEPLOY_ROOTFS="${DEPLOY_DIR}/rootfs.ext4"
+DEPLOY_IMAGES="${DEPLOY_DIR}/images.ext4"
 
 # Flags
 WITH_KERNEL=false
@@ -90,6 +96,10 @@ while [[ $# -gt 0 ]]; do
             ROOTFS_SIZE="$2"
             shift 2
             ;;
+        --images-size)
+            IMAGES_SIZE="$2"
+            shift 2
+            ;;
         --with-kernel)
             WITH_KERNEL=true
             shift
@@ -121,12 +131,16 @@ echo ""
 
 mkdir -p "${OUTPUT_DIR}"
 ROOTFS_IMG="${OUTPUT_DIR}/rootfs.ext4"
+IMAGES_IMG="${OUTPUT_DIR}/images.ext4"
 KERNEL_IMG="${OUTPUT_DIR}/vmlinux"
 MOUNT_POINT="${OUTPUT_DIR}/mnt"
+IMAGES_MOUNT="${MOUNT_POINT}/mnt/octolab-images"
+BAKE_SOCK="/run/octolab-bake.sock"
 
 echo "Configuration:"
 echo "  Output directory: ${OUTPUT_DIR}"
 echo "  Rootfs size: ${ROOTFS_SIZE}"
+echo "  Image store size: ${IMAGES_SIZE}"
 echo "  Debian release: ${DEBIAN_RELEASE}"
 echo "  Architecture: ${ARCH}"
 echo "  With kernel: ${WITH_KERNEL}"
@@ -219,7 +233,13 @@ mount -o loop "${ROOTFS_IMG_TMP}" "${MOUNT_POINT}"
 cleanup() {
     echo ""
     echo "Cleaning up..."
-    # Unmount bind mounts first
+    # Stop the bake dockerd and release the image store first
+    if [[ -f "${MOUNT_POINT}/run/octolab-bake.pid" ]]; then
+        kill "$(cat "${MOUNT_POINT}/run/octolab-bake.pid")" 2>/dev/null || true
+        sleep 2
+    fi
+    umount "${IMAGES_MOUNT}" 2>/dev/null || true
+    # Unmount bind mounts
     umount "${MOUNT_POINT}/proc" 2>/dev/null || true
     umount "${MOUNT_POINT}/sys" 2>/dev/null || true
     umount "${MOUNT_POINT}/dev/pts" 2>/dev/null || true
@@ -237,7 +257,7 @@ trap cleanup EXIT
 echo "[3/7] Bootstrapping Debian ${DEBIAN_RELEASE} (this takes a few minutes)..."
 debootstrap \
     --arch="${ARCH}" \
-    --include=systemd,systemd-sysv,dbus,ca-certificates,curl,gnupg,python3,iproute2,iptables,procps \
+    --include=systemd,systemd-sysv,dbus,ca-certificates,curl,gnupg,python3,iproute2,iptables,procps,dmsetup \
     "${DEBIAN_RELEASE}" \
     "${MOUNT_POINT}" \
     http://deb.debian.org/debian
@@ -292,6 +312,33 @@ cat > "${MOUNT_POINT}/etc/fstab" <<'EOF'
 /dev/vda / ext4 defaults,noatime 0 1
 EOF
 
+# Overlay init: lets the backend share this image read-only between VMs and
+# give each VM a small writable overlay drive instead of a full copy.
+# Used only when the kernel cmdline has init=/sbin/overlay-init.
+cat > "${MOUNT_POINT}/sbin/overlay-init" <<'EOF'
+#!/bin/sh
+# Mount a per-VM writable overlay over the read-only root, then start systemd.
+set -e
+mount -t proc proc /proc
+DEV=$(sed -n 's/.*octolab\.overlay=\([^ ]*\).*/\1/p' /proc/cmdline)
+DEV=${DEV:-/dev/vdb}
+# The overlay drive arrives as a blank sparse file; format it on first use
+if ! blkid "$DEV" >/dev/null 2>&1; then
+    mkfs.ext4 -q -F -E lazy_itable_init=1,lazy_journal_init=1 "$DEV"
+fi
+mount -t ext4 -o noatime "$DEV" /mnt
+mkdir -p /mnt/upper /mnt/work /mnt/docker /mnt/root
+mount -t overlay overlay -o lowerdir=/,upperdir=/mnt/upper,workdir=/mnt/work /mnt/root
+# Docker's overlay2 driver cannot sit on overlayfs; give it the ext4 drive
+mkdir -p /mnt/root/var/lib/docker /mnt/root/rom
+mount --bind /mnt/docker /mnt/root/var/lib/docker
+umount /proc
+cd /mnt/root
+pivot_root . rom
+exec chroot . /sbin/init "$@"
+EOF
+chmod 755 "${MOUNT_POINT}/sbin/overlay-init"
+
 # Bind mount /dev, /proc, /sys for chroot operations
 mount --bind /dev "${MOUNT_POINT}/dev"
 mount --bind /proc "${MOUNT_POINT}/proc"
@@ -475,7 +522,7 @@ LOADEOF
 [Unit]
 Description=Load pre-baked Docker images
 Documentation=https://github.com/octolab/octolab
-After=docker.service
+After=docker.service octolab-image-store.service
 ConditionPathExists=!/var/lib/octolab/.images-loaded
 
 [Service]
@@ -493,7 +540,151 @@ SVCEOF
         ln -sf /etc/systemd/system/octolab-load-images.service \
             "${MOUNT_POINT}/etc/systemd/system/multi-user.target.wants/octolab-load-images.service"
 
-        echo "  Pre-bake complete: OctoBox will load on first boot"
+        # Bake the same image into a Docker data root on its own drive
+        # (images.ext4). The backend attaches it read-only to every VM and
+        # the guest mounts it through a copy-on-write snapshot, so boots skip
+        # the tarball load. The tarball stays as the fallback.
+        echo "  Baking image store (${IMAGES_SIZE}, sparse)..."
+        IMAGES_IMG_TMP="${IMAGES_IMG}.tmp"
+        rm -f "${IMAGES_IMG_TMP}" "${IMAGES_IMG}"
+        truncate -s "${IMAGES_SIZE}" "${IMAGES_IMG_TMP}"
+        mkfs.ext4 -F -q -L octolab-images "${IMAGES_IMG_TMP}"
+        mkdir -p "${IMAGES_MOUNT}"
+        mount -o loop "${IMAGES_IMG_TMP}" "${IMAGES_MOUNT}"
+        mkdir -p "${IMAGES_MOUNT}/docker"
+
+        # The guest's own dockerd writes the store, so the layout matches the
+        # Docker version that mounts it. Loading needs no networking.
+        chroot "${MOUNT_POINT}" dockerd \
+            --data-root /mnt/octolab-images/docker \
+            --exec-root /run/octolab-bake \
+            --pidfile /run/octolab-bake.pid \
+            --host "unix://${BAKE_SOCK}" \
+            --bridge=none --iptables=false --ip6tables=false \
+            > "${OUTPUT_DIR}/bake-dockerd.log" 2>&1 &
+        BAKE_PID=$!
+        for i in {1..30}; do
+            if chroot "${MOUNT_POINT}" docker -H "unix://${BAKE_SOCK}" info > /dev/null 2>&1; then
+                break
+            fi
+            sleep 1
+        done
+
+        IMAGES_BAKED=false
+        if docker save octolab/octobox:latest \
+            | chroot "${MOUNT_POINT}" docker -H "unix://${BAKE_SOCK}" load > /dev/null 2>&1; then
+            IMAGES_BAKED=true
+        fi
+        kill "${BAKE_PID}" 2>/dev/null || true
+        wait "${BAKE_PID}" 2>/dev/null || true
+        rm -rf "${MOUNT_POINT}/run/octolab-bake" "${MOUNT_POINT}${BAKE_SOCK}" \
+            "${MOUNT_POINT}/run/octolab-bake.pid"
+
+        if [[ "$IMAGES_BAKED" == "true" ]]; then
+            # The guest only mounts a store from its own rootfs build
+            cat > "${IMAGES_MOUNT}/octolab-images.json" <<EOF
+{
+    "build_id": "${BUILD_ID}",
+    "images": ["octolab/octobox:latest"]
+}
+EOF
+            sync
+            umount "${IMAGES_MOUNT}"
+            mv "${IMAGES_IMG_TMP}" "${IMAGES_IMG}"
+            echo "  Baked: ${IMAGES_IMG}"
+        else
+            umount "${IMAGES_MOUNT}" 2>/dev/null || true
+            rm -f "${IMAGES_IMG_TMP}"
+            echo "  WARNING: Failed to bake image store (see ${OUTPUT_DIR}/bake-dockerd.log)"
+            echo "  VMs will load the OctoBox tarball on boot"
+        fi
+        rmdir "${IMAGES_MOUNT}" 2>/dev/null || true
+
+        # Mount the image store at boot, before docker starts. Any failure
+        # (no drive, other build, no dm-snapshot) falls back to the tarball.
+        cat > "${MOUNT_POINT}/opt/octolab/mount-image-store.sh" <<'STOREEOF'
+#!/bin/bash
+# Mount the pre-baked image store as Docker's data root.
+# The host attaches images.ext4 read-only (octolab.images=/dev/vdX). A
+# device-mapper snapshot backed by a sparse file on this VM's own disk makes
+# it writable without touching the shared drive.
+
+set -u
+
+LOADED_MARKER="/var/lib/octolab/.images-loaded"
+STORE_DIR="/var/lib/octolab/image-store"
+COW_FILE="/var/lib/octolab/image-store.cow"
+DM_NAME="octolab-images"
+LOOP=""
+
+DEV=$(sed -n 's/.*octolab\.images=\([^ ]*\).*/\1/p' /proc/cmdline)
+if [[ -z "$DEV" || ! -b "$DEV" ]]; then
+    echo "No image store drive attached"
+    exit 0
+fi
+
+fail() {
+    echo "WARNING: $1; images will be loaded from the tarball"
+    umount "$STORE_DIR" 2>/dev/null || true
+    dmsetup remove "$DM_NAME" 2>/dev/null || true
+    if [[ -n "$LOOP" ]]; then
+        losetup -d "$LOOP" 2>/dev/null || true
+    fi
+    rm -f "$COW_FILE"
+    exit 0
+}
+
+build_id() {
+    python3 -c 'import json, sys; print(json.load(open(sys.argv[1]))["build_id"])' "$1" 2>/dev/null
+}
+
+# As large as the drive, so the snapshot can never overflow; sparse, so it
+# only takes what this VM writes
+SECTORS=$(blockdev --getsz "$DEV") || fail "cannot size $DEV"
+rm -f "$COW_FILE"
+truncate -s $(( SECTORS * 512 )) "$COW_FILE" || fail "cannot create snapshot file"
+LOOP=$(losetup --find --show "$COW_FILE") || fail "no loop device"
+dmsetup create "$DM_NAME" --table "0 $SECTORS snapshot $DEV $LOOP N 8" \
+    || fail "dm-snapshot unavailable"
+mkdir -p "$STORE_DIR"
+mount -o noatime "/dev/mapper/$DM_NAME" "$STORE_DIR" || fail "cannot mount image store"
+
+STORE_BUILD=$(build_id "$STORE_DIR/octolab-images.json")
+ROOTFS_BUILD=$(build_id /etc/octolab-build.json)
+if [[ -z "$STORE_BUILD" || "$STORE_BUILD" != "$ROOTFS_BUILD" ]]; then
+    fail "image store build ${STORE_BUILD:-unknown} does not match rootfs ${ROOTFS_BUILD:-unknown}"
+fi
+
+mkdir -p /var/lib/docker
+mount --bind "$STORE_DIR/docker" /var/lib/docker || fail "cannot mount docker data root"
+touch "$LOADED_MARKER"
+echo "Image store mounted (build $STORE_BUILD)"
+STOREEOF
+        chmod 755 "${MOUNT_POINT}/opt/octolab/mount-image-store.sh"
+
+        cat > "${MOUNT_POINT}/etc/systemd/system/octolab-image-store.service" <<'SVCEOF'
+[Unit]
+Description=Mount pre-baked Docker image store
+Documentation=https://github.com/octolab/octolab
+After=local-fs.target
+Before=docker.service containerd.service octolab-load-images.service
+ConditionPathExists=!/var/lib/octolab/.images-loaded
+
+[Service]
+Type=oneshot
+ExecStart=/opt/octolab/mount-image-store.sh
+RemainAfterExit=yes
+StandardOutput=journal+console
+StandardError=journal+console
+
+[Install]
+WantedBy=multi-user.target
+SVCEOF
+
+        ln -sf /etc/systemd/system/octolab-image-store.service \
+            "${MOUNT_POINT}/etc/systemd/system/multi-user.target.wants/octolab-image-store.service"
+
+        echo "  Pre-bake complete: OctoBox comes from the image store, else loads on first boot"
     else
         echo "  WARNING: Failed to build OctoBox image"
         echo "  OctoBox will be built on first lab (slower)"
@@ -613,6 +804,9 @@ echo "Build ID: ${BUILD_ID}"
 echo ""
 echo "Artifacts:"
 echo "  Rootfs: ${ROOTFS_IMG} (${ROOTFS_SIZE_FINAL})"
+if [[ -f "$IMAGES_IMG" ]]; then
+    echo "  Image store: ${IMAGES_IMG} ($(du -h "$IMAGES_IMG" | cut -f1) allocated)"
+fi
 if [[ "$WITH_KERNEL" == "true" ]] && [[ -f "$KERNEL_IMG" ]]; then
     KERNEL_SIZE_FINAL=$(du -h "$KERNEL_IMG" | cut -f1)
     echo "  Kernel: ${KERNEL_IMG} (${KERNEL_SIZE_FINAL}, v${KERNEL_VERSION})"
@@ -636,6 +830,18 @@ if [[ "$DEPLOY" == "true" ]]; then
     chown root:root "${DEPLOY_ROOTFS}.tmp"
     mv -f "${DEPLOY_ROOTFS}.tmp" "${DEPLOY_ROOTFS}"
 
+    # Deploy image store (sparse, atomic). A store from an older build would
+    # only be rejected by the guest, so drop it when this build has none.
+    if [[ -f "$IMAGES_IMG" ]]; then
+        echo "  Copying image store..."
+        cp -f --sparse=always "${IMAGES_IMG}" "${DEPLOY_IMAGES}.tmp"
+        chmod 644 "${DEPLOY_IMAGES}.tmp"
+        chown root:root "${DEPLOY_IMAGES}.tmp"
+        mv -f "${DEPLOY_IMAGES}.tmp" "${DEPLOY_IMAGES}"
+    else
+        rm -f "${DEPLOY_IMAGES}"
+    fi
+
     # Deploy kernel if built (atomic: copy to .tmp, then rename)
     if [[ "$WITH_KERNEL" == "true" ]] && [[ -f "$KERNEL_IMG" ]]; then
         echo "  Copying kernel..."
@@ -650,6 +856,9 @@ if [[ "$DEPLOY" == "true" ]]; then
         chown root:octolab "${DEPLOY_DIR}"
         chmod 750 "${DEPLOY_DIR}"
         chown root:octolab "${DEPLOY_ROOTFS}"
+        if [[ -f "${DEPLOY_IMAGES}" ]]; then
+            chown root:octolab "${DEPLOY_IMAGES}"
+        fi
         if [[ -f "${DEPLOY_KERNEL}" ]]; then
             chown root:octolab "${DEPLOY_KERNEL}"
         fi
@@ -659,6 +868,9 @@ if [[ "$DEPLOY" == "true" ]]; then
     echo "Deployed to:"
     echo "  Kernel: ${DEPLOY_KERNEL}"
     echo "  Rootfs: ${DEPLOY_ROOTFS}"
+    if [[ -f "${DEPLOY_IMAGES}" ]]; then
+        echo "  Image store: ${DEPLOY_IMAGES}"
+    fi
     echo "  Build ID: ${BUILD_ID}"
 fi
 
@@ -9,6 +9,12 @@ SECURITY:
 - Requires exact token match for authentication
 - Enforces output size limits
 - Hard timeout per request
+- Connections are served concurrently by a bounded worker pool; commands
+  that change the project workspace (upload, compose, build) are serialized
+  with each other and VM-wide changes (network, reidentify) likewise, while
+  read-only commands never wait behind them
+- Connections waiting for their next request are watched by one selector
+  thread and only take a worker once a request arrives
 - shell=False for all subprocess calls
 - Writes only under /opt/octolab (and /etc/resolv.conf for DNS)
 - Never logs tokens
@@ -17,15 +23,30 @@ Protocol (JSON-over-line):
   Request:  {"token": "...", "command": "...", ...}
   Response: {"ok": true/false, "stdout": "...", "stderr": "...", "exit_code": int}
 
+Framed protocol (binary payloads; versions listed in ping's "frame_versions"):
+  A request starts with "OCTF" + version byte instead of "{", followed by
+  frames of <type: 1 byte><length: 4 bytes big-endian><payload>:
+    H  header: a JSON request as above plus "files": [{"name", "size"}]
+    D  file contents, back to back in header order (streamed to disk)
+    E  end of request
+  The agent answers with P frames ({"received", "total"} every few MB) and
+  one R frame holding the JSON response; image_save sends its output as D
+  frames before the R frame. Only upload_project ("project.tgz"),
+  docker_build (source files) and image_load ("image.tar") take files.
+  Either protocol can be used on a kept-alive connection, request by request.
+
 Commands:
   ping              - Health check
-  upload_project    - Upload compose project (base64-encoded tar.gz)
+  upload_project    - Upload compose project (tar.gz; base64 or framed file)
   compose_up        - Run docker compose up -d
   compose_down      - Run docker compose down
   status            - Get container status
   diag              - Get diagnostic information
   configure_network - Configure eth0 with IP/gateway/DNS (for outbound networking)
   docker_build      - Build Docker image from Dockerfile + source files
+  reidentify        - Take on a lab's identity after snapshot restore
+  image_save        - Stream `docker save` of a built image back (framed only)
+  image_load        - `docker load` an image archive sent as a file (framed only)
 
 configure_network expects:
   - guest_ip: IP address for eth0 (e.g., "10.200.123.45")
@@ -33,20 +54,35 @@ configure_network expects:
   - netmask: Netmask (optional, defaults to "255.255.0.0")
   - dns: DNS server (optional, defaults to "8.8.8.8")
 
+reidentify expects (sent by the host right after restoring a snapshot, while
+the agent still holds the template token from the golden VM's cmdline):
+  - new_token: 64 hex chars; replaces the expected token for all later requests
+  - mac: MAC address for eth0 (optional)
+  - epoch: host wall-clock time in seconds (optional; guest clock is stale)
+  - entropy: base64 random bytes mixed into the guest RNG (optional; every
+    restored VM starts from the same RNG state)
+
 Usage:
   Run at boot via systemd. Token and vsock port are passed via kernel cmdline:
     octolab.token=<token> octolab.vsock_port=<port>
 """
 
 import base64
+import ipaddress
 import json
 import os
 import re
+import selectors
+import shutil
 import signal
 import socket
+import struct
 import subprocess
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
@@ -62,13 +98,40 @@ DEFAULT_VSOCK_PORT = 5000
 MAX_REQUEST_SIZE = 100 * 1024 * 1024  # 100 MB for project uploads
 MAX_OUTPUT_SIZE = 65536  # 64 KB
 REQUEST_TIMEOUT = 300.0  # 5 minutes for compose operations
+# After a response the connection stays open this long for the host's next
+# request (the host parks connections for less than this)
+KEEPALIVE_IDLE_TIMEOUT = 5.0
 SHORT_TIMEOUT = 30.0  # For simple commands
 
+# Requests served at once (idle connections hold no worker). Mutating
+# commands may occupy all but READ_ONLY_RESERVE workers, so ping/status/diag
+# always get a thread.
+MAX_WORKERS = 16
+READ_ONLY_RESERVE = 4
+
 # Directories
 PROJECT_BASE = Path("/opt/octolab")
 PROJECT_DIR = PROJECT_BASE / "project"
 PROJECT_TAR = PROJECT_BASE / "project.tgz"
 COMPOSE_STATUS_FILE = PROJECT_BASE / "last_compose_status.json"
+# Files of framed requests land here (same filesystem as their destination)
+STAGING_BASE = PROJECT_BASE / "incoming"
+
+# Framed protocol
+FRAME_MAGIC = b"OCTF"
+FRAME_VERSIONS = (1,)
+FRAME_HEADER = struct.Struct(">cI")  # type, payload length
+MAX_FRAME_SIZE = 1024 * 1024
+MAX_STREAM_FILES = 64
+PROGRESS_INTERVAL_BYTES = 8 * 1024 * 1024
+REJECT_LINGER_SECONDS = 2.0
+STREAM_COMMANDS = frozenset({"upload_project", "docker_build", "image_load"})
+# Set only by the framed protocol: received files, and a D frame writer
+INTERNAL_FIELDS = ("_staged", "_output")
+
+# docker_build limits
+MAX_SOURCE_FILES = 20
+MAX_SOURCE_FILE_SIZE = 1_000_000
 
 # Build metadata file (written by build-rootfs.sh)
 BUILD_METADATA_FILE = Path("/etc/octolab-build.json")
@@ -94,6 +157,26 @@ ALLOWED_COMMANDS = frozenset({
     "net_test",  # Test network connectivity (DNS + HTTP)
     "iptables_check",  # Check if kernel has netfilter support
     "exec",  # Execute command inside a running container
+    "reidentify",  # Replace token/MAC/clock after snapshot restore
+    "image_save",  # Export a built image (host-side image cache)
+    "image_load",  # Import a cached image archive
+})
+
+# Commands that change the project workspace (PROJECT_DIR, PROJECT_TAR,
+# current_project_name), containers or images: one at a time, whatever
+# project they name, since there is only one workspace
+PROJECT_COMMANDS = frozenset({
+    "upload_project",
+    "compose_up",
+    "compose_down",
+    "docker_build",
+    "image_load",
+})
+
+# Commands that change VM-wide state: one at a time
+HOST_COMMANDS = frozenset({
+    "configure_network",
+    "reidentify",
 })
 
 # Marker file written by octolab-load-images.service when images are loaded
@@ -106,6 +189,21 @@ DOCKER_POLL_INTERVAL = 1.0  # Poll every 1 second
 # Current project name (set on upload)
 current_project_name: str | None = None
 
+# Expected auth token. Starts as the cmdline token; reidentify replaces it
+# after a snapshot restore, so it must be read per request (connections are
+# kept alive across it).
+agent_token: str = ""
+
+# Serialization of mutating commands (see PROJECT_COMMANDS / HOST_COMMANDS)
+_host_lock = threading.Lock()
+_workspace_lock = threading.Lock()
+_mutating_slots = threading.BoundedSemaphore(MAX_WORKERS - READ_ONLY_RESERVE)
+
+TOKEN_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+MAC_PATTERN = re.compile(r"^[0-9A-Fa-f]{2}(:[0-9A-Fa-f]{2}){5}$")
+IMAGE_TAG_PATTERN = re.compile(r"^octolab/[A-Za-z0-9_.-]{1,100}:[A-Za-z0-9_.-]{1,128}$")
+MAX_ENTROPY_BYTES = 512
+
 
 # =============================================================================
 # Helper Functions
@@ -379,6 +477,7 @@ def handle_ping(request: dict) -> dict[str, Any]:
         # Version fields for backend enforcement
         "agent_version": metadata["agent_version"],
         "rootfs_build_id": metadata["build_id"],
+        "frame_versions": list(FRAME_VERSIONS),
     }
 
 
@@ -386,7 +485,8 @@ def handle_upload_project(request: dict) -> dict[str, Any]:
     """Handle project upload.
 
     Expects request with:
-    - data: base64-encoded tar.gz content
+    - data: base64-encoded tar.gz content, or the file "project.tgz" in a
+      framed request
     - project: project name (validated)
 
     SECURITY:
@@ -398,8 +498,9 @@ def handle_upload_project(request: dict) -> dict[str, Any]:
     try:
         data_b64 = request.get("data")
         project_name = request.get("project")
+        staged_archive = request.get("_staged", {}).get("project.tgz")
 
-        if not data_b64:
+        if not data_b64 and staged_archive is None:
             return {
                 "ok": False,
                 "stdout": "",
@@ -415,31 +516,35 @@ def handle_upload_project(request: dict) -> dict[str, Any]:
                 "exit_code": -1,
             }
 
-        # Decode base64
-        try:
-            data = base64.b64decode(data_b64)
-        except Exception:
-            return {
-                "ok": False,
-                "stdout": "",
-                "stderr": "Invalid base64 data",
-                "exit_code": -1,
-            }
-
-        # Size check
-        if len(data) > MAX_REQUEST_SIZE:
-            return {
-                "ok": False,
-                "stdout": "",
-                "stderr": "Data too large",
-                "exit_code": -1,
-            }
-
         # Ensure directories
         ensure_project_dirs()
 
-        # Write tar file
-        PROJECT_TAR.write_bytes(data)
+        if staged_archive is not None:
+            # Streamed to disk already (size checked while receiving)
+            os.replace(staged_archive, PROJECT_TAR)
+        else:
+            # Decode base64
+            try:
+                data = base64.b64decode(data_b64)
+            except Exception:
+                return {
+                    "ok": False,
+                    "stdout": "",
+                    "stderr": "Invalid base64 data",
+                    "exit_code": -1,
+                }
+
+            # Size check
+            if len(data) > MAX_REQUEST_SIZE:
+                return {
+                    "ok": False,
+                    "stdout": "",
+                    "stderr": "Data too large",
+                    "exit_code": -1,
+                }
+
+            # Write tar file
+            PROJECT_TAR.write_bytes(data)
 
         # Clear and recreate project dir
         if PROJECT_DIR.exists():
@@ -936,14 +1041,11 @@ def handle_configure_network(request: dict) -> dict[str, Any]:
 
         log(f"Configuring network: ip={guest_ip}, gw={gateway}, dns={dns}")
 
-        # Convert netmask to CIDR prefix
-        netmask_to_cidr = {
-            "255.255.255.255": "32",
-            "255.255.255.0": "24",
-            "255.255.0.0": "16",
-            "255.0.0.0": "8",
-        }
-        cidr = netmask_to_cidr.get(netmask, "16")
+        # Convert netmask to CIDR prefix (netd sizes guest subnets freely)
+        try:
+            cidr = str(ipaddress.IPv4Network(f"0.0.0.0/{netmask}").prefixlen)
+        except ValueError:
+            cidr = "16"
 
         # Step 1: Bring up the interface
         result = run_cmd(["ip", "link", "set", interface, "up"], timeout=10.0)
@@ -1045,7 +1147,8 @@ def handle_docker_build(request: dict) -> dict[str, Any]:
     Expects request with:
     - project: str - project name (used as image tag)
     - dockerfile: str - Dockerfile content
-    - source_files: list[{filename, content}] - additional source files (optional)
+    - source_files: list[{filename, content}] - additional source files (optional);
+      in a framed request they can be sent as files instead (binary-safe)
 
     Returns:
         {ok: true, image: str, stdout: ..., stderr: ..., exit_code: 0} on success
@@ -1062,6 +1165,7 @@ def handle_docker_build(request: dict) -> dict[str, Any]:
         project_name = request.get("project")
         dockerfile_content = request.get("dockerfile")
         source_files = request.get("source_files", [])
+        staged_files = request.get("_staged", {})
 
         # Validate project name
         if not project_name or not validate_project_name(project_name):
@@ -1131,11 +1235,11 @@ def handle_docker_build(request: dict) -> dict[str, Any]:
             }
 
         # Limit number of source files
-        if len(source_files) > 20:
+        if len(source_files) + len(staged_files) > MAX_SOURCE_FILES:
             return {
                 "ok": False,
                 "stdout": "",
-                "stderr": "Too many source files (max 20)",
+                "stderr": f"Too many source files (max {MAX_SOURCE_FILES})",
                 "exit_code": -1,
             }
 
@@ -1171,7 +1275,7 @@ def handle_docker_build(request: dict) -> dict[str, Any]:
                 continue
 
             # Size limit per file (1MB)
-            if len(content) > 1_000_000:
+            if len(content) > MAX_SOURCE_FILE_SIZE:
                 log(f"Skipping oversized file: {filename}")
                 continue
 
@@ -1179,6 +1283,14 @@ def handle_docker_build(request: dict) -> dict[str, Any]:
             file_path.write_text(content)
             log(f"Wrote source file: {filename}")
 
+        # Move streamed source files into place (names checked on receipt)
+        for filename, staged_path in staged_files.items():
+            if staged_path.stat().st_size > MAX_SOURCE_FILE_SIZE:
+                log(f"Skipping oversized file: {filename}")
+                continue
+            os.replace(staged_path, build_dir / filename)
+            log(f"Wrote source file: {filename}")
+
         # Wait for Docker daemon
         docker_ready = wait_for_docker(timeout_seconds=30)
         if not docker_ready:
@@ -1253,9 +1365,11 @@ def handle_docker_build(request: dict) -> dict[str, Any]:
 def handle_wait_for_images(request: dict) -> dict[str, Any]:
     """Wait for pre-baked Docker images to be loaded.
 
-    The octolab-load-images.service loads images from /var/lib/octolab/images/
-    on first boot. This command waits for that process to complete by polling
-    for the marker file.
+    octolab-image-store.service writes the marker as soon as it has mounted
+    the host's pre-baked image store, so this normally returns at once.
+    Otherwise octolab-load-images.service loads images from
+    /var/lib/octolab/images/ on first boot; this command waits for that
+    process to complete by polling for the marker file.
 
     Expects request with:
     - timeout: int - Max wait time in seconds (optional, defaults to 120)
@@ -1529,6 +1643,164 @@ def handle_exec(request: dict) -> dict[str, Any]:
     }
 
 
+def handle_reidentify(request: dict) -> dict[str, Any]:
+    """Take on a lab's identity after the VM was restored from a snapshot.
+
+    Every VM restored from the same template shares the golden VM's memory:
+    its token, MAC address, clock and RNG state. The host sends this command
+    (authenticated with the template token) before anything else.
+
+    SECURITY:
+    - Token is replaced first and never logged; the template token stops
+      working for this VM as soon as this returns
+    - Strict format validation on every field
+    - Entropy is mixed into /dev/urandom (no credit is claimed)
+    """
+    global agent_token
+
+    new_token = request.get("new_token", "")
+    mac = request.get("mac")
+    epoch = request.get("epoch")
+    entropy = request.get("entropy")
+
+    if not isinstance(new_token, str) or not TOKEN_PATTERN.match(new_token):
+        return {"ok": False, "stdout": "", "stderr": "Invalid new_token", "exit_code": -1}
+    if mac is not None and (not isinstance(mac, str) or not MAC_PATTERN.match(mac)):
+        return {"ok": False, "stdout": "", "stderr": "Invalid mac", "exit_code": -1}
+    if epoch is not None and not isinstance(epoch, (int, float)):
+        return {"ok": False, "stdout": "", "stderr": "Invalid epoch", "exit_code": -1}
+
+    agent_token = new_token
+    steps = ["token"]
+
+    if entropy:
+        try:
+            seed = base64.b64decode(entropy, validate=True)[:MAX_ENTROPY_BYTES]
+            with open("/dev/urandom", "wb") as f:
+                f.write(seed)
+            steps.append("rng")
+        except Exception as e:
+            log(f"reidentify: RNG reseed failed: {type(e).__name__}")
+
+    if epoch is not None:
+        result = run_cmd(["date", "-u", "-s", f"@{int(epoch)}"], timeout=5.0)
+        if result["ok"]:
+            steps.append("clock")
+        else:
+            log(f"reidentify: clock set failed: {result['stderr'][:200]}")
+
+    if mac:
+        # virtio-net only accepts a new address while the link is down
+        for args in (
+            ["ip", "link", "set", "eth0", "down"],
+            ["ip", "link", "set", "eth0", "address", mac.lower()],
+            ["ip", "link", "set", "eth0", "up"],
+        ):
+            result = run_cmd(args, timeout=10.0)
+            if not result["ok"]:
+                return {
+                    "ok": False,
+                    "stdout": "",
+                    "stderr": f"Failed to set MAC: {result['stderr'][:200]}",
+                    "exit_code": result["exit_code"],
+                }
+        steps.append("mac")
+
+    log(f"Reidentified after restore: {', '.join(steps)}")
+    return {"ok": True, "stdout": ",".join(steps), "stderr": "", "exit_code": 0}
+
+
+def handle_image_save(request: dict) -> dict[str, Any]:
+    """Stream `docker save` of an image built by docker_build to the host.
+
+    Expects request with:
+    - image: octolab/<name>:<tag>
+
+    The archive goes out as D frames of a framed response; the R frame
+    reports its size. JSON-line requests are refused (no binary channel).
+
+    SECURITY:
+    - Only octolab/ images (those built here) can be exported
+    """
+    image = request.get("image")
+    output = request.get("_output")
+
+    if not isinstance(image, str) or not IMAGE_TAG_PATTERN.match(image):
+        return {"ok": False, "stdout": "", "stderr": "Invalid image", "exit_code": -1}
+    if output is None:
+        return {"ok": False, "stdout": "", "stderr": "image_save needs a framed request", "exit_code": -1}
+
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            ["docker", "save", image],
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+        killer = threading.Timer(REQUEST_TIMEOUT, proc.kill)
+        killer.start()
+        size = 0
+        try:
+            while True:
+                chunk = proc.stdout.read(MAX_FRAME_SIZE)
+                if not chunk:
+                    break
+                output(chunk)
+                size += len(chunk)
+            exit_code = proc.wait()
+        finally:
+            killer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        stderr.seek(0)
+        error = stderr.read(MAX_OUTPUT_SIZE).decode(errors="replace")
+
+    log(f"image_save {image}: {size} bytes, exit {exit_code}")
+    return {
+        "ok": exit_code == 0,
+        "size": size,
+        "stdout": "",
+        "stderr": error,
+        "exit_code": exit_code,
+    }
+
+
+def handle_image_load(request: dict) -> dict[str, Any]:
+    """Load an image archive (from the host's image cache) into docker.
+
+    Expects a framed request with:
+    - file "image.tar": output of image_save
+    - project: project the image belongs to (serializes with docker_build)
+    """
+    archive = request.get("_staged", {}).get("image.tar")
+    project_name = request.get("project")
+
+    if not project_name or not validate_project_name(project_name):
+        return {"ok": False, "stdout": "", "stderr": "Invalid project name", "exit_code": -1}
+    if archive is None:
+        return {"ok": False, "stdout": "", "stderr": "Missing image.tar", "exit_code": -1}
+
+    if not wait_for_docker(timeout_seconds=30):
+        return {
+            "ok": False,
+            "docker_ready": False,
+            "stdout": "",
+            "stderr": "Docker daemon not ready",
+            "exit_code": -1,
+        }
+
+    result = run_cmd(["docker", "load", "--input", str(archive)], timeout=REQUEST_TIMEOUT)
+    log(f"image_load for {project_name}: {'OK' if result['ok'] else 'FAILED'}")
+    return {
+        "ok": result["ok"],
+        "docker_ready": True,
+        "stdout": result["stdout"],
+        "stderr": result["stderr"],
+        "exit_code": result["exit_code"],
+    }
+
+
 # Command dispatcher
 COMMAND_HANDLERS = {
     "ping": handle_ping,
@@ -1544,6 +1816,9 @@ COMMAND_HANDLERS = {
     "net_test": handle_net_test,
     "iptables_check": handle_iptables_check,
     "exec": handle_exec,
+    "reidentify": handle_reidentify,
+    "image_save": handle_image_save,
+    "image_load": handle_image_load,
 }
 
 
@@ -1552,86 +1827,338 @@ COMMAND_HANDLERS = {
 # =============================================================================
 
 
-def handle_request(request_data: bytes, expected_token: str) -> bytes:
-    """Handle a single request.
+def command_lock(command: str, request: dict) -> "threading.Lock | None":
+    """Lock serializing a mutating command, or None for read-only commands."""
+    if command in HOST_COMMANDS:
+        return _host_lock
+    if command in PROJECT_COMMANDS:
+        return _workspace_lock
+    return None
+
+
+def parse_request(request_data: bytes, expected_token: str) -> tuple[dict, dict | None]:
+    """Decode, authenticate and check a request.
 
     Args:
         request_data: Raw request JSON
         expected_token: Expected authentication token
 
     Returns:
-        Response JSON bytes
+        (request, None) if it may run, else (request, error response)
     """
     try:
         request = json.loads(request_data.decode("utf-8"))
     except (json.JSONDecodeError, UnicodeDecodeError):
-        return json.dumps({
-            "ok": False,
-            "error": "Invalid JSON",
-        }).encode() + b"\n"
+        return {}, {"ok": False, "error": "Invalid JSON"}
+    if not isinstance(request, dict):
+        return {}, {"ok": False, "error": "Invalid JSON"}
 
     # Authenticate
     token = request.get("token", "")
     if not token or token != expected_token:
         log("Authentication failed")
-        return json.dumps({
-            "ok": False,
-            "error": "Authentication failed",
-        }).encode() + b"\n"
+        return request, {"ok": False, "error": "Authentication failed"}
 
     # Get command (support both "command" and "action" keys)
     command = request.get("command", request.get("action", ""))
     if not command:
-        return json.dumps({
-            "ok": False,
-            "error": "No command specified",
-        }).encode() + b"\n"
+        return request, {"ok": False, "error": "No command specified"}
 
     if command not in ALLOWED_COMMANDS:
-        return json.dumps({
-            "ok": False,
-            "error": f"Unknown command: {command}",
-        }).encode() + b"\n"
+        return request, {"ok": False, "error": f"Unknown command: {command}"}
 
-    # Execute command
+    for field in INTERNAL_FIELDS:
+        request.pop(field, None)
+    request["command"] = command
+    return request, None
+
+
+def run_command(request: dict) -> dict[str, Any]:
+    """Run a checked request's handler under its command lock."""
+    command = request["command"]
     log(f"Executing command: {command}")
     handler = COMMAND_HANDLERS[command]
-    result = handler(request)
-
-    return json.dumps(result).encode() + b"\n"
+    lock = command_lock(command, request)
+    if lock is None:
+        return handler(request)
+    if not _mutating_slots.acquire(blocking=False):
+        # Waiting would take a worker from read-only commands
+        return {"ok": False, "error": "Agent busy"}
+    try:
+        with lock:
+            return handler(request)
+    finally:
+        _mutating_slots.release()
 
 
-def handle_client(conn: socket.socket, expected_token: str) -> None:
-    """Handle a connected client.
+def handle_request(request_data: bytes, expected_token: str) -> bytes:
+    """Handle a single request.
 
     Args:
-        conn: Client socket
+        request_data: Raw request JSON
         expected_token: Expected authentication token
+
+    Returns:
+        Response JSON bytes
     """
-    conn.settimeout(REQUEST_TIMEOUT)
+    request, error = parse_request(request_data, expected_token)
+    result = error if error is not None else run_command(request)
+    return json.dumps(result).encode() + b"\n"
+
 
+def recv_into(conn: socket.socket, buf: bytearray, timeout: float) -> bool:
+    """Append the next chunk from the connection to buf (False on EOF or timeout)."""
+    conn.settimeout(timeout)
     try:
-        # Receive request (potentially large for project uploads)
-        data = b""
-        while len(data) < MAX_REQUEST_SIZE:
-            try:
-                chunk = conn.recv(65536)
-                if not chunk:
-                    break
-                data += chunk
-                if b"\n" in data:
-                    break
-            except socket.timeout:
-                break
+        chunk = conn.recv(65536)
+    except socket.timeout:
+        return False
+    if not chunk:
+        return False
+    buf.extend(chunk)
+    return True
+
+
+def read_exact(conn: socket.socket, buf: bytearray, size: int) -> bytes | None:
+    """Take exactly size bytes from buf, reading more as needed (None on EOF)."""
+    while len(buf) < size:
+        if not recv_into(conn, buf, REQUEST_TIMEOUT):
+            return None
+    data = bytes(buf[:size])
+    del buf[:size]
+    return data
+
+
+def read_frame(conn: socket.socket, buf: bytearray) -> tuple[bytes, bytes] | None:
+    """Read one frame as (type, payload); None on EOF or an oversized frame."""
+    header = read_exact(conn, buf, FRAME_HEADER.size)
+    if header is None:
+        return None
+    kind, length = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        return None
+    payload = read_exact(conn, buf, length)
+    if payload is None:
+        return None
+    return kind, payload
+
+
+def send_frame(conn: socket.socket, kind: bytes, message: dict) -> None:
+    """Send a JSON frame (P or R)."""
+    payload = json.dumps(message).encode()
+    conn.sendall(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+def send_data(conn: socket.socket, chunk: bytes) -> None:
+    """Send a D frame (response payload)."""
+    conn.sendall(FRAME_HEADER.pack(b"D", len(chunk)))
+    conn.sendall(chunk)
+
+
+def check_stream_files(files: Any) -> str | None:
+    """Validate a framed request's file list; returns an error or None."""
+    if not isinstance(files, list) or len(files) > MAX_STREAM_FILES:
+        return "Invalid file list"
+    names = set()
+    total = 0
+    for entry in files:
+        if not isinstance(entry, dict):
+            return "Invalid file list"
+        name = entry.get("name")
+        size = entry.get("size")
+        if (
+            not isinstance(name, str) or not name or len(name) > 255
+            or "/" in name or "\\" in name or ".." in name or name in names
+        ):
+            return "Invalid file name"
+        if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+            return "Invalid file size"
+        names.add(name)
+        total += size
+    if total > MAX_REQUEST_SIZE:
+        return "Data too large"
+    return None
+
+
+def receive_files(
+    conn: socket.socket,
+    buf: bytearray,
+    files: list[dict],
+    staging_dir: Path,
+) -> dict[str, Path] | None:
+    """Write a framed request's D frames to staging_dir, up to its E frame.
+
+    Sends a P frame every PROGRESS_INTERVAL_BYTES.
+
+    Returns:
+        File name -> staged path, or None if the stream is malformed
+    """
+    total = sum(entry["size"] for entry in files)
+    received = 0
+    next_progress = PROGRESS_INTERVAL_BYTES
+    pending = memoryview(b"")
+    staged: dict[str, Path] = {}
+
+    for entry in files:
+        path = staging_dir / entry["name"]
+        remaining = entry["size"]
+        with open(path, "wb") as f:
+            while remaining:
+                if not pending:
+                    frame = read_frame(conn, buf)
+                    if frame is None or frame[0] != b"D":
+                        return None
+                    pending = memoryview(frame[1])
+                part = pending[:remaining]
+                f.write(part)
+                pending = pending[len(part):]
+                remaining -= len(part)
+                received += len(part)
+                if received >= next_progress:
+                    send_frame(conn, b"P", {"received": received, "total": total})
+                    next_progress = received + PROGRESS_INTERVAL_BYTES
+        staged[entry["name"]] = path
+
+    # No data beyond the declared sizes
+    frame = read_frame(conn, buf)
+    if pending or frame is None or frame[0] != b"E":
+        return None
+    return staged
+
+
+def reject_stream(conn: socket.socket, message: dict) -> None:
+    """Answer a framed request whose payload won't be read; close afterwards.
+
+    Input is discarded until the host hangs up (it does once it has the
+    response) so it is not reset while still sending, which would lose the
+    response on its side.
+    """
+    send_frame(conn, b"R", message)
+    try:
+        conn.shutdown(socket.SHUT_WR)
+        conn.settimeout(REJECT_LINGER_SECONDS)
+        deadline = time.monotonic() + REJECT_LINGER_SECONDS
+        while time.monotonic() < deadline and conn.recv(65536):
+            pass
+    except OSError:
+        pass
+
+
+def handle_framed_request(conn: socket.socket, buf: bytearray) -> bool:
+    """Serve one framed request (buf starts with FRAME_MAGIC).
+
+    Files are received into a fresh staging directory before the command's
+    lock is taken, and removed afterwards unless the handler moved them.
+
+    Returns:
+        False if the connection must be closed (protocol error or rejected
+        request whose payload was not read)
+    """
+    preamble = read_exact(conn, buf, len(FRAME_MAGIC) + 1)
+    if preamble is None or preamble[:-1] != FRAME_MAGIC:
+        return False
+    version = preamble[-1]
+    if version not in FRAME_VERSIONS:
+        reject_stream(conn, {"ok": False, "error": f"Unsupported frame version: {version}"})
+        return False
 
-        if not data:
-            return
+    frame = read_frame(conn, buf)
+    if frame is None or frame[0] != b"H":
+        return False
+    request, error = parse_request(frame[1], agent_token)
+    files = request.pop("files", [])
+    if error is None and files and request["command"] not in STREAM_COMMANDS:
+        error = {"ok": False, "error": f"Command takes no files: {request['command']}"}
+    if error is None:
+        file_error = check_stream_files(files)
+        if file_error is not None:
+            error = {"ok": False, "error": file_error}
+    if error is not None:
+        reject_stream(conn, error)
+        return False
 
-        # Handle request
-        response = handle_request(data.strip(), expected_token)
+    STAGING_BASE.mkdir(parents=True, exist_ok=True)
+    staging_dir = Path(tempfile.mkdtemp(dir=STAGING_BASE))
+    try:
+        staged = receive_files(conn, buf, files, staging_dir)
+        if staged is None:
+            reject_stream(conn, {"ok": False, "error": "Malformed stream"})
+            return False
+        log(f"Received {len(staged)} file(s) for {request['command']}")
+        request["_staged"] = staged
+        request["_output"] = lambda chunk: send_data(conn, chunk)
+        send_frame(conn, b"R", run_command(request))
+        return True
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def read_request(conn: socket.socket, buf: bytearray, idle_timeout: float) -> bytes:
+    """Read one newline-terminated request from the connection.
 
-        # Send response
-        conn.sendall(response)
+    Waits up to idle_timeout for the first byte, then REQUEST_TIMEOUT for the
+    rest (uploads can be large). Bytes after the newline stay in buf.
+
+    Returns:
+        The request line, or whatever arrived before EOF, a timeout or the
+        size limit (b"" if nothing did)
+    """
+    while True:
+        end = buf.find(b"\n")
+        if end >= 0:
+            line = bytes(buf[:end])
+            del buf[:end + 1]
+            return line
+        if len(buf) >= MAX_REQUEST_SIZE:
+            break
+        if not recv_into(conn, buf, REQUEST_TIMEOUT if buf else idle_timeout):
+            break
+
+    line = bytes(buf)
+    buf.clear()
+    return line
+
+
+def handle_client(conn: socket.socket, idle: "IdleConnections | None" = None) -> None:
+    """Handle a connected client (on a worker thread).
+
+    Serves requests (JSON lines or framed) until the host closes the
+    connection or stays idle for KEEPALIVE_IDLE_TIMEOUT after a response.
+    Each request is checked against the current agent_token.
+
+    Args:
+        conn: Client socket
+        idle: Where to park the connection between requests, so waiting for
+            the next one does not hold this worker (None: wait here)
+    """
+    buf = bytearray()
+    idle_timeout = REQUEST_TIMEOUT
+    parked = False
+
+    try:
+        while True:
+            if not buf and not recv_into(conn, buf, idle_timeout):
+                return
+
+            if buf.startswith(FRAME_MAGIC[:1]):
+                if not handle_framed_request(conn, buf):
+                    return
+            else:
+                # Receive request (potentially large for project uploads)
+                data = read_request(conn, buf, idle_timeout)
+                if not data:
+                    return
+
+                # Handle request
+                response = handle_request(data.strip(), agent_token)
+
+                # Send response
+                conn.sendall(response)
+            idle_timeout = KEEPALIVE_IDLE_TIMEOUT
+            if idle is not None and not buf:
+                idle.park(conn, KEEPALIVE_IDLE_TIMEOUT)
+                parked = True
+                return
 
     except Exception as e:
         log(f"Connection error: {type(e).__name__}")
@@ -1644,10 +2171,91 @@ def handle_client(conn: socket.socket, expected_token: str) -> None:
             pass
 
     finally:
+        if not parked:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class IdleConnections:
+    """Connections waiting for their next request, watched by one thread.
+
+    A connection that becomes readable (a request or EOF) goes back to the
+    worker pool; one idle past its timeout is closed. A parked connection
+    holds no worker, so kept-alive host connections cannot use up the
+    READ_ONLY_RESERVE.
+    """
+
+    def __init__(self, workers: ThreadPoolExecutor) -> None:
+        self._workers = workers
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._pending: list[tuple[socket.socket, float]] = []
+        self._deadlines: dict[socket.socket, float] = {}
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+    def park(self, conn: socket.socket, timeout: float) -> None:
+        """Hand a connection over until its next request (from any thread)."""
+        with self._lock:
+            self._pending.append((conn, time.monotonic() + timeout))
         try:
-            conn.close()
-        except Exception:
-            pass
+            self._wakeup_w.send(b"\0")
+        except BlockingIOError:
+            pass  # A wakeup is already pending
+
+    def run(self) -> None:
+        """Watch parked connections until the process exits."""
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                log(f"Idle connection watcher error: {type(e).__name__}")
+                time.sleep(0.1)
+
+    def poll(self) -> None:
+        """One round: register new connections, wait, dispatch and expire."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for conn, deadline in pending:
+            try:
+                self._selector.register(conn, selectors.EVENT_READ)
+            except (OSError, ValueError):
+                conn.close()
+                continue
+            self._deadlines[conn] = deadline
+
+        now = time.monotonic()
+        timeout = max(0.0, min(self._deadlines.values()) - now) if self._deadlines else None
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self._wakeup_r:
+                try:
+                    while self._wakeup_r.recv(4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            conn = key.fileobj
+            self._forget(conn)
+            try:
+                self._workers.submit(handle_client, conn, self)
+            except RuntimeError:
+                conn.close()  # Shutting down
+
+        now = time.monotonic()
+        for conn in [c for c, deadline in self._deadlines.items() if deadline <= now]:
+            self._forget(conn)
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _forget(self, conn: socket.socket) -> None:
+        self._selector.unregister(conn)
+        del self._deadlines[conn]
 
 
 # =============================================================================
@@ -1657,6 +2265,8 @@ def handle_client(conn: socket.socket, expected_token: str) -> None:
 
 def main() -> int:
     """Main entry point."""
+    global agent_token
+
     log("OctoLab Guest Agent starting...")
 
     # Load and log build metadata early
@@ -1670,6 +2280,7 @@ def main() -> int:
     if not token:
         log("ERROR: No token found in kernel cmdline (octolab.token=...)")
         return 1
+    agent_token = token
 
     log(f"Listening on vsock port {port}")
 
@@ -1698,11 +2309,15 @@ def main() -> int:
     print("AGENT_READY", flush=True)
     log("Agent ready, waiting for connections...")
 
+    workers = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="conn")
+    idle = IdleConnections(workers)
+    threading.Thread(target=idle.run, name="idle", daemon=True).start()
     while True:
         try:
             conn, addr = server.accept()
             log(f"Connection from CID {addr[0]}")
-            handle_client(conn, token)
+            # A worker is taken once the first request arrives
+            idle.park(conn, REQUEST_TIMEOUT)
         except KeyboardInterrupt:
             log("Interrupted, shutting down...")
             break
@@ -1711,6 +2326,7 @@ def main() -> int:
             time.sleep(0.1)
 
     server.close()
+    workers.shutdown(wait=False, cancel_futures=True)
     return 0
 
 
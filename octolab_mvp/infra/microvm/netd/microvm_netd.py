@@ -10,25 +10,36 @@ This daemon runs as root and handles network operations that require CAP_NET_ADM
 ARCHITECTURE:
 - ONE shared bridge (br-octonet) on 10.200.0.0/16 subnet
 - Per-lab TAP devices attached to the shared bridge
-- Deterministic guest IPs derived from lab_id hash
+- Guest IPs allocated from the bridge subnet (bitmap; more subnets optional)
 - MASQUERADE NAT for outbound traffic
+- Host port forwards as one element each in an nftables DNAT map keyed by
+  host port (table ip octolab); per-lab iptables rules are the fallback
+- Which lab owns which TAP, guest IP and host ports is kept in memory and
+  journaled to /run/octolab/microvm-netd.journal (reconciled at startup)
 
 SECURITY:
 - Runs as root, listens only on UNIX socket with restrictive permissions
 - NEVER accepts interface names from clients - derives ALL names from lab_id
 - Implements strict deny-by-default: limited set of operations
 - Uses shell=False for all subprocess calls
+- Links and addresses are managed over rtnetlink (no `ip` subprocesses)
 - Logs minimally (no secrets, redacted paths)
 - Blocks GCP metadata server to prevent credential theft
 
-Protocol (JSON over UNIX socket):
+Protocol (newline-delimited JSON over UNIX socket):
+  A request carrying an "id" keeps the connection open: the client may send
+  more requests without waiting, responses echo the id and may arrive out of
+  order. A request without an id is answered once and the connection closed
+  (the original one-shot protocol; a trailing newline is optional).
+
   Request (new API - preferred):
     {"op": "hello"}                              # Handshake - returns API version and supported ops
     {"op": "ping"}
     {"op": "alloc_vm_net", "lab_id": "<uuid>"}   # Allocate network for VM
     {"op": "release_vm_net", "lab_id": "<uuid>"} # Release network for VM
     {"op": "diag_vm_net", "lab_id": "<uuid>"}    # Diagnose network status
-    {"op": "list"}
+    {"op": "list"}                               # Interfaces + allocations (from the index)
+    {"op": "batch", "id": 7, "requests": [{"op": ...}, ...]}  # One round-trip
 
   Legacy (deprecated, maps to new API):
     {"op": "create", "lab_id": "<uuid>"}   -> alloc_vm_net
@@ -39,13 +50,15 @@ Protocol (JSON over UNIX socket):
     {"ok": false, "error": "ERROR_CODE", "message": "..."}
 
   hello response:
-    {"ok": true, "name": "microvm-netd", "api_version": 1, "supported_ops": [...], "build_id": "..."}
+    {"ok": true, "name": "microvm-netd", "api_version": 1, "protocol_version": 2,
+     "supported_ops": [...], "build_id": "..."}
 
   alloc_vm_net result includes:
     - tap: TAP device name
-    - guest_ip: IP address for the VM
-    - gateway: Gateway IP (10.200.0.1)
-    - netmask: Subnet mask (255.255.0.0)
+    - guest_ip: IP address allocated to the VM (kept until release/cleanup)
+    - gateway: Gateway IP (first address of the subnet, e.g. 10.200.0.1)
+    - netmask: Subnet mask (e.g. 255.255.0.0)
+    - bridge: Shared bridge of the guest IP's subnet
     - dns: DNS server (8.8.8.8)
 
 Usage:
@@ -59,18 +72,25 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import errno
+import fcntl
 import grp
+import ipaddress
+import itertools
 import json
 import logging
 import os
 import pwd
 import re
+import shlex
 import signal
 import socket
+import struct
 import subprocess
 import sys
 import threading
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 from uuid import UUID
@@ -82,10 +102,14 @@ from uuid import UUID
 # API versioning for handshake
 API_VERSION = 1
 BUILD_ID = "netd-1"
+# Framing: 1 = one request per connection, 2 = persistent connections with
+# request ids, pipelining and batch
+PROTOCOL_VERSION = 2
 
 # Socket configuration
 DEFAULT_SOCKET_PATH = "/run/octolab/microvm-netd.sock"
 DEFAULT_PIDFILE_PATH = "/run/octolab/microvm-netd.pid"
+DEFAULT_JOURNAL_PATH = "/run/octolab/microvm-netd.journal"
 DEFAULT_LOG_PATH = "/var/log/octolab/microvm-netd.log"
 FALLBACK_LOG_PATH = "/var/lib/octolab/microvm/microvm-netd.log"
 RUN_DIR = "/run/octolab"
@@ -98,27 +122,65 @@ SOCKET_GROUP = "octolab"  # Group that can access the socket
 TAP_PREFIX = "otp"     # 3 chars + 10 hex = 13 chars
 IFNAME_MAX_LEN = 15
 
-# Shared bridge configuration (ONE bridge for all VMs)
-SHARED_BRIDGE_NAME = "br-octonet"  # Fixed name, not per-lab
+# Shared bridge configuration (one bridge per guest subnet, shared by its VMs)
+SHARED_BRIDGE_NAME = "br-octonet"  # First bridge, not per-lab
+BRIDGE_NAME_PATTERN = re.compile(r"^[a-z][a-z0-9-]{0,14}$")
 
 # Network configuration for VM connectivity
-# VMs get IPs in 10.200.x.x/16 range, bridge acts as gateway
-BRIDGE_GATEWAY_IP = "10.200.0.1/16"   # Gateway IP with subnet
-BRIDGE_SUBNET = "10.200.0.0/16"       # For NAT rule
-BRIDGE_GATEWAY = "10.200.0.1"         # Gateway without prefix
-BRIDGE_NETMASK = "255.255.0.0"        # /16 netmask
+# Guest IPs are allocated from each bridge's subnet; its first address is the
+# gateway. More subnets (--subnet / OCTOLAB_NETD_SUBNETS, comma-separated
+# bridge=cidr) are used in order as earlier ones fill up.
+DEFAULT_GUEST_SUBNETS = f"{SHARED_BRIDGE_NAME}=10.200.0.0/16"
+GUEST_PREFIX_MIN = 12  # Bitmap stays small (1M addresses)
+GUEST_PREFIX_MAX = 29
 DNS_SERVER = "8.8.8.8"                # Public DNS for VMs
 
 # GCP metadata server - must be blocked for security
 METADATA_SERVER_IP = "169.254.169.254"
 
+IP_FORWARD_SYSCTL = "/proc/sys/net/ipv4/ip_forward"
+
 # Legacy bridge prefix (deprecated, for cleanup only)
 LEGACY_BRIDGE_PREFIX = "obr"  # Old per-lab bridges
 
+# Port forwarding: one nftables map lookup per packet, one element per lab.
+# "auto" uses nftables when the nft CLI can set up the table, else iptables.
+FORWARD_BACKEND_AUTO = "auto"
+FORWARD_BACKEND_NFTABLES = "nftables"
+FORWARD_BACKEND_IPTABLES = "iptables"
+FORWARD_BACKENDS = (FORWARD_BACKEND_AUTO, FORWARD_BACKEND_NFTABLES, FORWARD_BACKEND_IPTABLES)
+NFT_TABLE = "octolab"
+NFT_FORWARD_MAP = "port_forwards"
+NFT_TABLE_SPEC = f"""table ip {NFT_TABLE} {{
+    map {NFT_FORWARD_MAP} {{
+        type inet_service : ipv4_addr . inet_service
+    }}
+    chain prerouting {{
+        type nat hook prerouting priority -100; policy accept;
+        dnat ip to tcp dport map @{NFT_FORWARD_MAP}
+    }}
+    chain output {{
+        type nat hook output priority -100; policy accept;
+        ip daddr 127.0.0.1 dnat ip to tcp dport map @{NFT_FORWARD_MAP}
+    }}
+}}
+"""
+FORWARD_COMMENT_PREFIX = "octolab_"
+
 # Timeouts
 CMD_TIMEOUT_SECS = 5.0
 SOCKET_TIMEOUT_SECS = 30.0
-MAX_REQUEST_SIZE = 4096
+IDLE_TIMEOUT_SECS = 300.0  # Persistent connections with no requests
+MAX_REQUEST_SIZE = 65536  # One request line (batch included)
+
+# Allocation journal
+JOURNAL_MODE = 0o600
+JOURNAL_COMPACT_RECORDS = 4096  # Appended records before rewriting as a snapshot
+
+# Request execution
+REQUEST_WORKERS = 8
+MAX_IN_FLIGHT_PER_CONN = 32
+MAX_BATCH_OPS = 16
 
 # Logging
 LOG_FORMAT = "%(asctime)s [netd] %(levelname)s: %(message)s"
@@ -219,29 +281,16 @@ def derive_tap_name(lab_id: str) -> str:
     return tap
 
 
-def derive_guest_ip(lab_id: str) -> str:
-    """Derive deterministic guest IP from lab_id.
-
-    Uses a hash of the lab_id to generate a unique IP in 10.200.x.y/16.
-    - Third octet (x): derived from first 4 hex chars
-    - Fourth octet (y): derived from next 4 hex chars
-    - Avoids .0 and .1 in last octet (network/gateway)
+def legacy_guest_ip(tap_name: str) -> str:
+    """Guest IP an older netd derived for a TAP's lab (10.200.x.y/16).
 
-    Args:
-        lab_id: Validated lab UUID string
-
-    Returns:
-        Guest IP address (e.g., "10.200.123.45")
+    Older netd versions hashed the lab_id's first 8 hex chars into an
+    address, which the TAP name still carries. Used only to keep addresses
+    of VMs started before the allocator from being handed out again.
     """
-    # Use hash for better distribution
-    hex_part = lab_id.replace("-", "")
-
-    # Third octet: 1-254 (avoid 0)
+    hex_part = tap_name[len(TAP_PREFIX):]
     third = (int(hex_part[:4], 16) % 254) + 1
-
-    # Fourth octet: 2-254 (avoid 0=network, 1=gateway)
     fourth = (int(hex_part[4:8], 16) % 253) + 2
-
     return f"10.200.{third}.{fourth}"
 
 
@@ -270,7 +319,12 @@ def derive_interface_names(lab_id: str) -> tuple[str, str]:
 # Network Operations
 # =============================================================================
 
-def run_cmd(args: list[str], timeout: float = CMD_TIMEOUT_SECS) -> tuple[int, str, str]:
+def run_cmd(
+    args: list[str],
+    timeout: float = CMD_TIMEOUT_SECS,
+    input_text: str | None = None,
+    output_limit: int = 2048,
+) -> tuple[int, str, str]:
     """Run a command safely.
 
     SECURITY:
@@ -281,6 +335,8 @@ def run_cmd(args: list[str], timeout: float = CMD_TIMEOUT_SECS) -> tuple[int, st
     Args:
         args: Command arguments as list
         timeout: Command timeout in seconds
+        input_text: Optional stdin (e.g. an nft -f - script)
+        output_limit: Max stdout characters kept (listings need more)
 
     Returns:
         Tuple of (returncode, stdout, stderr)
@@ -292,8 +348,9 @@ def run_cmd(args: list[str], timeout: float = CMD_TIMEOUT_SECS) -> tuple[int, st
             capture_output=True,
             text=True,
             timeout=timeout,
+            input=input_text,
         )
-        stdout = result.stdout[:2048] if result.stdout else ""
+        stdout = result.stdout[:output_limit] if result.stdout else ""
         stderr = result.stderr[:2048] if result.stderr else ""
         return result.returncode, stdout, stderr
     except subprocess.TimeoutExpired:
@@ -304,95 +361,357 @@ def run_cmd(args: list[str], timeout: float = CMD_TIMEOUT_SECS) -> tuple[int, st
         return -1, "", f"error: {type(e).__name__}"
 
 
+# =============================================================================
+# Netlink (rtnetlink)
+# =============================================================================
+#
+# Links and addresses are managed over AF_NETLINK instead of forking `ip`
+# and parsing its output. One socket per request keeps concurrent requests
+# from reading each other's replies. The backend's app/utils/rtnetlink.py
+# carries the same message handling; keep the two in step.
+
+NETLINK_ROUTE = 0
+
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+NLM_F_DUMP = 0x300
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+IFLA_IFNAME = 3
+IFLA_MASTER = 10
+IFLA_OPERSTATE = 16
+IFLA_LINKINFO = 18
+IFLA_INFO_KIND = 1
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+IFF_UP = 0x1
+
+OPERSTATES = ("unknown", "notpresent", "down", "lowerlayerdown", "testing", "dormant", "up")
+
+# TAP devices are created through the tun driver (it has no rtnetlink create)
+TUN_DEVICE = "/dev/net/tun"
+TUNSETIFF = 0x400454CA
+TUNSETPERSIST = 0x400454CB
+IFF_TAP = 0x0002
+IFF_NO_PI = 0x1000
+
+_NLMSGHDR = struct.Struct("=IHHII")  # len, type, flags, seq, pid
+_IFINFOMSG = struct.Struct("=BxHiII")  # family, type, index, flags, change
+_IFADDRMSG = struct.Struct("=BBBBI")  # family, prefixlen, flags, scope, index
+_RTATTR = struct.Struct("=HH")  # len, type
+_NLMSGERR = struct.Struct("=i")
+_IFREQ = struct.Struct("16sH22x")  # ifr_name, ifr_flags (struct ifreq is 40 bytes)
+
+NETLINK_RECV_BYTES = 256 * 1024
+
+_netlink_seq = itertools.count(1)
+
+
+class NetlinkError(OSError):
+    """The kernel rejected a netlink request (errno is set)."""
+
+
+def _nl_align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _nl_attr(attr_type: int, value: bytes) -> bytes:
+    length = _RTATTR.size + len(value)
+    return _RTATTR.pack(length, attr_type) + value + b"\0" * (_nl_align(length) - length)
+
+
+def _nl_parse_attrs(data: bytes) -> dict[int, bytes]:
+    attrs: dict[int, bytes] = {}
+    offset = 0
+    while offset + _RTATTR.size <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        # Strip NLA_F_NESTED / NLA_F_NET_BYTEORDER
+        attrs[attr_type & 0x3FFF] = data[offset + _RTATTR.size : offset + length]
+        offset += _nl_align(length)
+    return attrs
+
+
+def _nl_str(value: bytes) -> str:
+    return value.split(b"\0", 1)[0].decode(errors="replace")
+
+
+def _nl_ifinfo(index: int = 0, flags: int = 0, change: int = 0) -> bytes:
+    return _IFINFOMSG.pack(socket.AF_UNSPEC, 0, index, flags, change)
+
+
+def _nl_ifname(name: str) -> bytes:
+    return _nl_attr(IFLA_IFNAME, name.encode() + b"\0")
+
+
+def netlink_call(msg_type: int, flags: int, payload: bytes) -> list[tuple[int, bytes]]:
+    """Send one rtnetlink request; return (type, body) replies up to the ACK or DONE.
+
+    Raises:
+        NetlinkError: The kernel answered with an error
+        OSError: Socket failure
+    """
+    seq = next(_netlink_seq)
+    header = _NLMSGHDR.pack(
+        _NLMSGHDR.size + len(payload), msg_type, flags | NLM_F_REQUEST | NLM_F_ACK, seq, 0
+    )
+    replies: list[tuple[int, bytes]] = []
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.settimeout(CMD_TIMEOUT_SECS)
+        sock.bind((0, 0))
+        sock.send(header + payload)
+        while True:
+            data = sock.recv(NETLINK_RECV_BYTES)
+            offset = 0
+            while offset + _NLMSGHDR.size <= len(data):
+                length, reply_type, _, reply_seq, _ = _NLMSGHDR.unpack_from(data, offset)
+                if length < _NLMSGHDR.size:
+                    return replies
+                body = data[offset + _NLMSGHDR.size : offset + length]
+                offset += _nl_align(length)
+                if reply_seq != seq:
+                    continue
+                if reply_type == NLMSG_DONE:
+                    return replies
+                if reply_type == NLMSG_ERROR:
+                    error = -_NLMSGERR.unpack_from(body)[0]
+                    if error:
+                        raise NetlinkError(error, os.strerror(error))
+                    return replies  # ACK
+                replies.append((reply_type, body))
+
+
+def _nl_parse_link(body: bytes) -> dict[str, Any]:
+    """Decode an RTM_NEWLINK body (master is an ifindex, 0 for none)."""
+    _, _, index, flags, _ = _IFINFOMSG.unpack_from(body)
+    attrs = _nl_parse_attrs(body[_IFINFOMSG.size :])
+
+    kind = None
+    if IFLA_LINKINFO in attrs:
+        info = _nl_parse_attrs(attrs[IFLA_LINKINFO])
+        if IFLA_INFO_KIND in info:
+            kind = _nl_str(info[IFLA_INFO_KIND])
+
+    operstate = "unknown"
+    if attrs.get(IFLA_OPERSTATE):
+        value = attrs[IFLA_OPERSTATE][0]
+        operstate = OPERSTATES[value] if value < len(OPERSTATES) else "unknown"
+
+    master = 0
+    if len(attrs.get(IFLA_MASTER, b"")) >= 4:
+        master = struct.unpack_from("=I", attrs[IFLA_MASTER])[0]
+
+    return {
+        "index": index,
+        "name": _nl_str(attrs.get(IFLA_IFNAME, b"")),
+        "kind": kind,
+        "up": bool(flags & IFF_UP),
+        "operstate": operstate,
+        "master": master,
+    }
+
+
+def nl_dump_links() -> list[dict[str, Any]]:
+    """All links, with master resolved to a name (None if not enslaved)."""
+    replies = netlink_call(RTM_GETLINK, NLM_F_DUMP, _nl_ifinfo())
+    links = [_nl_parse_link(body) for reply_type, body in replies if reply_type == RTM_NEWLINK]
+    names = {link["index"]: link["name"] for link in links}
+    for link in links:
+        link["master"] = names.get(link["master"])
+    return links
+
+
+def nl_get_link(name: str) -> dict[str, Any] | None:
+    """One link by name (master resolved to a name), or None if absent."""
+    try:
+        replies = netlink_call(RTM_GETLINK, 0, _nl_ifinfo() + _nl_ifname(name))
+    except NetlinkError as e:
+        if e.errno == errno.ENODEV:
+            return None
+        raise
+    links = [_nl_parse_link(body) for reply_type, body in replies if reply_type == RTM_NEWLINK]
+    if not links:
+        return None
+    link = links[0]
+    if link["master"]:
+        masters = netlink_call(RTM_GETLINK, 0, _nl_ifinfo(index=link["master"]))
+        link["master"] = next(
+            (_nl_parse_link(body)["name"] for reply_type, body in masters if reply_type == RTM_NEWLINK),
+            None,
+        )
+    else:
+        link["master"] = None
+    return link
+
+
+def nl_create_link(name: str, kind: str) -> None:
+    """Create a link of the given kind (e.g. "bridge"); EEXIST if present."""
+    linkinfo = _nl_attr(IFLA_LINKINFO, _nl_attr(IFLA_INFO_KIND, kind.encode()))
+    netlink_call(RTM_NEWLINK, NLM_F_CREATE | NLM_F_EXCL, _nl_ifinfo() + _nl_ifname(name) + linkinfo)
+
+
+def nl_set_link(name: str, up: bool | None = None, master: str | None = None) -> None:
+    """Set a link up/down and/or enslave it to master, in one request."""
+    attrs = _nl_ifname(name)
+    if master is not None:
+        master_link = nl_get_link(master)
+        if master_link is None:
+            raise NetlinkError(errno.ENODEV, f"No such device: {master}")
+        attrs += _nl_attr(IFLA_MASTER, struct.pack("=I", master_link["index"]))
+    flags = IFF_UP if up else 0
+    change = IFF_UP if up is not None else 0
+    netlink_call(RTM_NEWLINK, 0, _nl_ifinfo(flags=flags, change=change) + attrs)
+
+
+def nl_delete_link(name: str) -> None:
+    """Delete a link by name; ENODEV if absent."""
+    netlink_call(RTM_DELLINK, 0, _nl_ifinfo() + _nl_ifname(name))
+
+
+def nl_add_address(name: str, cidr: str) -> None:
+    """Add an IPv4 address (a.b.c.d/len) to a link; EEXIST if assigned."""
+    link = nl_get_link(name)
+    if link is None:
+        raise NetlinkError(errno.ENODEV, f"No such device: {name}")
+    address, _, prefix = cidr.partition("/")
+    packed = socket.inet_aton(address)
+    payload = (
+        _IFADDRMSG.pack(socket.AF_INET, int(prefix or 32), 0, 0, link["index"])
+        + _nl_attr(IFA_LOCAL, packed)
+        + _nl_attr(IFA_ADDRESS, packed)
+    )
+    netlink_call(RTM_NEWADDR, NLM_F_CREATE | NLM_F_EXCL, payload)
+
+
+def create_persistent_tap(name: str) -> None:
+    """Create a persistent TAP device (what `ip tuntap add mode tap` does).
+
+    Raises:
+        OSError: e.g. EPERM without CAP_NET_ADMIN, EBUSY if in use
+    """
+    fd = os.open(TUN_DEVICE, os.O_RDWR | os.O_CLOEXEC)
+    try:
+        fcntl.ioctl(fd, TUNSETIFF, _IFREQ.pack(name.encode(), IFF_TAP | IFF_NO_PI))
+        fcntl.ioctl(fd, TUNSETPERSIST, 1)
+    finally:
+        os.close(fd)
+
+
+def _netlink_error_code(error: OSError, default: str) -> str:
+    if error.errno in (errno.EPERM, errno.EACCES):
+        return "EPERM"
+    return default
+
+
 def interface_exists(name: str) -> bool:
     """Check if a network interface exists."""
-    rc, _, _ = run_cmd(["ip", "link", "show", name])
-    return rc == 0
+    try:
+        return nl_get_link(name) is not None
+    except OSError as e:
+        logger.warning(f"Failed to look up {name}: {e.strerror}")
+        return False
 
 
-def create_bridge(bridge_name: str) -> tuple[bool, str]:
-    """Create a Linux bridge with gateway IP and NAT.
+def create_bridge(subnet: GuestSubnet) -> tuple[bool, str]:
+    """Create a guest subnet's Linux bridge with gateway IP and NAT.
 
     Args:
-        bridge_name: Bridge interface name (server-derived)
+        subnet: Guest subnet (bridge name and addresses are server-configured)
 
     Returns:
         Tuple of (success, error_code_or_empty)
     """
+    bridge_name = subnet.bridge
+
     # Check if already exists (idempotent)
     if interface_exists(bridge_name):
         logger.info(f"Bridge {bridge_name} already exists (idempotent)")
         # Still ensure gateway IP and NAT are configured (idempotent)
-        _ensure_gateway_and_nat(bridge_name)
+        _ensure_gateway_and_nat(subnet)
         return True, ""
 
     # Create bridge
-    rc, _, stderr = run_cmd(["ip", "link", "add", bridge_name, "type", "bridge"])
-    if rc != 0:
-        if "File exists" in stderr:
+    try:
+        nl_create_link(bridge_name, "bridge")
+    except OSError as e:
+        if e.errno == errno.EEXIST:
             # Race condition - bridge was created between check and create
-            _ensure_gateway_and_nat(bridge_name)
+            _ensure_gateway_and_nat(subnet)
             return True, ""
-        if "Operation not permitted" in stderr:
-            return False, "EPERM"
-        logger.error(f"Failed to create bridge {bridge_name}: {stderr[:100]}")
-        return False, "CREATE_FAILED"
+        logger.error(f"Failed to create bridge {bridge_name}: {e.strerror}")
+        return False, _netlink_error_code(e, "CREATE_FAILED")
 
     # Bring up bridge
-    rc, _, stderr = run_cmd(["ip", "link", "set", bridge_name, "up"])
-    if rc != 0:
-        logger.error(f"Failed to bring up bridge {bridge_name}: {stderr[:100]}")
+    try:
+        nl_set_link(bridge_name, up=True)
+    except OSError as e:
+        logger.error(f"Failed to bring up bridge {bridge_name}: {e.strerror}")
         # Try to clean up
-        run_cmd(["ip", "link", "del", bridge_name])
+        destroy_interface(bridge_name)
         return False, "UP_FAILED"
 
     # Configure gateway IP and NAT
-    _ensure_gateway_and_nat(bridge_name)
+    _ensure_gateway_and_nat(subnet)
 
     logger.info(f"Created bridge: {bridge_name}")
     return True, ""
 
 
-def _ensure_gateway_and_nat(bridge_name: str) -> None:
+def _ensure_gateway_and_nat(subnet: GuestSubnet) -> None:
     """Ensure gateway IP is assigned, NAT is configured, and metadata blocked.
 
     This is idempotent - safe to call multiple times.
 
     Args:
-        bridge_name: Bridge interface name
+        subnet: Guest subnet whose bridge to configure
     """
-    # Assign gateway IP to bridge (idempotent - fails gracefully if exists)
-    rc, stdout, stderr = run_cmd([
-        "ip", "addr", "add", BRIDGE_GATEWAY_IP, "dev", bridge_name
-    ])
-    if rc == 0:
-        logger.info(f"Assigned gateway IP {BRIDGE_GATEWAY_IP} to {bridge_name}")
-    elif "File exists" in stderr or "RTNETLINK answers" in stderr:
-        logger.debug(f"Gateway IP already assigned to {bridge_name}")
-    else:
-        logger.warning(f"Failed to assign gateway IP: {stderr[:100]}")
+    bridge_name = subnet.bridge
+    guest_subnet = str(subnet.network)
+
+    # Assign gateway IP to bridge (idempotent - EEXIST if already assigned)
+    try:
+        nl_add_address(bridge_name, subnet.gateway_cidr)
+        logger.info(f"Assigned gateway IP {subnet.gateway_cidr} to {bridge_name}")
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            logger.debug(f"Gateway IP already assigned to {bridge_name}")
+        else:
+            logger.warning(f"Failed to assign gateway IP: {e.strerror}")
 
     # Enable IP forwarding (idempotent)
-    rc, _, _ = run_cmd(["sysctl", "-w", "net.ipv4.ip_forward=1"])
-    if rc == 0:
+    try:
+        Path(IP_FORWARD_SYSCTL).write_text("1\n")
         logger.debug("IP forwarding enabled")
+    except OSError as e:
+        logger.warning(f"Failed to enable IP forwarding: {e.strerror}")
 
     # Block GCP metadata server (SECURITY: prevent credential theft)
     # Check if rule exists first
     rc, _, _ = run_cmd([
         "iptables", "-C", "FORWARD",
-        "-s", BRIDGE_SUBNET, "-d", METADATA_SERVER_IP,
+        "-s", guest_subnet, "-d", METADATA_SERVER_IP,
         "-j", "DROP"
     ])
     if rc != 0:
         # Rule doesn't exist, add it at the beginning of FORWARD chain
         rc, _, stderr = run_cmd([
             "iptables", "-I", "FORWARD", "1",
-            "-s", BRIDGE_SUBNET, "-d", METADATA_SERVER_IP,
+            "-s", guest_subnet, "-d", METADATA_SERVER_IP,
             "-j", "DROP"
         ])
         if rc == 0:
-            logger.info(f"Blocked metadata server {METADATA_SERVER_IP} for {BRIDGE_SUBNET}")
+            logger.info(f"Blocked metadata server {METADATA_SERVER_IP} for {guest_subnet}")
         else:
             logger.warning(f"Failed to block metadata server: {stderr[:100]}")
     else:
@@ -402,18 +721,18 @@ def _ensure_gateway_and_nat(bridge_name: str) -> None:
     # First check if rule exists
     rc, stdout, _ = run_cmd([
         "iptables", "-t", "nat", "-C", "POSTROUTING",
-        "-s", BRIDGE_SUBNET, "!", "-d", BRIDGE_SUBNET,
+        "-s", guest_subnet, "!", "-d", guest_subnet,
         "-j", "MASQUERADE"
     ])
     if rc != 0:
         # Rule doesn't exist, add it
         rc, _, stderr = run_cmd([
             "iptables", "-t", "nat", "-A", "POSTROUTING",
-            "-s", BRIDGE_SUBNET, "!", "-d", BRIDGE_SUBNET,
+            "-s", guest_subnet, "!", "-d", guest_subnet,
             "-j", "MASQUERADE"
         ])
         if rc == 0:
-            logger.info(f"Added NAT rule for {BRIDGE_SUBNET}")
+            logger.info(f"Added NAT rule for {guest_subnet}")
         else:
             logger.warning(f"Failed to add NAT rule: {stderr[:100]}")
     else:
@@ -436,29 +755,22 @@ def create_tap(tap_name: str, bridge_name: str) -> tuple[bool, str]:
         return True, ""
 
     # Create TAP device
-    rc, _, stderr = run_cmd(["ip", "tuntap", "add", "dev", tap_name, "mode", "tap"])
-    if rc != 0:
-        if "File exists" in stderr:
+    try:
+        create_persistent_tap(tap_name)
+    except OSError as e:
+        if e.errno in (errno.EEXIST, errno.EBUSY):
             return True, ""
-        if "Operation not permitted" in stderr:
-            return False, "EPERM"
-        logger.error(f"Failed to create TAP {tap_name}: {stderr[:100]}")
-        return False, "CREATE_FAILED"
+        logger.error(f"Failed to create TAP {tap_name}: {e.strerror}")
+        return False, _netlink_error_code(e, "CREATE_FAILED")
 
-    # Attach to bridge
-    rc, _, stderr = run_cmd(["ip", "link", "set", tap_name, "master", bridge_name])
-    if rc != 0:
-        logger.error(f"Failed to attach TAP to bridge: {stderr[:100]}")
-        run_cmd(["ip", "link", "del", tap_name])
+    # Attach to bridge and bring up (one netlink request)
+    try:
+        nl_set_link(tap_name, up=True, master=bridge_name)
+    except OSError as e:
+        logger.error(f"Failed to attach TAP to bridge: {e.strerror}")
+        destroy_interface(tap_name)
         return False, "ATTACH_FAILED"
 
-    # Bring up TAP
-    rc, _, stderr = run_cmd(["ip", "link", "set", tap_name, "up"])
-    if rc != 0:
-        logger.error(f"Failed to bring up TAP {tap_name}: {stderr[:100]}")
-        run_cmd(["ip", "link", "del", tap_name])
-        return False, "UP_FAILED"
-
     logger.info(f"Created TAP: {tap_name} -> {bridge_name}")
     return True, ""
 
@@ -472,20 +784,16 @@ def destroy_interface(name: str) -> tuple[bool, str]:
     Returns:
         Tuple of (success, error_code_or_empty)
     """
-    if not interface_exists(name):
-        logger.info(f"Interface {name} does not exist (idempotent destroy)")
-        return True, ""
-
-    rc, _, stderr = run_cmd(["ip", "link", "del", name])
-    if rc != 0:
-        if "Cannot find device" in stderr:
-            # Race condition - already gone
+    try:
+        nl_delete_link(name)
+    except OSError as e:
+        if e.errno == errno.ENODEV:
+            logger.info(f"Interface {name} does not exist (idempotent destroy)")
             return True, ""
-        if "Operation not permitted" in stderr:
-            return False, "EPERM"
-        logger.error(f"Failed to delete {name}: {stderr[:100]}")
-        return False, "DELETE_FAILED"
+        logger.error(f"Failed to delete {name}: {e.strerror}")
+        return False, _netlink_error_code(e, "DELETE_FAILED")
 
+    _allocations.forget_link(name)
     logger.info(f"Deleted interface: {name}")
     return True, ""
 
@@ -496,63 +804,638 @@ def list_lab_interfaces() -> list[dict[str, str]]:
     Returns:
         List of dicts with interface info
     """
-    result = []
-
-    rc, stdout, _ = run_cmd(["ip", "-j", "link", "show"])
-    if rc != 0:
-        # Fallback to non-JSON
-        rc, stdout, _ = run_cmd(["ip", "link", "show"])
-        if rc != 0:
-            return result
-
-        # Parse text output
-        for line in stdout.split("\n"):
-            # Check for shared bridge
-            if SHARED_BRIDGE_NAME in line:
-                result.append({"name": SHARED_BRIDGE_NAME, "type": "bridge"})
-            # Check for TAP devices
-            elif TAP_PREFIX in line:
-                parts = line.split(":")
-                if len(parts) >= 2:
-                    name = parts[1].strip().split("@")[0]
-                    if name.startswith(TAP_PREFIX):
-                        result.append({"name": name, "type": "tap"})
-            # Check for legacy bridges (for cleanup)
-            elif LEGACY_BRIDGE_PREFIX in line:
-                parts = line.split(":")
-                if len(parts) >= 2:
-                    name = parts[1].strip().split("@")[0]
-                    if name.startswith(LEGACY_BRIDGE_PREFIX):
-                        result.append({"name": name, "type": "bridge", "legacy": True})
-        return result
-
-    # Parse JSON output
     try:
-        interfaces = json.loads(stdout)
-        for iface in interfaces:
-            name = iface.get("ifname", "")
-            if name == SHARED_BRIDGE_NAME:
-                result.append({"name": name, "type": "bridge"})
-            elif name.startswith(TAP_PREFIX):
-                result.append({"name": name, "type": "tap"})
-            elif name.startswith(LEGACY_BRIDGE_PREFIX):
-                result.append({"name": name, "type": "bridge", "legacy": True})
-    except json.JSONDecodeError:
-        pass
+        links = nl_dump_links()
+    except OSError as e:
+        logger.warning(f"Failed to list interfaces: {e.strerror}")
+        return []
+    return _classify_lab_links(links, _allocations.bridge_names())
+
 
+def _classify_lab_links(links: list[dict[str, Any]], bridges: set[str]) -> list[dict[str, str]]:
+    """Pick the subnet bridges, TAPs and legacy bridges out of a link dump."""
+    result = []
+    for link in links:
+        name = link["name"]
+        if name in bridges:
+            result.append({"name": name, "type": "bridge"})
+        elif name.startswith(TAP_PREFIX):
+            result.append({"name": name, "type": "tap"})
+        # Legacy per-lab bridges (for cleanup)
+        elif name.startswith(LEGACY_BRIDGE_PREFIX):
+            result.append({"name": name, "type": "bridge", "legacy": True})
     return result
 
 
-def ensure_shared_bridge() -> tuple[bool, str]:
-    """Ensure the shared bridge exists with proper configuration.
+def ensure_bridge(subnet: GuestSubnet) -> tuple[bool, str]:
+    """Ensure a guest subnet's shared bridge exists with proper configuration.
 
-    This is called on first allocation or daemon startup.
+    This is called on allocation from the subnet.
     Idempotent - safe to call multiple times.
 
     Returns:
         Tuple of (success, error_code_or_empty)
     """
-    return create_bridge(SHARED_BRIDGE_NAME)
+    ok, err = create_bridge(subnet)
+    if ok:
+        _allocations.note_link(subnet.bridge, "bridge")
+    return ok, err
+
+
+# =============================================================================
+# Guest Addresses
+# =============================================================================
+
+_WORD_BITS = 64
+_WORD_MASK = (1 << _WORD_BITS) - 1
+
+
+def _lowest_bit(value: int) -> int:
+    """Index of the lowest set bit of a nonzero int."""
+    return (value & -value).bit_length() - 1
+
+
+class GuestSubnet:
+    """Guest addresses of one bridge's subnet, tracked in a two-level bitmap.
+
+    _words has one bit per address (set = free), 64 to a word; _nonfull has
+    one bit per word that still has a free address. Allocating or freeing
+    is a few integer operations however many addresses are in use.
+    Allocation continues after the previous one (next-fit), so a freed
+    address is not handed out again while the bridge may still have a
+    neighbour entry for the old VM.
+    """
+
+    def __init__(self, bridge: str, cidr: str):
+        self.bridge = bridge
+        self.network = ipaddress.IPv4Network(cidr)
+        self.size = self.network.num_addresses
+        self.gateway = str(self.network.network_address + 1)
+        self.gateway_cidr = f"{self.gateway}/{self.network.prefixlen}"
+        self.netmask = str(self.network.netmask)
+
+        word_count = (self.size + _WORD_BITS - 1) // _WORD_BITS
+        self._words = [_WORD_MASK] * word_count
+        if self.size % _WORD_BITS:
+            self._words[-1] = (1 << (self.size % _WORD_BITS)) - 1
+        self._nonfull = (1 << word_count) - 1
+        self._cursor = 0
+        self.free_count = self.size
+
+        # Network, gateway and broadcast addresses are never handed out
+        self._reserved = {0, 1, self.size - 1}
+        for offset in self._reserved:
+            self._take(offset)
+
+    def __contains__(self, ip: str) -> bool:
+        return ipaddress.IPv4Address(ip) in self.network
+
+    def _offset(self, ip: str) -> int:
+        return int(ipaddress.IPv4Address(ip)) - int(self.network.network_address)
+
+    def _take(self, offset: int) -> bool:
+        word, bit = divmod(offset, _WORD_BITS)
+        mask = 1 << bit
+        if not self._words[word] & mask:
+            return False
+        self._words[word] &= ~mask
+        if not self._words[word]:
+            self._nonfull &= ~(1 << word)
+        self.free_count -= 1
+        return True
+
+    def allocate(self) -> str | None:
+        """Take the next free address, or None if the subnet is full."""
+        if not self._nonfull:
+            return None
+        word, bit = divmod(self._cursor, _WORD_BITS)
+        # The cursor's word from the cursor on, then later words, then wrap
+        free = self._words[word] >> bit << bit
+        if not free:
+            later = self._nonfull >> (word + 1) << (word + 1)
+            word = _lowest_bit(later or self._nonfull)
+            free = self._words[word]
+        offset = word * _WORD_BITS + _lowest_bit(free)
+        self._take(offset)
+        self._cursor = (offset + 1) % self.size
+        return str(self.network.network_address + offset)
+
+    def reserve(self, ip: str) -> bool:
+        """Take a specific address. False if it is in use or not assignable."""
+        return self._take(self._offset(ip))
+
+    def release(self, ip: str) -> None:
+        """Return an address to the pool."""
+        offset = self._offset(ip)
+        if offset in self._reserved:
+            return
+        word, bit = divmod(offset, _WORD_BITS)
+        mask = 1 << bit
+        if self._words[word] & mask:
+            return
+        self._words[word] |= mask
+        self._nonfull |= 1 << word
+        self.free_count += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "bridge": self.bridge,
+            "subnet": str(self.network),
+            "gateway": self.gateway,
+            "free": self.free_count,
+        }
+
+
+def parse_guest_subnets(specs: list[str]) -> list[GuestSubnet]:
+    """Build subnets from "bridge=cidr" (or bare "cidr") specs.
+
+    A bare cidr gets the shared bridge name, numbered after the first
+    (br-octonet, br-octonet1, ...).
+
+    Raises:
+        ValueError: Bad cidr or bridge name, or overlapping subnets
+    """
+    subnets: list[GuestSubnet] = []
+    for position, spec in enumerate(specs):
+        bridge, _, cidr = spec.rpartition("=")
+        if not bridge:
+            bridge = SHARED_BRIDGE_NAME if position == 0 else f"{SHARED_BRIDGE_NAME}{position}"
+        if not BRIDGE_NAME_PATTERN.match(bridge):
+            raise ValueError(f"Invalid bridge name: {bridge}")
+        try:
+            network = ipaddress.IPv4Network(cidr.strip())
+        except ValueError as e:
+            raise ValueError(f"Invalid guest subnet {cidr!r}: {e}") from None
+        if not GUEST_PREFIX_MIN <= network.prefixlen <= GUEST_PREFIX_MAX:
+            raise ValueError(
+                f"Guest subnet {network} must be /{GUEST_PREFIX_MIN} to /{GUEST_PREFIX_MAX}"
+            )
+        for other in subnets:
+            if other.bridge == bridge or other.network.overlaps(network):
+                raise ValueError(f"Guest subnet {bridge}={network} overlaps {other.bridge}={other.network}")
+        subnets.append(GuestSubnet(bridge, str(network)))
+    if not subnets:
+        raise ValueError("At least one guest subnet is required")
+    return subnets
+
+
+# =============================================================================
+# Allocation Index
+# =============================================================================
+#
+# Which lab owns which TAP, guest IP and host ports, kept in memory so list,
+# diag and orphan cleanup never list interfaces or firewall rules.
+#
+# Every change is appended to a journal before the kernel is touched (and a
+# release after), so after a crash the journal describes at least everything
+# that exists; startup replays it and drops what the kernel no longer has.
+# The journal lives under /run (tmpfs): it disappears on reboot together with
+# the TAPs and forwards it describes, so records are not fsynced.
+
+
+@dataclass
+class LabAllocation:
+    """Network resources owned by one lab."""
+    lab_id: str
+    tap: str
+    guest_ip: str
+    has_tap: bool = False
+    forwards: dict[int, int] = field(default_factory=dict)  # host port -> guest port
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "lab_id": self.lab_id,
+            "tap": self.tap if self.has_tap else None,
+            "guest_ip": self.guest_ip,
+            "forwards": [
+                {"host_port": host_port, "guest_port": guest_port}
+                for host_port, guest_port in sorted(self.forwards.items())
+            ],
+        }
+
+
+class AllocationIndex:
+    """Lab allocations by lab_id, host port owners, and non-lab links.
+
+    Also assigns guest IPs: an allocation holds its address in its subnet's
+    bitmap until the allocation is gone (no TAP and no forwards).
+
+    Thread-safe. Without a journal path the index is memory-only.
+    """
+
+    def __init__(self, journal_path: str | None = None, subnets: list[GuestSubnet] | None = None):
+        self.journal_path = journal_path
+        self.subnets = subnets or parse_guest_subnets(DEFAULT_GUEST_SUBNETS.split(","))
+        self.allocations: dict[str, LabAllocation] = {}
+        self.port_owners: dict[int, str] = {}
+        # Subnet bridges, plus orphaned TAPs and legacy bridges found at startup
+        self.links: dict[str, dict[str, Any]] = {}
+        # TAP name -> address of a VM started before the allocator (see reconcile)
+        self.legacy_ips: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._journal_fd: int | None = None
+        self._journal_records = 0
+
+    # --- Changes -------------------------------------------------------------
+
+    def record_alloc(self, lab_id: str, tap: str) -> tuple[str | None, bool]:
+        """Record that lab_id owns tap and a guest IP (its existing one, else a new one).
+
+        Returns:
+            (guest IP or None if every subnet is full, whether it had the TAP already)
+        """
+        with self._lock:
+            existing = self._lookup(lab_id, tap)
+            if existing is not None:
+                guest_ip, had_tap = existing.guest_ip, existing.has_tap
+            else:
+                guest_ip, had_tap = self._allocate_ip(), False
+                if guest_ip is None:
+                    return None, False
+            self._record({"op": "alloc", "lab_id": lab_id, "tap": tap, "guest_ip": guest_ip})
+            return guest_ip, had_tap
+
+    def record_release(self, lab_id: str, tap: str) -> None:
+        """Record that lab_id's TAP is gone (its forwards are kept)."""
+        with self._lock:
+            if lab_id in self.allocations:
+                self._record({"op": "release", "lab_id": lab_id})
+            elif tap in self.legacy_ips:
+                self._release_ip(self.legacy_ips.pop(tap))
+
+    def record_forward(
+        self, lab_id: str, tap: str, guest_ip: str, host_port: int, guest_port: int
+    ) -> dict[str, Any] | None:
+        """Record host_port -> lab_id. Returns the previous owner's forward record."""
+        with self._lock:
+            previous = None
+            owner = self.port_owners.get(host_port)
+            if owner is not None:
+                allocation = self.allocations[owner]
+                previous = {
+                    "op": "forward",
+                    "lab_id": owner,
+                    "tap": allocation.tap,
+                    "guest_ip": allocation.guest_ip,
+                    "host_port": host_port,
+                    "guest_port": allocation.forwards[host_port],
+                }
+            self._record({
+                "op": "forward",
+                "lab_id": lab_id,
+                "tap": tap,
+                "guest_ip": guest_ip,
+                "host_port": host_port,
+                "guest_port": guest_port,
+            })
+            return previous
+
+    def restore_forward(self, lab_id: str, host_port: int, previous: dict[str, Any] | None) -> None:
+        """Undo record_forward after the kernel change failed."""
+        with self._lock:
+            self._record({"op": "unforward", "lab_id": lab_id, "host_port": host_port})
+            if previous is not None:
+                self._record(previous)
+
+    def record_unforward(self, lab_id: str) -> None:
+        """Record that all of lab_id's forwards are gone."""
+        with self._lock:
+            if lab_id in self.allocations:
+                self._record({"op": "unforward", "lab_id": lab_id})
+
+    def note_link(self, name: str, link_type: str) -> None:
+        """Remember a non-lab link (the shared bridge)."""
+        with self._lock:
+            self.links[name] = {"name": name, "type": link_type}
+
+    def forget_link(self, name: str) -> None:
+        with self._lock:
+            self.links.pop(name, None)
+
+    # --- Queries -------------------------------------------------------------
+
+    def get(self, lab_id: str, tap: str) -> dict[str, Any] | None:
+        """lab_id's allocation (adopting a pre-allocator TAP), or None."""
+        with self._lock:
+            allocation = self._lookup(lab_id, tap)
+            return allocation.to_dict() if allocation else None
+
+    def subnet_for(self, guest_ip: str) -> GuestSubnet | None:
+        for subnet in self.subnets:
+            if guest_ip in subnet:
+                return subnet
+        return None
+
+    def bridge_names(self) -> set[str]:
+        return {subnet.bridge for subnet in self.subnets}
+
+    def subnet_summary(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [subnet.to_dict() for subnet in self.subnets]
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [allocation.to_dict() for allocation in self.allocations.values()]
+
+    def interfaces(self) -> list[dict[str, Any]]:
+        """Known interfaces, in the shape list_lab_interfaces() returns."""
+        with self._lock:
+            result = [dict(link) for link in self.links.values()]
+            result += [
+                {"name": allocation.tap, "type": "tap"}
+                for allocation in self.allocations.values()
+                if allocation.has_tap
+            ]
+            return result
+
+    # --- Addresses -----------------------------------------------------------
+
+    def _allocate_ip(self) -> str | None:
+        for subnet in self.subnets:
+            guest_ip = subnet.allocate()
+            if guest_ip is not None:
+                return guest_ip
+        return None
+
+    def _claim_ip(self, guest_ip: str) -> None:
+        # Already taken when it came from _allocate_ip; replay claims it here
+        subnet = self.subnet_for(guest_ip)
+        if subnet is not None:
+            subnet.reserve(guest_ip)
+
+    def _release_ip(self, guest_ip: str) -> None:
+        subnet = self.subnet_for(guest_ip)
+        if subnet is not None:
+            subnet.release(guest_ip)
+
+    def _lookup(self, lab_id: str, tap: str) -> LabAllocation | None:
+        """Called with the lock held."""
+        allocation = self.allocations.get(lab_id)
+        if allocation is None and tap in self.legacy_ips:
+            # A VM from before the allocator: it keeps its derived address
+            guest_ip = self.legacy_ips.pop(tap)
+            self.links.pop(tap, None)
+            self._record({"op": "alloc", "lab_id": lab_id, "tap": tap, "guest_ip": guest_ip})
+            allocation = self.allocations[lab_id]
+        return allocation
+
+    # --- Journal -------------------------------------------------------------
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        op = record["op"]
+        lab_id = record["lab_id"]
+        allocation = self.allocations.get(lab_id)
+
+        if op in ("alloc", "forward"):
+            if allocation is None:
+                allocation = LabAllocation(lab_id, record["tap"], record["guest_ip"])
+                self.allocations[lab_id] = allocation
+                self._claim_ip(allocation.guest_ip)
+            elif allocation.guest_ip != record["guest_ip"]:
+                self._release_ip(allocation.guest_ip)
+                self._claim_ip(record["guest_ip"])
+            allocation.tap = record["tap"]
+            allocation.guest_ip = record["guest_ip"]
+        if op == "alloc":
+            allocation.has_tap = True
+        elif op == "forward":
+            host_port = record["host_port"]
+            owner = self.port_owners.get(host_port)
+            if owner is not None and owner != lab_id:
+                self.allocations[owner].forwards.pop(host_port, None)
+                self._drop_if_empty(owner)
+            allocation.forwards[host_port] = record["guest_port"]
+            self.port_owners[host_port] = lab_id
+        elif allocation is None:
+            return
+        elif op == "release":
+            allocation.has_tap = False
+        elif op == "unforward":
+            host_port = record.get("host_port")
+            ports = [host_port] if host_port is not None else list(allocation.forwards)
+            for port in ports:
+                if allocation.forwards.pop(port, None) is not None:
+                    self.port_owners.pop(port, None)
+        else:
+            raise ValueError(f"unknown journal op: {op}")
+        self._drop_if_empty(lab_id)
+
+    def _drop_if_empty(self, lab_id: str) -> None:
+        allocation = self.allocations.get(lab_id)
+        if allocation is not None and not allocation.has_tap and not allocation.forwards:
+            del self.allocations[lab_id]
+            self._release_ip(allocation.guest_ip)
+
+    def _record(self, record: dict[str, Any]) -> None:
+        """Journal a change, then apply it. Called with the lock held."""
+        if self.journal_path is not None:
+            if self._journal_records >= JOURNAL_COMPACT_RECORDS:
+                self._compact()
+            try:
+                if self._journal_fd is None:
+                    self._journal_fd = os.open(
+                        self.journal_path,
+                        os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC,
+                        JOURNAL_MODE,
+                    )
+                # One write per record: a crash leaves at most a torn last line
+                os.write(self._journal_fd, json.dumps(record, separators=(",", ":")).encode() + b"\n")
+                self._journal_records += 1
+            except OSError as e:
+                logger.warning(f"Failed to append to allocation journal: {e.strerror}")
+        self._apply(record)
+
+    def _compact(self) -> None:
+        """Rewrite the journal as one record per live allocation and forward."""
+        records = []
+        for allocation in self.allocations.values():
+            if allocation.has_tap:
+                records.append({
+                    "op": "alloc",
+                    "lab_id": allocation.lab_id,
+                    "tap": allocation.tap,
+                    "guest_ip": allocation.guest_ip,
+                })
+            for host_port, guest_port in sorted(allocation.forwards.items()):
+                records.append({
+                    "op": "forward",
+                    "lab_id": allocation.lab_id,
+                    "tap": allocation.tap,
+                    "guest_ip": allocation.guest_ip,
+                    "host_port": host_port,
+                    "guest_port": guest_port,
+                })
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+
+        tmp_path = f"{self.journal_path}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, JOURNAL_MODE)
+            try:
+                os.write(fd, data.encode())
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, self.journal_path)
+        except OSError as e:
+            logger.warning(f"Failed to compact allocation journal: {e.strerror}")
+            return
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+        self._journal_records = len(records)
+
+    def load(self) -> int:
+        """Replay the journal into memory. Returns the number of records applied."""
+        if self.journal_path is None:
+            return 0
+        try:
+            lines = Path(self.journal_path).read_bytes().splitlines()
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logger.warning(f"Failed to read allocation journal: {e.strerror}")
+            return 0
+
+        applied = 0
+        with self._lock:
+            for line in lines:
+                try:
+                    self._apply(json.loads(line))
+                    applied += 1
+                except (ValueError, KeyError, TypeError):
+                    # Torn last write (crash) or foreign content: skip it
+                    continue
+            self._journal_records = len(lines)
+        if applied != len(lines):
+            logger.warning(f"Skipped {len(lines) - applied} unreadable allocation journal records")
+        return applied
+
+    def reconcile(
+        self,
+        interfaces: list[dict[str, Any]] | None,
+        forwards: dict[int, tuple[str, int]] | None,
+    ) -> None:
+        """Match the index to the kernel, then compact the journal.
+
+        TAPs no allocation owns (started by a netd without the allocator)
+        keep their hash-derived address reserved; the lab adopts it on its
+        next request.
+
+        Args:
+            interfaces: list_lab_interfaces() output (None if unavailable)
+            forwards: host port -> (guest IP, guest port) (None if unavailable)
+        """
+        with self._lock:
+            orphan_taps = []
+            if interfaces is not None:
+                present = {iface["name"] for iface in interfaces}
+                for allocation in self.allocations.values():
+                    allocation.has_tap = allocation.tap in present
+                owned = {allocation.tap for allocation in self.allocations.values()}
+                bridges = self.bridge_names()
+                self.links = {}
+                for iface in interfaces:
+                    if iface["name"] in owned:
+                        continue
+                    link = dict(iface)
+                    if link["name"] not in bridges:
+                        link["orphan"] = True
+                    self.links[link["name"]] = link
+                    if link["type"] == "tap":
+                        orphan_taps.append(link["name"])
+
+            if forwards is not None:
+                by_guest_ip = {a.guest_ip: a for a in self.allocations.values()}
+                for allocation in self.allocations.values():
+                    for host_port, guest_port in list(allocation.forwards.items()):
+                        if forwards.get(host_port) != (allocation.guest_ip, guest_port):
+                            del allocation.forwards[host_port]
+                            self.port_owners.pop(host_port, None)
+                unowned = 0
+                for host_port, (guest_ip, guest_port) in forwards.items():
+                    if host_port in self.port_owners:
+                        continue
+                    allocation = by_guest_ip.get(guest_ip)
+                    if allocation is None:
+                        unowned += 1
+                        continue
+                    allocation.forwards[host_port] = guest_port
+                    self.port_owners[host_port] = allocation.lab_id
+                if unowned:
+                    logger.warning(f"{unowned} port forwards target no known lab")
+
+            for lab_id in list(self.allocations):
+                self._drop_if_empty(lab_id)
+            for tap in orphan_taps:
+                self._reserve_legacy_ip(tap)
+            if self.journal_path is not None:
+                self._compact()
+
+    def _reserve_legacy_ip(self, tap: str) -> None:
+        """Keep the derived address of a TAP no allocation owns out of the pool."""
+        try:
+            guest_ip = legacy_guest_ip(tap)
+        except ValueError:
+            return
+        subnet = self.subnet_for(guest_ip)
+        if subnet is None:
+            return
+        if subnet.reserve(guest_ip):
+            self.legacy_ips[tap] = guest_ip
+        else:
+            logger.warning(f"TAP {tap} from an older netd shares guest IP {guest_ip} with another lab")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._journal_fd is not None:
+                os.close(self._journal_fd)
+                self._journal_fd = None
+
+
+# Memory-only until main() calls load_allocation_index()
+_allocations = AllocationIndex()
+
+
+def _kernel_forwards() -> dict[int, tuple[str, int]] | None:
+    """Current host port forwards from the active backend (None on failure)."""
+    if _forward_backend_in_use() == FORWARD_BACKEND_NFTABLES:
+        with _forward_lock:
+            return dict(_nft_port_targets)
+
+    rc, _, _ = run_cmd(["iptables", "-t", "nat", "-S", "PREROUTING"])
+    if rc != 0:
+        return None
+    forwards = {}
+    for args in _iptables_forward_rules("PREROUTING"):
+        if "--dport" not in args or "--to-destination" not in args:
+            continue
+        host_port = args[args.index("--dport") + 1]
+        guest_ip, _, guest_port = args[args.index("--to-destination") + 1].partition(":")
+        if host_port.isdigit() and guest_port.isdigit():
+            forwards[int(host_port)] = (guest_ip, int(guest_port))
+    return forwards
+
+
+def load_allocation_index(journal_path: str, subnets: list[GuestSubnet] | None = None) -> AllocationIndex:
+    """Replay the journal, reconcile with the kernel, and make it the live index."""
+    global _allocations
+
+    index = AllocationIndex(journal_path, subnets)
+    records = index.load()
+    try:
+        links = nl_dump_links()
+    except OSError as e:
+        logger.warning(f"Cannot list interfaces for reconcile: {e.strerror}")
+        interfaces = None
+    else:
+        interfaces = _classify_lab_links(links, index.bridge_names())
+    index.reconcile(interfaces, _kernel_forwards())
+
+    _allocations = index
+    logger.info(
+        f"Allocation index: {len(index.allocations)} labs, {len(index.port_owners)} forwards "
+        f"({records} journal records replayed)"
+    )
+    return index
 
 
 # =============================================================================
@@ -583,7 +1466,8 @@ def handle_create(lab_id: str) -> dict[str, Any]:
 def handle_alloc_vm_net(lab_id: str) -> dict[str, Any]:
     """Allocate network resources for a VM.
 
-    Creates TAP device attached to shared bridge and returns network params.
+    Allocates a guest IP (the lab keeps its IP if it has one), creates a TAP
+    device attached to that subnet's shared bridge and returns network params.
 
     Args:
         lab_id: Lab UUID
@@ -596,19 +1480,23 @@ def handle_alloc_vm_net(lab_id: str) -> dict[str, Any]:
     except ValueError as e:
         return {"ok": False, "error": {"code": "INVALID_LAB_ID", "message": str(e)}}
 
-    # Ensure shared bridge exists (idempotent)
-    ok, err = ensure_shared_bridge()
-    if not ok:
-        return {"ok": False, "error": {"code": err, "message": f"Failed to create shared bridge: {err}"}}
-
-    # Derive TAP name and guest IP
     tap_name = derive_tap_name(safe_lab_id)
-    guest_ip = derive_guest_ip(safe_lab_id)
 
-    # Create and attach TAP to shared bridge
-    ok, err = create_tap(tap_name, SHARED_BRIDGE_NAME)
+    # Journal first: after a crash the index must cover every TAP
+    guest_ip, had_tap = _allocations.record_alloc(safe_lab_id, tap_name)
+    if guest_ip is None:
+        return {"ok": False, "error": {"code": "NO_ADDRESS", "message": "No free guest IP in any subnet"}}
+    subnet = _allocations.subnet_for(guest_ip)
+
+    # Ensure the subnet's shared bridge exists (idempotent)
+    ok, err = ensure_bridge(subnet)
+    if ok:
+        # Create and attach TAP to the bridge
+        ok, err = create_tap(tap_name, subnet.bridge)
     if not ok:
-        return {"ok": False, "error": {"code": err, "message": f"Failed to create TAP: {err}"}}
+        if not had_tap:
+            _allocations.record_release(safe_lab_id, tap_name)
+        return {"ok": False, "error": {"code": err, "message": f"Failed to set up TAP on {subnet.bridge}: {err}"}}
 
     logger.info(f"Allocated network for lab ...{safe_lab_id[-6:]}: tap={tap_name}, ip={guest_ip}")
 
@@ -617,10 +1505,10 @@ def handle_alloc_vm_net(lab_id: str) -> dict[str, Any]:
         "result": {
             "tap": tap_name,
             "guest_ip": guest_ip,
-            "gateway": BRIDGE_GATEWAY,
-            "netmask": BRIDGE_NETMASK,
+            "gateway": subnet.gateway,
+            "netmask": subnet.netmask,
             "dns": DNS_SERVER,
-            "bridge": SHARED_BRIDGE_NAME,
+            "bridge": subnet.bridge,
             "lab_id_suffix": safe_lab_id[-6:],
         },
     }
@@ -663,6 +1551,7 @@ def handle_release_vm_net(lab_id: str) -> dict[str, Any]:
     ok, err = destroy_interface(tap_name)
     if not ok:
         return {"ok": False, "error": {"code": err, "message": f"Failed to destroy TAP: {err}"}}
+    _allocations.record_release(safe_lab_id, tap_name)
 
     logger.info(f"Released network for lab ...{safe_lab_id[-6:]}: tap={tap_name}")
 
@@ -678,7 +1567,8 @@ def handle_release_vm_net(lab_id: str) -> dict[str, Any]:
 def handle_diag_vm_net(lab_id: str) -> dict[str, Any]:
     """Diagnose network status for a VM.
 
-    Reports if TAP exists, bridge status, and network params.
+    Reports if TAP exists, bridge status, network params, and what the
+    allocation index records for the lab.
 
     Args:
         lab_id: Lab UUID
@@ -692,31 +1582,26 @@ def handle_diag_vm_net(lab_id: str) -> dict[str, Any]:
         return {"ok": False, "error": {"code": "INVALID_LAB_ID", "message": str(e)}}
 
     tap_name = derive_tap_name(safe_lab_id)
-    guest_ip = derive_guest_ip(safe_lab_id)
+    allocation = _allocations.get(safe_lab_id, tap_name)
+    guest_ip = allocation["guest_ip"] if allocation else None
+    subnet = _allocations.subnet_for(guest_ip) if guest_ip else None
+    subnet = subnet or _allocations.subnets[0]
 
     # Check interface status
     tap_exists = interface_exists(tap_name)
-    bridge_exists = interface_exists(SHARED_BRIDGE_NAME)
+    bridge_exists = interface_exists(subnet.bridge)
 
     # Get TAP details if it exists
     tap_state = "unknown"
     tap_master = None
     if tap_exists:
-        rc, stdout, _ = run_cmd(["ip", "-j", "link", "show", tap_name])
-        if rc == 0:
-            try:
-                data = json.loads(stdout)
-                if data:
-                    tap_state = data[0].get("operstate", "unknown").lower()
-                    tap_master = data[0].get("master")
-            except (json.JSONDecodeError, IndexError, KeyError):
-                pass
-
-    # Check if we can reach gateway (basic connectivity test)
-    gateway_reachable = False
-    if bridge_exists:
-        rc, _, _ = run_cmd(["ip", "addr", "show", SHARED_BRIDGE_NAME])
-        gateway_reachable = rc == 0
+        try:
+            link = nl_get_link(tap_name)
+        except OSError:
+            link = None
+        if link is not None:
+            tap_state = link["operstate"]
+            tap_master = link["master"]
 
     return {
         "ok": True,
@@ -729,24 +1614,39 @@ def handle_diag_vm_net(lab_id: str) -> dict[str, Any]:
                 "master": tap_master,
             },
             "bridge": {
-                "name": SHARED_BRIDGE_NAME,
+                "name": subnet.bridge,
                 "exists": bridge_exists,
             },
             "network_params": {
                 "guest_ip": guest_ip,
-                "gateway": BRIDGE_GATEWAY,
-                "netmask": BRIDGE_NETMASK,
+                "gateway": subnet.gateway,
+                "netmask": subnet.netmask,
                 "dns": DNS_SERVER,
             },
-            "healthy": tap_exists and bridge_exists and tap_master == SHARED_BRIDGE_NAME,
+            "allocation": allocation,
+            "healthy": tap_exists and bridge_exists and tap_master == subnet.bridge,
         },
     }
 
 
 def handle_list() -> dict[str, Any]:
-    """Handle list request."""
-    interfaces = list_lab_interfaces()
-    return {"ok": True, "result": {"interfaces": interfaces, "count": len(interfaces)}}
+    """Handle list request (answered from the allocation index).
+
+    Result:
+        interfaces: Subnet bridges, lab TAPs, and links found orphaned at startup
+        allocations: Per lab: lab_id, tap, guest_ip, forwards
+        subnets: Per subnet: bridge, subnet, gateway, free addresses
+    """
+    interfaces = _allocations.interfaces()
+    return {
+        "ok": True,
+        "result": {
+            "interfaces": interfaces,
+            "count": len(interfaces),
+            "allocations": _allocations.snapshot(),
+            "subnets": _allocations.subnet_summary(),
+        },
+    }
 
 
 def handle_hello() -> dict[str, Any]:
@@ -762,6 +1662,7 @@ def handle_hello() -> dict[str, Any]:
         "ok": True,
         "name": "microvm-netd",
         "api_version": API_VERSION,
+        "protocol_version": PROTOCOL_VERSION,
         "supported_ops": supported_ops,
         "build_id": BUILD_ID,
     }
@@ -772,37 +1673,215 @@ def handle_hello() -> dict[str, Any]:
 # =============================================================================
 
 
-def handle_setup_port_forward(lab_id: str, host_port: int, guest_port: int = 6080) -> dict[str, Any]:
-    """Set up iptables DNAT for port forwarding.
+# Resolved lazily on first use; see configure_forward_backend()
+_forward_backend_requested = os.environ.get("OCTOLAB_NETD_FORWARD_BACKEND", FORWARD_BACKEND_AUTO)
+_forward_backend: str | None = None
+_forward_lock = threading.Lock()
 
-    Forwards host_port to guest_ip:guest_port.
+# Mirror of the nftables map, so setup/cleanup never list it:
+# host port -> (guest IP, guest port) and guest IP -> host ports
+_nft_port_targets: dict[int, tuple[str, int]] = {}
+_nft_guest_ports: dict[str, set[int]] = {}
 
-    Args:
-        lab_id: Lab UUID string (for rule comment and IP derivation)
-        host_port: Host port to listen on
-        guest_port: Guest port to forward to (default 6080)
 
-    Returns:
-        Response dict
+def configure_forward_backend(requested: str) -> None:
+    """Select the port forwarding backend (auto, nftables or iptables).
 
-    SECURITY:
-    - Rules are tagged with lab_id for precise cleanup
-    - Only forwards specific port to specific guest IP
-    - shell=False
+    Takes effect on the next port forward operation.
     """
+    global _forward_backend_requested, _forward_backend
+    if requested not in FORWARD_BACKENDS:
+        raise ValueError(f"Unknown forward backend: {requested}")
+    with _forward_lock:
+        _forward_backend_requested = requested
+        _forward_backend = None
+        _nft_port_targets.clear()
+        _nft_guest_ports.clear()
+
+
+def _nft_list_forwards() -> dict[int, tuple[str, int]] | None:
+    """Read the forward map from the kernel, or None if it cannot be listed."""
+    rc, stdout, _ = run_cmd(
+        ["nft", "-j", "list", "map", "ip", NFT_TABLE, NFT_FORWARD_MAP],
+        output_limit=4 * 1024 * 1024,
+    )
+    if rc != 0:
+        return None
     try:
-        safe_lab_id = validate_lab_id(lab_id)
-    except ValueError as e:
-        return {"ok": False, "error": {"code": "INVALID_LAB_ID", "message": str(e)}}
+        data = json.loads(stdout)
+    except json.JSONDecodeError:
+        return None
 
-    # Validate port numbers
-    if not isinstance(host_port, int) or host_port < 1 or host_port > 65535:
-        return {"ok": False, "error": {"code": "INVALID_PORT", "message": f"Invalid host_port: {host_port}"}}
-    if not isinstance(guest_port, int) or guest_port < 1 or guest_port > 65535:
-        return {"ok": False, "error": {"code": "INVALID_PORT", "message": f"Invalid guest_port: {guest_port}"}}
+    forwards: dict[int, tuple[str, int]] = {}
+    for entry in data.get("nftables", []):
+        for key, value in entry.get("map", {}).get("elem", []):
+            # Elements with attributes come wrapped as {"elem": {"val": ...}}
+            if isinstance(key, dict):
+                key = key.get("elem", {}).get("val")
+            target = value.get("concat", []) if isinstance(value, dict) else []
+            if isinstance(key, int) and len(target) == 2:
+                forwards[key] = (str(target[0]), int(target[1]))
+    return forwards
+
+
+def _nft_load_index(forwards: dict[int, tuple[str, int]]) -> None:
+    _nft_port_targets.clear()
+    _nft_guest_ports.clear()
+    for host_port, (guest_ip, guest_port) in forwards.items():
+        _nft_port_targets[host_port] = (guest_ip, guest_port)
+        _nft_guest_ports.setdefault(guest_ip, set()).add(host_port)
+
+
+def _nft_ensure_table() -> bool:
+    """Create table ip octolab with the forward map and NAT chains if missing."""
+    rc, _, _ = run_cmd(["nft", "list", "map", "ip", NFT_TABLE, NFT_FORWARD_MAP])
+    if rc == 0:
+        return True
+
+    # No map means no forwards to keep: replace any partial table atomically
+    # (the leading "table" line makes the delete safe when it does not exist)
+    script = f"table ip {NFT_TABLE}\ndelete table ip {NFT_TABLE}\n{NFT_TABLE_SPEC}"
+    rc, _, stderr = run_cmd(["nft", "-f", "-"], input_text=script)
+    if rc != 0:
+        logger.warning(f"Failed to create nftables table {NFT_TABLE}: {stderr[:100]}")
+        return False
+    logger.info(f"Created nftables table ip {NFT_TABLE} (map {NFT_FORWARD_MAP})")
+    return True
+
+
+def _iptables_forward_rules(chain: str) -> list[list[str]]:
+    """Our DNAT rules in a nat chain, as iptables -S argument lists."""
+    rc, stdout, _ = run_cmd(
+        ["iptables", "-t", "nat", "-S", chain], output_limit=4 * 1024 * 1024
+    )
+    if rc != 0:
+        return []
+    rules = []
+    for line in stdout.splitlines():
+        if f"--comment {FORWARD_COMMENT_PREFIX}" not in line or "-j DNAT" not in line:
+            continue
+        try:
+            rules.append(shlex.split(line))
+        except ValueError:
+            continue
+    return rules
+
+
+def _migrate_iptables_forwards() -> int:
+    """Move per-lab iptables DNAT rules (older netd) into the nftables map.
+
+    Called with _forward_lock held, once the map is the active backend.
+
+    Returns:
+        Number of iptables rules removed
+    """
+    removed = 0
+    for chain in ("PREROUTING", "OUTPUT"):
+        for args in _iptables_forward_rules(chain):
+            if chain == "PREROUTING" and "--dport" in args and "--to-destination" in args:
+                host_port = args[args.index("--dport") + 1]
+                guest_ip, _, guest_port = args[args.index("--to-destination") + 1].partition(":")
+                if host_port.isdigit() and guest_port.isdigit():
+                    ok, _ = _nft_add_forward(int(host_port), guest_ip, int(guest_port))
+                    if not ok:
+                        # Keep the rule rather than break a running lab
+                        continue
+            rc, _, _ = run_cmd(["iptables", "-t", "nat", "-D", *args[1:]])
+            if rc == 0:
+                removed += 1
+    if removed:
+        logger.info(f"Migrated {removed} iptables port forward rules to nftables")
+    return removed
+
+
+def _forward_backend_in_use() -> str:
+    """The active port forwarding backend, resolving it on first use."""
+    global _forward_backend
+    with _forward_lock:
+        if _forward_backend is not None:
+            return _forward_backend
+
+        requested = _forward_backend_requested
+        backend = FORWARD_BACKEND_IPTABLES
+        if requested != FORWARD_BACKEND_IPTABLES:
+            rc, _, _ = run_cmd(["nft", "--version"])
+            forwards = _nft_list_forwards() if rc == 0 and _nft_ensure_table() else None
+            if forwards is not None:
+                backend = FORWARD_BACKEND_NFTABLES
+                _nft_load_index(forwards)
+                _migrate_iptables_forwards()
+            elif requested == FORWARD_BACKEND_NFTABLES:
+                logger.error("nftables port forwarding unavailable; falling back to iptables")
+
+        _forward_backend = backend
+        logger.info(f"Port forwarding backend: {backend}")
+        return backend
+
+
+def _nft_add_forward(host_port: int, guest_ip: str, guest_port: int) -> tuple[bool, str]:
+    """Map host_port to guest_ip:guest_port. Called with _forward_lock held."""
+    target = (guest_ip, guest_port)
+    current = _nft_port_targets.get(host_port)
+    if current == target:
+        return True, ""
+
+    element = f"{{ {host_port} : {guest_ip} . {guest_port} }}"
+    rc, _, stderr = -1, "", ""
+    if current is None:
+        rc, _, stderr = run_cmd(["nft", "add", "element", "ip", NFT_TABLE, NFT_FORWARD_MAP, element])
+    if rc != 0:
+        # Port still mapped to an old target (its lab was not cleaned up):
+        # replace it in one transaction
+        script = (
+            f"delete element ip {NFT_TABLE} {NFT_FORWARD_MAP} {{ {host_port} }}\n"
+            f"add element ip {NFT_TABLE} {NFT_FORWARD_MAP} {element}\n"
+        )
+        rc, _, stderr = run_cmd(["nft", "-f", "-"], input_text=script)
+        if rc != 0:
+            return False, stderr
+
+    if current is not None:
+        _nft_guest_ports.get(current[0], set()).discard(host_port)
+    _nft_port_targets[host_port] = target
+    _nft_guest_ports.setdefault(guest_ip, set()).add(host_port)
+    return True, ""
+
+
+def _nft_delete_forwards(guest_ip: str) -> tuple[int, str]:
+    """Remove every host port mapped to guest_ip in one map operation."""
+    with _forward_lock:
+        ports = sorted(_nft_guest_ports.get(guest_ip, ()))
+        if not ports:
+            return 0, ""
+
+        elements = "{ " + ", ".join(str(port) for port in ports) + " }"
+        rc, _, stderr = run_cmd(["nft", "delete", "element", "ip", NFT_TABLE, NFT_FORWARD_MAP, elements])
+        if rc != 0:
+            # The mirror is stale (map changed outside netd): reload and retry
+            forwards = _nft_list_forwards()
+            if forwards is None:
+                return 0, stderr
+            _nft_load_index(forwards)
+            ports = sorted(_nft_guest_ports.get(guest_ip, ()))
+            if ports:
+                elements = "{ " + ", ".join(str(port) for port in ports) + " }"
+                rc, _, stderr = run_cmd(
+                    ["nft", "delete", "element", "ip", NFT_TABLE, NFT_FORWARD_MAP, elements]
+                )
+                if rc != 0:
+                    return 0, stderr
+
+        for port in ports:
+            _nft_port_targets.pop(port, None)
+        _nft_guest_ports.pop(guest_ip, None)
+        return len(ports), ""
 
-    guest_ip = derive_guest_ip(safe_lab_id)
-    comment = f"octolab_{safe_lab_id[-12:]}"
+
+def _iptables_setup_port_forward(
+    safe_lab_id: str, guest_ip: str, host_port: int, guest_port: int
+) -> tuple[bool, str]:
+    """Append per-lab DNAT rules to nat PREROUTING and OUTPUT."""
+    comment = f"{FORWARD_COMMENT_PREFIX}{safe_lab_id[-12:]}"
 
     # DNAT rule: redirect incoming traffic on host_port to guest
     dnat_args = [
@@ -815,7 +1894,7 @@ def handle_setup_port_forward(lab_id: str, host_port: int, guest_port: int = 608
     ]
     rc, _, stderr = run_cmd(dnat_args)
     if rc != 0:
-        return {"ok": False, "error": {"code": "DNAT_FAILED", "message": f"Failed to add DNAT rule: {stderr[:100]}"}}
+        return False, stderr
 
     # Also add OUTPUT chain rule for local access (127.0.0.1)
     output_args = [
@@ -832,7 +1911,93 @@ def handle_setup_port_forward(lab_id: str, host_port: int, guest_port: int = 608
         logger.warning(f"Failed to add OUTPUT DNAT rule: {stderr[:100]}")
         # Non-fatal for local-only testing
 
-    logger.info(f"Set up port forward: {host_port} -> {guest_ip}:{guest_port} (lab ...{safe_lab_id[-6:]})")
+    return True, ""
+
+
+def _iptables_cleanup_port_forward(safe_lab_id: str) -> int:
+    """Delete a lab's DNAT rules by comment. Returns the number deleted."""
+    comment = f"{FORWARD_COMMENT_PREFIX}{safe_lab_id[-12:]}"
+    deleted_count = 0
+
+    # Remove rules by comment from nat PREROUTING and OUTPUT chains
+    for chain in ["PREROUTING", "OUTPUT"]:
+        # List rules with line numbers
+        rc, stdout, _ = run_cmd(["iptables", "-t", "nat", "-L", chain, "--line-numbers", "-n"])
+        if rc != 0:
+            continue
+
+        # Find matching rule numbers (parse in reverse to delete from end first)
+        lines = stdout.strip().split("\n")
+        rule_nums = []
+        for line in lines:
+            if comment in line:
+                parts = line.split()
+                if parts and parts[0].isdigit():
+                    rule_nums.append(int(parts[0]))
+
+        # Delete in reverse order to preserve line numbers
+        for rule_num in sorted(rule_nums, reverse=True):
+            rc, _, _ = run_cmd(["iptables", "-t", "nat", "-D", chain, str(rule_num)])
+            if rc == 0:
+                deleted_count += 1
+
+    return deleted_count
+
+
+def handle_setup_port_forward(lab_id: str, host_port: int, guest_port: int = 6080) -> dict[str, Any]:
+    """Set up DNAT port forwarding for a lab.
+
+    Forwards host_port to guest_ip:guest_port, as one element of the
+    nftables forward map (or per-lab iptables rules as the fallback).
+
+    Args:
+        lab_id: Lab UUID string (for rule comment and its allocated guest IP)
+        host_port: Host port to listen on
+        guest_port: Guest port to forward to (default 6080)
+
+    Returns:
+        Response dict
+
+    SECURITY:
+    - Forwards are keyed by server-derived guest IP for precise cleanup
+    - Only forwards specific port to specific guest IP
+    - shell=False
+    """
+    try:
+        safe_lab_id = validate_lab_id(lab_id)
+    except ValueError as e:
+        return {"ok": False, "error": {"code": "INVALID_LAB_ID", "message": str(e)}}
+
+    # Validate port numbers
+    if not isinstance(host_port, int) or host_port < 1 or host_port > 65535:
+        return {"ok": False, "error": {"code": "INVALID_PORT", "message": f"Invalid host_port: {host_port}"}}
+    if not isinstance(guest_port, int) or guest_port < 1 or guest_port > 65535:
+        return {"ok": False, "error": {"code": "INVALID_PORT", "message": f"Invalid guest_port: {guest_port}"}}
+
+    tap_name = derive_tap_name(safe_lab_id)
+    allocation = _allocations.get(safe_lab_id, tap_name)
+    if allocation is None:
+        return {
+            "ok": False,
+            "error": {"code": "NOT_ALLOCATED", "message": "Lab has no guest IP (alloc_vm_net first)"},
+        }
+    guest_ip = allocation["guest_ip"]
+    backend = _forward_backend_in_use()
+    previous = _allocations.record_forward(safe_lab_id, tap_name, guest_ip, host_port, guest_port)
+
+    if backend == FORWARD_BACKEND_NFTABLES:
+        with _forward_lock:
+            ok, stderr = _nft_add_forward(host_port, guest_ip, guest_port)
+    else:
+        ok, stderr = _iptables_setup_port_forward(safe_lab_id, guest_ip, host_port, guest_port)
+    if not ok:
+        _allocations.restore_forward(safe_lab_id, host_port, previous)
+        return {"ok": False, "error": {"code": "DNAT_FAILED", "message": f"Failed to add DNAT rule: {stderr[:100]}"}}
+
+    logger.info(
+        f"Set up port forward: {host_port} -> {guest_ip}:{guest_port} "
+        f"(lab ...{safe_lab_id[-6:]}, {backend})"
+    )
 
     return {
         "ok": True,
@@ -840,13 +2005,14 @@ def handle_setup_port_forward(lab_id: str, host_port: int, guest_port: int = 608
             "host_port": host_port,
             "guest_ip": guest_ip,
             "guest_port": guest_port,
+            "backend": backend,
             "lab_id_suffix": safe_lab_id[-6:],
         },
     }
 
 
 def handle_cleanup_port_forward(lab_id: str) -> dict[str, Any]:
-    """Remove iptables port forwarding rules for a lab.
+    """Remove port forwarding for a lab.
 
     Args:
         lab_id: Lab UUID string
@@ -854,37 +2020,28 @@ def handle_cleanup_port_forward(lab_id: str) -> dict[str, Any]:
     Returns:
         Response dict
 
-    SECURITY: Uses comment matching to remove only this lab's rules.
+    SECURITY: Removes only forwards to this lab's guest IP (nftables) or
+    rules carrying its comment (iptables).
     """
     try:
         safe_lab_id = validate_lab_id(lab_id)
     except ValueError as e:
         return {"ok": False, "error": {"code": "INVALID_LAB_ID", "message": str(e)}}
 
-    comment = f"octolab_{safe_lab_id[-12:]}"
-    deleted_count = 0
-
-    # Remove rules by comment from nat PREROUTING and OUTPUT chains
-    for chain in ["PREROUTING", "OUTPUT"]:
-        # List rules with line numbers
-        rc, stdout, _ = run_cmd(["iptables", "-t", "nat", "-L", chain, "--line-numbers", "-n"])
-        if rc != 0:
-            continue
-
-        # Find matching rule numbers (parse in reverse to delete from end first)
-        lines = stdout.strip().split("\n")
-        rule_nums = []
-        for line in lines:
-            if comment in line:
-                parts = line.split()
-                if parts and parts[0].isdigit():
-                    rule_nums.append(int(parts[0]))
-
-        # Delete in reverse order to preserve line numbers
-        for rule_num in sorted(rule_nums, reverse=True):
-            rc, _, _ = run_cmd(["iptables", "-t", "nat", "-D", chain, str(rule_num)])
-            if rc == 0:
-                deleted_count += 1
+    backend = _forward_backend_in_use()
+    if backend == FORWARD_BACKEND_NFTABLES:
+        allocation = _allocations.get(safe_lab_id, derive_tap_name(safe_lab_id))
+        deleted_count, stderr = (
+            _nft_delete_forwards(allocation["guest_ip"]) if allocation else (0, "")
+        )
+        if stderr:
+            return {
+                "ok": False,
+                "error": {"code": "DNAT_CLEANUP_FAILED", "message": f"Failed to remove forwards: {stderr[:100]}"},
+            }
+    else:
+        deleted_count = _iptables_cleanup_port_forward(safe_lab_id)
+    _allocations.record_unforward(safe_lab_id)
 
     logger.info(f"Cleaned up port forwarding for lab ...{safe_lab_id[-6:]}: deleted {deleted_count} rules")
 
@@ -892,6 +2049,7 @@ def handle_cleanup_port_forward(lab_id: str) -> dict[str, Any]:
         "ok": True,
         "result": {
             "deleted_rules": deleted_count,
+            "backend": backend,
             "lab_id_suffix": safe_lab_id[-6:],
         },
     }
@@ -901,6 +2059,38 @@ def handle_cleanup_port_forward(lab_id: str) -> dict[str, Any]:
 # Operation Registry
 # =============================================================================
 
+def handle_batch(requests: Any, stop_on_error: bool = True) -> dict[str, Any]:
+    """Run several operations in one round-trip, in order.
+
+    Args:
+        requests: List of request dicts (same shape as top-level requests)
+        stop_on_error: Skip the remaining operations after the first failure
+
+    Returns:
+        Response dict with one response per operation; skipped operations
+        are reported as {"ok": false, "error": "SKIPPED"}
+    """
+    if not isinstance(requests, list) or not requests:
+        return {"ok": False, "error": "INVALID_BATCH", "message": "requests must be a non-empty list"}
+    if len(requests) > MAX_BATCH_OPS:
+        return {"ok": False, "error": "INVALID_BATCH", "message": f"At most {MAX_BATCH_OPS} operations per batch"}
+
+    responses: list[dict[str, Any]] = []
+    failed = False
+    for request in requests:
+        if failed and stop_on_error:
+            responses.append({"ok": False, "error": "SKIPPED", "message": "Skipped after earlier failure"})
+            continue
+        if not isinstance(request, dict) or request.get("op") == "batch":
+            response = {"ok": False, "error": "INVALID_BATCH", "message": "Batch entries must be non-batch requests"}
+        else:
+            response = dispatch_request(request)
+        failed = failed or not response.get("ok", False)
+        responses.append(response)
+
+    return {"ok": True, "result": {"responses": responses}}
+
+
 # Registry maps op name to (handler, requires_lab_id, extra_params)
 # extra_params is a list of (param_name, required, default) tuples
 # This is the single source of truth for supported operations
@@ -908,6 +2098,10 @@ OP_REGISTRY: dict[str, tuple[Any, bool, list]] = {
     "hello": (handle_hello, False, []),
     "ping": (handle_ping, False, []),
     "list": (handle_list, False, []),
+    "batch": (handle_batch, False, [
+        ("requests", True, None),
+        ("stop_on_error", False, True),
+    ]),
     # New API (preferred)
     "alloc_vm_net": (handle_alloc_vm_net, True, []),
     "release_vm_net": (handle_release_vm_net, True, []),
@@ -924,65 +2118,74 @@ OP_REGISTRY: dict[str, tuple[Any, bool, list]] = {
 }
 
 
-def process_request(request_data: bytes) -> bytes:
-    """Process a single request.
-
-    Uses OP_REGISTRY to dispatch operations.
-
-    Args:
-        request_data: Raw request bytes
+def parse_request(request_data: bytes) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+    """Decode one request.
 
     Returns:
-        Response bytes (JSON)
+        (request, None) or (None, error response)
     """
     try:
         request = json.loads(request_data.decode("utf-8"))
-    except (json.JSONDecodeError, UnicodeDecodeError) as e:
-        return json.dumps({
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, {
             "ok": False,
             "error": "INVALID_JSON",
             "message": "Invalid JSON request",
-        }).encode("utf-8")
+        }
+    if not isinstance(request, dict):
+        return None, {
+            "ok": False,
+            "error": "INVALID_JSON",
+            "message": "Request must be a JSON object",
+        }
+    return request, None
 
+
+def dispatch_request(request: dict[str, Any]) -> dict[str, Any]:
+    """Run a decoded request through OP_REGISTRY.
+
+    Args:
+        request: Request dict
+
+    Returns:
+        Response dict (without the request id)
+    """
     op = request.get("op")
 
     # Look up operation in registry
     if op not in OP_REGISTRY:
-        return json.dumps({
+        return {
             "ok": False,
             "error": "UNKNOWN_OP",
             "message": f"Unknown operation: {op}",
-        }).encode("utf-8")
+        }
 
     handler, requires_lab_id, extra_params = OP_REGISTRY[op]
 
     # Check for lab_id if required
-    if requires_lab_id:
-        lab_id = request.get("lab_id")
-        if not lab_id:
-            return json.dumps({
+    lab_id = request.get("lab_id")
+    if requires_lab_id and not lab_id:
+        return {
+            "ok": False,
+            "error": "MISSING_LAB_ID",
+            "message": "lab_id required",
+        }
+
+    # Build kwargs from extra_params
+    kwargs = {}
+    for param_name, required, default in extra_params:
+        value = request.get(param_name, default)
+        if required and value is None:
+            return {
                 "ok": False,
-                "error": "MISSING_LAB_ID",
-                "message": "lab_id required",
-            }).encode("utf-8")
-
-        # Build kwargs from extra_params
-        kwargs = {}
-        for param_name, required, default in extra_params:
-            value = request.get(param_name, default)
-            if required and value is None:
-                return json.dumps({
-                    "ok": False,
-                    "error": "MISSING_PARAM",
-                    "message": f"Missing required parameter: {param_name}",
-                }).encode("utf-8")
-            kwargs[param_name] = value
-
-        response = handler(lab_id, **kwargs)
-    else:
-        response = handler()
+                "error": "MISSING_PARAM",
+                "message": f"Missing required parameter: {param_name}",
+            }
+        kwargs[param_name] = value
 
-    return json.dumps(response).encode("utf-8")
+    if requires_lab_id:
+        return handler(lab_id, **kwargs)
+    return handler(**kwargs)
 
 
 # =============================================================================
@@ -996,6 +2199,9 @@ class NetdServer:
         self.socket_path = socket_path
         self.running = False
         self.server_socket: socket.socket | None = None
+        self.executor = ThreadPoolExecutor(
+            max_workers=REQUEST_WORKERS, thread_name_prefix="netd-request"
+        )
 
     def setup_socket(self) -> None:
         """Create and configure the UNIX socket.
@@ -1078,32 +2284,106 @@ class NetdServer:
         logger.info(f"Listening on: {socket_path}")
 
     def handle_client(self, client_socket: socket.socket, addr: Any) -> None:
-        """Handle a single client connection."""
-        try:
-            client_socket.settimeout(SOCKET_TIMEOUT_SECS)
+        """Serve one client connection.
 
-            # Read request (up to max size)
-            data = client_socket.recv(MAX_REQUEST_SIZE)
-            if not data:
-                return
+        Requests are newline-delimited. The first request without an id (or
+        unterminated complete JSON, as sent by one-shot clients) is answered
+        and the connection closed. Requests with an id run on the shared
+        request pool, up to MAX_IN_FLIGHT_PER_CONN at a time, and their
+        responses are written back as they complete.
+        """
+        send_lock = threading.Lock()
+        in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT_PER_CONN)
+
+        def respond(response: dict[str, Any], request_id: Any = None) -> None:
+            if request_id is not None:
+                response = {**response, "id": request_id}
+            data = json.dumps(response).encode("utf-8") + b"\n"
+            with send_lock:
+                client_socket.sendall(data)
+
+        def run_request(request: dict[str, Any]) -> None:
+            # The permit is held until the response is written, so the
+            # socket is not closed under it (see finally below)
+            try:
+                try:
+                    response = dispatch_request(request)
+                except Exception as e:
+                    logger.error(f"Request error ({request.get('op')}): {type(e).__name__}")
+                    response = {"ok": False, "error": "INTERNAL_ERROR", "message": "Internal server error"}
+                respond(response, request["id"])
+            except OSError:
+                pass  # Client went away
+            finally:
+                in_flight.release()
 
-            # Process and respond
-            response = process_request(data)
-            client_socket.sendall(response)
+        try:
+            client_socket.settimeout(SOCKET_TIMEOUT_SECS)
+            buffer = bytearray()
+            persistent = False
+
+            while True:
+                chunk = client_socket.recv(MAX_REQUEST_SIZE)
+                if not chunk:
+                    return
+                buffer.extend(chunk)
+
+                while True:
+                    newline = buffer.find(b"\n")
+                    if newline < 0:
+                        break
+                    line = bytes(buffer[:newline])
+                    del buffer[: newline + 1]
+                    if not line.strip():
+                        continue
+
+                    request, error = parse_request(line)
+                    if request is None or request.get("id") is None:
+                        if persistent:
+                            # Cannot be matched to a request by the client
+                            respond(error or {
+                                "ok": False,
+                                "error": "MISSING_ID",
+                                "message": "id required after the first request with an id",
+                            })
+                            continue
+                        # One-shot request: answer and close
+                        respond(error or dispatch_request(request))
+                        return
+
+                    if not persistent:
+                        persistent = True
+                        client_socket.settimeout(IDLE_TIMEOUT_SECS)
+                    in_flight.acquire()
+                    try:
+                        self.executor.submit(run_request, request)
+                    except RuntimeError:
+                        in_flight.release()
+                        return  # Shutting down
+
+                if len(buffer) > MAX_REQUEST_SIZE:
+                    respond({"ok": False, "error": "REQUEST_TOO_LARGE", "message": "Request too large"})
+                    return
+
+                if buffer and not persistent:
+                    # One-shot clients send a single unterminated request
+                    request, error = parse_request(bytes(buffer))
+                    if request is not None and request.get("id") is None:
+                        respond(dispatch_request(request))
+                        return
 
         except socket.timeout:
-            logger.warning("Client timeout")
+            logger.debug("Client idle timeout")
         except Exception as e:
             logger.error(f"Client error: {type(e).__name__}")
             try:
-                error_response = json.dumps({
-                    "ok": False,
-                    "error": {"code": "INTERNAL_ERROR", "message": "Internal server error"},
-                }).encode("utf-8")
-                client_socket.sendall(error_response)
+                respond({"ok": False, "error": "INTERNAL_ERROR", "message": "Internal server error"})
             except Exception:
                 pass
         finally:
+            # Let in-flight requests finish writing before closing
+            for _ in range(MAX_IN_FLIGHT_PER_CONN):
+                in_flight.acquire(timeout=SOCKET_TIMEOUT_SECS)
             try:
                 client_socket.close()
             except Exception:
@@ -1139,6 +2419,7 @@ class NetdServer:
     def stop(self) -> None:
         """Stop the server."""
         self.running = False
+        self.executor.shutdown(wait=False)
         if self.server_socket:
             try:
                 self.server_socket.close()
@@ -1342,6 +2623,26 @@ def main() -> int:
         action="store_true",
         help="Enable debug logging",
     )
+    parser.add_argument(
+        "--journal",
+        default=DEFAULT_JOURNAL_PATH,
+        help=f"Allocation journal path (default: {DEFAULT_JOURNAL_PATH})",
+    )
+    parser.add_argument(
+        "--subnet",
+        action="append",
+        metavar="BRIDGE=CIDR",
+        help=(
+            "Guest subnet and its bridge, repeatable; used in order "
+            f"(default: OCTOLAB_NETD_SUBNETS or {DEFAULT_GUEST_SUBNETS})"
+        ),
+    )
+    parser.add_argument(
+        "--forward-backend",
+        choices=FORWARD_BACKENDS,
+        default=_forward_backend_requested,
+        help="Port forwarding backend (default: auto = nftables, else iptables)",
+    )
 
     args = parser.parse_args()
 
@@ -1351,6 +2652,14 @@ def main() -> int:
         print("ERROR: Socket path must not contain '..'", file=sys.stderr)
         return 1
 
+    try:
+        subnets = parse_guest_subnets(
+            args.subnet or os.environ.get("OCTOLAB_NETD_SUBNETS", DEFAULT_GUEST_SUBNETS).split(",")
+        )
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
     # Check if running as root
     if os.geteuid() != 0:
         logger.error("microvm-netd must run as root (requires CAP_NET_ADMIN)")
@@ -1358,6 +2667,7 @@ def main() -> int:
 
     # Setup file logging
     _setup_logging(args.log_file, args.debug)
+    configure_forward_backend(args.forward_backend)
 
     # Ensure run directory exists with correct permissions
     _ensure_run_directory(args.group)
@@ -1374,6 +2684,9 @@ def main() -> int:
         logger.error("Failed to write PID file")
         return 1
 
+    # Rebuild the allocation index (journal + kernel) before serving
+    index = load_allocation_index(args.journal, subnets)
+
     # Setup signal handlers
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
@@ -1392,6 +2705,7 @@ def main() -> int:
         pass
     finally:
         _server.stop()
+        index.close()
         _remove_pidfile(args.pidfile)
 
     return 0
@@ -136,7 +136,7 @@ check_sudo() {
 install_packages() {
     log_info "Installing required packages..."
 
-    local packages=(curl jq tar ca-certificates util-linux iptables wget)
+    local packages=(curl jq tar ca-certificates util-linux iptables nftables wget)
 
     # Check which packages need installation
     local to_install=()
@@ -465,6 +465,7 @@ cmd_install() {
         jq \
         socat \
         iptables \
+        nftables \
         iproute2 \
         util-linux \
         ca-certificates \